@@ -1,20 +1,33 @@
-from flask import Flask, request, abort
+from flask import Flask, request, abort, jsonify
 from linebot import LineBotApi, WebhookHandler
 from linebot.exceptions import InvalidSignatureError
 from linebot.models import (
     MessageEvent, TextMessage, TextSendMessage,
-    QuickReply, QuickReplyButton, MessageAction,
-    FlexSendMessage
+    QuickReplyButton, MessageAction
 )
 import os
-from datetime import datetime, timedelta
-import sqlite3
-from collections import defaultdict
+from datetime import datetime
 import threading
 import time
-import re
 import logging
 
+from config import Config
+from flex_styles import FlexStyles
+from utils.profile_cache import ProfileCache
+from utils.game_store import create_game_store
+from utils.locks import LockManager
+from utils.dispatcher import EventDispatcher
+from utils.storage import get_storage
+from utils.leaderboard_cache import LeaderboardCache
+from utils.standings_cache import StandingsCache
+from utils.flex_templates import FrozenQuickReply, prebuilt_flex
+from utils.commands import CommandRouter
+from utils.rate_limiter import create_rate_limiter
+from utils.expiry import ExpiryScheduler
+from utils.ai_client import get_ai_client
+from utils.gemini_helper import get_gemini_helper
+from utils import arabic
+
 # إعداد السجلات (Logging)
 logging.basicConfig(
     level=logging.INFO,
@@ -22,24 +35,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# استيراد الألعاب
+# استيراد الألعاب - كل لعبة تسجل نفسها وأسماءها في games.registry
 try:
-    from games.iq_game import IQGame
-    from games.word_color_game import WordColorGame
-    from games.chain_words_game import ChainWordsGame
-    from games.scramble_word_game import ScrambleWordGame
-    from games.letters_words_game import LettersWordsGame
-    from games.fast_typing_game import FastTypingGame
-    from games.human_animal_plant_game import HumanAnimalPlantGame
-    from games.guess_game import GuessGame
+    import games
+    from games.registry import GAMES, game_specs
     from games.compatibility_game import CompatibilityGame
-    from games.math_game import MathGame
-    from games.memory_game import MemoryGame
-    from games.riddle_game import RiddleGame
-    from games.opposite_game import OppositeGame
-    from games.emoji_game import EmojiGame
-    from games.song_game import SongGame
-    logger.info("تم استيراد جميع الألعاب بنجاح")
+    from games.base_game import BaseGame
+    logger.info(f"تم استيراد {len(game_specs())} لعبة بنجاح")
 except Exception as e:
     logger.error(f"خطأ في استيراد الألعاب: {e}")
 
@@ -57,135 +59,64 @@ if LINE_CHANNEL_SECRET == 'YOUR_CHANNEL_SECRET':
 line_bot_api = LineBotApi(LINE_CHANNEL_ACCESS_TOKEN)
 handler = WebhookHandler(LINE_CHANNEL_SECRET)
 
-# إعدادات Gemini AI (دعم متعدد المفاتيح)
-GEMINI_API_KEYS = [
-    os.getenv('GEMINI_API_KEY_1', ''),
-    os.getenv('GEMINI_API_KEY_2', ''),
-    os.getenv('GEMINI_API_KEY_3', '')
-]
-GEMINI_API_KEYS = [key for key in GEMINI_API_KEYS if key]
-current_gemini_key_index = 0
-USE_AI = bool(GEMINI_API_KEYS)
+# إعدادات Gemini AI - العميل المشترك يوزع الطلبات على كل المفاتيح
+ai_client = get_ai_client()
+GEMINI_API_KEYS = ai_client.keys.keys
+USE_AI = ai_client.enabled
+# مطابقة الإجابات ومخزون الأسئلة (يبدأ التعبئة فقط عند أول طلب سؤال من المخزون)
+gemini = get_gemini_helper() if USE_AI else None
 
 logger.info(f"عدد مفاتيح Gemini المتاحة: {len(GEMINI_API_KEYS)}")
 logger.info(f"استخدام AI: {USE_AI}")
 
 def get_gemini_api_key():
-    """الحصول على مفتاح Gemini API الحالي"""
-    global current_gemini_key_index
-    if GEMINI_API_KEYS:
-        return GEMINI_API_KEYS[current_gemini_key_index]
-    return None
+    """المفتاح الأقل انشغالاً حالياً"""
+    return ai_client.keys.pick()
 
 def switch_gemini_key():
-    """التبديل إلى المفتاح التالي"""
-    global current_gemini_key_index
-    if len(GEMINI_API_KEYS) > 1:
-        current_gemini_key_index = (current_gemini_key_index + 1) % len(GEMINI_API_KEYS)
-        logger.info(f"تم التبديل إلى مفتاح Gemini رقم: {current_gemini_key_index + 1}")
-        return True
-    return False
-
-# تخزين الألعاب النشطة واللاعبين المسجلين
-active_games = {}
-registered_players = set()
-user_message_count = defaultdict(lambda: {'count': 0, 'reset_time': datetime.now()})
+    """للتوافق فقط - التوزيع بين المفاتيح يتم تلقائياً في ai_client"""
+    return len(GEMINI_API_KEYS) > 1
 
-# قفل thread-safe للوصول للبيانات المشتركة
-games_lock = threading.Lock()
+# أقفال مقسمة حسب game_id - القراءة من السجل بدون قفل
+# ترتيب الحجز: أقفال الألعاب (تصاعدياً عبر game_locks.locked) ثم players_lock، ولا يُحجز العكس أبداً
+game_locks = LockManager(Config.GAME_LOCK_STRIPES)
 players_lock = threading.Lock()
 
-# دالة تطبيع النص
-def normalize_text(text):
-    """تطبيع النص للمقارنة"""
-    if not text:
-        return ""
-    
-    text = text.strip().lower()
-    text = re.sub(r'^ال', '', text)
-    text = text.replace('أ', 'ا').replace('إ', 'ا').replace('آ', 'ا')
-    text = text.replace('ة', 'ه')
-    text = text.replace('ى', 'ي')
-    text = re.sub(r'[\u064B-\u065F]', '', text)
-    return text
-
-# قاعدة البيانات
-DB_NAME = 'game_scores.db'
+# تخزين الألعاب النشطة واللاعبين المسجلين (قابل للمشاركة بين العمال)
+game_store = create_game_store(Config.GAME_STORE, Config.GAME_STORE_PATH, line_bot_api,
+                               idle_seconds=Config.GAME_IDLE_SPILL_SECONDS,
+                               max_hot=Config.GAME_HOT_MAX, locks=game_locks)
+active_games = game_store
+registered_players = game_store.players
+
+# حد الرسائل بنافذة منزلقة - لكل مستخدم ولكل مجموعة
+user_limiter = create_rate_limiter(Config.RATE_LIMIT_STORE, Config.MAX_MESSAGES_PER_MINUTE,
+                                   Config.RATE_LIMIT_WINDOW, Config.GAME_STORE_PATH,
+                                   scope='user', max_keys=Config.RATE_LIMIT_MAX_KEYS)
+group_limiter = None
+if Config.GROUP_MAX_MESSAGES_PER_MINUTE > 0:
+    group_limiter = create_rate_limiter(Config.RATE_LIMIT_STORE, Config.GROUP_MAX_MESSAGES_PER_MINUTE,
+                                        Config.RATE_LIMIT_WINDOW, Config.GAME_STORE_PATH,
+                                        scope='group', max_keys=Config.RATE_LIMIT_MAX_KEYS)
+
+# قاعدة البيانات - محرك التخزين الموحد (ترحيل المخطط واستيراد القواعد القديمة عند البدء)
+storage = get_storage()
+db_pool = storage.pool
+score_buffer = storage.buffer
+DB_NAME = storage.db_path
 
 def get_db_connection():
-    """إنشاء اتصال آمن بقاعدة البيانات"""
-    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def init_db():
-    """إنشاء جداول قاعدة البيانات"""
-    try:
-        conn = get_db_connection()
-        c = conn.cursor()
-        
-        c.execute('''CREATE TABLE IF NOT EXISTS users
-                     (user_id TEXT PRIMARY KEY, 
-                      display_name TEXT,
-                      total_points INTEGER DEFAULT 0,
-                      games_played INTEGER DEFAULT 0,
-                      wins INTEGER DEFAULT 0,
-                      last_played TEXT,
-                      registered_at TEXT DEFAULT CURRENT_TIMESTAMP)''')
-        
-        c.execute('''CREATE TABLE IF NOT EXISTS game_history
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      user_id TEXT,
-                      game_type TEXT,
-                      points INTEGER,
-                      won INTEGER,
-                      played_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                      FOREIGN KEY (user_id) REFERENCES users(user_id))''')
-        
-        c.execute('''CREATE INDEX IF NOT EXISTS idx_user_points 
-                     ON users(total_points DESC)''')
-        c.execute('''CREATE INDEX IF NOT EXISTS idx_game_history_user 
-                     ON game_history(user_id, played_at)''')
-        
-        conn.commit()
-        conn.close()
-        logger.info("تم إنشاء قاعدة البيانات بنجاح")
-    except Exception as e:
-        logger.error(f"خطأ في إنشاء قاعدة البيانات: {e}")
+    """استعارة اتصال من المجمع: with get_db_connection() as conn"""
+    return storage.connection()
 
-init_db()
+def flush_scores():
+    """كتابة النقاط المعلقة فوراً (نهاية اللعبة)"""
+    storage.flush()
 
 def update_user_points(user_id, display_name, points, won=False, game_type=""):
     """تحديث نقاط المستخدم"""
     try:
-        conn = get_db_connection()
-        c = conn.cursor()
-        
-        c.execute('SELECT * FROM users WHERE user_id = ?', (user_id,))
-        user = c.fetchone()
-        
-        if user:
-            new_points = user['total_points'] + points
-            new_games = user['games_played'] + 1
-            new_wins = user['wins'] + (1 if won else 0)
-            c.execute('''UPDATE users SET total_points = ?, games_played = ?, 
-                         wins = ?, last_played = ?, display_name = ?
-                         WHERE user_id = ?''',
-                      (new_points, new_games, new_wins, datetime.now().isoformat(), 
-                       display_name, user_id))
-        else:
-            c.execute('''INSERT INTO users (user_id, display_name, total_points, 
-                         games_played, wins, last_played) VALUES (?, ?, ?, ?, ?, ?)''',
-                      (user_id, display_name, points, 1, 1 if won else 0, 
-                       datetime.now().isoformat()))
-        
-        if game_type:
-            c.execute('''INSERT INTO game_history (user_id, game_type, points, won) 
-                         VALUES (?, ?, ?, ?)''',
-                      (user_id, game_type, points, 1 if won else 0))
-        
-        conn.commit()
-        conn.close()
+        storage.add_score(user_id, display_name, points, won, game_type)
         logger.info(f"تم تحديث نقاط {display_name}: +{points}")
         return True
     except Exception as e:
@@ -195,12 +126,7 @@ def update_user_points(user_id, display_name, points, won=False, game_type=""):
 def get_user_stats(user_id):
     """الحصول على إحصائيات المستخدم"""
     try:
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute('SELECT * FROM users WHERE user_id = ?', (user_id,))
-        user = c.fetchone()
-        conn.close()
-        return user
+        return storage.get_user(user_id)
     except Exception as e:
         logger.error(f"خطأ في الحصول على الإحصائيات: {e}")
         return None
@@ -208,426 +134,228 @@ def get_user_stats(user_id):
 def get_leaderboard(limit=10):
     """الحصول على لوحة الصدارة"""
     try:
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute('''SELECT display_name, total_points, games_played, wins 
-                     FROM users ORDER BY total_points DESC LIMIT ?''', (limit,))
-        leaders = c.fetchall()
-        conn.close()
-        return leaders
+        return storage.get_leaderboard(limit)
     except Exception as e:
         logger.error(f"خطأ في الحصول على الصدارة: {e}")
         return []
 
-def check_rate_limit(user_id, max_messages=20, time_window=60):
-    """فحص حد المعدل"""
-    now = datetime.now()
-    user_data = user_message_count[user_id]
-    
-    if now - user_data['reset_time'] > timedelta(seconds=time_window):
-        user_data['count'] = 0
-        user_data['reset_time'] = now
-    
-    if user_data['count'] >= max_messages:
-        logger.warning(f"تجاوز حد الرسائل: {user_id}")
-        return False
+def load_leaderboard(limit=10):
+    """صفوف ذاكرة الصدارة من SQL عند انتهاء صلاحيتها (فهرس الذاكرة خاص بكل عامل)"""
+    try:
+        return storage.query_leaderboard(limit)
+    except Exception as e:
+        logger.error(f"خطأ في الحصول على الصدارة: {e}")
+        return []
+
+def build_leaderboard_message(leaders):
+    """رسالة لوحة الصدارة الجاهزة (تُحفظ في leaderboard_cache)"""
+    return prebuilt_flex("لوحة الصدارة", FlexStyles.leaderboard(leaders), QUICK_REPLY)
+
+leaderboard_cache = LeaderboardCache(load_leaderboard, build_leaderboard_message,
+                                     limit=10, ttl=Config.LEADERBOARD_CACHE_TTL_SECONDS)
+storage.listeners.append(leaderboard_cache.notify)
+
+def check_rate_limit(user_id):
+    """فحص حد المعدل للمستخدم"""
+    if user_limiter.allow(user_id):
+        return True
+    logger.warning(f"تجاوز حد الرسائل: {user_id}")
+    return False
+
+def check_group_rate_limit(group_id):
+    """فحص حد المعدل للمجموعة كاملة"""
+    if group_limiter is None or group_limiter.allow(group_id):
+        return True
+    logger.warning(f"تجاوز حد رسائل المجموعة: {group_id}")
+    return False
+
+GAME_TIMEOUT_SECONDS = Config.GAME_TIMEOUT_MINUTES * 60
+
+def last_activity(game_data):
+    """وقت آخر نشاط في اللعبة (أو وقت إنشائها للسجلات القديمة)"""
+    at = game_data.get('last_activity')
+    if at is None:
+        at = game_data.get('created_at', datetime.now()).timestamp()
+    return at
+
+def expire_game(game_id):
+    """حذف لعبة انتهى وقتها - يعيد موعداً جديداً إذا كانت ما زالت نشطة"""
+    with game_locks.locked(game_id):
+        # peek: لعبة خاملة في SQLite لا تُعاد للذاكرة لمجرد حذفها
+        game_data = active_games.peek(game_id)
+        if game_data is None:
+            return None
+        # نشاط سُجل في عامل آخر يشارك نفس المخزن
+        deadline = last_activity(game_data) + GAME_TIMEOUT_SECONDS
+        if deadline > time.time():
+            return deadline
+        active_games.delete(game_id)
     
-    user_data['count'] += 1
-    return True
+    game_type = game_data.get('type', '')
+    logger.info(f"تم حذف لعبة منتهية الوقت: {game_id}")
+    if Config.GAME_TIMEOUT_NOTIFY:
+        try:
+            line_bot_api.push_message(
+                game_id,
+                TextSendMessage(text=f"⏰ انتهى وقت لعبة {game_type} لعدم النشاط", quick_reply=get_quick_reply())
+            )
+        except Exception as e:
+            logger.error(f"خطأ في إرسال إشعار انتهاء اللعبة: {e}")
+    return None
+
+game_expiry = ExpiryScheduler(GAME_TIMEOUT_SECONDS, expire_game)
+game_expiry.start()
 
 def cleanup_old_games():
-    """تنظيف الألعاب القديمة"""
+    """صيانة دورية: جدولة ألعاب العمليات الأخرى ومزامنة فهرس الصدارة"""
     while True:
         try:
-            time.sleep(300)
-            now = datetime.now()
-            to_delete = []
+            time.sleep(Config.CLEANUP_INTERVAL_SECONDS)
             
-            with games_lock:
-                for game_id, game_data in active_games.items():
-                    if now - game_data.get('created_at', now) > timedelta(minutes=10):
-                        to_delete.append(game_id)
-                
-                for game_id in to_delete:
-                    del active_games[game_id]
-                    logger.info(f"تم حذف لعبة قديمة: {game_id}")
+            # ألعاب بدأت في عامل آخر (مخزن مشترك) ولم تُجدول هنا
+            for game_id, game_data in active_games.items():
+                if game_id not in game_expiry:
+                    game_expiry.touch(game_id, at=last_activity(game_data))
+            
+            # إخراج الألعاب الخاملة من الذاكرة (مخزن tiered فقط)
+            active_games.spill_idle()
+            
+            # مزامنة فهرس الصدارة مع تحديثات العمليات الأخرى
+            storage.verify_index()
         except Exception as e:
             logger.error(f"خطأ في التنظيف: {e}")
 
 cleanup_thread = threading.Thread(target=cleanup_old_games, daemon=True)
 cleanup_thread.start()
 
+# عمال معالجة الأحداث - الرد على LINE فوراً والمعالجة في الخلفية
+dispatcher = None
+if Config.DISPATCH_WORKERS > 0:
+    dispatcher = EventDispatcher(Config.DISPATCH_WORKERS, Config.DISPATCH_QUEUE_SIZE,
+                                 Config.DISPATCH_PUT_TIMEOUT)
+    dispatcher.start()
+
+# الأزرار والقوائم الثابتة تُبنى وتُرمّز مرة واحدة
+QUICK_REPLY = FrozenQuickReply(items=[
+    QuickReplyButton(action=MessageAction(label="أسرع", text="أسرع")),
+    QuickReplyButton(action=MessageAction(label="ذكاء", text="ذكاء")),
+    QuickReplyButton(action=MessageAction(label="لون", text="كلمة ولون")),
+    QuickReplyButton(action=MessageAction(label="أغنية", text="أغنية")),
+    QuickReplyButton(action=MessageAction(label="سلسلة", text="سلسلة")),
+    QuickReplyButton(action=MessageAction(label="ترتيب", text="ترتيب الحروف")),
+    QuickReplyButton(action=MessageAction(label="تكوين", text="تكوين كلمات")),
+    QuickReplyButton(action=MessageAction(label="لعبة", text="لعبة")),
+    QuickReplyButton(action=MessageAction(label="خمن", text="خمن")),
+    QuickReplyButton(action=MessageAction(label="ضد", text="ضد")),
+    QuickReplyButton(action=MessageAction(label="ذاكرة", text="ذاكرة")),
+    QuickReplyButton(action=MessageAction(label="لغز", text="لغز")),
+    QuickReplyButton(action=MessageAction(label="رياضيات", text="رياضيات"))
+])
+
+MORE_QUICK_REPLY = FrozenQuickReply(items=[
+    QuickReplyButton(action=MessageAction(label="إيموجي", text="إيموجي")),
+    QuickReplyButton(action=MessageAction(label="توافق", text="توافق")),
+    QuickReplyButton(action=MessageAction(label="مساعدة", text="مساعدة"))
+])
+
 def get_quick_reply():
     """الأزرار الثابتة - ألعاب فقط"""
-    return QuickReply(items=[
-        QuickReplyButton(action=MessageAction(label="أسرع", text="أسرع")),
-        QuickReplyButton(action=MessageAction(label="ذكاء", text="ذكاء")),
-        QuickReplyButton(action=MessageAction(label="لون", text="كلمة ولون")),
-        QuickReplyButton(action=MessageAction(label="أغنية", text="أغنية")),
-        QuickReplyButton(action=MessageAction(label="سلسلة", text="سلسلة")),
-        QuickReplyButton(action=MessageAction(label="ترتيب", text="ترتيب الحروف")),
-        QuickReplyButton(action=MessageAction(label="تكوين", text="تكوين كلمات")),
-        QuickReplyButton(action=MessageAction(label="لعبة", text="لعبة")),
-        QuickReplyButton(action=MessageAction(label="خمن", text="خمن")),
-        QuickReplyButton(action=MessageAction(label="ضد", text="ضد")),
-        QuickReplyButton(action=MessageAction(label="ذاكرة", text="ذاكرة")),
-        QuickReplyButton(action=MessageAction(label="لغز", text="لغز")),
-        QuickReplyButton(action=MessageAction(label="رياضيات", text="رياضيات"))
-    ])
+    return QUICK_REPLY
 
 def get_more_quick_reply():
     """أزرار إضافية"""
-    return QuickReply(items=[
-        QuickReplyButton(action=MessageAction(label="إيموجي", text="إيموجي")),
-        QuickReplyButton(action=MessageAction(label="توافق", text="توافق")),
-        QuickReplyButton(action=MessageAction(label="مساعدة", text="مساعدة"))
-    ])
+    return MORE_QUICK_REPLY
 
 def get_help_message():
     """رسالة المساعدة - تصميم أنيق"""
-    return {
-        "type": "bubble",
-        "size": "mega",
-        "header": {
-            "type": "box",
-            "layout": "vertical",
-            "contents": [
-                {
-                    "type": "text",
-                    "text": "دليل الاستخدام",
-                    "weight": "bold",
-                    "size": "xxl",
-                    "color": "#1a1a1a",
-                    "align": "center"
-                }
-            ],
-            "backgroundColor": "#ffffff",
-            "paddingAll": "20px"
-        },
-        "body": {
-            "type": "box",
-            "layout": "vertical",
-            "contents": [
-                {
-                    "type": "box",
-                    "layout": "vertical",
-                    "contents": [
-                        {
-                            "type": "text",
-                            "text": "الأوامر الأساسية",
-                            "weight": "bold",
-                            "size": "lg",
-                            "color": "#2a2a2a",
-                            "margin": "none"
-                        },
-                        {
-                            "type": "separator",
-                            "margin": "md",
-                            "color": "#e8e8e8"
-                        }
-                    ],
-                    "margin": "none",
-                    "spacing": "sm"
-                },
-                {
-                    "type": "box",
-                    "layout": "vertical",
-                    "contents": [
-                        {
-                            "type": "box",
-                            "layout": "horizontal",
-                            "contents": [
-                                {
-                                    "type": "text",
-                                    "text": "انضم",
-                                    "size": "sm",
-                                    "color": "#1a1a1a",
-                                    "flex": 2,
-                                    "weight": "bold"
-                                },
-                                {
-                                    "type": "text",
-                                    "text": "التسجيل في البوت",
-                                    "size": "sm",
-                                    "color": "#6a6a6a",
-                                    "flex": 5,
-                                    "wrap": True
-                                }
-                            ],
-                            "spacing": "md"
-                        },
-                        {
-                            "type": "box",
-                            "layout": "horizontal",
-                            "contents": [
-                                {
-                                    "type": "text",
-                                    "text": "انسحب",
-                                    "size": "sm",
-                                    "color": "#1a1a1a",
-                                    "flex": 2,
-                                    "weight": "bold"
-                                },
-                                {
-                                    "type": "text",
-                                    "text": "إلغاء التسجيل",
-                                    "size": "sm",
-                                    "color": "#6a6a6a",
-                                    "flex": 5,
-                                    "wrap": True
-                                }
-                            ],
-                            "spacing": "md"
-                        },
-                        {
-                            "type": "box",
-                            "layout": "horizontal",
-                            "contents": [
-                                {
-                                    "type": "text",
-                                    "text": "نقاطي",
-                                    "size": "sm",
-                                    "color": "#1a1a1a",
-                                    "flex": 2,
-                                    "weight": "bold"
-                                },
-                                {
-                                    "type": "text",
-                                    "text": "عرض إحصائياتك",
-                                    "size": "sm",
-                                    "color": "#6a6a6a",
-                                    "flex": 5,
-                                    "wrap": True
-                                }
-                            ],
-                            "spacing": "md"
-                        },
-                        {
-                            "type": "box",
-                            "layout": "horizontal",
-                            "contents": [
-                                {
-                                    "type": "text",
-                                    "text": "الصدارة",
-                                    "size": "sm",
-                                    "color": "#1a1a1a",
-                                    "flex": 2,
-                                    "weight": "bold"
-                                },
-                                {
-                                    "type": "text",
-                                    "text": "أفضل اللاعبين",
-                                    "size": "sm",
-                                    "color": "#6a6a6a",
-                                    "flex": 5,
-                                    "wrap": True
-                                }
-                            ],
-                            "spacing": "md"
-                        },
-                        {
-                            "type": "box",
-                            "layout": "horizontal",
-                            "contents": [
-                                {
-                                    "type": "text",
-                                    "text": "إيقاف",
-                                    "size": "sm",
-                                    "color": "#1a1a1a",
-                                    "flex": 2,
-                                    "weight": "bold"
-                                },
-                                {
-                                    "type": "text",
-                                    "text": "إنهاء اللعبة الحالية",
-                                    "size": "sm",
-                                    "color": "#6a6a6a",
-                                    "flex": 5,
-                                    "wrap": True
-                                }
-                            ],
-                            "spacing": "md"
-                        }
-                    ],
-                    "spacing": "md",
-                    "margin": "md"
-                },
-                {
-                    "type": "box",
-                    "layout": "vertical",
-                    "contents": [
-                        {
-                            "type": "text",
-                            "text": "أثناء اللعب",
-                            "weight": "bold",
-                            "size": "lg",
-                            "color": "#2a2a2a",
-                            "margin": "none"
-                        },
-                        {
-                            "type": "separator",
-                            "margin": "md",
-                            "color": "#e8e8e8"
-                        }
-                    ],
-                    "margin": "xl",
-                    "spacing": "sm"
-                },
-                {
-                    "type": "box",
-                    "layout": "vertical",
-                    "contents": [
-                        {
-                            "type": "box",
-                            "layout": "horizontal",
-                            "contents": [
-                                {
-                                    "type": "text",
-                                    "text": "لمح",
-                                    "size": "sm",
-                                    "color": "#1a1a1a",
-                                    "flex": 2,
-                                    "weight": "bold"
-                                },
-                                {
-                                    "type": "text",
-                                    "text": "الحصول على تلميح",
-                                    "size": "sm",
-                                    "color": "#6a6a6a",
-                                    "flex": 5,
-                                    "wrap": True
-                                }
-                            ],
-                            "spacing": "md"
-                        },
-                        {
-                            "type": "box",
-                            "layout": "horizontal",
-                            "contents": [
-                                {
-                                    "type": "text",
-                                    "text": "جاوب",
-                                    "size": "sm",
-                                    "color": "#1a1a1a",
-                                    "flex": 2,
-                                    "weight": "bold"
-                                },
-                                {
-                                    "type": "text",
-                                    "text": "عرض الإجابة الصحيحة",
-                                    "size": "sm",
-                                    "color": "#6a6a6a",
-                                    "flex": 5,
-                                    "wrap": True
-                                }
-                            ],
-                            "spacing": "md"
-                        }
-                    ],
-                    "spacing": "md",
-                    "margin": "md"
-                }
-            ],
-            "spacing": "md",
-            "backgroundColor": "#ffffff",
-            "paddingAll": "20px"
-        },
-        "footer": {
-            "type": "box",
-            "layout": "vertical",
-            "contents": [
-                {
-                    "type": "separator",
-                    "color": "#e8e8e8"
-                },
-                {
-                    "type": "box",
-                    "layout": "horizontal",
-                    "contents": [
-                        {
-                            "type": "button",
-                            "action": {
-                                "type": "message",
-                                "label": "انضم",
-                                "text": "انضم"
-                            },
-                            "style": "primary",
-                            "color": "#2a2a2a",
-                            "height": "sm"
-                        },
-                        {
-                            "type": "button",
-                            "action": {
-                                "type": "message",
-                                "label": "نقاطي",
-                                "text": "نقاطي"
-                            },
-                            "style": "secondary",
-                            "height": "sm"
-                        },
-                        {
-                            "type": "button",
-                            "action": {
-                                "type": "message",
-                                "label": "الصدارة",
-                                "text": "الصدارة"
-                            },
-                            "style": "secondary",
-                            "height": "sm"
-                        }
-                    ],
-                    "spacing": "sm",
-                    "margin": "md"
-                },
-                {
-                    "type": "text",
-                    "text": "تم إنشاء هذا البوت بواسطة عبير الدوسري",
-                    "size": "xs",
-                    "color": "#9a9a9a",
-                    "align": "center",
-                    "wrap": True,
-                    "margin": "md"
-                }
-            ],
-            "backgroundColor": "#f8f8f8",
-            "paddingAll": "16px"
-        }
-    }
+    return FlexStyles.help()
+
+HELP_MESSAGE = prebuilt_flex("مساعدة", FlexStyles.help(), QUICK_REPLY)
+MORE_MESSAGE = prebuilt_flex("ألعاب إضافية", FlexStyles.more_games(), MORE_QUICK_REPLY)
+BUSY_MESSAGE = TextSendMessage(text="⏳ البوت مشغول حالياً، أعد إرسال رسالتك بعد قليل.")
+
+def fetch_display_name(user_id):
+    """جلب اسم العرض من LINE API"""
+    return line_bot_api.get_profile(user_id).display_name
+
+def load_display_name(user_id):
+    """قراءة آخر اسم معروف من قاعدة البيانات"""
+    return storage.get_display_name(user_id)
+
+def persist_display_name(user_id, display_name):
+    """تحديث الاسم المخزن للاعبين الموجودين"""
+    storage.set_display_name(user_id, display_name)
+
+profile_cache = ProfileCache(
+    fetch_display_name,
+    load=load_display_name,
+    persist=persist_display_name,
+    max_size=Config.PROFILE_CACHE_SIZE,
+    ttl=Config.PROFILE_CACHE_TTL_SECONDS,
+    negative_ttl=Config.PROFILE_NEGATIVE_TTL_SECONDS
+)
+
+# أسماء النتائج تُحدَّث من الذاكرة فقط (بدون طلبات LINE) عند عرض الترتيب
+BaseGame.name_lookup = staticmethod(profile_cache.peek)
 
 def get_user_profile_safe(user_id):
-    """الحصول على معلومات المستخدم"""
-    try:
-        profile = line_bot_api.get_profile(user_id)
-        return profile.display_name
-    except Exception as e:
-        logger.error(f"خطأ في الحصول على الملف الشخصي: {e}")
-        return "مستخدم"
+    """الحصول على اسم المستخدم (من الذاكرة المؤقتة عند توفره)"""
+    return profile_cache.get(user_id)
+
+def pending_name(user_id):
+    """اسم مؤقت داخل قفل اللعبة - يُستبدل بالاسم الحقيقي بعد تحرير القفل"""
+    return f"\u2068{user_id}\u2069"
+
+def fill_name(result, placeholder, display_name):
+    """استبدال الاسم المؤقت في نص الرد بعد جلب الاسم الحقيقي"""
+    if result.get('message'):
+        result['message'] = result['message'].replace(placeholder, display_name)
+    response = result.get('response')
+    if isinstance(response, TextSendMessage) and response.text:
+        response.text = response.text.replace(placeholder, display_name)
+
+def update_participants(user_id, joined):
+    """إضافة/إزالة لاعب من جميع الألعاب النشطة - قفل لعبة واحدة في كل مرة"""
+    def apply(game_data):
+        participants = game_data.setdefault('participants', set())
+        if joined:
+            participants.add(user_id)
+        else:
+            participants.discard(user_id)
+        return None, False
+    
+    for gid, _ in active_games.items():
+        with game_locks.locked(gid):
+            active_games.update(gid, apply)
 
-def start_game(game_id, game_class, game_type, user_id, event):
+def start_game(game_id, game_class, game_type, user_id, event, uses_ai=False):
     """دالة موحدة لبدء الألعاب"""
     try:
-        with games_lock:
-            if game_class in [IQGame, WordColorGame, LettersWordsGame, HumanAnimalPlantGame]:
+        with game_locks.locked(game_id):
+            if uses_ai:
                 game = game_class(line_bot_api, use_ai=USE_AI, 
                                 get_api_key=get_gemini_api_key, 
                                 switch_key=switch_gemini_key)
             else:
                 game = game_class(line_bot_api)
             
-            with players_lock:
-                participants = registered_players.copy()
-                participants.add(user_id)
+            # بدء اللعبة قبل الحفظ حتى يُخزَّن السؤال الأول مع الحالة
+            response = game.start_game()
+            
+            participants = registered_players.copy()
+            participants.add(user_id)
             
             active_games[game_id] = {
                 'game': game,
                 'type': game_type,
                 'created_at': datetime.now(),
+                'last_activity': time.time(),
                 'participants': participants
             }
+        game_expiry.touch(game_id)
         
-        response = game.start_game()
         line_bot_api.reply_message(event.reply_token, response)
-        logger.info(f"بدأت لعبة {game_type} في {game_id}")
+        logger.info(f"بدأت لعبة {game_type} في {game_id} (seed={game.seed})")
         return True
     except Exception as e:
         logger.error(f"خطأ في بدء اللعبة {game_type}: {e}")
@@ -658,7 +386,7 @@ def home():
             <div class="status">
                 <h2>✅ الخادم يعمل بنجاح</h2>
                 <p>البوت جاهز لاستقبال الرسائل</p>
-                <p><strong>الألعاب المتاحة:</strong> 15 لعبة</p>
+                <p><strong>الألعاب المتاحة:</strong> {len(game_specs())} لعبة</p>
                 <p><strong>اللاعبون المسجلون:</strong> {len(registered_players)}</p>
                 <p><strong>الألعاب النشطة:</strong> {len(active_games)}</p>
             </div>
@@ -666,6 +394,50 @@ def home():
     </html>
     """
 
+@app.route("/metrics", methods=['GET'])
+def metrics():
+    """مؤشرات الأداء الداخلية"""
+    return jsonify({
+        'profile_cache': profile_cache.stats(),
+        'active_games': len(active_games),
+        'game_store': game_store.stats(),
+        'game_locks': game_locks.stats(),
+        'registered_players': len(registered_players),
+        'dispatcher': dispatcher.stats() if dispatcher else None,
+        'storage': storage.stats(),
+        'leaderboard_cache': leaderboard_cache.stats(),
+        'standings_cache': standings_cache.stats(),
+        'game_expiry': game_expiry.stats(),
+        'ai_client': ai_client.stats(),
+        'question_pool': gemini.pool.stats() if gemini and gemini.pool else None,
+        'answer_matcher': gemini.matcher.stats() if gemini else None,
+        'text_normalization': arabic.cache_stats(),
+        'rate_limits': {
+            'users': user_limiter.stats(),
+            'groups': group_limiter.stats() if group_limiter else None
+        }
+    })
+
+def event_key(event):
+    """مفتاح الترتيب - نفس المجموعة/الغرفة/المستخدم تُعالج بالتسلسل"""
+    source = event.source
+    return (getattr(source, 'group_id', None) or getattr(source, 'room_id', None)
+            or getattr(source, 'user_id', None))
+
+def process_event(event):
+    """توجيه الحدث للمعالج المناسب"""
+    if isinstance(event, MessageEvent) and isinstance(event.message, TextMessage):
+        handle_message(event)
+
+def reply_busy(event):
+    """إبلاغ المرسل أن الحدث لم يُعالج (بدون أي عمل آخر في مسار webhook)"""
+    if not getattr(event, 'reply_token', None):
+        return
+    try:
+        line_bot_api.reply_message(event.reply_token, BUSY_MESSAGE)
+    except Exception as e:
+        logger.error(f"خطأ في إرسال رد الانشغال: {e}")
+
 @app.route("/callback", methods=['POST'])
 def callback():
     """معالج webhook"""
@@ -673,15 +445,206 @@ def callback():
     body = request.get_data(as_text=True)
     
     try:
-        handler.handle(body, signature)
+        if dispatcher is None:
+            handler.handle(body, signature)
+            return 'OK'
+        events = handler.parser.parse(body, signature)
     except InvalidSignatureError:
         logger.error("توقيع غير صالح")
         abort(400)
     except Exception as e:
         logger.error(f"خطأ في معالجة webhook: {e}")
+        return 'OK'
+    
+    for event in events:
+        # عند امتلاء الطابور بعد DISPATCH_PUT_TIMEOUT يُسقط الحدث (يُعد في rejected)،
+        # ولا يُعالج مباشرة حتى لا يسبق أحداثاً أقدم لنفس المجموعة ما زالت في الطابور
+        key = event_key(event)
+        if not dispatcher.submit(key, process_event, event):
+            logger.warning(f"تم إسقاط حدث بسبب الضغط - المفتاح: {key}")
+            reply_busy(event)
     
     return 'OK'
 
+# الأوامر - تُسجل مرة واحدة ثم تُجمد
+commands = CommandRouter()
+
+@commands.command('البداية', 'ابدأ', 'start', 'قائمة', 'البوت')
+def welcome_command(event, user_id, game_id):
+    display_name = get_user_profile_safe(user_id)
+    line_bot_api.reply_message(
+        event.reply_token,
+        prebuilt_flex("مرحباً", FlexStyles.welcome(display_name), QUICK_REPLY)
+    )
+
+@commands.command('أكثر', 'المزيد', 'more')
+def more_command(event, user_id, game_id):
+    line_bot_api.reply_message(event.reply_token, MORE_MESSAGE)
+
+@commands.command('مساعدة')
+def help_command(event, user_id, game_id):
+    line_bot_api.reply_message(event.reply_token, HELP_MESSAGE)
+
+@commands.command('نقاطي')
+def stats_command(event, user_id, game_id):
+    stats = get_user_stats(user_id)
+    if stats:
+        display_name = get_user_profile_safe(user_id)
+        status = "مسجل" if user_id in registered_players else "غير مسجل"
+        status_color = "#2a2a2a" if user_id in registered_players else "#9a9a9a"
+        win_rate = (stats['wins'] / stats['games_played'] * 100) if stats['games_played'] > 0 else 0
+        flex_stats = FlexStyles.user_stats(display_name, status, status_color, stats['total_points'],
+                                           stats['games_played'], stats['wins'], win_rate)
+        
+        line_bot_api.reply_message(
+            event.reply_token,
+            prebuilt_flex("إحصائياتك", flex_stats, QUICK_REPLY)
+        )
+    else:
+        line_bot_api.reply_message(
+            event.reply_token,
+            TextSendMessage(text="لم تلعب أي لعبة بعد\n\nاكتب 'انضم' للتسجيل والبدء", quick_reply=get_quick_reply())
+        )
+
+@commands.command('الصدارة')
+def leaderboard_command(event, user_id, game_id):
+    leaders, leaderboard_message = leaderboard_cache.get()
+    if leaders:
+        line_bot_api.reply_message(event.reply_token, leaderboard_message)
+    else:
+        line_bot_api.reply_message(
+            event.reply_token,
+            TextSendMessage(text="لا توجد بيانات بعد", quick_reply=get_quick_reply())
+        )
+
+standings_cache = StandingsCache(Config.STANDINGS_COOLDOWN_SECONDS, Config.STANDINGS_CACHE_SIZE)
+
+def build_standings_message(game_data):
+    """رسالة ترتيب اللعبة الجارية (أعلى 3 من Scoreboard)"""
+    game = game_data['game']
+    standings = game.standings(3)
+    if not standings:
+        return TextSendMessage(text="📊 لا توجد نقاط بعد في هذه اللعبة", quick_reply=get_quick_reply())
+    current_round = min(game.current_question + 1, game.questions_count)
+    contents = FlexStyles.game_progress(game_data.get('type', ''), standings, current_round,
+                                        game.questions_count)
+    return prebuilt_flex("المراكز", contents, QUICK_REPLY)
+
+@commands.command('المراكز', 'النتيجة')
+def standings_command(event, user_id, game_id):
+    if standings_cache.is_limited(game_id):
+        return  # طلب متكرر خلال فترة التهدئة - بدون قفل أو قراءة من المخزن
+    message = None
+    if game_id in active_games:
+        with game_locks.locked(game_id):
+            game_data = active_games.get(game_id)
+            if game_data is not None:
+                game = game_data['game']
+                token = (game_data.get('created_at'), game.current_question, game.scores.version)
+                message = standings_cache.get(game_id, token, lambda: build_standings_message(game_data))
+                if message is None:
+                    return  # طلب متزامن سبق هذا الطلب
+    if message is None:
+        message = TextSendMessage(text="لا توجد لعبة نشطة", quick_reply=get_quick_reply())
+    line_bot_api.reply_message(event.reply_token, message)
+
+@commands.command('إيقاف', 'ايقاف', 'stop')
+def stop_command(event, user_id, game_id):
+    with game_locks.locked(game_id):
+        stopped = active_games.delete(game_id)
+    game_expiry.cancel(game_id)
+    if stopped is not None:
+        game_type = stopped.get('type', '')
+        line_bot_api.reply_message(
+            event.reply_token,
+            TextSendMessage(text=f"تم إيقاف لعبة {game_type}", quick_reply=get_quick_reply())
+        )
+    else:
+        line_bot_api.reply_message(
+            event.reply_token,
+            TextSendMessage(text="لا توجد لعبة نشطة", quick_reply=get_quick_reply())
+        )
+
+@commands.command('انضم', 'تسجيل', 'join')
+def join_command(event, user_id, game_id):
+    display_name = get_user_profile_safe(user_id)
+    with players_lock:
+        newly_joined = user_id not in registered_players
+        if newly_joined:
+            registered_players.add(user_id)
+    
+    if not newly_joined:
+        line_bot_api.reply_message(
+            event.reply_token,
+            TextSendMessage(text=f"أنت مسجل بالفعل يا {display_name}\n\nيمكنك اللعب في جميع الألعاب", quick_reply=get_quick_reply())
+        )
+    else:
+        update_participants(user_id, joined=True)
+        
+        line_bot_api.reply_message(
+            event.reply_token,
+            prebuilt_flex("تم التسجيل", FlexStyles.join_success(display_name), QUICK_REPLY)
+        )
+        logger.info(f"انضم لاعب جديد: {display_name}")
+
+@commands.command('انسحب', 'خروج', 'leave')
+def leave_command(event, user_id, game_id):
+    with players_lock:
+        was_registered = user_id in registered_players
+        if was_registered:
+            registered_players.remove(user_id)
+    
+    if was_registered:
+        display_name = get_user_profile_safe(user_id)
+        update_participants(user_id, joined=False)
+        
+        line_bot_api.reply_message(
+            event.reply_token,
+            TextSendMessage(text=f"تم انسحابك يا {display_name}\n\nيمكنك الانضمام مرة أخرى بكتابة 'انضم'", quick_reply=get_quick_reply())
+        )
+        logger.info(f"انسحب لاعب: {display_name}")
+    else:
+        line_bot_api.reply_message(
+            event.reply_token,
+            TextSendMessage(text="أنت غير مسجل\n\nاكتب 'انضم' للتسجيل", quick_reply=get_quick_reply())
+        )
+
+def start_compatibility(event, user_id, game_id):
+    """التوافق لا يبدأ بسؤال - ينتظر اسمين"""
+    with game_locks.locked(game_id):
+        participants = registered_players.copy()
+        participants.add(user_id)
+        
+        game = CompatibilityGame(line_bot_api)
+        active_games[game_id] = {
+            'game': game,
+            'type': 'توافق',
+            'created_at': datetime.now(),
+            'last_activity': time.time(),
+            'participants': participants
+        }
+    game_expiry.touch(game_id)
+    
+    line_bot_api.reply_message(
+        event.reply_token,
+        TextSendMessage(text="💖 لعبة التوافق!\n\nاكتب اسمين مفصولين بمسافة\nمثال: أحمد فاطمة", quick_reply=get_quick_reply())
+    )
+
+def game_starter(spec):
+    """دالة بدء لعبة مسجلة"""
+    if spec.game_class is CompatibilityGame:
+        return start_compatibility
+    
+    def start(event, user_id, game_id):
+        start_game(game_id, spec.game_class, spec.game_type, user_id, event, spec.uses_ai)
+    return start
+
+for spec in game_specs():
+    commands.add(spec.aliases, game_starter(spec))
+
+COMMANDS = commands.freeze()
+logger.info(f"عدد الأوامر المسجلة: {len(COMMANDS)}")
+
 @handler.add(MessageEvent, message=TextMessage)
 def handle_message(event):
     """معالج الرسائل الرئيسي - محسّن للسرعة"""
@@ -696,776 +659,67 @@ def handle_message(event):
             )
             return
         
-        display_name = get_user_profile_safe(user_id)
+        # اسم العرض يُجلب فقط في المسارات التي تحتاجه
         game_id = event.source.group_id if hasattr(event.source, 'group_id') else user_id
         
-        logger.info(f"رسالة من {display_name}: {text}")
-        
-        # الأوامر الأساسية
-        if text in ['البداية', 'ابدأ', 'start', 'قائمة', 'البوت']:
-            flex_message = {
-                "type": "bubble",
-                "size": "mega",
-                "header": {
-                    "type": "box",
-                    "layout": "vertical",
-                    "contents": [
-                        {
-                            "type": "text",
-                            "text": "منصة الألعاب",
-                            "weight": "bold",
-                            "size": "xxl",
-                            "color": "#1a1a1a",
-                            "align": "center"
-                        },
-                        {
-                            "type": "text",
-                            "text": f"مرحباً {display_name}",
-                            "size": "md",
-                            "color": "#6a6a6a",
-                            "align": "center",
-                            "margin": "sm"
-                        }
-                    ],
-                    "backgroundColor": "#ffffff",
-                    "paddingAll": "24px"
-                },
-                "body": {
-                    "type": "box",
-                    "layout": "vertical",
-                    "contents": [
-                        {
-                            "type": "box",
-                            "layout": "vertical",
-                            "contents": [
-                                {
-                                    "type": "text",
-                                    "text": "خطوات البدء",
-                                    "weight": "bold",
-                                    "size": "md",
-                                    "color": "#2a2a2a"
-                                },
-                                {
-                                    "type": "separator",
-                                    "margin": "md",
-                                    "color": "#e8e8e8"
-                                }
-                            ],
-                            "spacing": "sm"
-                        },
-                        {
-                            "type": "box",
-                            "layout": "vertical",
-                            "contents": [
-                                {
-                                    "type": "box",
-                                    "layout": "horizontal",
-                                    "contents": [
-                                        {
-                                            "type": "text",
-                                            "text": "1",
-                                            "size": "sm",
-                                            "color": "#ffffff",
-                                            "align": "center",
-                                            "weight": "bold",
-                                            "flex": 0
-                                        },
-                                        {
-                                            "type": "text",
-                                            "text": "اضغط على زر انضم للتسجيل",
-                                            "size": "sm",
-                                            "color": "#4a4a4a",
-                                            "flex": 1,
-                                            "margin": "md",
-                                            "wrap": True
-                                        }
-                                    ],
-                                    "backgroundColor": "#2a2a2a",
-                                    "cornerRadius": "md",
-                                    "paddingAll": "12px",
-                                    "spacing": "md"
-                                },
-                                {
-                                    "type": "box",
-                                    "layout": "horizontal",
-                                    "contents": [
-                                        {
-                                            "type": "text",
-                                            "text": "2",
-                                            "size": "sm",
-                                            "color": "#2a2a2a",
-                                            "align": "center",
-                                            "weight": "bold",
-                                            "flex": 0
-                                        },
-                                        {
-                                            "type": "text",
-                                            "text": "اختر لعبة من الأزرار أدناه",
-                                            "size": "sm",
-                                            "color": "#4a4a4a",
-                                            "flex": 1,
-                                            "margin": "md",
-                                            "wrap": True
-                                        }
-                                    ],
-                                    "backgroundColor": "#f5f5f5",
-                                    "cornerRadius": "md",
-                                    "paddingAll": "12px",
-                                    "spacing": "md",
-                                    "margin": "sm"
-                                },
-                                {
-                                    "type": "box",
-                                    "layout": "horizontal",
-                                    "contents": [
-                                        {
-                                            "type": "text",
-                                            "text": "3",
-                                            "size": "sm",
-                                            "color": "#2a2a2a",
-                                            "align": "center",
-                                            "weight": "bold",
-                                            "flex": 0
-                                        },
-                                        {
-                                            "type": "text",
-                                            "text": "ابدأ اللعب واجمع النقاط",
-                                            "size": "sm",
-                                            "color": "#4a4a4a",
-                                            "flex": 1,
-                                            "margin": "md",
-                                            "wrap": True
-                                        }
-                                    ],
-                                    "backgroundColor": "#f5f5f5",
-                                    "cornerRadius": "md",
-                                    "paddingAll": "12px",
-                                    "spacing": "md",
-                                    "margin": "sm"
-                                }
-                            ],
-                            "margin": "md"
-                        },
-                        {
-                            "type": "box",
-                            "layout": "vertical",
-                            "contents": [
-                                {
-                                    "type": "text",
-                                    "text": "15 لعبة متاحة",
-                                    "size": "xs",
-                                    "color": "#9a9a9a",
-                                    "align": "center"
-                                },
-                                {
-                                    "type": "text",
-                                    "text": "إجاباتك تُحسب تلقائياً بعد التسجيل",
-                                    "size": "xs",
-                                    "color": "#9a9a9a",
-                                    "align": "center",
-                                    "margin": "xs"
-                                }
-                            ],
-                            "margin": "lg"
-                        }
-                    ],
-                    "backgroundColor": "#ffffff",
-                    "paddingAll": "20px"
-                },
-                "footer": {
-                    "type": "box",
-                    "layout": "vertical",
-                    "contents": [
-                        {
-                            "type": "separator",
-                            "color": "#e8e8e8"
-                        },
-                        {
-                            "type": "box",
-                            "layout": "horizontal",
-                            "contents": [
-                                {
-                                    "type": "button",
-                                    "action": {
-                                        "type": "message",
-                                        "label": "انضم",
-                                        "text": "انضم"
-                                    },
-                                    "style": "primary",
-                                    "color": "#2a2a2a",
-                                    "height": "sm"
-                                },
-                                {
-                                    "type": "button",
-                                    "action": {
-                                        "type": "message",
-                                        "label": "مساعدة",
-                                        "text": "مساعدة"
-                                    },
-                                    "style": "secondary",
-                                    "height": "sm"
-                                }
-                            ],
-                            "spacing": "sm",
-                            "margin": "md"
-                        }
-                    ],
-                    "backgroundColor": "#f8f8f8",
-                    "paddingAll": "16px"
-                }
-            }
-            
+        if game_id != user_id and not check_group_rate_limit(game_id):
             line_bot_api.reply_message(
                 event.reply_token,
-                FlexSendMessage(alt_text="مرحباً", contents=flex_message, quick_reply=get_quick_reply())
+                TextSendMessage(text="⚠️ رسائل كثيرة في المجموعة! انتظروا قليلاً.")
             )
             return
         
-        elif text in ['أكثر', 'المزيد', 'more']:
-            more_message = {
-                "type": "bubble",
-                "body": {
-                    "type": "box",
-                    "layout": "vertical",
-                    "contents": [
-                        {
-                            "type": "text",
-                            "text": "ألعاب إضافية",
-                            "weight": "bold",
-                            "size": "xl",
-                            "color": "#1a1a1a",
-                            "align": "center"
-                        },
-                        {
-                            "type": "separator",
-                            "margin": "lg",
-                            "color": "#e8e8e8"
-                        },
-                        {
-                            "type": "box",
-                            "layout": "vertical",
-                            "contents": [
-                                {
-                                    "type": "text",
-                                    "text": "اختر من الأزرار أدناه",
-                                    "size": "sm",
-                                    "color": "#6a6a6a",
-                                    "align": "center"
-                                }
-                            ],
-                            "margin": "lg"
-                        }
-                    ],
-                    "backgroundColor": "#ffffff",
-                    "paddingAll": "24px"
-                }
-            }
-            
-            line_bot_api.reply_message(
-                event.reply_token,
-                FlexSendMessage(alt_text="ألعاب إضافية", contents=more_message, quick_reply=get_more_quick_reply())
-            )
-            return
+        logger.info(f"رسالة من {user_id}: {text}")
         
-        elif text == 'مساعدة':
-            line_bot_api.reply_message(
-                event.reply_token,
-                FlexSendMessage(alt_text="مساعدة", contents=get_help_message(), quick_reply=get_quick_reply())
-            )
+        # الأوامر وبدء الألعاب - بحث واحد في قاموس ثابت
+        command = commands.resolve(text)
+        if command is not None:
+            command(event, user_id, game_id)
             return
         
-        elif text == 'نقاطي':
-            stats = get_user_stats(user_id)
-            if stats:
-                status = "مسجل" if user_id in registered_players else "غير مسجل"
-                status_color = "#2a2a2a" if user_id in registered_players else "#9a9a9a"
-                win_rate = (stats['wins'] / stats['games_played'] * 100) if stats['games_played'] > 0 else 0
+        # معالجة إجابات الألعاب النشطة (فحص سريع بدون قفل)
+        if game_id in active_games:
+            is_registered = user_id in registered_players
+            
+            try:
+                # الاسم من الذاكرة فقط - بدون طلب شبكة داخل القفل أو مع كل محاولة
+                cached_name = profile_cache.peek(user_id)
+                lazy_name = cached_name or pending_name(user_id)
                 
-                flex_stats = {
-                    "type": "bubble",
-                    "size": "mega",
-                    "header": {
-                        "type": "box",
-                        "layout": "vertical",
-                        "contents": [
-                            {
-                                "type": "text",
-                                "text": "إحصائياتك",
-                                "weight": "bold",
-                                "size": "xl",
-                                "color": "#1a1a1a",
-                                "align": "center"
-                            },
-                            {
-                                "type": "text",
-                                "text": display_name,
-                                "size": "sm",
-                                "color": "#6a6a6a",
-                                "align": "center",
-                                "margin": "sm"
-                            }
-                        ],
-                        "backgroundColor": "#ffffff",
-                        "paddingAll": "20px"
-                    },
-                    "body": {
-                        "type": "box",
-                        "layout": "vertical",
-                        "contents": [
-                            {
-                                "type": "box",
-                                "layout": "horizontal",
-                                "contents": [
-                                    {
-                                        "type": "text",
-                                        "text": "الحالة",
-                                        "size": "sm",
-                                        "color": "#6a6a6a",
-                                        "flex": 2
-                                    },
-                                    {
-                                        "type": "text",
-                                        "text": status,
-                                        "size": "sm",
-                                        "color": status_color,
-                                        "flex": 3,
-                                        "align": "end",
-                                        "weight": "bold"
-                                    }
-                                ]
-                            },
-                            {
-                                "type": "separator",
-                                "margin": "md",
-                                "color": "#e8e8e8"
-                            },
-                            {
-                                "type": "box",
-                                "layout": "horizontal",
-                                "contents": [
-                                    {
-                                        "type": "text",
-                                        "text": "النقاط",
-                                        "size": "sm",
-                                        "color": "#6a6a6a",
-                                        "flex": 2
-                                    },
-                                    {
-                                        "type": "text",
-                                        "text": str(stats['total_points']),
-                                        "size": "xl",
-                                        "color": "#1a1a1a",
-                                        "flex": 3,
-                                        "align": "end",
-                                        "weight": "bold"
-                                    }
-                                ],
-                                "margin": "md"
-                            },
-                            {
-                                "type": "separator",
-                                "margin": "md",
-                                "color": "#e8e8e8"
-                            },
-                            {
-                                "type": "box",
-                                "layout": "horizontal",
-                                "contents": [
-                                    {
-                                        "type": "text",
-                                        "text": "الألعاب",
-                                        "size": "sm",
-                                        "color": "#6a6a6a",
-                                        "flex": 2
-                                    },
-                                    {
-                                        "type": "text",
-                                        "text": str(stats['games_played']),
-                                        "size": "sm",
-                                        "color": "#2a2a2a",
-                                        "flex": 3,
-                                        "align": "end",
-                                        "weight": "bold"
-                                    }
-                                ],
-                                "margin": "md"
-                            },
-                            {
-                                "type": "box",
-                                "layout": "horizontal",
-                                "contents": [
-                                    {
-                                        "type": "text",
-                                        "text": "الفوز",
-                                        "size": "sm",
-                                        "color": "#6a6a6a",
-                                        "flex": 2
-                                    },
-                                    {
-                                        "type": "text",
-                                        "text": str(stats['wins']),
-                                        "size": "sm",
-                                        "color": "#2a2a2a",
-                                        "flex": 3,
-                                        "align": "end",
-                                        "weight": "bold"
-                                    }
-                                ],
-                                "margin": "sm"
-                            },
-                            {
-                                "type": "box",
-                                "layout": "horizontal",
-                                "contents": [
-                                    {
-                                        "type": "text",
-                                        "text": "نسبة الفوز",
-                                        "size": "sm",
-                                        "color": "#6a6a6a",
-                                        "flex": 2
-                                    },
-                                    {
-                                        "type": "text",
-                                        "text": f"{win_rate:.1f}%",
-                                        "size": "sm",
-                                        "color": "#2a2a2a",
-                                        "flex": 3,
-                                        "align": "end",
-                                        "weight": "bold"
-                                    }
-                                ],
-                                "margin": "sm"
-                            }
-                        ],
-                        "backgroundColor": "#ffffff",
-                        "paddingAll": "20px"
-                    },
-                    "footer": {
-                        "type": "box",
-                        "layout": "vertical",
-                        "contents": [
-                            {
-                                "type": "separator",
-                                "color": "#e8e8e8"
-                            },
-                            {
-                                "type": "button",
-                                "action": {
-                                    "type": "message",
-                                    "label": "الصدارة",
-                                    "text": "الصدارة"
-                                },
-                                "style": "secondary",
-                                "height": "sm",
-                                "margin": "md"
-                            }
-                        ],
-                        "backgroundColor": "#f8f8f8",
-                        "paddingAll": "16px"
-                    }
-                }
+                def answer(game_data):
+                    """فحص الإجابة على أحدث حالة (قد يُعاد عند تعارض مع عامل آخر)"""
+                    if not is_registered and 'participants' in game_data and user_id not in game_data['participants']:
+                        return None, False
+                    result = game_data['game'].check_answer(text, user_id, lazy_name)
+                    game_over = bool(result and result.get('game_over', False))
+                    if result and not game_over:
+                        game_data['last_activity'] = time.time()
+                    return (result, game_data['type']), game_over
                 
-                line_bot_api.reply_message(
-                    event.reply_token,
-                    FlexSendMessage(alt_text="إحصائياتك", contents=flex_stats, quick_reply=get_quick_reply())
-                )
-            else:
-                line_bot_api.reply_message(
-                    event.reply_token,
-                    TextSendMessage(text="لم تلعب أي لعبة بعد\n\nاكتب 'انضم' للتسجيل والبدء", quick_reply=get_quick_reply())
-                )
-            return
-        
-        elif text == 'الصدارة':
-            leaders = get_leaderboard()
-            if leaders:
-                players_list = []
-                for i, leader in enumerate(leaders, 1):
-                    if i <= 3:
-                        rank_bg = "#4a4a4a"
-                        rank_color = "#ffffff"
-                        name_color = "#ffffff"
-                    else:
-                        rank_bg = "#f5f5f5"
-                        rank_color = "#2a2a2a"
-                        name_color = "#4a4a4a"
-                    
-                    player_box = {
-                        "type": "box",
-                        "layout": "horizontal",
-                        "contents": [
-                            {
-                                "type": "text",
-                                "text": str(i),
-                                "size": "sm",
-                                "color": rank_color,
-                                "align": "center",
-                                "weight": "bold",
-                                "flex": 0
-                            },
-                            {
-                                "type": "text",
-                                "text": leader['display_name'],
-                                "size": "sm",
-                                "color": name_color,
-                                "flex": 3,
-                                "margin": "md",
-                                "weight": "bold" if i <= 3 else "regular"
-                            },
-                            {
-                                "type": "text",
-                                "text": str(leader['total_points']),
-                                "size": "sm",
-                                "color": name_color,
-                                "flex": 1,
-                                "align": "end",
-                                "weight": "bold" if i <= 3 else "regular"
-                            }
-                        ],
-                        "backgroundColor": rank_bg,
-                        "cornerRadius": "md",
-                        "paddingAll": "12px",
-                        "spacing": "md",
-                        "margin": "xs" if i > 1 else "none"
-                    }
-                    players_list.append(player_box)
+                # قفل هذه اللعبة فقط - المجموعات الأخرى لا تنتظر، والمخزن يمنع
+                # تداخل العمال على نفس اللعبة (update)
+                with game_locks.locked(game_id):
+                    outcome = active_games.update(game_id, answer)
+                if outcome is None:
+                    return
+                result, game_type = outcome
+                display_name = cached_name
                 
-                flex_leaderboard = {
-                    "type": "bubble",
-                    "size": "mega",
-                    "header": {
-                        "type": "box",
-                        "layout": "vertical",
-                        "contents": [
-                            {
-                                "type": "text",
-                                "text": "لوحة الصدارة",
-                                "weight": "bold",
-                                "size": "xl",
-                                "color": "#1a1a1a",
-                                "align": "center"
-                            },
-                            {
-                                "type": "text",
-                                "text": "أفضل اللاعبين",
-                                "size": "sm",
-                                "color": "#6a6a6a",
-                                "align": "center",
-                                "margin": "sm"
-                            }
-                        ],
-                        "backgroundColor": "#ffffff",
-                        "paddingAll": "20px"
-                    },
-                    "body": {
-                        "type": "box",
-                        "layout": "vertical",
-                        "contents": players_list,
-                        "backgroundColor": "#ffffff",
-                        "paddingAll": "20px"
-                    },
-                    "footer": {
-                        "type": "box",
-                        "layout": "vertical",
-                        "contents": [
-                            {
-                                "type": "separator",
-                                "color": "#e8e8e8"
-                            },
-                            {
-                                "type": "button",
-                                "action": {
-                                    "type": "message",
-                                    "label": "نقاطي",
-                                    "text": "نقاطي"
-                                },
-                                "style": "secondary",
-                                "height": "sm",
-                                "margin": "md"
-                            }
-                        ],
-                        "backgroundColor": "#f8f8f8",
-                        "paddingAll": "16px"
-                    }
-                }
+                if result and cached_name is None:
+                    # الاسم غير معروف: يُجلب الآن بعد تحرير القفل ويُكتب في النتائج
+                    display_name = get_user_profile_safe(user_id)
+                    fill_name(result, lazy_name, display_name)
+                    if result.get('points', 0) > 0 and not result.get('game_over', False):
+                        def rename(game_data):
+                            game_data['game'].scores.slot(user_id, display_name)
+                            return None, False
+                        with game_locks.locked(game_id):
+                            active_games.update(game_id, rename)
                 
-                line_bot_api.reply_message(
-                    event.reply_token,
-                    FlexSendMessage(alt_text="لوحة الصدارة", contents=flex_leaderboard, quick_reply=get_quick_reply())
-                )
-            else:
-                line_bot_api.reply_message(
-                    event.reply_token,
-                    TextSendMessage(text="لا توجد بيانات بعد", quick_reply=get_quick_reply())
-                )
-            return
-        
-        elif text in ['إيقاف', 'ايقاف', 'stop']:
-            with games_lock:
-                if game_id in active_games:
-                    game_type = active_games[game_id]['type']
-                    del active_games[game_id]
-                    line_bot_api.reply_message(
-                        event.reply_token,
-                        TextSendMessage(text=f"تم إيقاف لعبة {game_type}", quick_reply=get_quick_reply())
-                    )
+                if result and result.get('game_over', False):
+                    game_expiry.cancel(game_id)
                 else:
-                    line_bot_api.reply_message(
-                        event.reply_token,
-                        TextSendMessage(text="لا توجد لعبة نشطة", quick_reply=get_quick_reply())
-                    )
-            return
-        
-        elif text in ['انضم', 'تسجيل', 'join']:
-            with players_lock:
-                if user_id in registered_players:
-                    line_bot_api.reply_message(
-                        event.reply_token,
-                        TextSendMessage(text=f"أنت مسجل بالفعل يا {display_name}\n\nيمكنك اللعب في جميع الألعاب", quick_reply=get_quick_reply())
-                    )
-                else:
-                    registered_players.add(user_id)
-                    
-                    with games_lock:
-                        for gid, game_data in active_games.items():
-                            if 'participants' not in game_data:
-                                game_data['participants'] = set()
-                            game_data['participants'].add(user_id)
-                    
-                    join_message = {
-                        "type": "bubble",
-                        "body": {
-                            "type": "box",
-                            "layout": "vertical",
-                            "contents": [
-                                {
-                                    "type": "text",
-                                    "text": "تم التسجيل بنجاح",
-                                    "weight": "bold",
-                                    "size": "xl",
-                                    "color": "#1a1a1a",
-                                    "align": "center"
-                                },
-                                {
-                                    "type": "text",
-                                    "text": f"مرحباً بك {display_name}",
-                                    "size": "md",
-                                    "color": "#6a6a6a",
-                                    "align": "center",
-                                    "margin": "md"
-                                },
-                                {
-                                    "type": "separator",
-                                    "margin": "xl",
-                                    "color": "#e8e8e8"
-                                },
-                                {
-                                    "type": "text",
-                                    "text": "يمكنك الآن اللعب في جميع الألعاب\n\nإجاباتك ستُحسب تلقائياً",
-                                    "size": "sm",
-                                    "color": "#4a4a4a",
-                                    "align": "center",
-                                    "wrap": True,
-                                    "margin": "xl"
-                                }
-                            ],
-                            "backgroundColor": "#ffffff",
-                            "paddingAll": "28px"
-                        }
-                    }
-                    
-                    line_bot_api.reply_message(
-                        event.reply_token,
-                        FlexSendMessage(alt_text="تم التسجيل", contents=join_message, quick_reply=get_quick_reply())
-                    )
-                    logger.info(f"انضم لاعب جديد: {display_name}")
-            return
-        
-        elif text in ['انسحب', 'خروج', 'leave']:
-            with players_lock:
-                if user_id in registered_players:
-                    registered_players.remove(user_id)
-                    
-                    with games_lock:
-                        for gid, game_data in active_games.items():
-                            if 'participants' in game_data and user_id in game_data['participants']:
-                                game_data['participants'].remove(user_id)
-                    
-                    line_bot_api.reply_message(
-                        event.reply_token,
-                        TextSendMessage(text=f"تم انسحابك يا {display_name}\n\nيمكنك الانضمام مرة أخرى بكتابة 'انضم'", quick_reply=get_quick_reply())
-                    )
-                    logger.info(f"انسحب لاعب: {display_name}")
-                else:
-                    line_bot_api.reply_message(
-                        event.reply_token,
-                        TextSendMessage(text="أنت غير مسجل\n\nاكتب 'انضم' للتسجيل", quick_reply=get_quick_reply())
-                    )
-            return
-        
-        # بدء الألعاب
-        games_map = {
-            'ذكاء': (IQGame, 'ذكاء'),
-            'كلمة ولون': (WordColorGame, 'كلمة ولون'),
-            'لون': (WordColorGame, 'كلمة ولون'),
-            'سلسلة': (ChainWordsGame, 'سلسلة'),
-            'ترتيب الحروف': (ScrambleWordGame, 'ترتيب'),
-            'ترتيب': (ScrambleWordGame, 'ترتيب'),
-            'تكوين كلمات': (LettersWordsGame, 'تكوين'),
-            'تكوين': (LettersWordsGame, 'تكوين'),
-            'أسرع': (FastTypingGame, 'أسرع'),
-            'لعبة': (HumanAnimalPlantGame, 'لعبة'),
-            'خمن': (GuessGame, 'خمن'),
-            'توافق': (CompatibilityGame, 'توافق'),
-            'رياضيات': (MathGame, 'رياضيات'),
-            'ذاكرة': (MemoryGame, 'ذاكرة'),
-            'لغز': (RiddleGame, 'لغز'),
-            'ضد': (OppositeGame, 'ضد'),
-            'إيموجي': (EmojiGame, 'إيموجي'),
-            'أغنية': (SongGame, 'أغنية')
-        }
-        
-        if text in games_map:
-            game_class, game_type = games_map[text]
-            
-            if text == 'توافق':
-                with games_lock:
-                    with players_lock:
-                        participants = registered_players.copy()
-                        participants.add(user_id)
-                    
-                    game = CompatibilityGame(line_bot_api)
-                    active_games[game_id] = {
-                        'game': game,
-                        'type': 'توافق',
-                        'created_at': datetime.now(),
-                        'participants': participants
-                    }
-                
-                line_bot_api.reply_message(
-                    event.reply_token,
-                    TextSendMessage(text="💖 لعبة التوافق!\n\nاكتب اسمين مفصولين بمسافة\nمثال: أحمد فاطمة", quick_reply=get_quick_reply())
-                )
-                return
-            
-            start_game(game_id, game_class, game_type, user_id, event)
-            return
-        
-        # معالجة إجابات الألعاب النشطة
-        if game_id in active_games:
-            game_data = active_games[game_id]
-            
-            with players_lock:
-                is_registered = user_id in registered_players
-            
-            if not is_registered and 'participants' in game_data and user_id not in game_data['participants']:
-                return
-            
-            game = game_data['game']
-            game_type = game_data['type']
-            
-            try:
-                result = game.check_answer(text, user_id, display_name)
+                    game_expiry.touch(game_id)
                 
                 if result:
                     points = result.get('points', 0)
@@ -1474,10 +728,7 @@ def handle_message(event):
                                          result.get('won', False), game_type)
                     
                     if result.get('game_over', False):
-                        with games_lock:
-                            if game_id in active_games:
-                                del active_games[game_id]
-                        
+                        flush_scores()
                         response = TextSendMessage(
                             text=result.get('message', 'انتهت اللعبة'),
                             quick_reply=get_quick_reply()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+قياس تطبيع النص: re.sub + replace متسلسلة (الطريقة القديمة) مقابل جدول translate واحد
+
+النصوص عينة من رسائل محادثة واقعية (أوامر، إجابات قصيرة، تشكيل، جمل كاملة)
+مكررة كما تتكرر في مجموعة نشطة. "بدون ذاكرة" يقيس المحرك نفسه، و"مع ذاكرة" يشمل LRU.
+الطريقة:
+    python benchmarks/bench_arabic.py [iterations]
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.arabic import normalize
+
+MESSAGES = [
+    "ذكاء", "أسرع", "  الإجابة  ", "القَلَمُ", "مدرسة", "إنسان", "آسف ما عرفت", "ى",
+    "الجواب هو الساعة", "تلميح", "  كتاب ", "السَّيَّارَة", "أكثر", "شمس", "قمــر",
+    "والله ما أدري بس أظن إنها البطة", "الإسكندرية", "مستشفى", "انضم", "نقاطي",
+    "هههههههه صعبة", "الأُمّ", "برتقالة", "ترتيب", "١٢٣", "Hello", "صدارة", "بحر",
+]
+
+
+def old_normalize(text):
+    """نسخة BaseGame.normalize_text قبل المحرك الموحد"""
+    if not text:
+        return ""
+    text = text.strip().lower()
+    text = re.sub(r'^ال', '', text)
+    text = text.replace('أ', 'ا').replace('إ', 'ا').replace('آ', 'ا')
+    text = text.replace('ة', 'ه')
+    text = text.replace('ى', 'ي')
+    text = re.sub(r'[\u064B-\u065F]', '', text)
+    text = ' '.join(text.split())
+    return text
+
+
+def timed(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for message in MESSAGES:
+            func(message)
+    return (time.perf_counter() - start) / (iterations * len(MESSAGES)) * 1e9
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    engine = normalize.__wrapped__  # بدون lru_cache
+    for message in MESSAGES:
+        if '\u0640' not in message:  # القديم لا يحذف التطويل
+            assert old_normalize(message) == engine(message), message
+
+    print(f"تكرارات: {iterations} × {len(MESSAGES)} رسالة")
+    print("-" * 50)
+    old = timed(old_normalize, iterations)
+    print(f"{'re + replace':<16} {old:8.0f} ns")
+    for name, func in (('translate', engine), ('translate + LRU', normalize)):
+        ns = timed(func, iterations)
+        print(f"{name:<16} {ns:8.0f} ns {old / ns:6.1f}x")
+    print("-" * 50)
+
+
+if __name__ == "__main__":
+    main()
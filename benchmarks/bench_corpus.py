@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+قياس بنك أسئلة كبير: تجهيز كل السجلات في الذاكرة (MemoryBank) مقابل ملف مخزون
+مقروء عبر mmap (Corpus) - زمن التحميل والذاكرة المحجوزة وزمن قراءة سؤال عشوائي
+
+السجلات مولدة بحجم ألغاز حقيقية (سؤال جملة وإجابة كلمتين) في مجلد مؤقت.
+الطريقة:
+    python benchmarks/bench_corpus.py [records]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from games.corpus import Corpus, MemoryBank, write_corpus
+from games.question_bank import question_compiler
+
+
+def make_records(n):
+    return [{"q": f"ما الشيء رقم {i} الذي يمشي بلا أرجل ويبكي بلا عيون؟", "a": f"السحاب {i}"}
+            for i in range(n)]
+
+
+def load(factory):
+    tracemalloc.start()
+    start = time.perf_counter()
+    bank = factory()
+    elapsed = (time.perf_counter() - start) * 1000
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return bank, elapsed, used
+
+
+def lookup_us(bank, lookups):
+    ids = [random.randrange(len(bank)) for _ in range(lookups)]
+    start = time.perf_counter()
+    for i in ids:
+        bank[i]
+    return (time.perf_counter() - start) / lookups * 1e6
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    records = make_records(n)
+    compile_item = question_compiler('q', 'a', words=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "riddles.qbc")
+        size = write_corpus(path, records)
+        print(f"سجلات: {n}، حجم الملف: {size / 1024:.0f} KB")
+        print("-" * 60)
+        print(f"{'البنك':<12} {'تحميل ms':>10} {'ذاكرة KB':>10} {'قراءة µs':>10}")
+        for name, factory in (('MemoryBank', lambda: MemoryBank(map(compile_item, records))),
+                              ('Corpus', lambda: Corpus(path, compile_item))):
+            bank, elapsed, used = load(factory)
+            print(f"{name:<12} {elapsed:10.1f} {used / 1024:10.0f} {lookup_us(bank, 5000):10.2f}")
+            if isinstance(bank, Corpus):
+                bank.close()
+        print("-" * 60)
+
+
+if __name__ == "__main__":
+    main()
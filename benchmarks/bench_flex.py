@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+قياس بناء رسائل Flex: بناء القاموس وكائنات SDK في كل مرة مقابل القوالب المجهزة
+
+المسار القديم: *_layout() ثم FlexSendMessage(contents=dict) ثم as_json_dict + json.dumps
+(نفس ما يفعله reply_message). المسار الجديد: FlexStyles.x() ثم prebuilt_flex.
+الطريقة:
+    python benchmarks/bench_flex.py [iterations]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from linebot.models import FlexSendMessage, QuickReply, QuickReplyButton, MessageAction
+
+from flex_styles import FlexStyles
+from utils.flex_templates import FrozenQuickReply, prebuilt_flex
+
+BUTTONS = ["أسرع", "ذكاء", "لون", "ترتيب", "رياضيات", "خمن", "ضد", "تكوين", "أغنية", "لعبة", "سلسلة", "أكثر"]
+LEADERS = [{'display_name': f"لاعب {i}", 'total_points': 500 - i * 7} for i in range(10)]
+
+
+def buttons():
+    return [QuickReplyButton(action=MessageAction(label=b, text=b)) for b in BUTTONS]
+
+
+def leaderboard_layout():
+    rows = [FlexStyles.leaderboard_row_layout(i, r['display_name'], r['total_points'], i <= 3,
+                                              "none" if i == 1 else "xs")
+            for i, r in enumerate(LEADERS, 1)]
+    return FlexStyles.leaderboard_layout(rows)
+
+
+CASES = {
+    'welcome': (lambda: FlexStyles.welcome_layout("أحمد"),
+                lambda: FlexStyles.welcome("أحمد")),
+    'stats': (lambda: FlexStyles.user_stats_layout("أحمد", "مسجل", "#4a4a4a", 120, 30, 12, "40.0%"),
+              lambda: FlexStyles.user_stats("أحمد", "مسجل", "#4a4a4a", 120, 30, 12, 40.0)),
+    'help': (FlexStyles.help_layout, FlexStyles.help),
+    'game_start': (lambda: FlexStyles.game_start_layout("ذكاء", "ما هو الشيء؟", 3, 10),
+                   lambda: FlexStyles.game_start("ذكاء", "ما هو الشيء؟", 3, 10)),
+    'leaderboard': (leaderboard_layout, lambda: FlexStyles.leaderboard(LEADERS)),
+}
+
+
+def old_path(build):
+    message = FlexSendMessage(alt_text="alt", contents=build(), quick_reply=QuickReply(items=buttons()))
+    return json.dumps({'messages': [message.as_json_dict()]})
+
+
+def new_path(build, quick_reply):
+    message = prebuilt_flex("alt", build(), quick_reply)
+    return json.dumps({'messages': [message.as_json_dict()]})
+
+
+def timed(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    quick_reply = FrozenQuickReply(items=buttons())
+
+    print(f"تكرارات: {iterations}")
+    print("-" * 60)
+    print(f"{'الرسالة':<12} {'قديم µs':>10} {'قوالب µs':>10} {'التحسن':>8}")
+    for name, (layout, render) in CASES.items():
+        assert json.loads(old_path(layout)) == json.loads(new_path(render, quick_reply)), name
+        old = timed(lambda: old_path(layout), iterations)
+        new = timed(lambda: new_path(render, quick_reply), iterations)
+        print(f"{name:<12} {old:10.1f} {new:10.1f} {old / new:7.1f}x")
+    print("-" * 60)
+
+
+if __name__ == "__main__":
+    main()
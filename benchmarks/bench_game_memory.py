@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+قياس ذاكرة N لعبة متزامنة: البنوك المشتركة + ترتيب فهارس لكل لعبة
+مقابل نسخة من البنك لكل لعبة (كما كانت المنشئات تفعل)
+
+النسخة السابقة تُحاكى بـ deepcopy لبيانات البنك الخام ثم خلطها، مع بقاء النصوص
+مشتركة كما كانت (ثوابت الكود). يُقاس أيضاً حجم اللعبة بعد pickle (ما يُكتب في المخزن).
+الطريقة:
+    python benchmarks/bench_game_memory.py [N]
+"""
+import copy
+import os
+import pickle
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from games import (IQGame, RiddleGame, OppositeGame, EmojiGame, ScrambleWordGame, SongGame,
+                   GuessGame, LettersWordsGame, HumanAnimalPlantGame, FastTypingGame,
+                   ChainWordsGame, WordColorGame)
+from games import (iq_game, riddle_game, opposite_game, emoji_game, scramble_word_game, song_game,
+                   guess_game, letters_words_game, human_animal_plant_game, fast_typing_game,
+                   chain_words_game, word_color_game)
+
+# بيانات كل لعبة كما كانت تُنسخ في المنشئ
+RAW = {
+    IQGame: (iq_game._QUESTIONS, iq_game._HINTS),
+    RiddleGame: (riddle_game._RIDDLES,),
+    OppositeGame: (opposite_game._OPPOSITES,),
+    EmojiGame: (emoji_game._EMOJIS,),
+    ScrambleWordGame: (scramble_word_game._WORDS,),
+    SongGame: (song_game._SONGS,),
+    GuessGame: (guess_game._ITEMS, [{"category": c, "letter": l, "answers": w}
+                                    for c, letters in guess_game._ITEMS.items() for l, w in letters.items()]),
+    LettersWordsGame: (letters_words_game._LETTER_SETS,),
+    HumanAnimalPlantGame: (human_animal_plant_game._ANSWERS, list(human_animal_plant_game.LETTERS),
+                           list(human_animal_plant_game.CATEGORIES)),
+    FastTypingGame: (list(fast_typing_game.SENTENCES),),
+    ChainWordsGame: (list(chain_words_game.STARTING_WORDS),),
+    WordColorGame: (word_color_game._COLORS, list(word_color_game._COLORS)),
+}
+
+
+def per_instance_copy(game_class):
+    """اللعبة مع نسختها من البنك (الألعاب بـ __slots__ فلا تُضاف لها حقول)"""
+    bank_copy = [copy.deepcopy(data) for data in RAW[game_class]]
+    for data in bank_copy:
+        if isinstance(data, list):
+            random.shuffle(data)
+    return game_class(None), bank_copy
+
+
+def measure(factory, n):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = [factory() for _ in range(n)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used, games
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    print(f"ألعاب متزامنة لكل نوع: {n}")
+    print("-" * 72)
+    print(f"{'اللعبة':<22} {'نسخة KB':>10} {'مشترك KB':>10} {'التوفير':>8} {'pickle قبل/بعد B':>18}")
+    total_old = total_new = 0
+    for game_class in RAW:
+        old, old_games = measure(lambda: per_instance_copy(game_class), n)
+        new, new_games = measure(lambda: game_class(None), n)
+        total_old += old
+        total_new += new
+        old_pickle = len(pickle.dumps(old_games[0]))
+        new_pickle = len(pickle.dumps(new_games[0]))
+        print(f"{game_class.__name__:<22} {old / 1024:10.0f} {new / 1024:10.0f} {old / new:7.1f}x "
+              f"{old_pickle:>9}/{new_pickle:<8}")
+    print("-" * 72)
+    print(f"{'المجموع':<22} {total_old / 1024:10.0f} {total_new / 1024:10.0f} {total_old / total_new:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+قياس مخزن الألعاب المتدرج: ذاكرة N لعبة خاملة قبل وبعد إخراجها إلى SQLite،
+وزمن الإخراج وزمن إعادة اللعبة عند الرسالة التالية
+
+كل مجموعة تبدأ لعبة (أنواع متنوعة) وتُجاب بضعة أسئلة ثم تسكت.
+الطريقة:
+    python benchmarks/bench_game_store.py [N]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from games import RiddleGame, IQGame, SongGame, GuessGame, HumanAnimalPlantGame, ScrambleWordGame
+from utils.game_store import TieredGameStore
+
+GAME_CLASSES = (RiddleGame, IQGame, SongGame, GuessGame, HumanAnimalPlantGame, ScrambleWordGame)
+
+
+def played_game(game_class, players=8):
+    game = game_class(None)
+    game.start_game()
+    for i in range(players):
+        game.add_score(f"U{i:032x}", f"لاعب {i}", 10)
+    return game
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    now = [0.0]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TieredGameStore(os.path.join(tmp, "spill.db"), idle_seconds=60, max_hot=n,
+                                clock=lambda: now[0])
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        for i in range(n):
+            store[f"C{i:032x}"] = {'game': played_game(GAME_CLASSES[i % len(GAME_CLASSES)]),
+                                   'type': 'لعبة', 'last_activity': now[0],
+                                   'participants': set()}
+        hot = tracemalloc.get_traced_memory()[0] - base
+
+        now[0] += 61
+        start = time.perf_counter()
+        spilled = store.spill_idle()
+        spill_s = time.perf_counter() - start
+        cold = tracemalloc.get_traced_memory()[0] - base
+        tracemalloc.stop()
+
+        ids = random.sample(range(n), min(n, 200))
+        start = time.perf_counter()
+        for i in ids:
+            store.get(f"C{i:032x}")
+        rehydrate_ms = (time.perf_counter() - start) / len(ids) * 1000
+        disk = os.path.getsize(os.path.join(tmp, "spill.db"))
+
+    print(f"ألعاب: {n}، أُخرج منها: {spilled}")
+    print("-" * 50)
+    print(f"{'الذاكرة والألعاب نشطة':<28} {hot / 1024:10.0f} KB")
+    print(f"{'الذاكرة بعد الإخراج':<28} {cold / 1024:10.0f} KB")
+    print(f"{'حجم ملف SQLite':<28} {disk / 1024:10.0f} KB")
+    print(f"{'زمن الإخراج لكل لعبة':<28} {spill_s / max(spilled, 1) * 1000:10.3f} ms")
+    print(f"{'زمن إعادة لعبة':<28} {rehydrate_ms:10.3f} ms")
+    print("-" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+قياس التنافس على الأقفال: قفل عام واحد مقابل أقفال مقسمة حسب اللعبة
+
+يحاكي عدة مجموعات ترسل إجابات بالتوازي، وكل إجابة تمسك القفل لفترة قصيرة
+(تمثل check_answer + حفظ الحالة). الطريقة:
+    python benchmarks/bench_locks.py [groups] [threads] [ops_per_thread]
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.locks import LockManager
+
+CRITICAL_SECTION_SECONDS = 0.0005
+
+
+class GlobalLock:
+    """السلوك القديم: games_lock واحد لكل شيء"""
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def locked(self, *keys):
+        with self._lock:
+            yield
+
+
+def run(lock_manager, groups, threads, ops):
+    def worker(index):
+        for op in range(ops):
+            game_id = f"group-{(index * ops + op) % groups}"
+            with lock_manager.locked(game_id):
+                time.sleep(CRITICAL_SECTION_SECONDS)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return elapsed, (threads * ops) / elapsed
+
+
+def main():
+    groups = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    ops = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+
+    print(f"مجموعات: {groups} | threads: {threads} | عمليات لكل thread: {ops}")
+    print("-" * 60)
+    results = {}
+    for name, manager in (("قفل عام", GlobalLock()), ("أقفال مقسمة", LockManager(64))):
+        elapsed, throughput = run(manager, groups, threads, ops)
+        results[name] = throughput
+        print(f"{name:<12} {elapsed:8.3f}s  {throughput:10.0f} عملية/ث")
+        if isinstance(manager, LockManager):
+            print(f"             {manager.stats()}")
+    print("-" * 60)
+    print(f"التحسن: x{results['أقفال مقسمة'] / results['قفل عام']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
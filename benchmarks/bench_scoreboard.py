@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+قياس ترتيب اللاعبين في لعبة جماعية كبيرة: فرز كل النقاط عند كل عرض
+(defaultdict + sorted كما كان end_game) مقابل أعلى k المحدَّث مع كل نقطة في Scoreboard
+
+كل جولة: إجابات صحيحة من لاعبين عشوائيين ثم عرض الترتيب مرة.
+الطريقة:
+    python benchmarks/bench_scoreboard.py [players]
+"""
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from games.state import Scoreboard
+
+ROUNDS = 200
+ANSWERS_PER_ROUND = 20
+
+
+def run_dict(events):
+    scores = defaultdict(int)
+    start = time.perf_counter()
+    for round_events in events:
+        for user, points in round_events:
+            scores[user] += points
+        sorted(scores.items(), key=lambda x: x[1], reverse=True)[:5]
+    return time.perf_counter() - start
+
+
+def run_board(events):
+    board = Scoreboard()
+    start = time.perf_counter()
+    for round_events in events:
+        for user, points in round_events:
+            board.add(user, points)
+        board.top(5)
+    return time.perf_counter() - start
+
+
+def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rng = random.Random(1)
+    users = [f"U{i:032x}" for i in range(players)]
+    # كل اللاعبين سجلوا نقاطاً مرة على الأقل قبل القياس
+    warmup = [[(user, 5) for user in users]]
+    events = warmup + [[(rng.choice(users), rng.choice((10, 15))) for _ in range(ANSWERS_PER_ROUND)]
+                       for _ in range(ROUNDS)]
+
+    old = run_dict(events)
+    new = run_board(events)
+    print(f"لاعبون: {players}، جولات: {ROUNDS} × {ANSWERS_PER_ROUND} إجابة + عرض الترتيب")
+    print("-" * 50)
+    print(f"{'sorted لكل عرض':<20} {old * 1000:10.2f} ms")
+    print(f"{'أعلى k تدريجي':<20} {new * 1000:10.2f} ms {old / new:6.1f}x")
+    print("-" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,34 @@ class Config:
         os.getenv('GEMINI_API_KEY_3', '')
     ]
     GEMINI_API_KEYS = [key for key in GEMINI_API_KEYS if key]
+    GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash')
+    # يمكن توجيهه إلى خادم محلي للاختبار
+    GEMINI_BASE_URL = os.getenv('GEMINI_BASE_URL', 'https://generativelanguage.googleapis.com/v1beta')
+    GEMINI_TIMEOUT_SECONDS = float(os.getenv('GEMINI_TIMEOUT_SECONDS', 8))
+    GEMINI_WORKERS = int(os.getenv('GEMINI_WORKERS', 4))
+    # لكل مفتاح: طلبات متزامنة وحصة في الدقيقة
+    GEMINI_KEY_CONCURRENCY = int(os.getenv('GEMINI_KEY_CONCURRENCY', 2))
+    GEMINI_KEY_RPM = int(os.getenv('GEMINI_KEY_RPM', 15))
+    # قاطع الدائرة: عدد الأخطاء/الطلبات البطيئة قبل التحويل للأسئلة المحلية
+    GEMINI_BREAKER_FAILURES = int(os.getenv('GEMINI_BREAKER_FAILURES', 5))
+    GEMINI_BREAKER_RESET_SECONDS = int(os.getenv('GEMINI_BREAKER_RESET_SECONDS', 30))
+    GEMINI_SLOW_CALL_SECONDS = float(os.getenv('GEMINI_SLOW_CALL_SECONDS', 5))
+    # مخزون أسئلة مولدة مسبقاً لكل نوع (0 = طلب مباشر عند الحاجة)
+    QUESTION_POOL_SIZE = int(os.getenv('QUESTION_POOL_SIZE', 20))
+    QUESTION_POOL_LOW_WATER = int(os.getenv('QUESTION_POOL_LOW_WATER', 5))
+    QUESTION_POOL_PATH = os.getenv('QUESTION_POOL_PATH', 'data/question_pool.json')
+    # مطابقة الإجابات: قبول محلي فوق ACCEPT، و Gemini فقط بين LLM و ACCEPT
+    ANSWER_ACCEPT_THRESHOLD = float(os.getenv('ANSWER_ACCEPT_THRESHOLD', 0.8))
+    ANSWER_LLM_THRESHOLD = float(os.getenv('ANSWER_LLM_THRESHOLD', 0.6))
+    # ملفات مخزون الأسئلة المبنية بـ python -m games.build_corpus build (إن لم توجد تُستخدم البنوك المدمجة)
+    CORPUS_DIR = os.getenv('CORPUS_DIR', 'data/corpus')
+    # ذاكرة ردود Gemini المتكررة (0 = معطلة، المسار الفارغ = الذاكرة فقط)
+    AI_CACHE_SIZE = int(os.getenv('AI_CACHE_SIZE', 2000))
+    AI_CACHE_MAX_BYTES = int(os.getenv('AI_CACHE_MAX_BYTES', 2 * 1024 * 1024))
+    AI_CACHE_PATH = os.getenv('AI_CACHE_PATH', 'data/ai_cache.db')
+    AI_CACHE_MAX_DISK_BYTES = int(os.getenv('AI_CACHE_MAX_DISK_BYTES', 20 * 1024 * 1024))
+    AI_CACHE_TTL_SECONDS = int(os.getenv('AI_CACHE_TTL_SECONDS', 86400))
+    AI_VERDICT_TTL_SECONDS = int(os.getenv('AI_VERDICT_TTL_SECONDS', 30 * 86400))
     
     PORT = int(os.getenv('PORT', 5000))
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
@@ -27,11 +55,50 @@ class Config:
     RATE_LIMIT_WINDOW = int(os.getenv('RATE_LIMIT_WINDOW', 60))
     GAME_TIMEOUT_MINUTES = int(os.getenv('GAME_TIMEOUT_MINUTES', 10))
     CLEANUP_INTERVAL_SECONDS = int(os.getenv('CLEANUP_INTERVAL_SECONDS', 300))
+    # إرسال رسالة للمجموعة عند انتهاء لعبة لعدم النشاط (push - يستهلك من الحصة)
+    GAME_TIMEOUT_NOTIFY = os.getenv('GAME_TIMEOUT_NOTIFY', 'False').lower() == 'true'
     QUESTIONS_PER_GAME = int(os.getenv('QUESTIONS_PER_GAME', 10))
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     POINTS_PER_CORRECT_ANSWER = int(os.getenv('POINTS_PER_CORRECT_ANSWER', 10))
     POINTS_WIN_BONUS = int(os.getenv('POINTS_WIN_BONUS', 50))
     
+    PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', 5000))
+    PROFILE_CACHE_TTL_SECONDS = int(os.getenv('PROFILE_CACHE_TTL_SECONDS', 3600))
+    PROFILE_NEGATIVE_TTL_SECONDS = int(os.getenv('PROFILE_NEGATIVE_TTL_SECONDS', 60))
+    
+    # memory أو sqlite (للمشاركة بين عمال gunicorn) أو tiered (ذاكرة + إخراج الخاملة إلى GAME_STORE_PATH)
+    GAME_STORE = os.getenv('GAME_STORE', 'memory')
+    GAME_STORE_PATH = os.getenv('GAME_STORE_PATH', 'data/games.db')
+    # tiered: ثواني الخمول قبل إخراج اللعبة من الذاكرة، وأقصى عدد ألعاب في الذاكرة
+    GAME_IDLE_SPILL_SECONDS = int(os.getenv('GAME_IDLE_SPILL_SECONDS', 120))
+    GAME_HOT_MAX = int(os.getenv('GAME_HOT_MAX', 1000))
+    GAME_LOCK_STRIPES = int(os.getenv('GAME_LOCK_STRIPES', 64))
+    
+    # معالجة أحداث webhook في الخلفية (0 = معالجة مباشرة)
+    DISPATCH_WORKERS = int(os.getenv('DISPATCH_WORKERS', 4))
+    DISPATCH_QUEUE_SIZE = int(os.getenv('DISPATCH_QUEUE_SIZE', 1000))
+    # أقصى انتظار لمكان في طابور ممتلئ قبل إسقاط الحدث
+    DISPATCH_PUT_TIMEOUT = float(os.getenv('DISPATCH_PUT_TIMEOUT', 0.5))
+    
+    # تجميع تحديثات النقاط وكتابتها كل N ميلي ثانية (0 = كتابة فورية)
+    SCORE_FLUSH_INTERVAL_MS = int(os.getenv('SCORE_FLUSH_INTERVAL_MS', 200))
+    
+    # أقصى عمر لذاكرة الصدارة - بعده تُقرأ من SQL فتظهر نقاط عمال gunicorn الآخرين
+    LEADERBOARD_CACHE_TTL_SECONDS = int(os.getenv('LEADERBOARD_CACHE_TTL_SECONDS', 30))
+    
+    # أمر المراكز: أقل فاصل بين ردين في نفس المجموعة، وعدد المجموعات في ذاكرة الرسائل
+    STANDINGS_COOLDOWN_SECONDS = int(os.getenv('STANDINGS_COOLDOWN_SECONDS', 10))
+    STANDINGS_CACHE_SIZE = int(os.getenv('STANDINGS_CACHE_SIZE', 1000))
+    
+    # حد اختياري لرسائل كل مجموعة خلال RATE_LIMIT_WINDOW (0 = معطل، الافتراضي)
+    GROUP_MAX_MESSAGES_PER_MINUTE = int(os.getenv('GROUP_MAX_MESSAGES_PER_MINUTE', 0))
+    # memory أو sqlite (افتراضياً نفس مخزن الألعاب)، وأقصى عدد مفاتيح في الذاكرة
+    RATE_LIMIT_STORE = os.getenv('RATE_LIMIT_STORE', 'sqlite' if GAME_STORE == 'sqlite' else 'memory')
+    RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', 50000))
+    
+    # قواعد بيانات قديمة تُدمج مرة واحدة في DB_NAME
+    LEGACY_DB_PATHS = [p for p in os.getenv('LEGACY_DB_PATHS', 'data/users.db,users.db').split(',') if p]
+    
     @classmethod
     def validate(cls):
         """التحقق من صحة الإعدادات"""
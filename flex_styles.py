@@ -2,6 +2,7 @@
 ملف التصاميم الخارجي - Flex Message Templates
 جميع تصاميم الرسائل بألوان احترافية (أبيض، أسود، رمادي)
 """
+from utils.flex_templates import FlexTemplate, slot, RAW
 
 class FlexStyles:
     """مكتبة التصاميم الاحترافية"""
@@ -19,9 +20,89 @@ class FlexStyles:
         'muted': '#9a9a9a'         # رمادي باهت
     }
     
+    # الواجهة العامة تملأ قوالب مترجمة مرة واحدة عند الاستيراد (أسفل الملف)
+    # دوال *_layout هي التصاميم نفسها وتُستدعى عند الترجمة فقط
+    
     @staticmethod
     def game_start(game_name, question, round_num=1, total_rounds=5):
         """تصميم بداية السؤال"""
+        return _GAME_START.render(game_name=game_name, question=question, round_num=round_num,
+                                  total_rounds=total_rounds, remaining=total_rounds - round_num)
+    
+    @staticmethod
+    def correct_answer(player_name, points, streak=1):
+        """تصميم الإجابة الصحيحة"""
+        template = _CORRECT_ANSWER_STREAK if streak > 1 else _CORRECT_ANSWER
+        return template.render(player_name=player_name, points=points, streak=streak)
+    
+    @staticmethod
+    def wrong_answer(correct_ans):
+        """تصميم الإجابة الخاطئة"""
+        return _WRONG_ANSWER.render(correct_ans=correct_ans)
+    
+    @staticmethod
+    def game_winner(winner_name, winner_score, players_scores, game_name):
+        """تصميم إعلان الفائز"""
+        sorted_players = sorted(players_scores.items(), key=lambda x: x[1], reverse=True)
+        rows = [(_WINNER_ROW_FIRST if i == 1 else _WINNER_ROW).render_json(rank=i, name=name, score=score)
+                for i, (name, score) in enumerate(sorted_players[:5], 1)]
+        return _GAME_WINNER.render(winner_name=winner_name, winner_score=winner_score,
+                                   players_list='[' + ','.join(rows) + ']', game_name=game_name)
+    
+    @staticmethod
+    def hint_message(hint_text):
+        """تصميم رسالة التلميح"""
+        return _HINT.render(hint_text=hint_text)
+    
+    @staticmethod
+    def game_progress(game_name, standings, current_round, total_rounds):
+        """تصميم عرض التقدم في اللعبة - standings أزواج (الاسم، النقاط) مرتبة مسبقاً"""
+        rows = [_PROGRESS_ROW.render_json(name=name, score=score) for name, score in standings]
+        return _GAME_PROGRESS.render(game_name=game_name, score_items='[' + ','.join(rows) + ']',
+                                     current_round=current_round, total_rounds=total_rounds)
+    
+    @staticmethod
+    def welcome(display_name):
+        """رسالة البداية"""
+        return _WELCOME.render(display_name=display_name)
+    
+    @staticmethod
+    def more_games():
+        """قائمة الألعاب الإضافية"""
+        return _MORE_GAMES.render()
+    
+    @staticmethod
+    def help():
+        """رسالة المساعدة"""
+        return _HELP.render()
+    
+    @staticmethod
+    def user_stats(display_name, status, status_color, total_points, games_played, wins, win_rate):
+        """إحصائيات اللاعب"""
+        return _USER_STATS.render(display_name=display_name, status=status, status_color=status_color,
+                                  total_points=total_points, games_played=games_played, wins=wins,
+                                  win_rate=f"{win_rate:.1f}%")
+    
+    @staticmethod
+    def join_success(display_name):
+        """رسالة التسجيل"""
+        return _JOIN_SUCCESS.render(display_name=display_name)
+    
+    @staticmethod
+    def leaderboard(leaders):
+        """لوحة الصدارة من صفوف فيها display_name و total_points"""
+        rows = []
+        for i, leader in enumerate(leaders, 1):
+            template = _LEADER_ROW_FIRST if i == 1 else _LEADER_ROW_TOP if i <= 3 else _LEADER_ROW
+            rows.append(template.render_json(rank=i, name=leader['display_name'],
+                                             points=leader['total_points']))
+        return _LEADERBOARD.render(players_list='[' + ','.join(rows) + ']')
+    
+    @staticmethod
+    def game_start_layout(game_name, question, round_num=1, total_rounds=5, remaining=None):
+        """تصميم بداية السؤال"""
+        if remaining is None:
+            remaining = total_rounds - round_num
         return {
             "type": "bubble",
             "size": "mega",
@@ -79,7 +160,7 @@ class FlexStyles:
                                 "height": "4px",
                                 "backgroundColor": FlexStyles.COLORS['border'],
                                 "cornerRadius": "2px",
-                                "flex": total_rounds - round_num
+                                "flex": remaining
                             }
                         ],
                         "layout": "horizontal",
@@ -110,8 +191,10 @@ class FlexStyles:
         }
     
     @staticmethod
-    def correct_answer(player_name, points, streak=1):
+    def correct_answer_layout(player_name, points, streak=1, show_streak=None):
         """تصميم الإجابة الصحيحة"""
+        if show_streak is None:
+            show_streak = streak > 1
         return {
             "type": "bubble",
             "body": {
@@ -209,7 +292,7 @@ class FlexStyles:
                             }
                         ],
                         "margin": "md"
-                    } if streak > 1 else {
+                    } if show_streak else {
                         "type": "box",
                         "layout": "vertical",
                         "contents": []
@@ -221,7 +304,7 @@ class FlexStyles:
         }
     
     @staticmethod
-    def wrong_answer(correct_ans):
+    def wrong_answer_layout(correct_ans):
         """تصميم الإجابة الخاطئة"""
         return {
             "type": "bubble",
@@ -301,69 +384,62 @@ class FlexStyles:
         }
     
     @staticmethod
-    def game_winner(winner_name, winner_score, players_scores, game_name):
+    def winner_row_layout(rank, name, score, is_winner, margin):
+        """صف لاعب في نتائج نهاية اللعبة"""
+        return {
+            "type": "box",
+            "layout": "horizontal",
+            "contents": [
+                {
+                    "type": "box",
+                    "layout": "vertical",
+                    "contents": [
+                        {
+                            "type": "text",
+                            "text": str(rank),
+                            "size": "md" if is_winner else "sm",
+                            "color": FlexStyles.COLORS['background'] if is_winner else FlexStyles.COLORS['text'],
+                            "align": "center",
+                            "weight": "bold"
+                        }
+                    ],
+                    "backgroundColor": FlexStyles.COLORS['primary'] if is_winner else FlexStyles.COLORS['hover'],
+                    "cornerRadius": "full",
+                    "width": "36px",
+                    "height": "36px",
+                    "justifyContent": "center",
+                    "flex": 0
+                },
+                {
+                    "type": "text",
+                    "text": name,
+                    "size": "md" if is_winner else "sm",
+                    "color": FlexStyles.COLORS['primary'] if is_winner else FlexStyles.COLORS['text'],
+                    "flex": 3,
+                    "margin": "md",
+                    "weight": "bold" if is_winner else "regular",
+                    "wrap": True
+                },
+                {
+                    "type": "text",
+                    "text": f"{score} نقطة",
+                    "size": "md" if is_winner else "sm",
+                    "color": FlexStyles.COLORS['primary'] if is_winner else FlexStyles.COLORS['secondary'],
+                    "flex": 2,
+                    "align": "end",
+                    "weight": "bold" if is_winner else "regular"
+                }
+            ],
+            "spacing": "md",
+            "paddingAll": "12px",
+            "backgroundColor": FlexStyles.COLORS['hover'] if is_winner else FlexStyles.COLORS['background'],
+            "cornerRadius": "md",
+            "margin": margin
+        }
+    
+    @staticmethod
+    def game_winner_layout(winner_name, winner_score, players_list, game_name):
         """تصميم إعلان الفائز - احترافي جداً"""
-        
-        # ترتيب اللاعبين
-        sorted_players = sorted(players_scores.items(), key=lambda x: x[1], reverse=True)
-        
-        # قائمة اللاعبين
-        players_list = []
-        for i, (name, score) in enumerate(sorted_players[:5], 1):
-            is_winner = (i == 1)
-            
-            player_box = {
-                "type": "box",
-                "layout": "horizontal",
-                "contents": [
-                    {
-                        "type": "box",
-                        "layout": "vertical",
-                        "contents": [
-                            {
-                                "type": "text",
-                                "text": str(i),
-                                "size": "md" if is_winner else "sm",
-                                "color": FlexStyles.COLORS['background'] if is_winner else FlexStyles.COLORS['text'],
-                                "align": "center",
-                                "weight": "bold"
-                            }
-                        ],
-                        "backgroundColor": FlexStyles.COLORS['primary'] if is_winner else FlexStyles.COLORS['hover'],
-                        "cornerRadius": "full",
-                        "width": "36px",
-                        "height": "36px",
-                        "justifyContent": "center",
-                        "flex": 0
-                    },
-                    {
-                        "type": "text",
-                        "text": name,
-                        "size": "md" if is_winner else "sm",
-                        "color": FlexStyles.COLORS['primary'] if is_winner else FlexStyles.COLORS['text'],
-                        "flex": 3,
-                        "margin": "md",
-                        "weight": "bold" if is_winner else "regular",
-                        "wrap": True
-                    },
-                    {
-                        "type": "text",
-                        "text": f"{score} نقطة",
-                        "size": "md" if is_winner else "sm",
-                        "color": FlexStyles.COLORS['primary'] if is_winner else FlexStyles.COLORS['secondary'],
-                        "flex": 2,
-                        "align": "end",
-                        "weight": "bold" if is_winner else "regular"
-                    }
-                ],
-                "spacing": "md",
-                "paddingAll": "12px",
-                "backgroundColor": FlexStyles.COLORS['hover'] if is_winner else FlexStyles.COLORS['background'],
-                "cornerRadius": "md",
-                "margin": "sm" if i > 1 else "none"
-            }
-            players_list.append(player_box)
-        
         return {
             "type": "bubble",
             "size": "mega",
@@ -528,7 +604,7 @@ class FlexStyles:
         }
     
     @staticmethod
-    def hint_message(hint_text):
+    def hint_message_layout(hint_text):
         """تصميم رسالة التلميح"""
         return {
             "type": "bubble",
@@ -572,37 +648,36 @@ class FlexStyles:
         }
     
     @staticmethod
-    def game_progress(game_name, scores, current_round, total_rounds):
+    def progress_row_layout(name, score):
+        """صف لاعب في عرض التقدم"""
+        return {
+            "type": "box",
+            "layout": "horizontal",
+            "contents": [
+                {
+                    "type": "text",
+                    "text": name,
+                    "size": "sm",
+                    "color": FlexStyles.COLORS['text'],
+                    "flex": 2,
+                    "wrap": True
+                },
+                {
+                    "type": "text",
+                    "text": str(score),
+                    "size": "sm",
+                    "color": FlexStyles.COLORS['secondary'],
+                    "flex": 1,
+                    "align": "end",
+                    "weight": "bold"
+                }
+            ],
+            "margin": "sm"
+        }
+    
+    @staticmethod
+    def game_progress_layout(game_name, score_items, current_round, total_rounds):
         """تصميم عرض التقدم في اللعبة"""
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        
-        score_items = []
-        for name, score in sorted_scores[:3]:
-            score_items.append({
-                "type": "box",
-                "layout": "horizontal",
-                "contents": [
-                    {
-                        "type": "text",
-                        "text": name,
-                        "size": "sm",
-                        "color": FlexStyles.COLORS['text'],
-                        "flex": 2,
-                        "wrap": True
-                    },
-                    {
-                        "type": "text",
-                        "text": str(score),
-                        "size": "sm",
-                        "color": FlexStyles.COLORS['secondary'],
-                        "flex": 1,
-                        "align": "end",
-                        "weight": "bold"
-                    }
-                ],
-                "margin": "sm"
-            })
-        
         return {
             "type": "bubble",
             "body": {
@@ -639,3 +714,976 @@ class FlexStyles:
                 "paddingAll": "16px"
             }
         }
+    
+    @staticmethod
+    def welcome_layout(display_name):
+        """تصميم رسالة البداية"""
+        return {
+            "type": "bubble",
+            "size": "mega",
+            "header": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "text",
+                        "text": "منصة الألعاب",
+                        "weight": "bold",
+                        "size": "xxl",
+                        "color": "#1a1a1a",
+                        "align": "center"
+                    },
+                    {
+                        "type": "text",
+                        "text": f"مرحباً {display_name}",
+                        "size": "md",
+                        "color": "#6a6a6a",
+                        "align": "center",
+                        "margin": "sm"
+                    }
+                ],
+                "backgroundColor": "#ffffff",
+                "paddingAll": "24px"
+            },
+            "body": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "box",
+                        "layout": "vertical",
+                        "contents": [
+                            {
+                                "type": "text",
+                                "text": "خطوات البدء",
+                                "weight": "bold",
+                                "size": "md",
+                                "color": "#2a2a2a"
+                            },
+                            {
+                                "type": "separator",
+                                "margin": "md",
+                                "color": "#e8e8e8"
+                            }
+                        ],
+                        "spacing": "sm"
+                    },
+                    {
+                        "type": "box",
+                        "layout": "vertical",
+                        "contents": [
+                            {
+                                "type": "box",
+                                "layout": "horizontal",
+                                "contents": [
+                                    {
+                                        "type": "text",
+                                        "text": "1",
+                                        "size": "sm",
+                                        "color": "#ffffff",
+                                        "align": "center",
+                                        "weight": "bold",
+                                        "flex": 0
+                                    },
+                                    {
+                                        "type": "text",
+                                        "text": "اضغط على زر انضم للتسجيل",
+                                        "size": "sm",
+                                        "color": "#4a4a4a",
+                                        "flex": 1,
+                                        "margin": "md",
+                                        "wrap": True
+                                    }
+                                ],
+                                "backgroundColor": "#2a2a2a",
+                                "cornerRadius": "md",
+                                "paddingAll": "12px",
+                                "spacing": "md"
+                            },
+                            {
+                                "type": "box",
+                                "layout": "horizontal",
+                                "contents": [
+                                    {
+                                        "type": "text",
+                                        "text": "2",
+                                        "size": "sm",
+                                        "color": "#2a2a2a",
+                                        "align": "center",
+                                        "weight": "bold",
+                                        "flex": 0
+                                    },
+                                    {
+                                        "type": "text",
+                                        "text": "اختر لعبة من الأزرار أدناه",
+                                        "size": "sm",
+                                        "color": "#4a4a4a",
+                                        "flex": 1,
+                                        "margin": "md",
+                                        "wrap": True
+                                    }
+                                ],
+                                "backgroundColor": "#f5f5f5",
+                                "cornerRadius": "md",
+                                "paddingAll": "12px",
+                                "spacing": "md",
+                                "margin": "sm"
+                            },
+                            {
+                                "type": "box",
+                                "layout": "horizontal",
+                                "contents": [
+                                    {
+                                        "type": "text",
+                                        "text": "3",
+                                        "size": "sm",
+                                        "color": "#2a2a2a",
+                                        "align": "center",
+                                        "weight": "bold",
+                                        "flex": 0
+                                    },
+                                    {
+                                        "type": "text",
+                                        "text": "ابدأ اللعب واجمع النقاط",
+                                        "size": "sm",
+                                        "color": "#4a4a4a",
+                                        "flex": 1,
+                                        "margin": "md",
+                                        "wrap": True
+                                    }
+                                ],
+                                "backgroundColor": "#f5f5f5",
+                                "cornerRadius": "md",
+                                "paddingAll": "12px",
+                                "spacing": "md",
+                                "margin": "sm"
+                            }
+                        ],
+                        "margin": "md"
+                    },
+                    {
+                        "type": "box",
+                        "layout": "vertical",
+                        "contents": [
+                            {
+                                "type": "text",
+                                "text": "15 لعبة متاحة",
+                                "size": "xs",
+                                "color": "#9a9a9a",
+                                "align": "center"
+                            },
+                            {
+                                "type": "text",
+                                "text": "إجاباتك تُحسب تلقائياً بعد التسجيل",
+                                "size": "xs",
+                                "color": "#9a9a9a",
+                                "align": "center",
+                                "margin": "xs"
+                            }
+                        ],
+                        "margin": "lg"
+                    }
+                ],
+                "backgroundColor": "#ffffff",
+                "paddingAll": "20px"
+            },
+            "footer": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "separator",
+                        "color": "#e8e8e8"
+                    },
+                    {
+                        "type": "box",
+                        "layout": "horizontal",
+                        "contents": [
+                            {
+                                "type": "button",
+                                "action": {
+                                    "type": "message",
+                                    "label": "انضم",
+                                    "text": "انضم"
+                                },
+                                "style": "primary",
+                                "color": "#2a2a2a",
+                                "height": "sm"
+                            },
+                            {
+                                "type": "button",
+                                "action": {
+                                    "type": "message",
+                                    "label": "مساعدة",
+                                    "text": "مساعدة"
+                                },
+                                "style": "secondary",
+                                "height": "sm"
+                            }
+                        ],
+                        "spacing": "sm",
+                        "margin": "md"
+                    }
+                ],
+                "backgroundColor": "#f8f8f8",
+                "paddingAll": "16px"
+            }
+        }
+    
+    @staticmethod
+    def more_games_layout():
+        """تصميم قائمة الألعاب الإضافية"""
+        return {
+            "type": "bubble",
+            "body": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "text",
+                        "text": "ألعاب إضافية",
+                        "weight": "bold",
+                        "size": "xl",
+                        "color": "#1a1a1a",
+                        "align": "center"
+                    },
+                    {
+                        "type": "separator",
+                        "margin": "lg",
+                        "color": "#e8e8e8"
+                    },
+                    {
+                        "type": "box",
+                        "layout": "vertical",
+                        "contents": [
+                            {
+                                "type": "text",
+                                "text": "اختر من الأزرار أدناه",
+                                "size": "sm",
+                                "color": "#6a6a6a",
+                                "align": "center"
+                            }
+                        ],
+                        "margin": "lg"
+                    }
+                ],
+                "backgroundColor": "#ffffff",
+                "paddingAll": "24px"
+            }
+        }
+    
+    @staticmethod
+    def help_layout():
+        """رسالة المساعدة - تصميم أنيق"""
+        return {
+            "type": "bubble",
+            "size": "mega",
+            "header": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "text",
+                        "text": "دليل الاستخدام",
+                        "weight": "bold",
+                        "size": "xxl",
+                        "color": "#1a1a1a",
+                        "align": "center"
+                    }
+                ],
+                "backgroundColor": "#ffffff",
+                "paddingAll": "20px"
+            },
+            "body": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "box",
+                        "layout": "vertical",
+                        "contents": [
+                            {
+                                "type": "text",
+                                "text": "الأوامر الأساسية",
+                                "weight": "bold",
+                                "size": "lg",
+                                "color": "#2a2a2a",
+                                "margin": "none"
+                            },
+                            {
+                                "type": "separator",
+                                "margin": "md",
+                                "color": "#e8e8e8"
+                            }
+                        ],
+                        "margin": "none",
+                        "spacing": "sm"
+                    },
+                    {
+                        "type": "box",
+                        "layout": "vertical",
+                        "contents": [
+                            {
+                                "type": "box",
+                                "layout": "horizontal",
+                                "contents": [
+                                    {
+                                        "type": "text",
+                                        "text": "انضم",
+                                        "size": "sm",
+                                        "color": "#1a1a1a",
+                                        "flex": 2,
+                                        "weight": "bold"
+                                    },
+                                    {
+                                        "type": "text",
+                                        "text": "التسجيل في البوت",
+                                        "size": "sm",
+                                        "color": "#6a6a6a",
+                                        "flex": 5,
+                                        "wrap": True
+                                    }
+                                ],
+                                "spacing": "md"
+                            },
+                            {
+                                "type": "box",
+                                "layout": "horizontal",
+                                "contents": [
+                                    {
+                                        "type": "text",
+                                        "text": "انسحب",
+                                        "size": "sm",
+                                        "color": "#1a1a1a",
+                                        "flex": 2,
+                                        "weight": "bold"
+                                    },
+                                    {
+                                        "type": "text",
+                                        "text": "إلغاء التسجيل",
+                                        "size": "sm",
+                                        "color": "#6a6a6a",
+                                        "flex": 5,
+                                        "wrap": True
+                                    }
+                                ],
+                                "spacing": "md"
+                            },
+                            {
+                                "type": "box",
+                                "layout": "horizontal",
+                                "contents": [
+                                    {
+                                        "type": "text",
+                                        "text": "نقاطي",
+                                        "size": "sm",
+                                        "color": "#1a1a1a",
+                                        "flex": 2,
+                                        "weight": "bold"
+                                    },
+                                    {
+                                        "type": "text",
+                                        "text": "عرض إحصائياتك",
+                                        "size": "sm",
+                                        "color": "#6a6a6a",
+                                        "flex": 5,
+                                        "wrap": True
+                                    }
+                                ],
+                                "spacing": "md"
+                            },
+                            {
+                                "type": "box",
+                                "layout": "horizontal",
+                                "contents": [
+                                    {
+                                        "type": "text",
+                                        "text": "الصدارة",
+                                        "size": "sm",
+                                        "color": "#1a1a1a",
+                                        "flex": 2,
+                                        "weight": "bold"
+                                    },
+                                    {
+                                        "type": "text",
+                                        "text": "أفضل اللاعبين",
+                                        "size": "sm",
+                                        "color": "#6a6a6a",
+                                        "flex": 5,
+                                        "wrap": True
+                                    }
+                                ],
+                                "spacing": "md"
+                            },
+                            {
+                                "type": "box",
+                                "layout": "horizontal",
+                                "contents": [
+                                    {
+                                        "type": "text",
+                                        "text": "المراكز",
+                                        "size": "sm",
+                                        "color": "#1a1a1a",
+                                        "flex": 2,
+                                        "weight": "bold"
+                                    },
+                                    {
+                                        "type": "text",
+                                        "text": "ترتيب اللعبة الحالية",
+                                        "size": "sm",
+                                        "color": "#6a6a6a",
+                                        "flex": 5,
+                                        "wrap": True
+                                    }
+                                ],
+                                "spacing": "md"
+                            },
+                            {
+                                "type": "box",
+                                "layout": "horizontal",
+                                "contents": [
+                                    {
+                                        "type": "text",
+                                        "text": "إيقاف",
+                                        "size": "sm",
+                                        "color": "#1a1a1a",
+                                        "flex": 2,
+                                        "weight": "bold"
+                                    },
+                                    {
+                                        "type": "text",
+                                        "text": "إنهاء اللعبة الحالية",
+                                        "size": "sm",
+                                        "color": "#6a6a6a",
+                                        "flex": 5,
+                                        "wrap": True
+                                    }
+                                ],
+                                "spacing": "md"
+                            }
+                        ],
+                        "spacing": "md",
+                        "margin": "md"
+                    },
+                    {
+                        "type": "box",
+                        "layout": "vertical",
+                        "contents": [
+                            {
+                                "type": "text",
+                                "text": "أثناء اللعب",
+                                "weight": "bold",
+                                "size": "lg",
+                                "color": "#2a2a2a",
+                                "margin": "none"
+                            },
+                            {
+                                "type": "separator",
+                                "margin": "md",
+                                "color": "#e8e8e8"
+                            }
+                        ],
+                        "margin": "xl",
+                        "spacing": "sm"
+                    },
+                    {
+                        "type": "box",
+                        "layout": "vertical",
+                        "contents": [
+                            {
+                                "type": "box",
+                                "layout": "horizontal",
+                                "contents": [
+                                    {
+                                        "type": "text",
+                                        "text": "لمح",
+                                        "size": "sm",
+                                        "color": "#1a1a1a",
+                                        "flex": 2,
+                                        "weight": "bold"
+                                    },
+                                    {
+                                        "type": "text",
+                                        "text": "الحصول على تلميح",
+                                        "size": "sm",
+                                        "color": "#6a6a6a",
+                                        "flex": 5,
+                                        "wrap": True
+                                    }
+                                ],
+                                "spacing": "md"
+                            },
+                            {
+                                "type": "box",
+                                "layout": "horizontal",
+                                "contents": [
+                                    {
+                                        "type": "text",
+                                        "text": "جاوب",
+                                        "size": "sm",
+                                        "color": "#1a1a1a",
+                                        "flex": 2,
+                                        "weight": "bold"
+                                    },
+                                    {
+                                        "type": "text",
+                                        "text": "عرض الإجابة الصحيحة",
+                                        "size": "sm",
+                                        "color": "#6a6a6a",
+                                        "flex": 5,
+                                        "wrap": True
+                                    }
+                                ],
+                                "spacing": "md"
+                            }
+                        ],
+                        "spacing": "md",
+                        "margin": "md"
+                    }
+                ],
+                "spacing": "md",
+                "backgroundColor": "#ffffff",
+                "paddingAll": "20px"
+            },
+            "footer": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "separator",
+                        "color": "#e8e8e8"
+                    },
+                    {
+                        "type": "box",
+                        "layout": "horizontal",
+                        "contents": [
+                            {
+                                "type": "button",
+                                "action": {
+                                    "type": "message",
+                                    "label": "انضم",
+                                    "text": "انضم"
+                                },
+                                "style": "primary",
+                                "color": "#2a2a2a",
+                                "height": "sm"
+                            },
+                            {
+                                "type": "button",
+                                "action": {
+                                    "type": "message",
+                                    "label": "نقاطي",
+                                    "text": "نقاطي"
+                                },
+                                "style": "secondary",
+                                "height": "sm"
+                            },
+                            {
+                                "type": "button",
+                                "action": {
+                                    "type": "message",
+                                    "label": "الصدارة",
+                                    "text": "الصدارة"
+                                },
+                                "style": "secondary",
+                                "height": "sm"
+                            }
+                        ],
+                        "spacing": "sm",
+                        "margin": "md"
+                    },
+                    {
+                        "type": "text",
+                        "text": "تم إنشاء هذا البوت بواسطة عبير الدوسري",
+                        "size": "xs",
+                        "color": "#9a9a9a",
+                        "align": "center",
+                        "wrap": True,
+                        "margin": "md"
+                    }
+                ],
+                "backgroundColor": "#f8f8f8",
+                "paddingAll": "16px"
+            }
+        }
+    
+    @staticmethod
+    def user_stats_layout(display_name, status, status_color, total_points, games_played, wins, win_rate):
+        """تصميم إحصائيات اللاعب (win_rate نص منسق مثل 12.5%)"""
+        return {
+            "type": "bubble",
+            "size": "mega",
+            "header": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "text",
+                        "text": "إحصائياتك",
+                        "weight": "bold",
+                        "size": "xl",
+                        "color": "#1a1a1a",
+                        "align": "center"
+                    },
+                    {
+                        "type": "text",
+                        "text": display_name,
+                        "size": "sm",
+                        "color": "#6a6a6a",
+                        "align": "center",
+                        "margin": "sm"
+                    }
+                ],
+                "backgroundColor": "#ffffff",
+                "paddingAll": "20px"
+            },
+            "body": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "box",
+                        "layout": "horizontal",
+                        "contents": [
+                            {
+                                "type": "text",
+                                "text": "الحالة",
+                                "size": "sm",
+                                "color": "#6a6a6a",
+                                "flex": 2
+                            },
+                            {
+                                "type": "text",
+                                "text": status,
+                                "size": "sm",
+                                "color": status_color,
+                                "flex": 3,
+                                "align": "end",
+                                "weight": "bold"
+                            }
+                        ]
+                    },
+                    {
+                        "type": "separator",
+                        "margin": "md",
+                        "color": "#e8e8e8"
+                    },
+                    {
+                        "type": "box",
+                        "layout": "horizontal",
+                        "contents": [
+                            {
+                                "type": "text",
+                                "text": "النقاط",
+                                "size": "sm",
+                                "color": "#6a6a6a",
+                                "flex": 2
+                            },
+                            {
+                                "type": "text",
+                                "text": str(total_points),
+                                "size": "xl",
+                                "color": "#1a1a1a",
+                                "flex": 3,
+                                "align": "end",
+                                "weight": "bold"
+                            }
+                        ],
+                        "margin": "md"
+                    },
+                    {
+                        "type": "separator",
+                        "margin": "md",
+                        "color": "#e8e8e8"
+                    },
+                    {
+                        "type": "box",
+                        "layout": "horizontal",
+                        "contents": [
+                            {
+                                "type": "text",
+                                "text": "الألعاب",
+                                "size": "sm",
+                                "color": "#6a6a6a",
+                                "flex": 2
+                            },
+                            {
+                                "type": "text",
+                                "text": str(games_played),
+                                "size": "sm",
+                                "color": "#2a2a2a",
+                                "flex": 3,
+                                "align": "end",
+                                "weight": "bold"
+                            }
+                        ],
+                        "margin": "md"
+                    },
+                    {
+                        "type": "box",
+                        "layout": "horizontal",
+                        "contents": [
+                            {
+                                "type": "text",
+                                "text": "الفوز",
+                                "size": "sm",
+                                "color": "#6a6a6a",
+                                "flex": 2
+                            },
+                            {
+                                "type": "text",
+                                "text": str(wins),
+                                "size": "sm",
+                                "color": "#2a2a2a",
+                                "flex": 3,
+                                "align": "end",
+                                "weight": "bold"
+                            }
+                        ],
+                        "margin": "sm"
+                    },
+                    {
+                        "type": "box",
+                        "layout": "horizontal",
+                        "contents": [
+                            {
+                                "type": "text",
+                                "text": "نسبة الفوز",
+                                "size": "sm",
+                                "color": "#6a6a6a",
+                                "flex": 2
+                            },
+                            {
+                                "type": "text",
+                                "text": win_rate,
+                                "size": "sm",
+                                "color": "#2a2a2a",
+                                "flex": 3,
+                                "align": "end",
+                                "weight": "bold"
+                            }
+                        ],
+                        "margin": "sm"
+                    }
+                ],
+                "backgroundColor": "#ffffff",
+                "paddingAll": "20px"
+            },
+            "footer": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "separator",
+                        "color": "#e8e8e8"
+                    },
+                    {
+                        "type": "button",
+                        "action": {
+                            "type": "message",
+                            "label": "الصدارة",
+                            "text": "الصدارة"
+                        },
+                        "style": "secondary",
+                        "height": "sm",
+                        "margin": "md"
+                    }
+                ],
+                "backgroundColor": "#f8f8f8",
+                "paddingAll": "16px"
+            }
+        }
+    
+    @staticmethod
+    def join_success_layout(display_name):
+        """تصميم رسالة التسجيل"""
+        return {
+            "type": "bubble",
+            "body": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "text",
+                        "text": "تم التسجيل بنجاح",
+                        "weight": "bold",
+                        "size": "xl",
+                        "color": "#1a1a1a",
+                        "align": "center"
+                    },
+                    {
+                        "type": "text",
+                        "text": f"مرحباً بك {display_name}",
+                        "size": "md",
+                        "color": "#6a6a6a",
+                        "align": "center",
+                        "margin": "md"
+                    },
+                    {
+                        "type": "separator",
+                        "margin": "xl",
+                        "color": "#e8e8e8"
+                    },
+                    {
+                        "type": "text",
+                        "text": "يمكنك الآن اللعب في جميع الألعاب\n\nإجاباتك ستُحسب تلقائياً",
+                        "size": "sm",
+                        "color": "#4a4a4a",
+                        "align": "center",
+                        "wrap": True,
+                        "margin": "xl"
+                    }
+                ],
+                "backgroundColor": "#ffffff",
+                "paddingAll": "28px"
+            }
+        }
+    
+    @staticmethod
+    def leaderboard_row_layout(rank, name, points, top, margin):
+        """صف لاعب في لوحة الصدارة (top لأول ثلاثة)"""
+        rank_bg = "#4a4a4a" if top else "#f5f5f5"
+        rank_color = "#ffffff" if top else "#2a2a2a"
+        name_color = "#ffffff" if top else "#4a4a4a"
+        
+        return {
+            "type": "box",
+            "layout": "horizontal",
+            "contents": [
+                {
+                    "type": "text",
+                    "text": str(rank),
+                    "size": "sm",
+                    "color": rank_color,
+                    "align": "center",
+                    "weight": "bold",
+                    "flex": 0
+                },
+                {
+                    "type": "text",
+                    "text": name,
+                    "size": "sm",
+                    "color": name_color,
+                    "flex": 3,
+                    "margin": "md",
+                    "weight": "bold" if top else "regular"
+                },
+                {
+                    "type": "text",
+                    "text": str(points),
+                    "size": "sm",
+                    "color": name_color,
+                    "flex": 1,
+                    "align": "end",
+                    "weight": "bold" if top else "regular"
+                }
+            ],
+            "backgroundColor": rank_bg,
+            "cornerRadius": "md",
+            "paddingAll": "12px",
+            "spacing": "md",
+            "margin": margin
+        }
+    
+    @staticmethod
+    def leaderboard_layout(players_list):
+        """تصميم لوحة الصدارة"""
+        return {
+            "type": "bubble",
+            "size": "mega",
+            "header": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "text",
+                        "text": "لوحة الصدارة",
+                        "weight": "bold",
+                        "size": "xl",
+                        "color": "#1a1a1a",
+                        "align": "center"
+                    },
+                    {
+                        "type": "text",
+                        "text": "أفضل اللاعبين",
+                        "size": "sm",
+                        "color": "#6a6a6a",
+                        "align": "center",
+                        "margin": "sm"
+                    }
+                ],
+                "backgroundColor": "#ffffff",
+                "paddingAll": "20px"
+            },
+            "body": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": players_list,
+                "backgroundColor": "#ffffff",
+                "paddingAll": "20px"
+            },
+            "footer": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "separator",
+                        "color": "#e8e8e8"
+                    },
+                    {
+                        "type": "button",
+                        "action": {
+                            "type": "message",
+                            "label": "نقاطي",
+                            "text": "نقاطي"
+                        },
+                        "style": "secondary",
+                        "height": "sm",
+                        "margin": "md"
+                    }
+                ],
+                "backgroundColor": "#f8f8f8",
+                "paddingAll": "16px"
+            }
+        }
+
+
+# ترجمة التصاميم مرة واحدة: الفراغات تأخذ مكان القيم المتغيرة فقط
+_GAME_START = FlexTemplate(
+    FlexStyles.game_start_layout(slot('game_name'), slot('question'), slot('round_num'),
+                                 slot('total_rounds'), slot('remaining')),
+    round_num=int, total_rounds=int, remaining=int)
+_CORRECT_ANSWER = FlexTemplate(
+    FlexStyles.correct_answer_layout(slot('player_name'), slot('points'), show_streak=False))
+_CORRECT_ANSWER_STREAK = FlexTemplate(
+    FlexStyles.correct_answer_layout(slot('player_name'), slot('points'), slot('streak'), show_streak=True))
+_WRONG_ANSWER = FlexTemplate(FlexStyles.wrong_answer_layout(slot('correct_ans')))
+_WINNER_ROW_FIRST = FlexTemplate(
+    FlexStyles.winner_row_layout(slot('rank'), slot('name'), slot('score'), True, "none"))
+_WINNER_ROW = FlexTemplate(
+    FlexStyles.winner_row_layout(slot('rank'), slot('name'), slot('score'), False, "sm"))
+_GAME_WINNER = FlexTemplate(
+    FlexStyles.game_winner_layout(slot('winner_name'), slot('winner_score'), slot('players_list'),
+                                  slot('game_name')),
+    players_list=RAW)
+_HINT = FlexTemplate(FlexStyles.hint_message_layout(slot('hint_text')))
+_PROGRESS_ROW = FlexTemplate(FlexStyles.progress_row_layout(slot('name'), slot('score')))
+_GAME_PROGRESS = FlexTemplate(
+    FlexStyles.game_progress_layout(slot('game_name'), slot('score_items'), slot('current_round'),
+                                    slot('total_rounds')),
+    score_items=RAW)
+_WELCOME = FlexTemplate(FlexStyles.welcome_layout(slot('display_name')))
+_MORE_GAMES = FlexTemplate(FlexStyles.more_games_layout())
+_HELP = FlexTemplate(FlexStyles.help_layout())
+_USER_STATS = FlexTemplate(
+    FlexStyles.user_stats_layout(slot('display_name'), slot('status'), slot('status_color'),
+                                 slot('total_points'), slot('games_played'), slot('wins'),
+                                 slot('win_rate')))
+_JOIN_SUCCESS = FlexTemplate(FlexStyles.join_success_layout(slot('display_name')))
+_LEADER_ROW_FIRST = FlexTemplate(
+    FlexStyles.leaderboard_row_layout(slot('rank'), slot('name'), slot('points'), True, "none"))
+_LEADER_ROW_TOP = FlexTemplate(
+    FlexStyles.leaderboard_row_layout(slot('rank'), slot('name'), slot('points'), True, "xs"))
+_LEADER_ROW = FlexTemplate(
+    FlexStyles.leaderboard_row_layout(slot('rank'), slot('name'), slot('points'), False, "xs"))
+_LEADERBOARD = FlexTemplate(FlexStyles.leaderboard_layout(slot('players_list')), players_list=RAW)
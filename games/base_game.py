@@ -1,40 +1,100 @@
 """
 القاعدة الأساسية لجميع الألعاب
 """
+import random
+import secrets
+import sys
+import time
+
 from linebot.models import TextSendMessage
-import re
-from collections import defaultdict
+
+from utils.arabic import normalize
+from .state import Scoreboard, register_class
 
 
 class BaseGame:
-    """الفئة الأساسية لجميع الألعاب"""
+    """الفئة الأساسية لجميع الألعاب
+
+    كل لعبة تعلن حقولها في __slots__ (بدون __dict__)، و snapshot()/restore()
+    تقرأ وتكتب هذه الحقول فقط. الحقول في _TRANSIENT لا تُحفظ (مراجع خدمات)
+
+    العشوائية من round_rng() فقط (مولد خاص باللعبة مشتق من seed)، والوقت من
+    clock() - فنفس seed ونفس الرسائل بنفس الأوقات تعيد نفس اللعبة (games.replay)
+    """
+
+    __slots__ = ('line_bot_api', 'questions_count', 'current_question', 'scores',
+                 'answered_users', 'current_answer', 'current_entry', 'game_active',
+                 'seed', 'clock', '_rng_round', '_rng_draws')
+
+    _TRANSIENT = ('line_bot_api', 'clock')
+    
+    # staticmethod: أحدث اسم عرض معروف لـ user_id أو None (profile_cache.peek) - يضبطه التطبيق
+    name_lookup = None
     
-    def __init__(self, line_bot_api, questions_count=10):
+    def __init__(self, line_bot_api, questions_count=10, seed=None, clock=None):
         self.line_bot_api = line_bot_api
+        self.seed = secrets.randbits(64) if seed is None else seed
+        self.clock = clock or time.time
+        self._rng_round = None
+        self._rng_draws = 0
         self.questions_count = questions_count
         self.current_question = 0
-        self.scores = defaultdict(int)
+        self.scores = Scoreboard()
         self.answered_users = set()
         self.current_answer = None
+        self.current_entry = None  # سؤال البنك الحالي (question_bank.Question)
         self.game_active = True
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if '__slots__' not in cls.__dict__:
+            raise TypeError(f"{cls.__name__} يجب أن تعلن حقولها في __slots__")
+        register_class(cls)
+        cls._fields = tuple(name for klass in reversed(cls.__mro__)
+                            for name in klass.__dict__.get('__slots__', ())
+                            if name not in cls._TRANSIENT)
+    
+    def snapshot(self):
+        """حالة اللعبة {حقل: قيمة} بدون مراجع الخدمات - تُرمّز بـ games.state.dump_game"""
+        return {name: getattr(self, name, None) for name in self._fields}
+    
+    def restore(self, fields, line_bot_api=None, clock=None):
+        """استعادة الحالة من snapshot() وإعادة ربط واجهة LINE والساعة (الحقول المؤقتة None)"""
+        for name in self._TRANSIENT:
+            setattr(self, name, None)
+        self.line_bot_api = line_bot_api
+        self.clock = clock or time.time
+        for name in self._fields:
+            setattr(self, name, fields.get(name))
+        return self
+    
+    def round_rng(self):
+        """مولد random.Random جديد لكل استدعاء، مبذور من (seed، رقم السؤال، رقم الاستدعاء)
+
+        رقم الاستدعاء داخل السؤال يُحفظ في اللقطة، فاللعبة المستعادة في منتصف
+        السؤال تكمل بسحبات جديدة بدلاً من إعادة ما سُحب قبل الحفظ، ولا تتشارك
+        الألعاب حالة random العامة
+        """
+        if self._rng_round != self.current_question:
+            self._rng_round = self.current_question
+            self._rng_draws = 0
+        self._rng_draws += 1
+        return random.Random(f"{self.seed}:{self.current_question}:{self._rng_draws}")
+    
+    def __getstate__(self):
+        """pickle عبر نفس اللقطة"""
+        return self.snapshot()
+    
+    def __setstate__(self, fields):
+        self.restore(fields)
         
     def normalize_text(self, text):
-        """تطبيع النص للمقارنة"""
-        if not text:
-            return ""
-        
-        text = text.strip().lower()
-        # إزالة ال التعريف
-        text = re.sub(r'^ال', '', text)
-        # توحيد الهمزات
-        text = text.replace('أ', 'ا').replace('إ', 'ا').replace('آ', 'ا')
-        text = text.replace('ة', 'ه')
-        text = text.replace('ى', 'ي')
-        # إزالة التشكيل
-        text = re.sub(r'[\u064B-\u065F]', '', text)
-        # إزالة المسافات الزائدة
-        text = ' '.join(text.split())
-        return text
+        """تطبيع النص للمقارنة (utils.arabic)"""
+        return normalize(text)
+    
+    def is_accepted(self, user_answer):
+        """تطبيع واحد لإجابة اللاعب ثم بحث في الإجابات المقبولة للسؤال الحالي"""
+        return self.normalize_text(user_answer) in self.current_entry.accepted
     
     def check_answer(self, user_answer, user_id, display_name):
         """فحص الإجابة - يجب تنفيذها في الفئات الفرعية"""
@@ -69,33 +129,38 @@ class BaseGame:
                 'response': TextSendMessage(text="🎮 انتهت اللعبة!\n\n❌ لم يشارك أحد في اللعبة")
             }
         
-        # ترتيب اللاعبين حسب النقاط
-        sorted_scores = sorted(self.scores.items(), key=lambda x: x[1], reverse=True)
+        # أعلى 5 مرتبون مسبقاً في Scoreboard - بدون فرز كل اللاعبين
+        top = self.scores.top(5, self.name_lookup)
         
         # بناء رسالة النتائج
         message = "🏆 نتائج اللعبة\n" + "="*25 + "\n\n"
         
-        for i, (user_name, score) in enumerate(sorted_scores[:5], 1):
+        for i, (_user_id, user_name, score) in enumerate(top, 1):
             emoji = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
             message += f"{emoji} {user_name}: {score} نقطة\n"
         
         # إضافة الفائز
-        winner_name, winner_score = sorted_scores[0]
+        winner_id, winner_name, winner_score = top[0]
         message += f"\n🎉 الفائز: {winner_name}"
         
         return {
             'game_over': True,
             'winner': winner_name,
+            'winner_id': winner_id,
             'winner_score': winner_score,
             'message': message,
             'response': TextSendMessage(text=message),
             'won': True
         }
     
+    def standings(self, k=3):
+        """الترتيب الحالي [(الاسم، النقاط)] لأعلى k - من Scoreboard بدون فرز"""
+        return [(name, score) for _user_id, name, score in self.scores.top(k, self.name_lookup)]
+    
     def add_score(self, user_id, display_name, points=10):
         """إضافة نقاط للاعب"""
-        self.scores[display_name] += points
-        self.answered_users.add(user_id)
+        self.scores.add(user_id, points, display_name)
+        self.answered_users.add(sys.intern(user_id))
         return points
     
     def get_hint(self):
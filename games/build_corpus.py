@@ -0,0 +1,54 @@
+"""
+أداة بناء ملفات مخزون الأسئلة من بنوك الألعاب المدمجة
+
+    python -m games.build_corpus build [--out data/corpus] [--extra riddles=more.json ...]
+    python -m games.build_corpus list
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import games  # noqa: F401 - استيراد الألعاب يسجل بنوكها
+from games import corpus
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m games.build_corpus",
+                                     description="بناء ملفات مخزون الأسئلة من بنوك الألعاب")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_cmd = commands.add_parser('build', help="كتابة ملف .qbc لكل بنك")
+    build_cmd.add_argument('--out', default=None, help="المجلد (افتراضياً Config.CORPUS_DIR)")
+    build_cmd.add_argument('--extra', action='append', default=[], metavar='NAME=FILE.json',
+                           help="سجلات إضافية (قائمة JSON) تُلحق ببنك")
+    commands.add_parser('list', help="عرض البنوك المسجلة")
+    args = parser.parse_args(argv)
+
+    if corpus.file_banks():
+        # البنوك المفتوحة من ملفات لا تحمل سجلاتها الحرفية: إعادة التشغيل بمجلد
+        # مخزون غير موجود فتُسجل كل البنوك من القيم الحرفية
+        argv = list(sys.argv[1:] if argv is None else argv)
+        if args.command == 'build' and args.out is None:
+            argv += ['--out', os.path.dirname(corpus.corpus_path('_'))]
+        env = dict(os.environ, CORPUS_DIR=os.path.join(os.devnull, 'corpus'))
+        return subprocess.call([sys.executable, '-m', 'games.build_corpus'] + argv, env=env)
+
+    if args.command == 'list':
+        for name, (records, key) in sorted(corpus.sources().items()):
+            print(f"{name:<16} {len(records):>6} سجل{' (بمفاتيح)' if key else ''}")
+        return 0
+
+    extra = {}
+    for item in args.extra:
+        name, _, path = item.partition('=')
+        with open(path, 'r', encoding='utf-8') as f:
+            extra[name] = json.load(f)
+    directory = args.out or os.path.dirname(corpus.corpus_path('_'))
+    for name, (count, size) in corpus.build(directory, extra).items():
+        print(f"{name:<16} {count:>6} سجل {size:>9} بايت")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
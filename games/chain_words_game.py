@@ -3,21 +3,24 @@
 """
 from linebot.models import TextSendMessage
 from .base_game import BaseGame
-import random
+from .registry import register_game
 
+# قائمة كلمات للبداية
+STARTING_WORDS = (
+    "سيارة", "تفاح", "قلم", "نجم", "كتاب", "باب", "رمل", 
+    "لعبة", "حديقة", "ورد", "دفتر", "معلم", "منزل", "شمس",
+    "سفر", "رياضة", "علم", "مدرسة", "طائرة", "عصير"
+)
 
+
+@register_game('سلسلة')
 class ChainWordsGame(BaseGame):
     """لعبة سلسلة الكلمات"""
+
+    __slots__ = ('last_word', 'used_words')
     
-    def __init__(self, line_bot_api):
-        super().__init__(line_bot_api, questions_count=10)
-        
-        # قائمة كلمات للبداية
-        self.starting_words = [
-            "سيارة", "تفاح", "قلم", "نجم", "كتاب", "باب", "رمل", 
-            "لعبة", "حديقة", "ورد", "دفتر", "معلم", "منزل", "شمس",
-            "سفر", "رياضة", "علم", "مدرسة", "طائرة", "عصير"
-        ]
+    def __init__(self, line_bot_api, seed=None, clock=None):
+        super().__init__(line_bot_api, questions_count=10, seed=seed, clock=clock)
         
         # الكلمة الحالية
         self.last_word = None
@@ -26,7 +29,7 @@ class ChainWordsGame(BaseGame):
     def start_game(self):
         """بدء اللعبة"""
         self.current_question = 0
-        self.last_word = random.choice(self.starting_words)
+        self.last_word = self.round_rng().choice(STARTING_WORDS)
         self.used_words.add(self.normalize_text(self.last_word))
         return self.get_question()
     
@@ -3,14 +3,17 @@
 """
 from linebot.models import TextSendMessage
 from .base_game import BaseGame
-import random
+from .registry import register_game
 
 
+@register_game('توافق')
 class CompatibilityGame(BaseGame):
     """لعبة حساب التوافق بين اسمين"""
+
+    __slots__ = ()
     
-    def __init__(self, line_bot_api):
-        super().__init__(line_bot_api, questions_count=1)
+    def __init__(self, line_bot_api, seed=None, clock=None):
+        super().__init__(line_bot_api, questions_count=1, seed=seed, clock=clock)
         self.game_active = True
     
     def calculate_compatibility(self, name1, name2):
@@ -0,0 +1,197 @@
+"""
+ملفات مخزون الأسئلة (صيغة ثنائية بإصدار) مع قراءة كسولة عبر mmap
+كل نوع أسئلة في ملف واحد مع فهرس مواقع، فيُقرأ السؤال حسب رقمه فقط عند الحاجة
+بدلاً من تحميل كل البنك في الذاكرة عند الاستيراد
+
+الصيغة (little-endian):
+    رأس: magic 'QBNK' | version u16 | flags u16 | count u32 | keys_offset u32
+    مواقع: (count + 1) × u32 نسبة إلى بداية البيانات
+    بيانات: كل سجل JSON مضغوط بترميز UTF-8
+    مفاتيح (اختياري عند keys_offset): قائمة JSON بمفتاح لكل سجل
+
+البناء من القيم الحرفية في الألعاب: python -m games.build_corpus
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'QBNK'
+VERSION = 1
+HEADER = struct.Struct('<4sHHII')
+OFFSET = struct.Struct('<I')
+SUFFIX = '.qbc'
+
+# name -> (السجلات الحرفية، دالة المفتاح) - مصدر أداة البناء، للبنوك المدمجة فقط
+_sources = {}
+# بنوك فُتحت من ملفات - سجلاتها الحرفية لا تبقى في الذاكرة
+_file_banks = set()
+
+
+def write_corpus(path, records, keys=None):
+    """كتابة السجلات في ملف مخزون (ملف مؤقت ثم استبدال ذري) - يعيد حجم الملف"""
+    payloads = [json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                for record in records]
+    offsets = [0]
+    for payload in payloads:
+        offsets.append(offsets[-1] + len(payload))
+    data_start = HEADER.size + OFFSET.size * len(offsets)
+    keys_blob = b''
+    keys_offset = 0
+    if keys is not None:
+        keys_blob = json.dumps(list(keys), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        keys_offset = data_start + offsets[-1]
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(payloads), keys_offset))
+        f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+        for payload in payloads:
+            f.write(payload)
+        f.write(keys_blob)
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+class Corpus(Sequence):
+    """بنك أسئلة مقروء من ملف عبر mmap
+
+    corpus[i] يقرأ السجل i فقط ويجهزه بـ compile_item، مع ذاكرة LRU صغيرة
+    للأسئلة المجهزة. find(key) يبحث بالمفتاح إذا كان الملف يحوي مفاتيح.
+    """
+
+    def __init__(self, path, compile_item, cache_size=256):
+        self.path = path
+        self._compile = compile_item
+        self.cache_size = cache_size
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, _flags, count, keys_offset = HEADER.unpack_from(self._mm, 0)
+        except struct.error:
+            self._mm.close()
+            raise ValueError(f"ملف مخزون تالف: {path}")
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"صيغة مخزون غير مدعومة في {path}: {magic!r} v{version}")
+        self._count = count
+        self._keys_offset = keys_offset
+        self._data_start = HEADER.size + OFFSET.size * (count + 1)
+        self._cache = OrderedDict()
+        self._index = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def record(self, i):
+        """السجل الخام رقم i (قاموس JSON)"""
+        start, end = struct.unpack_from('<II', self._mm, HEADER.size + OFFSET.size * i)
+        return json.loads(self._mm[self._data_start + start:self._data_start + end])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        with self._lock:
+            entry = self._cache.get(i)
+            if entry is not None:
+                self._cache.move_to_end(i)
+                return entry
+        entry = self._compile(self.record(i))
+        with self._lock:
+            self._cache[i] = entry
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return entry
+
+    def find(self, key):
+        """السؤال صاحب المفتاح أو None"""
+        if self._index is None:
+            keys = []
+            if self._keys_offset:
+                keys = json.loads(self._mm[self._keys_offset:])
+            self._index = {k: i for i, k in enumerate(keys)}
+        i = self._index.get(key)
+        return None if i is None else self[i]
+
+    def close(self):
+        self._mm.close()
+
+
+class MemoryBank(tuple):
+    """البنك من القيم الحرفية في الكود (عند عدم وجود ملف مخزون) - نفس واجهة Corpus"""
+
+    def __new__(cls, entries, keys=None):
+        bank = super().__new__(cls, entries)
+        bank._index = None if keys is None else {k: i for i, k in enumerate(keys)}
+        return bank
+
+    def find(self, key):
+        i = (self._index or {}).get(key)
+        return None if i is None else self[i]
+
+
+def corpus_path(name, directory=None):
+    if directory is None:
+        from config import Config
+        directory = Config.CORPUS_DIR
+    return os.path.join(directory, f"{name}{SUFFIX}")
+
+
+def load_bank(name, records, compile_item, key=None, directory=None):
+    """ملف المخزون name إن وجد (قراءة كسولة)، وإلا البنك من السجلات الحرفية
+
+    records تبقى مصدر أداة البناء عند استخدام البنك المدمج فقط، و key(record)
+    مفتاح اختياري للبحث بـ find()
+    """
+    path = corpus_path(name, directory)
+    if os.path.exists(path):
+        try:
+            bank = Corpus(path, compile_item)
+            _sources.pop(name, None)
+            _file_banks.add(name)
+            return bank
+        except (OSError, ValueError) as e:
+            logger.error(f"تعذر فتح مخزون {name}، استخدام البنك المدمج: {e}")
+    _sources[name] = (records, key)
+    _file_banks.discard(name)
+    keys = None if key is None else [key(record) for record in records]
+    return MemoryBank(map(compile_item, records), keys)
+
+
+def sources():
+    """البنوك المدمجة المسجلة: name -> (السجلات، دالة المفتاح)"""
+    return dict(_sources)
+
+
+def file_banks():
+    """أسماء البنوك المفتوحة من ملفات (بدون سجلاتها الحرفية)"""
+    return set(_file_banks)
+
+
+def build(directory, extra=None):
+    """كتابة ملف لكل بنك مسجل، مع إضافة سجلات extra {name: [سجلات]} - يعيد {name: (عدد، حجم)}"""
+    extra = extra or {}
+    unknown = set(extra) - set(_sources)
+    if unknown:
+        raise ValueError(f"بنوك غير معروفة: {', '.join(sorted(unknown))}")
+    built = {}
+    for name, (records, key) in sorted(_sources.items()):
+        records = list(records) + list(extra.get(name, ()))
+        keys = None if key is None else [key(record) for record in records]
+        size = write_corpus(corpus_path(name, directory), records, keys)
+        built[name] = (len(records), size)
+    return built
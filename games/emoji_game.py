@@ -3,45 +3,52 @@
 """
 from linebot.models import TextSendMessage
 from .base_game import BaseGame
-import random
+from .registry import register_game
+from .corpus import load_bank
+from .question_bank import question_compiler, shuffled_order
 
+# قائمة الإيموجي مع معانيها
+_EMOJIS = [
+    {"emoji": "🚗", "answer": "سيارة"},
+    {"emoji": "✈️", "answer": "طائرة"},
+    {"emoji": "🏠", "answer": "بيت"},
+    {"emoji": "📱", "answer": "هاتف"},
+    {"emoji": "💻", "answer": "حاسوب"},
+    {"emoji": "📚", "answer": "كتاب"},
+    {"emoji": "⚽", "answer": "كرة"},
+    {"emoji": "🍎", "answer": "تفاحة"},
+    {"emoji": "🌙", "answer": "قمر"},
+    {"emoji": "☀️", "answer": "شمس"},
+    {"emoji": "⭐", "answer": "نجم"},
+    {"emoji": "🌸", "answer": "زهرة"},
+    {"emoji": "🌳", "answer": "شجرة"},
+    {"emoji": "🐱", "answer": "قطة"},
+    {"emoji": "🐶", "answer": "كلب"},
+    {"emoji": "🦁", "answer": "أسد"},
+    {"emoji": "🐘", "answer": "فيل"},
+    {"emoji": "🦅", "answer": "نسر"},
+    {"emoji": "🐠", "answer": "سمكة"},
+    {"emoji": "🎂", "answer": "كعكة"},
+    {"emoji": "🍕", "answer": "بيتزا"},
+    {"emoji": "☕", "answer": "قهوة"},
+    {"emoji": "🎵", "answer": "موسيقى"},
+    {"emoji": "⚽", "answer": "كرة قدم"},
+    {"emoji": "🏆", "answer": "كأس"}
+]
 
+EMOJIS = load_bank('emojis', _EMOJIS, question_compiler('emoji', 'answer', words=True))
+
+
+@register_game('إيموجي')
 class EmojiGame(BaseGame):
     """لعبة تخمين معنى الإيموجي"""
+
+    __slots__ = ('order',)
     
-    def __init__(self, line_bot_api):
-        super().__init__(line_bot_api, questions_count=10)
+    def __init__(self, line_bot_api, seed=None, clock=None):
+        super().__init__(line_bot_api, questions_count=10, seed=seed, clock=clock)
         
-        # قائمة الإيموجي مع معانيها
-        self.emojis = [
-            {"emoji": "🚗", "answer": "سيارة"},
-            {"emoji": "✈️", "answer": "طائرة"},
-            {"emoji": "🏠", "answer": "بيت"},
-            {"emoji": "📱", "answer": "هاتف"},
-            {"emoji": "💻", "answer": "حاسوب"},
-            {"emoji": "📚", "answer": "كتاب"},
-            {"emoji": "⚽", "answer": "كرة"},
-            {"emoji": "🍎", "answer": "تفاحة"},
-            {"emoji": "🌙", "answer": "قمر"},
-            {"emoji": "☀️", "answer": "شمس"},
-            {"emoji": "⭐", "answer": "نجم"},
-            {"emoji": "🌸", "answer": "زهرة"},
-            {"emoji": "🌳", "answer": "شجرة"},
-            {"emoji": "🐱", "answer": "قطة"},
-            {"emoji": "🐶", "answer": "كلب"},
-            {"emoji": "🦁", "answer": "أسد"},
-            {"emoji": "🐘", "answer": "فيل"},
-            {"emoji": "🦅", "answer": "نسر"},
-            {"emoji": "🐠", "answer": "سمكة"},
-            {"emoji": "🎂", "answer": "كعكة"},
-            {"emoji": "🍕", "answer": "بيتزا"},
-            {"emoji": "☕", "answer": "قهوة"},
-            {"emoji": "🎵", "answer": "موسيقى"},
-            {"emoji": "⚽", "answer": "كرة قدم"},
-            {"emoji": "🏆", "answer": "كأس"}
-        ]
-        
-        random.shuffle(self.emojis)
+        self.order = shuffled_order(len(EMOJIS), self.seed)
     
     def start_game(self):
         """بدء اللعبة"""
@@ -50,12 +57,13 @@ class EmojiGame(BaseGame):
     
     def get_question(self):
         """الحصول على السؤال الحالي"""
-        emoji_data = self.emojis[self.current_question % len(self.emojis)]
-        self.current_answer = emoji_data["answer"]
+        emoji = EMOJIS[self.order[self.current_question % len(self.order)]]
+        self.current_entry = emoji
+        self.current_answer = emoji.answer
         
         message = f"😀 خمن الإيموجي ({self.current_question + 1}/{self.questions_count})\n\n"
         message += f"❓ ما معنى هذا الإيموجي؟\n\n"
-        message += f"『 {emoji_data['emoji']} 』\n\n"
+        message += f"『 {emoji.prompt} 』\n\n"
         message += "💡 اكتب الإجابة أو:\n"
         message += "• لمح - للحصول على تلميح\n"
         message += "• جاوب - لعرض الإجابة"
@@ -95,10 +103,7 @@ class EmojiGame(BaseGame):
             }
         
         # فحص الإجابة
-        normalized_answer = self.normalize_text(user_answer)
-        normalized_correct = self.normalize_text(self.current_answer)
-        
-        if normalized_answer == normalized_correct or normalized_answer in normalized_correct:
+        if self.is_accepted(user_answer):
             points = self.add_score(user_id, display_name, 10)
             
             # الانتقال للسؤال التالي
@@ -3,41 +3,47 @@
 """
 from linebot.models import TextSendMessage
 from .base_game import BaseGame
-import random
-from datetime import datetime
+from .registry import register_game
+from .corpus import load_bank
+from .question_bank import shuffled_order
 
+# جمل للكتابة السريعة
+_SENTENCES = (
+    "السرعة والدقة مفتاح النجاح",
+    "العلم نور والجهل ظلام",
+    "الصبر مفتاح الفرج",
+    "من جد وجد ومن زرع حصد",
+    "الوقت كالسيف إن لم تقطعه قطعك",
+    "اطلبوا العلم من المهد إلى اللحد",
+    "الصديق وقت الضيق",
+    "درهم وقاية خير من قنطار علاج",
+    "العقل السليم في الجسم السليم",
+    "خير الكلام ما قل ودل",
+    "لا تؤجل عمل اليوم إلى الغد",
+    "الحكمة ضالة المؤمن",
+    "القراءة غذاء العقل",
+    "النظافة من الإيمان",
+    "التعاون أساس النجاح",
+    "الأمانة من صفات المؤمنين",
+    "الصدق منجاة والكذب مهلكة",
+    "احترم تُحترم",
+    "المرء على دين خليله",
+    "كل إناء بما فيه ينضح"
+)
 
+SENTENCES = load_bank('sentences', _SENTENCES, str)
+
+
+@register_game('أسرع')
 class FastTypingGame(BaseGame):
     """لعبة الكتابة السريعة"""
+
+    __slots__ = ('order', 'start_time', 'first_answer')
     
-    def __init__(self, line_bot_api):
-        super().__init__(line_bot_api, questions_count=10)
-        
-        # جمل للكتابة السريعة
-        self.sentences = [
-            "السرعة والدقة مفتاح النجاح",
-            "العلم نور والجهل ظلام",
-            "الصبر مفتاح الفرج",
-            "من جد وجد ومن زرع حصد",
-            "الوقت كالسيف إن لم تقطعه قطعك",
-            "اطلبوا العلم من المهد إلى اللحد",
-            "الصديق وقت الضيق",
-            "درهم وقاية خير من قنطار علاج",
-            "العقل السليم في الجسم السليم",
-            "خير الكلام ما قل ودل",
-            "لا تؤجل عمل اليوم إلى الغد",
-            "الحكمة ضالة المؤمن",
-            "القراءة غذاء العقل",
-            "النظافة من الإيمان",
-            "التعاون أساس النجاح",
-            "الأمانة من صفات المؤمنين",
-            "الصدق منجاة والكذب مهلكة",
-            "احترم تُحترم",
-            "المرء على دين خليله",
-            "كل إناء بما فيه ينضح"
-        ]
+    def __init__(self, line_bot_api, seed=None, clock=None):
+        super().__init__(line_bot_api, questions_count=10, seed=seed, clock=clock)
         
-        random.shuffle(self.sentences)
+        self.order = shuffled_order(len(SENTENCES), self.seed)
         self.start_time = None
         self.first_answer = True
     
@@ -48,9 +54,9 @@ class FastTypingGame(BaseGame):
     
     def get_question(self):
         """الحصول على الجملة الحالية"""
-        sentence = self.sentences[self.current_question % len(self.sentences)]
+        sentence = SENTENCES[self.order[self.current_question % len(self.order)]]
         self.current_answer = sentence
-        self.start_time = datetime.now()
+        self.start_time = self.clock()
         self.first_answer = True
         
         message = f"⚡ اكتب بسرعة ({self.current_question + 1}/{self.questions_count})\n\n"
@@ -73,7 +79,7 @@ class FastTypingGame(BaseGame):
         if user_answer.strip() == self.current_answer:
             # حساب الوقت
             if self.start_time:
-                time_taken = (datetime.now() - self.start_time).total_seconds()
+                time_taken = self.clock() - self.start_time
             else:
                 time_taken = 0
             
@@ -3,96 +3,93 @@
 """
 from linebot.models import TextSendMessage
 from .base_game import BaseGame
-import random
+from .registry import register_game
+from .corpus import load_bank
+from .question_bank import category_records, compile_category, shuffled_order
 
+# قاعدة بيانات الكلمات مرتبة حسب الفئة والحرف
+_ITEMS = {
+    "المطبخ": {
+        "ق": ["قدر", "قلاية"],
+        "م": ["ملعقة", "مغرفة"],
+        "س": ["سكين", "صحن"],
+        "ف": ["فرن", "فنجان"],
+        "ك": ["كوب", "كاسة"],
+        "ط": ["طبق", "طنجرة"],
+        "ش": ["شوكة"],
+        "ب": ["برادة"],
+        "غ": ["غلاية"]
+    },
+    "غرفة النوم": {
+        "س": ["سرير"],
+        "و": ["وسادة"],
+        "م": ["مرآة", "مخدة"],
+        "خ": ["خزانة"],
+        "د": ["دولاب"],
+        "ل": ["لحاف"],
+        "ش": ["شراشف"],
+        "ب": ["بطانية"]
+    },
+    "غرفة الجلوس": {
+        "ك": ["كرسي", "كنب"],
+        "ط": ["طاولة"],
+        "ت": ["تلفاز", "تلفزيون"],
+        "س": ["ستارة"],
+        "ر": ["رف"],
+        "م": ["مكتب"],
+        "ش": ["شاشة"]
+    },
+    "الحمام": {
+        "ص": ["صابون"],
+        "م": ["مرحاض", "مغسلة", "مرآة"],
+        "ش": ["شامبو", "شطاف"],
+        "ف": ["فرشاة"],
+        "م": ["منشفة"],
+        "ح": ["حوض"]
+    },
+    "المدرسة": {
+        "ق": ["قلم"],
+        "د": ["دفتر"],
+        "ك": ["كتاب"],
+        "م": ["مسطرة", "ممحاة", "محفظة"],
+        "س": ["سبورة"],
+        "ط": ["طاولة"],
+        "ح": ["حقيبة"]
+    },
+    "السيارة": {
+        "م": ["محرك", "مقود"],
+        "ع": ["عجلة"],
+        "ك": ["كرسي"],
+        "ش": ["شباك"],
+        "ب": ["باب", "بنزين"],
+        "ف": ["فرامل"],
+        "ر": ["رادار"]
+    },
+    "الحديقة": {
+        "ش": ["شجرة"],
+        "ز": ["زهرة"],
+        "ع": ["عشب"],
+        "ب": ["بركة"],
+        "م": ["مقعد"],
+        "ج": ["جذع"],
+        "و": ["ورقة"]
+    }
+}
 
+# سؤال لكل (فئة، حرف) مع كل إجاباته مطبعة
+QUESTIONS = load_bank('guess', category_records(_ITEMS), compile_category)
+
+
+@register_game('خمن')
 class GuessGame(BaseGame):
     """لعبة تخمين الكلمة من الفئة والحرف"""
+
+    __slots__ = ('order',)
     
-    def __init__(self, line_bot_api):
-        super().__init__(line_bot_api, questions_count=10)
-        
-        # قاعدة بيانات الكلمات مرتبة حسب الفئة والحرف
-        self.items = {
-            "المطبخ": {
-                "ق": ["قدر", "قلاية"],
-                "م": ["ملعقة", "مغرفة"],
-                "س": ["سكين", "صحن"],
-                "ف": ["فرن", "فنجان"],
-                "ك": ["كوب", "كاسة"],
-                "ط": ["طبق", "طنجرة"],
-                "ش": ["شوكة"],
-                "ب": ["برادة"],
-                "غ": ["غلاية"]
-            },
-            "غرفة النوم": {
-                "س": ["سرير"],
-                "و": ["وسادة"],
-                "م": ["مرآة", "مخدة"],
-                "خ": ["خزانة"],
-                "د": ["دولاب"],
-                "ل": ["لحاف"],
-                "ش": ["شراشف"],
-                "ب": ["بطانية"]
-            },
-            "غرفة الجلوس": {
-                "ك": ["كرسي", "كنب"],
-                "ط": ["طاولة"],
-                "ت": ["تلفاز", "تلفزيون"],
-                "س": ["ستارة"],
-                "ر": ["رف"],
-                "م": ["مكتب"],
-                "ش": ["شاشة"]
-            },
-            "الحمام": {
-                "ص": ["صابون"],
-                "م": ["مرحاض", "مغسلة", "مرآة"],
-                "ش": ["شامبو", "شطاف"],
-                "ف": ["فرشاة"],
-                "م": ["منشفة"],
-                "ح": ["حوض"]
-            },
-            "المدرسة": {
-                "ق": ["قلم"],
-                "د": ["دفتر"],
-                "ك": ["كتاب"],
-                "م": ["مسطرة", "ممحاة", "محفظة"],
-                "س": ["سبورة"],
-                "ط": ["طاولة"],
-                "ح": ["حقيبة"]
-            },
-            "السيارة": {
-                "م": ["محرك", "مقود"],
-                "ع": ["عجلة"],
-                "ك": ["كرسي"],
-                "ش": ["شباك"],
-                "ب": ["باب", "بنزين"],
-                "ف": ["فرامل"],
-                "ر": ["رادار"]
-            },
-            "الحديقة": {
-                "ش": ["شجرة"],
-                "ز": ["زهرة"],
-                "ع": ["عشب"],
-                "ب": ["بركة"],
-                "م": ["مقعد"],
-                "ج": ["جذع"],
-                "و": ["ورقة"]
-            }
-        }
+    def __init__(self, line_bot_api, seed=None, clock=None):
+        super().__init__(line_bot_api, questions_count=10, seed=seed, clock=clock)
         
-        # إنشاء قائمة الأسئلة
-        self.questions_list = []
-        for category, letters_dict in self.items.items():
-            for letter, words in letters_dict.items():
-                if words:
-                    self.questions_list.append({
-                        "category": category,
-                        "letter": letter,
-                        "answers": words
-                    })
-        
-        random.shuffle(self.questions_list)
+        self.order = shuffled_order(len(QUESTIONS), self.seed)
     
     def start_game(self):
         """بدء اللعبة"""
@@ -101,12 +98,13 @@ class GuessGame(BaseGame):
     
     def get_question(self):
         """الحصول على السؤال الحالي"""
-        q_data = self.questions_list[self.current_question % len(self.questions_list)]
-        self.current_answer = q_data["answers"]
+        question = QUESTIONS[self.order[self.current_question % len(self.order)]]
+        self.current_entry = question
+        self.current_answer = question.answer
         
         message = f"خمن الكلمة ({self.current_question + 1}/{self.questions_count})\n\n"
-        message += f"الفئة: {q_data['category']}\n"
-        message += f"يبدأ بحرف: {q_data['letter']}\n\n"
+        message += f"الفئة: {question.prompt}\n"
+        message += f"يبدأ بحرف: {question.extra}\n\n"
         message += "ما هو؟\n\n"
         message += "• جاوب - لعرض الإجابة"
         
@@ -138,28 +136,24 @@ class GuessGame(BaseGame):
             }
         
         # فحص الإجابة
-        normalized_answer = self.normalize_text(user_answer)
-        
-        # التحقق من الإجابة
-        for correct_answer in self.current_answer:
-            if self.normalize_text(correct_answer) == normalized_answer:
-                points = self.add_score(user_id, display_name, 10)
-                
-                # الانتقال للسؤال التالي
-                next_q = self.next_question()
-                
-                if isinstance(next_q, dict) and next_q.get('game_over'):
-                    next_q['points'] = points
-                    return next_q
-                
-                message = f"إجابة صحيحة يا {display_name}\n+{points} نقطة\n\n"
-                if hasattr(next_q, 'text'):
-                    message += next_q.text
-                
-                return {
-                    'message': message,
-                    'response': TextSendMessage(text=message),
-                    'points': points
-                }
+        if self.is_accepted(user_answer):
+            points = self.add_score(user_id, display_name, 10)
+            
+            # الانتقال للسؤال التالي
+            next_q = self.next_question()
+            
+            if isinstance(next_q, dict) and next_q.get('game_over'):
+                next_q['points'] = points
+                return next_q
+            
+            message = f"إجابة صحيحة يا {display_name}\n+{points} نقطة\n\n"
+            if hasattr(next_q, 'text'):
+                message += next_q.text
+            
+            return {
+                'message': message,
+                'response': TextSendMessage(text=message),
+                'points': points
+            }
         
         return None
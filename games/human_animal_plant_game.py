@@ -3,84 +3,94 @@
 """
 from linebot.models import TextSendMessage
 from .base_game import BaseGame
-import random
+from .registry import register_game
+from .corpus import load_bank
+from .question_bank import (answer_key, answer_records, compile_answers, record_answer_key,
+                            shuffled_order)
 
+# الحروف المتاحة
+LETTERS = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
 
+# الفئات
+CATEGORIES = ("إنسان", "حيوان", "نبات", "جماد", "بلاد")
+
+# قاعدة بيانات للإجابات الصحيحة
+_ANSWERS = {
+    "إنسان": {
+        "أ": ["أحمد", "أمل", "أسامة", "أمير"],
+        "ب": ["بدر", "بسمة", "باسل"],
+        "م": ["محمد", "مريم", "ماجد", "منى"],
+        "س": ["سارة", "سعيد", "سامي"],
+        "ع": ["علي", "عمر", "عائشة"],
+        "ف": ["فاطمة", "فهد", "فيصل"],
+        "ل": ["ليلى", "لطيفة", "لؤي"],
+        "ن": ["نور", "نادر", "نهى"],
+        "ه": ["هند", "هاني", "هدى"],
+        "ي": ["يوسف", "ياسر", "ياسمين"]
+    },
+    "حيوان": {
+        "أ": ["أسد", "أرنب", "أفعى"],
+        "ب": ["بقرة", "بطة", "ببغاء"],
+        "ج": ["جمل", "جاموس"],
+        "د": ["دجاجة", "ديك", "دب"],
+        "ذ": ["ذئب", "ذبابة"],
+        "ز": ["زرافة"],
+        "س": ["سمكة", "سلحفاة"],
+        "ف": ["فيل", "فأر", "فهد"],
+        "ق": ["قط", "قرد"],
+        "ك": ["كلب"],
+        "ن": ["نمر", "نسر", "نحلة"],
+        "ه": ["هدهد"]
+    },
+    "نبات": {
+        "ت": ["تفاح", "توت", "تين"],
+        "ر": ["رمان", "ريحان"],
+        "ز": ["زيتون", "زعتر"],
+        "ل": ["ليمون"],
+        "م": ["موز", "مانجو"],
+        "ن": ["نخل", "نعناع"],
+        "و": ["ورد", "ورق"]
+    },
+    "جماد": {
+        "ب": ["باب", "بيت"],
+        "ح": ["حجر"],
+        "س": ["سرير", "سيارة"],
+        "ك": ["كتاب", "كرسي"],
+        "م": ["مفتاح", "مكتب"],
+        "ن": ["نافذة"]
+    },
+    "بلاد": {
+        "أ": ["الأردن", "الإمارات"],
+        "ب": ["البحرين"],
+        "ت": ["تونس", "تركيا"],
+        "ج": ["الجزائر"],
+        "س": ["السعودية", "سوريا", "السودان"],
+        "ع": ["عمان"],
+        "ف": ["فلسطين"],
+        "ق": ["قطر"],
+        "ك": ["الكويت"],
+        "ل": ["لبنان", "ليبيا"],
+        "م": ["مصر", "المغرب"],
+        "ي": ["اليمن"]
+    }
+}
+
+# بحث بمفتاح (الفئة، الحرف المطبع) -> (الإجابات، الإجابات مطبعة)
+ANSWERS = load_bank('hap_answers', answer_records(_ANSWERS), compile_answers, key=record_answer_key)
+
+
+@register_game('لعبة', uses_ai=True)
 class HumanAnimalPlantGame(BaseGame):
     """لعبة إنسان حيوان نبات جماد بلاد"""
+
+    __slots__ = ('order', 'current_category', 'current_letter')
     
-    def __init__(self, line_bot_api, use_ai=False, get_api_key=None, switch_key=None):
-        super().__init__(line_bot_api, questions_count=10)
+    def __init__(self, line_bot_api, use_ai=False, get_api_key=None, switch_key=None, seed=None, clock=None):
+        super().__init__(line_bot_api, questions_count=10, seed=seed, clock=clock)
         
-        # الحروف المتاحة
-        self.letters = list("ابتثجحخدذرزسشصضطظعغفقكلمنهوي")
-        random.shuffle(self.letters)
-        
-        # الفئات
-        self.categories = ["إنسان", "حيوان", "نبات", "جماد", "بلاد"]
+        self.order = shuffled_order(len(LETTERS), self.seed)
         self.current_category = None
         self.current_letter = None
-        
-        # قاعدة بيانات للإجابات الصحيحة
-        self.answers_db = {
-            "إنسان": {
-                "أ": ["أحمد", "أمل", "أسامة", "أمير"],
-                "ب": ["بدر", "بسمة", "باسل"],
-                "م": ["محمد", "مريم", "ماجد", "منى"],
-                "س": ["سارة", "سعيد", "سامي"],
-                "ع": ["علي", "عمر", "عائشة"],
-                "ف": ["فاطمة", "فهد", "فيصل"],
-                "ل": ["ليلى", "لطيفة", "لؤي"],
-                "ن": ["نور", "نادر", "نهى"],
-                "ه": ["هند", "هاني", "هدى"],
-                "ي": ["يوسف", "ياسر", "ياسمين"]
-            },
-            "حيوان": {
-                "أ": ["أسد", "أرنب", "أفعى"],
-                "ب": ["بقرة", "بطة", "ببغاء"],
-                "ج": ["جمل", "جاموس"],
-                "د": ["دجاجة", "ديك", "دب"],
-                "ذ": ["ذئب", "ذبابة"],
-                "ز": ["زرافة"],
-                "س": ["سمكة", "سلحفاة"],
-                "ف": ["فيل", "فأر", "فهد"],
-                "ق": ["قط", "قرد"],
-                "ك": ["كلب"],
-                "ن": ["نمر", "نسر", "نحلة"],
-                "ه": ["هدهد"]
-            },
-            "نبات": {
-                "ت": ["تفاح", "توت", "تين"],
-                "ر": ["رمان", "ريحان"],
-                "ز": ["زيتون", "زعتر"],
-                "ل": ["ليمون"],
-                "م": ["موز", "مانجو"],
-                "ن": ["نخل", "نعناع"],
-                "و": ["ورد", "ورق"]
-            },
-            "جماد": {
-                "ب": ["باب", "بيت"],
-                "ح": ["حجر"],
-                "س": ["سرير", "سيارة"],
-                "ك": ["كتاب", "كرسي"],
-                "م": ["مفتاح", "مكتب"],
-                "ن": ["نافذة"]
-            },
-            "بلاد": {
-                "أ": ["الأردن", "الإمارات"],
-                "ب": ["البحرين"],
-                "ت": ["تونس", "تركيا"],
-                "ج": ["الجزائر"],
-                "س": ["السعودية", "سوريا", "السودان"],
-                "ع": ["عمان"],
-                "ف": ["فلسطين"],
-                "ق": ["قطر"],
-                "ك": ["الكويت"],
-                "ل": ["لبنان", "ليبيا"],
-                "م": ["مصر", "المغرب"],
-                "ي": ["اليمن"]
-            }
-        }
     
     def start_game(self):
         """بدء اللعبة"""
@@ -90,8 +100,8 @@ class HumanAnimalPlantGame(BaseGame):
     def get_question(self):
         """الحصول على السؤال الحالي"""
         # اختيار حرف وفئة
-        self.current_letter = self.letters[self.current_question % len(self.letters)]
-        self.current_category = random.choice(self.categories)
+        self.current_letter = LETTERS[self.order[self.current_question % len(self.order)]]
+        self.current_category = self.round_rng().choice(CATEGORIES)
         
         message = f"إنسان حيوان نبات ({self.current_question + 1}/{self.questions_count})\n\n"
         message += f"الحرف: {self.current_letter}\n"
@@ -101,6 +111,10 @@ class HumanAnimalPlantGame(BaseGame):
         
         return TextSendMessage(text=message)
     
+    def known_answers(self):
+        """(الإجابات، الإجابات مطبعة) للفئة والحرف الحاليين أو None"""
+        return ANSWERS.find(answer_key(self.current_category, self.current_letter))
+    
     def check_answer(self, user_answer, user_id, display_name):
         """فحص الإجابة"""
         if not self.game_active:
@@ -114,11 +128,9 @@ class HumanAnimalPlantGame(BaseGame):
         if user_answer == 'جاوب':
             # اختيار إجابة عشوائية من القاعدة
             suggested = None
-            if self.current_category in self.answers_db:
-                if self.current_letter in self.answers_db[self.current_category]:
-                    answers_list = self.answers_db[self.current_category][self.current_letter]
-                    if answers_list:
-                        suggested = random.choice(answers_list)
+            known = self.known_answers()
+            if known:
+                suggested = self.round_rng().choice(known[0])
             
             if suggested:
                 reveal = f"إجابة مقترحة: {suggested}"
@@ -146,11 +158,8 @@ class HumanAnimalPlantGame(BaseGame):
             return None
         
         # التحقق من قاعدة البيانات (إن وُجدت)
-        is_valid = True
-        if self.current_category in self.answers_db:
-            if self.current_letter in self.answers_db[self.current_category]:
-                valid_answers = [self.normalize_text(a) for a in self.answers_db[self.current_category][self.current_letter]]
-                is_valid = normalized_answer in valid_answers
+        known = self.known_answers()
+        is_valid = known is None or normalized_answer in known[1]
         
         # قبول أي إجابة معقولة تبدأ بالحرف الصحيح
         if len(normalized_answer) >= 2:
@@ -3,68 +3,78 @@
 """
 from linebot.models import TextSendMessage
 from .base_game import BaseGame
-import random
-import re
+from .registry import register_game
+from .corpus import load_bank
+from .question_bank import question_compiler, shuffled_order
 
+# أسئلة وأجوبة جاهزة
+_QUESTIONS = [
+    {"q": "ما هو الشيء الذي يمشي بلا أرجل ويبكي بلا عيون؟", "a": "السحاب"},
+    {"q": "ما هو الشيء الذي له رأس ولا يملك عيون؟", "a": "الدبوس"},
+    {"q": "شيء موجود في السماء إذا أضفت له حرفاً أصبح في الأرض؟", "a": "نجم"},
+    {"q": "ما هو الشيء الذي كلما زاد نقص؟", "a": "العمر"},
+    {"q": "له عين ولا يرى؟", "a": "الإبرة"},
+    {"q": "ما هو الشيء الذي يكتب ولا يقرأ؟", "a": "القلم"},
+    {"q": "شيء إذا أكلته كله تستفيد وإذا أكلت نصفه تموت؟", "a": "السم"},
+    {"q": "ما هو البيت الذي ليس له أبواب ولا نوافذ؟", "a": "بيت الشعر"},
+    {"q": "شيء له أسنان ولا يعض؟", "a": "المشط"},
+    {"q": "ما هو الشيء الذي يسمع بلا أذن ويتكلم بلا لسان؟", "a": "الهاتف"},
+    {"q": "أنا ابن الماء فإن تركوني في الماء مت، فمن أنا؟", "a": "الثلج"},
+    {"q": "ما هو الشيء الذي يقرصك ولا تراه؟", "a": "الجوع"},
+    {"q": "له رقبة وليس له رأس؟", "a": "الزجاجة"},
+    {"q": "ما هو الحيوان الذي يحك أذنه بأنفه؟", "a": "الفيل"},
+    {"q": "كلما أخذت منه كبر؟", "a": "الحفرة"},
+    {"q": "ما هو الشيء الذي يخترق الزجاج ولا يكسره؟", "a": "الضوء"},
+    {"q": "شيء أمامك لا تراه؟", "a": "المستقبل"},
+    {"q": "ما هو الشيء الذي له أربع أرجل ولا يمشي؟", "a": "الكرسي"},
+    {"q": "ما هو الشيء الذي ينبض بلا قلب؟", "a": "الساعة"},
+    {"q": "شيء تحمله ويحملك؟", "a": "الحذاء"},
+]
 
+# تلميحات ذكية جاهزة
+_HINTS = {
+    "السحاب": "يُرى في السماء وغالباً ما يرافق المطر.",
+    "الدبوس": "أداة صغيرة تُستخدم لتثبيت الأشياء.",
+    "نجم": "جسم يضيء في السماء ليلاً.",
+    "العمر": "يزيد مع مرور الوقت لكنه في الحقيقة ينقص.",
+    "الإبرة": "تُستخدم في الخياطة.",
+    "القلم": "أداة للكتابة.",
+    "السم": "مادة قاتلة حتى بكميات صغيرة.",
+    "بيت الشعر": "يُكتب ولا يُسكن.",
+    "المشط": "يُستخدم لتسريح الشعر.",
+    "الهاتف": "يسمع ويتكلم دون أذن أو لسان.",
+    "الثلج": "أبيض يذوب عند الحرارة.",
+    "الجوع": "شعور يأتي من نقص الطعام.",
+    "الزجاجة": "تُستخدم لحفظ السوائل.",
+    "الفيل": "حيوان ضخم له خرطوم طويل.",
+    "الحفرة": "كلما أخذت منها كبرت.",
+    "الضوء": "يخترق الزجاج دون أن يكسره.",
+    "المستقبل": "أمامك دائماً لكن لا تراه.",
+    "الكرسي": "له أرجل ولا يمشي.",
+    "الساعة": "تمشي وتقف وليس لها أرجل.",
+    "الحذاء": "تحمله بيدك ويحملك على قدميك."
+}
+
+# من ملف المخزون إن وجد، وإلا مجهزة من القيم أعلاه: الإجابات مطبعة، وكل كلمة
+# من الإجابة المركبة مقبولة
+QUESTIONS = load_bank('iq', [dict(item, hint=_HINTS.get(item["a"])) for item in _QUESTIONS],
+                      question_compiler('q', 'a', hint='hint', words=True))
+
+
+@register_game('ذكاء', uses_ai=True)
 class IQGame(BaseGame):
     """لعبة أسئلة الذكاء"""
+
+    __slots__ = ('use_ai', 'get_api_key', 'switch_key', 'order')
+    _TRANSIENT = BaseGame._TRANSIENT + ('get_api_key', 'switch_key')
     
-    def __init__(self, line_bot_api, use_ai=False, get_api_key=None, switch_key=None):
-        super().__init__(line_bot_api, questions_count=10)
+    def __init__(self, line_bot_api, use_ai=False, get_api_key=None, switch_key=None, seed=None, clock=None):
+        super().__init__(line_bot_api, questions_count=10, seed=seed, clock=clock)
         self.use_ai = use_ai
         self.get_api_key = get_api_key
         self.switch_key = switch_key
         
-        # أسئلة وأجوبة جاهزة
-        self.questions = [
-            {"q": "ما هو الشيء الذي يمشي بلا أرجل ويبكي بلا عيون؟", "a": "السحاب"},
-            {"q": "ما هو الشيء الذي له رأس ولا يملك عيون؟", "a": "الدبوس"},
-            {"q": "شيء موجود في السماء إذا أضفت له حرفاً أصبح في الأرض؟", "a": "نجم"},
-            {"q": "ما هو الشيء الذي كلما زاد نقص؟", "a": "العمر"},
-            {"q": "له عين ولا يرى؟", "a": "الإبرة"},
-            {"q": "ما هو الشيء الذي يكتب ولا يقرأ؟", "a": "القلم"},
-            {"q": "شيء إذا أكلته كله تستفيد وإذا أكلت نصفه تموت؟", "a": "السم"},
-            {"q": "ما هو البيت الذي ليس له أبواب ولا نوافذ؟", "a": "بيت الشعر"},
-            {"q": "شيء له أسنان ولا يعض؟", "a": "المشط"},
-            {"q": "ما هو الشيء الذي يسمع بلا أذن ويتكلم بلا لسان؟", "a": "الهاتف"},
-            {"q": "أنا ابن الماء فإن تركوني في الماء مت، فمن أنا؟", "a": "الثلج"},
-            {"q": "ما هو الشيء الذي يقرصك ولا تراه؟", "a": "الجوع"},
-            {"q": "له رقبة وليس له رأس؟", "a": "الزجاجة"},
-            {"q": "ما هو الحيوان الذي يحك أذنه بأنفه؟", "a": "الفيل"},
-            {"q": "كلما أخذت منه كبر؟", "a": "الحفرة"},
-            {"q": "ما هو الشيء الذي يخترق الزجاج ولا يكسره؟", "a": "الضوء"},
-            {"q": "شيء أمامك لا تراه؟", "a": "المستقبل"},
-            {"q": "ما هو الشيء الذي له أربع أرجل ولا يمشي؟", "a": "الكرسي"},
-            {"q": "ما هو الشيء الذي ينبض بلا قلب؟", "a": "الساعة"},
-            {"q": "شيء تحمله ويحملك؟", "a": "الحذاء"},
-        ]
-        
-        # تلميحات ذكية جاهزة
-        self.hints_dict = {
-            "السحاب": "يُرى في السماء وغالباً ما يرافق المطر.",
-            "الدبوس": "أداة صغيرة تُستخدم لتثبيت الأشياء.",
-            "نجم": "جسم يضيء في السماء ليلاً.",
-            "العمر": "يزيد مع مرور الوقت لكنه في الحقيقة ينقص.",
-            "الإبرة": "تُستخدم في الخياطة.",
-            "القلم": "أداة للكتابة.",
-            "السم": "مادة قاتلة حتى بكميات صغيرة.",
-            "بيت الشعر": "يُكتب ولا يُسكن.",
-            "المشط": "يُستخدم لتسريح الشعر.",
-            "الهاتف": "يسمع ويتكلم دون أذن أو لسان.",
-            "الثلج": "أبيض يذوب عند الحرارة.",
-            "الجوع": "شعور يأتي من نقص الطعام.",
-            "الزجاجة": "تُستخدم لحفظ السوائل.",
-            "الفيل": "حيوان ضخم له خرطوم طويل.",
-            "الحفرة": "كلما أخذت منها كبرت.",
-            "الضوء": "يخترق الزجاج دون أن يكسره.",
-            "المستقبل": "أمامك دائماً لكن لا تراه.",
-            "الكرسي": "له أرجل ولا يمشي.",
-            "الساعة": "تمشي وتقف وليس لها أرجل.",
-            "الحذاء": "تحمله بيدك ويحملك على قدميك."
-        }
-        
-        random.shuffle(self.questions)
+        self.order = shuffled_order(len(QUESTIONS), self.seed)
 
     def start_game(self):
         """بدء اللعبة"""
@@ -74,11 +84,12 @@ class IQGame(BaseGame):
 
     def get_question(self):
         """عرض السؤال الحالي"""
-        question_data = self.questions[self.current_question % len(self.questions)]
-        self.current_answer = question_data["a"]
+        question = QUESTIONS[self.order[self.current_question % len(self.order)]]
+        self.current_entry = question
+        self.current_answer = question.answer
 
         message = f"سؤال ذكاء ({self.current_question + 1}/{self.questions_count})\n\n"
-        message += f"{question_data['q']}\n\n"
+        message += f"{question.prompt}\n\n"
         message += "اكتب الإجابة أو:\n"
         message += "• اكتب 'لمح' للحصول على تلميح.\n"
         message += "• اكتب 'جاوب' لمعرفة الإجابة."
@@ -88,7 +99,7 @@ class IQGame(BaseGame):
     def get_hint(self):
         """إرجاع تلميح ذكي بدون رموز"""
         answer = self.current_answer.strip()
-        hint = self.hints_dict.get(answer)
+        hint = self.current_entry.hint
         
         if hint:
             return f"تلميح: {hint}"
@@ -115,10 +126,7 @@ class IQGame(BaseGame):
             return {'message': message, 'response': TextSendMessage(text=message), 'points': 0}
 
         # تحقق من الإجابة
-        normalized_answer = self.normalize_text(user_answer)
-        normalized_correct = self.normalize_text(self.current_answer)
-
-        if normalized_answer == normalized_correct or normalized_answer in normalized_correct:
+        if self.is_accepted(user_answer):
             points = self.add_score(user_id, display_name, 10)
             next_q = self.next_question()
             if isinstance(next_q, dict) and next_q.get('game_over'):
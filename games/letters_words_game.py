@@ -3,49 +3,57 @@
 """
 from linebot.models import TextSendMessage
 from .base_game import BaseGame
-import random
-
+from .registry import register_game
+from .corpus import load_bank
+from .question_bank import compile_letter_set, shuffled_order
+from utils.arabic import normalize_compact
+
+# مجموعات أمثلة (يمكن توسيعها لاحقاً)
+_LETTER_SETS = [
+    {"letters": "ق ل م ع ر ب", "words":[
+        {"word": "قلم", "hint": "أداة للكتابة"},
+        {"word": "عمل", "hint": "فعل شيء"},
+        {"word": "علم", "hint": "معرفة"},
+        {"word": "قلب", "hint": "عضو في الجسم"},
+        {"word": "رقم", "hint": "عدد"},
+        {"word": "مقر", "hint": "مكان رسمي"}]},
+    {"letters": "س ا ر ة ي", "words":[
+        {"word": "سيارة", "hint": "وسيلة نقل"},
+        {"word": "سارية", "hint": "عمود العلم"},
+        {"word": "رئيس", "hint": "قائد"},
+        {"word": "أسر", "hint": "جمع أسير"},
+        {"word": "سير", "hint": "تحرك"}]},
+    {"letters": "ك ت ا ب", "words":[
+        {"word": "كتاب", "hint": "شيء يُقرأ"},
+        {"word": "بت", "hint": "اسم شيء"},
+        {"word": "كتب", "hint": "جمع كتاب"},
+        {"word": "تاب", "hint": "رجع"}]},
+    {"letters": "م د ر س ة", "words":[
+        {"word": "مدرسة", "hint": "مكان للتعلم"},
+        {"word": "درس", "hint": "تعلم شيء"},
+        {"word": "سمر", "hint": "جمع الحديث"},
+        {"word": "رمس", "hint": "اسم شيء"},
+        {"word": "سرد", "hint": "قص حكاية"}]},
+    {"letters": "ح د ي ق ة", "words":[
+        {"word": "حديقة", "hint": "مكان للنباتات"},
+        {"word": "قيد", "hint": "وثيقة رسمية"},
+        {"word": "قدح", "hint": "أداة للشرب"},
+        {"word": "يحد", "hint": "يفصل شيئا"},
+        {"word": "حقي", "hint": "شخصية أو اسم"}]},
+]
+
+LETTER_SETS = load_bank('letter_sets', _LETTER_SETS, compile_letter_set)
+
+@register_game('تكوين', 'تكوين كلمات', uses_ai=True)
 class LettersWordsGame(BaseGame):
     """لعبة تكوين كلمات من مجموعة حروف"""
 
-    def __init__(self, line_bot_api, use_ai=False, get_api_key=None, switch_key=None):
-        super().__init__(line_bot_api, questions_count=5)
-
-        # مجموعات أمثلة (يمكن توسيعها لاحقاً)
-        self.letter_sets = [
-            {"letters": "ق ل م ع ر ب", "words":[
-                {"word": "قلم", "hint": "أداة للكتابة"},
-                {"word": "عمل", "hint": "فعل شيء"},
-                {"word": "علم", "hint": "معرفة"},
-                {"word": "قلب", "hint": "عضو في الجسم"},
-                {"word": "رقم", "hint": "عدد"},
-                {"word": "مقر", "hint": "مكان رسمي"}]},
-            {"letters": "س ا ر ة ي", "words":[
-                {"word": "سيارة", "hint": "وسيلة نقل"},
-                {"word": "سارية", "hint": "عمود العلم"},
-                {"word": "رئيس", "hint": "قائد"},
-                {"word": "أسر", "hint": "جمع أسير"},
-                {"word": "سير", "hint": "تحرك"}]},
-            {"letters": "ك ت ا ب", "words":[
-                {"word": "كتاب", "hint": "شيء يُقرأ"},
-                {"word": "بت", "hint": "اسم شيء"},
-                {"word": "كتب", "hint": "جمع كتاب"},
-                {"word": "تاب", "hint": "رجع"}]},
-            {"letters": "م د ر س ة", "words":[
-                {"word": "مدرسة", "hint": "مكان للتعلم"},
-                {"word": "درس", "hint": "تعلم شيء"},
-                {"word": "سمر", "hint": "جمع الحديث"},
-                {"word": "رمس", "hint": "اسم شيء"},
-                {"word": "سرد", "hint": "قص حكاية"}]},
-            {"letters": "ح د ي ق ة", "words":[
-                {"word": "حديقة", "hint": "مكان للنباتات"},
-                {"word": "قيد", "hint": "وثيقة رسمية"},
-                {"word": "قدح", "hint": "أداة للشرب"},
-                {"word": "يحد", "hint": "يفصل شيئا"},
-                {"word": "حقي", "hint": "شخصية أو اسم"}]},
-        ]
-
-        random.shuffle(self.letter_sets)
+    __slots__ = ('order', 'found_words', 'required_words')
+
+    def __init__(self, line_bot_api, use_ai=False, get_api_key=None, switch_key=None, seed=None, clock=None):
+        super().__init__(line_bot_api, questions_count=5, seed=seed, clock=clock)
+
+        self.order = shuffled_order(len(LETTER_SETS), self.seed)
         self.found_words = set()
         self.required_words = 3
         self.game_active = False
@@ -56,12 +64,13 @@ class LettersWordsGame(BaseGame):
         return self.get_question()
 
     def get_question(self):
-        letter_set = self.letter_sets[self.current_question % len(self.letter_sets)]
-        self.current_answer = letter_set["words"]
+        letter_set = LETTER_SETS[self.order[self.current_question % len(self.order)]]
+        self.current_entry = letter_set
+        self.current_answer = letter_set.words
         self.found_words.clear()
 
         message = f"لعبة تكوين كلمات ({self.current_question + 1}/{self.questions_count})\n\n"
-        message += f"الحروف المتاحة:\n『 {letter_set['letters']} 』\n\n"
+        message += f"الحروف المتاحة:\n『 {letter_set.letters} 』\n\n"
         message += f"كوّن {self.required_words} كلمات صحيحة\n"
         message += "أرسل كل كلمة في رسالة مستقلة\n"
         message += "اكتب 'تم' للانتقال للسؤال التالي أو 'لمح' للحصول على تلميح"
@@ -74,9 +83,10 @@ class LettersWordsGame(BaseGame):
 
         answer = user_answer.strip()
         if answer.lower() == 'لمح':
-            remaining_words = [w for w in self.current_answer if self.normalize_text(w["word"]) not in self.found_words]
+            entry = self.current_entry
+            remaining_words = [word for (word, _), key in zip(entry.words, entry.keys) if key not in self.found_words]
             if remaining_words:
-                next_word = remaining_words[0]["word"]
+                next_word = remaining_words[0]
                 hint = f"التلميح: الكلمة مكونة من {len(next_word)} حروف وأول حرف هو '{next_word[0]}'"
             else:
                 hint = "لا يوجد تلميحات متبقية"
@@ -91,13 +101,12 @@ class LettersWordsGame(BaseGame):
                 return {'message': msg, 'response': TextSendMessage(text=msg), 'points': 0}
 
         normalized = self.normalize_text(answer)
-        valid_words = [self.normalize_text(w["word"]) for w in self.current_answer]
 
         if normalized in self.found_words:
             msg = f"الكلمة '{user_answer}' تم اكتشافها سابقًا!"
             return {'message': msg, 'response': TextSendMessage(text=msg), 'points': 0}
 
-        if normalized in valid_words:
+        if normalized in self.current_entry.accepted:
             self.found_words.add(normalized)
             points = self.add_score(user_id, display_name, 10)
             if len(self.found_words) >= self.required_words:
@@ -125,4 +134,5 @@ class LettersWordsGame(BaseGame):
         return {'message': msg, 'response': TextSendMessage(text=msg), 'points': points}
 
     def normalize_text(self, text):
-        return ''.join(text.split())
+        """الكلمة بدون مسافات (utils.arabic)"""
+        return normalize_compact(text)
@@ -3,18 +3,22 @@
 """
 from linebot.models import TextSendMessage
 from .base_game import BaseGame
-import random
+from .registry import register_game
 
 
+@register_game('رياضيات')
 class MathGame(BaseGame):
     """لعبة العمليات الحسابية"""
+
+    __slots__ = ('difficulty',)
     
-    def __init__(self, line_bot_api):
-        super().__init__(line_bot_api, questions_count=10)
+    def __init__(self, line_bot_api, seed=None, clock=None):
+        super().__init__(line_bot_api, questions_count=10, seed=seed, clock=clock)
         self.difficulty = 1  # مستوى الصعوبة (يزداد مع التقدم)
     
     def generate_question(self):
         """توليد سؤال رياضي"""
+        rng = self.round_rng()
         # زيادة الصعوبة تدريجياً
         max_num = 10 + (self.current_question * 5)
         
@@ -22,17 +26,17 @@ class MathGame(BaseGame):
         if self.current_question >= 5:  # إضافة القسمة في المراحل المتقدمة
             operations.append('/')
         
-        operation = random.choice(operations)
+        operation = rng.choice(operations)
         
         if operation == '/':
             # للقسمة، نتأكد من النتيجة صحيحة
-            result = random.randint(2, max_num // 2)
-            num2 = random.randint(2, 10)
+            result = rng.randint(2, max_num // 2)
+            num2 = rng.randint(2, 10)
             num1 = result * num2
             answer = result
         else:
-            num1 = random.randint(1, max_num)
-            num2 = random.randint(1, max_num)
+            num1 = rng.randint(1, max_num)
+            num2 = rng.randint(1, max_num)
             
             if operation == '+':
                 answer = num1 + num2
@@ -43,8 +47,8 @@ class MathGame(BaseGame):
                 answer = num1 - num2
             elif operation == '*':
                 # استخدام أرقام أصغر للضرب
-                num1 = random.randint(1, min(15, max_num))
-                num2 = random.randint(1, min(15, max_num))
+                num1 = rng.randint(1, min(15, max_num))
+                num2 = rng.randint(1, min(15, max_num))
                 answer = num1 * num2
         
         question = f"{num1} {operation} {num2}"
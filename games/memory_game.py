@@ -3,23 +3,26 @@
 """
 from linebot.models import TextSendMessage
 from .base_game import BaseGame
-import random
+from .registry import register_game
 
 
+@register_game('ذاكرة')
 class MemoryGame(BaseGame):
     """لعبة تذكر الأرقام/الكلمات"""
+
+    __slots__ = ('sequence_type',)
     
-    def __init__(self, line_bot_api):
-        super().__init__(line_bot_api, questions_count=10)
+    def __init__(self, line_bot_api, seed=None, clock=None):
+        super().__init__(line_bot_api, questions_count=10, seed=seed, clock=clock)
         self.sequence_type = "numbers"  # or "words"
     
     def generate_sequence(self, length):
         """توليد سلسلة للحفظ"""
         if self.sequence_type == "numbers":
-            return [str(random.randint(0, 9)) for _ in range(length)]
+            return [str(self.round_rng().randint(0, 9)) for _ in range(length)]
         else:
             words = ["قلم", "كتاب", "شجرة", "بيت", "سيارة", "قطة", "كلب", "زهرة", "نجم", "قمر"]
-            return random.sample(words, min(length, len(words)))
+            return self.round_rng().sample(words, min(length, len(words)))
     
     def start_game(self):
         """بدء اللعبة"""
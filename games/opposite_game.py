@@ -3,45 +3,52 @@
 """
 from linebot.models import TextSendMessage
 from .base_game import BaseGame
-import random
+from .registry import register_game
+from .corpus import load_bank
+from .question_bank import question_compiler, shuffled_order
 
+# قائمة الكلمات المتضادة
+_OPPOSITES = [
+    {"word": "كبير", "opposite": "صغير"},
+    {"word": "طويل", "opposite": "قصير"},
+    {"word": "سريع", "opposite": "بطيء"},
+    {"word": "ساخن", "opposite": "بارد"},
+    {"word": "جديد", "opposite": "قديم"},
+    {"word": "نظيف", "opposite": "وسخ"},
+    {"word": "سهل", "opposite": "صعب"},
+    {"word": "قوي", "opposite": "ضعيف"},
+    {"word": "ثقيل", "opposite": "خفيف"},
+    {"word": "غني", "opposite": "فقير"},
+    {"word": "جميل", "opposite": "قبيح"},
+    {"word": "سعيد", "opposite": "حزين"},
+    {"word": "ذكي", "opposite": "غبي"},
+    {"word": "شجاع", "opposite": "جبان"},
+    {"word": "كريم", "opposite": "بخيل"},
+    {"word": "صادق", "opposite": "كاذب"},
+    {"word": "مظلم", "opposite": "مضيء"},
+    {"word": "عالي", "opposite": "منخفض"},
+    {"word": "واسع", "opposite": "ضيق"},
+    {"word": "رطب", "opposite": "جاف"},
+    {"word": "ممتلئ", "opposite": "فارغ"},
+    {"word": "مفتوح", "opposite": "مغلق"},
+    {"word": "أول", "opposite": "آخر"},
+    {"word": "فوق", "opposite": "تحت"},
+    {"word": "داخل", "opposite": "خارج"}
+]
 
+OPPOSITES = load_bank('opposites', _OPPOSITES, question_compiler('word', 'opposite'))
+
+
+@register_game('ضد')
 class OppositeGame(BaseGame):
     """لعبة الأضداد"""
+
+    __slots__ = ('order',)
     
-    def __init__(self, line_bot_api):
-        super().__init__(line_bot_api, questions_count=10)
+    def __init__(self, line_bot_api, seed=None, clock=None):
+        super().__init__(line_bot_api, questions_count=10, seed=seed, clock=clock)
         
-        # قائمة الكلمات المتضادة
-        self.opposites = [
-            {"word": "كبير", "opposite": "صغير"},
-            {"word": "طويل", "opposite": "قصير"},
-            {"word": "سريع", "opposite": "بطيء"},
-            {"word": "ساخن", "opposite": "بارد"},
-            {"word": "جديد", "opposite": "قديم"},
-            {"word": "نظيف", "opposite": "وسخ"},
-            {"word": "سهل", "opposite": "صعب"},
-            {"word": "قوي", "opposite": "ضعيف"},
-            {"word": "ثقيل", "opposite": "خفيف"},
-            {"word": "غني", "opposite": "فقير"},
-            {"word": "جميل", "opposite": "قبيح"},
-            {"word": "سعيد", "opposite": "حزين"},
-            {"word": "ذكي", "opposite": "غبي"},
-            {"word": "شجاع", "opposite": "جبان"},
-            {"word": "كريم", "opposite": "بخيل"},
-            {"word": "صادق", "opposite": "كاذب"},
-            {"word": "مظلم", "opposite": "مضيء"},
-            {"word": "عالي", "opposite": "منخفض"},
-            {"word": "واسع", "opposite": "ضيق"},
-            {"word": "رطب", "opposite": "جاف"},
-            {"word": "ممتلئ", "opposite": "فارغ"},
-            {"word": "مفتوح", "opposite": "مغلق"},
-            {"word": "أول", "opposite": "آخر"},
-            {"word": "فوق", "opposite": "تحت"},
-            {"word": "داخل", "opposite": "خارج"}
-        ]
-        
-        random.shuffle(self.opposites)
+        self.order = shuffled_order(len(OPPOSITES), self.seed)
     
     def start_game(self):
         """بدء اللعبة"""
@@ -50,12 +57,13 @@ class OppositeGame(BaseGame):
     
     def get_question(self):
         """الحصول على السؤال الحالي"""
-        pair = self.opposites[self.current_question % len(self.opposites)]
-        self.current_answer = pair["opposite"]
+        pair = OPPOSITES[self.order[self.current_question % len(self.order)]]
+        self.current_entry = pair
+        self.current_answer = pair.answer
         
         message = f"🔄 ضد الكلمة ({self.current_question + 1}/{self.questions_count})\n\n"
         message += f"📝 ما هو ضد:\n\n"
-        message += f"『 {pair['word']} 』\n\n"
+        message += f"『 {pair.prompt} 』\n\n"
         message += "💡 اكتب الكلمة المضادة أو:\n"
         message += "• لمح - للحصول على تلميح\n"
         message += "• جاوب - لعرض الإجابة"
@@ -95,10 +103,7 @@ class OppositeGame(BaseGame):
             }
         
         # فحص الإجابة
-        normalized_answer = self.normalize_text(user_answer)
-        normalized_correct = self.normalize_text(self.current_answer)
-        
-        if normalized_answer == normalized_correct:
+        if self.is_accepted(user_answer):
             points = self.add_score(user_id, display_name, 10)
             
             # الانتقال للسؤال التالي
@@ -0,0 +1,114 @@
+"""
+بنوك الأسئلة الثابتة مجهزة مرة واحدة عند الاستيراد
+كل إجابة مطبعة مسبقاً مع الإجابات المقبولة (frozenset) والتلميح،
+فيكفي لكل رسالة تطبيع واحد لنص اللاعب وبحث في مجموعة
+"""
+import random
+from array import array
+from collections import namedtuple
+
+from utils.arabic import normalize, normalize_compact
+
+# prompt: نص السؤال، answer: الإجابة للعرض، key: الإجابة مطبعة،
+# accepted: كل الصيغ المقبولة مطبعة، extra: بيانات إضافية خاصة باللعبة
+Question = namedtuple('Question', ['prompt', 'answer', 'key', 'accepted', 'hint', 'extra'])
+
+# مجموعة حروف واحدة: words أزواج (الكلمة، التلميح) و keys نفس الكلمات مطبعة بدون مسافات
+LetterSet = namedtuple('LetterSet', ['letters', 'words', 'keys', 'accepted'])
+
+
+def accepted_answers(answer, aliases=(), words=False):
+    """الإجابة المطبعة وبدائلها، و words=True يقبل أيضاً كل كلمة (3 أحرف فأكثر) من إجابة مركبة"""
+    keys = {normalize(answer)}
+    keys.update(normalize(alias) for alias in aliases)
+    if words:
+        keys.update(key for key in map(normalize, answer.split()) if len(key) >= 3)
+    keys.discard("")
+    return frozenset(keys)
+
+
+def shuffled_order(size, seed=None):
+    """ترتيب عشوائي لفهارس بنك مشترك: اللعبة تحمل مصفوفة أعداد صغيرة (بايتان لكل سؤال)
+    بدلاً من نسخة من البنك، والمؤشر هو رقم السؤال الحالي. نفس seed يعطي نفس الترتيب"""
+    order = array('H' if size <= 0x10000 else 'I', range(size))
+    random.Random(None if seed is None else f"{seed}:order").shuffle(order)
+    return order
+
+
+def question_compiler(prompt, answer, hint=None, aliases=None, words=False, extra=None):
+    """دالة تحول سجلاً واحداً (قاموس) إلى Question
+
+    prompt/answer/hint/extra أسماء الحقول في السجل، aliases قاموس إجابة -> إجابات
+    بديلة مقبولة. نفس الدالة تجهز البنك في الذاكرة وسجلات ملف المخزون (games.corpus)
+    """
+    aliases = aliases or {}
+
+    def compile_question(item):
+        text = item[answer]
+        return Question(prompt=item[prompt], answer=text, key=normalize(text),
+                        accepted=accepted_answers(text, aliases.get(text, ()), words),
+                        hint=item.get(hint) if hint else None,
+                        extra=item[extra] if extra else None)
+    return compile_question
+
+
+def compile_bank(items, prompt, answer, **options):
+    """قائمة قواميس -> tuple من Question (الخيارات كما في question_compiler)"""
+    return tuple(map(question_compiler(prompt, answer, **options), items))
+
+
+def category_records(items):
+    """{فئة: {حرف: [إجابات]}} -> سجلات مسطحة لكل (فئة، حرف) لها إجابات"""
+    return [{"category": category, "letter": letter, "answers": list(words)}
+            for category, letters in items.items()
+            for letter, words in letters.items() if words]
+
+
+def compile_category(record):
+    """سجل (فئة، حرف) -> Question: prompt الفئة و extra الحرف و answer كل الإجابات"""
+    words = record["answers"]
+    return Question(prompt=record["category"], answer=tuple(words), key=normalize(words[0]),
+                    accepted=accepted_answers(words[0], words[1:]), hint=None,
+                    extra=record["letter"])
+
+
+def compile_categories(items):
+    return tuple(map(compile_category, category_records(items)))
+
+
+def compile_letter_set(item):
+    """مجموعة تكوين كلمات -> LetterSet"""
+    keys = tuple(normalize_compact(w["word"]) for w in item["words"])
+    return LetterSet(letters=item["letters"],
+                     words=tuple((w["word"], w["hint"]) for w in item["words"]),
+                     keys=keys, accepted=frozenset(keys))
+
+
+def compile_letter_sets(items):
+    return tuple(map(compile_letter_set, items))
+
+
+def answer_key(category, letter):
+    """مفتاح البحث في إجابات (فئة، حرف) - الحرف مطبع (أ و ا نفس المفتاح)"""
+    return f"{category}|{normalize(letter)}"
+
+
+def answer_records(answers):
+    """{فئة: {حرف: [إجابات]}} -> سجل لكل (فئة، حرف مطبع) مع دمج الحروف المتطابقة بعد التطبيع"""
+    merged = {}
+    for category, letters in answers.items():
+        for letter, words in letters.items():
+            record = merged.setdefault(answer_key(category, letter), {
+                "category": category, "letter": normalize(letter), "answers": []})
+            record["answers"].extend(words)
+    return list(merged.values())
+
+
+def record_answer_key(record):
+    return answer_key(record["category"], record["letter"])
+
+
+def compile_answers(record):
+    """سجل إجابات -> (الإجابات للعرض، frozenset مطبعة)"""
+    words = tuple(record["answers"])
+    return words, frozenset(map(normalize, words))
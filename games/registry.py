@@ -0,0 +1,29 @@
+"""
+سجل الألعاب - كل لعبة تسجل نفسها بالأسماء التي تبدأ بها
+"""
+from collections import namedtuple
+from types import MappingProxyType
+
+# game_type: الاسم المحفوظ مع اللعبة النشطة، uses_ai: يُمرر لها إعداد Gemini
+GameSpec = namedtuple('GameSpec', ['game_class', 'game_type', 'aliases', 'uses_ai'])
+
+_games = {}
+GAMES = MappingProxyType(_games)  # alias -> GameSpec (للقراءة فقط)
+
+
+def register_game(game_type, *aliases, uses_ai=False):
+    """مزخرف لتسجيل لعبة: @register_game('ترتيب', 'ترتيب الحروف')"""
+    def decorator(game_class):
+        spec = GameSpec(game_class, game_type, (game_type,) + aliases, uses_ai)
+        for alias in spec.aliases:
+            existing = _games.get(alias)
+            if existing is not None and existing.game_class is not game_class:
+                raise ValueError(f"الاسم {alias} مسجل مسبقاً للعبة {existing.game_type}")
+            _games[alias] = spec
+        return game_class
+    return decorator
+
+
+def game_specs():
+    """الألعاب المسجلة بدون تكرار (بترتيب التسجيل)"""
+    return list(dict.fromkeys(GAMES.values()))
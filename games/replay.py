@@ -0,0 +1,162 @@
+"""
+إعادة تشغيل لعبة بشكل حتمي من سجل رسائل - أساس قياسات الأداء واختبارات الانحدار
+اللعبة تُنشأ بـ seed ثابت وساعة تتبع أوقات السجل، ثم تمر كل رسالة
+(user_id، النص، الوقت) على check_answer كما يفعل التطبيق. البصمة (digest)
+تلخص كل الردود والنقاط: نفس اللعبة ونفس seed ونفس السجل تعطي نفس البصمة
+
+الطريقة:
+    python -m games.replay <نوع اللعبة> [--seed N] [--players N] [--messages N]
+                           [--transcript FILE.jsonl] [--save FILE.jsonl] [--roundtrip]
+"""
+import argparse
+import hashlib
+import json
+import random
+import sys
+import time
+from collections import namedtuple
+
+from .registry import GAMES
+from .state import dump_game, load_game
+
+# رسالة واحدة في السجل: at بالثواني (نفس ساعة اللعبة)
+Message = namedtuple('Message', ['user_id', 'text', 'at'])
+
+# outcomes: (رقم الرسالة، النقاط، انتهت اللعبة، نص الرد) لكل رسالة لها رد
+ReplayResult = namedtuple('ReplayResult', ['digest', 'outcomes', 'latencies', 'game'])
+
+# رسائل لا علاقة لها بالإجابة كما في محادثة مجموعة حقيقية
+NOISE = ("ما أدري", "صعبة", "هههه", "لمح", "ممكن تلميح", "كتاب", "شمس", "؟")
+
+
+class ReplayClock:
+    """ساعة تتقدم فقط بأوقات السجل"""
+
+    __slots__ = ('now',)
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def new_game(game_type, seed, clock):
+    spec = GAMES.get(game_type)
+    if spec is None:
+        raise ValueError(f"لعبة غير معروفة: {game_type}")
+    return spec.game_class(None, seed=seed, clock=clock)
+
+
+def _reply_text(reply):
+    if isinstance(reply, dict):
+        return reply.get('message') or getattr(reply.get('response'), 'text', '') or ''
+    return getattr(reply, 'text', '') or ''
+
+
+def _digest(start_text, outcomes):
+    payload = json.dumps([start_text, outcomes], ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def replay(game_type, seed, transcript, roundtrip=False):
+    """تشغيل السجل على لعبة جديدة - يتوقف عند انتهاء اللعبة كما يحذفها التطبيق
+
+    roundtrip: حفظ اللعبة واستعادتها (بنفس الساعة) قبل كل رسالة كما يفعل مخزن
+    SQLite، فالبصمة يجب أن تطابق التشغيل بدون حفظ
+    """
+    clock = ReplayClock(transcript[0].at if transcript else 0.0)
+    game = new_game(game_type, seed, clock)
+    start_text = _reply_text(game.start_game())
+    outcomes, latencies = [], []
+    for i, message in enumerate(transcript):
+        clock.now = message.at
+        if roundtrip:
+            game = load_game(dump_game(game), clock=clock)
+        started = time.perf_counter()
+        result = game.check_answer(message.text, message.user_id, message.user_id)
+        latencies.append(time.perf_counter() - started)
+        if result:
+            game_over = bool(result.get('game_over'))
+            outcomes.append((i, result.get('points', 0), game_over, _reply_text(result)))
+            if game_over:
+                break
+    return ReplayResult(_digest(start_text, outcomes), outcomes, latencies, game)
+
+
+def _correct_text(game):
+    """إجابة مقبولة للسؤال الحالي إن أمكن معرفتها"""
+    answer = game.current_answer
+    if answer is None and hasattr(game, 'known_answers'):
+        known = game.known_answers()
+        answer = known[0] if known else None
+    while isinstance(answer, (list, tuple)) and answer:
+        answer = answer[0]
+    return answer if isinstance(answer, str) and answer else None
+
+
+def simulate(game_type, seed, players=20, messages=200, correct_ratio=0.3, interval=2.0, start=0.0):
+    """توليد سجل واقعي: لاعبون عشوائيون، بعضهم يجيب صحيحاً والبقية رسائل عادية
+
+    السجل يُولد بلعب نفس اللعبة (نفس seed)، فإعادة تشغيله تمر بنفس الأسئلة.
+    الإجابة الصحيحة من current_answer أو known_answers()، وبدونهما رسائل عادية فقط
+    """
+    rng = random.Random(seed)
+    clock = ReplayClock(start)
+    game = new_game(game_type, seed, clock)
+    game.start_game()
+    users = [f"U{rng.getrandbits(128):032x}" for _ in range(players)]
+    transcript = []
+    for _ in range(messages):
+        clock.now += rng.expovariate(1 / interval)
+        text = _correct_text(game) if rng.random() < correct_ratio else None
+        message = Message(rng.choice(users), text or rng.choice(NOISE), round(clock.now, 3))
+        transcript.append(message)
+        result = game.check_answer(message.text, message.user_id, message.user_id)
+        if result and result.get('game_over'):
+            break
+    return transcript
+
+
+def save_transcript(path, transcript):
+    with open(path, 'w', encoding='utf-8') as f:
+        for message in transcript:
+            f.write(json.dumps(message._asdict(), ensure_ascii=False) + '\n')
+
+
+def load_transcript(path):
+    with open(path, encoding='utf-8') as f:
+        return [Message(**json.loads(line)) for line in f if line.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m games.replay', description="إعادة تشغيل لعبة من سجل رسائل")
+    parser.add_argument('game_type', help="اسم اللعبة كما يكتبه اللاعب (مثل لغز)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--players', type=int, default=20)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--transcript', help="سجل JSONL بدلاً من سجل مولد")
+    parser.add_argument('--save', help="حفظ السجل المستخدم بصيغة JSONL")
+    parser.add_argument('--roundtrip', action='store_true', help="حفظ اللعبة واستعادتها قبل كل رسالة")
+    args = parser.parse_args(argv)
+
+    if args.transcript:
+        transcript = load_transcript(args.transcript)
+    else:
+        transcript = simulate(args.game_type, args.seed, args.players, args.messages)
+    if args.save:
+        save_transcript(args.save, transcript)
+
+    result = replay(args.game_type, args.seed, transcript, args.roundtrip)
+    handled = len(result.latencies)
+    total = sum(result.latencies)
+    p95 = sorted(result.latencies)[int(handled * 0.95)] if handled else 0.0
+    print(f"{args.game_type} seed={args.seed}: {handled} رسالة، {len(result.outcomes)} رد")
+    print(f"digest: {result.digest}")
+    if handled:
+        print(f"متوسط {total / handled * 1e6:.1f} µs، p95 {p95 * 1e6:.1f} µs، {handled / total:,.0f} رسالة/ث")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
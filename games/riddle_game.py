@@ -3,40 +3,47 @@
 """
 from linebot.models import TextSendMessage
 from .base_game import BaseGame
-import random
+from .registry import register_game
+from .corpus import load_bank
+from .question_bank import question_compiler, shuffled_order
 
+# مجموعة ألغاز
+_RIDDLES = [
+    {"q": "ما هو الشيء الذي يخترق الزجاج ولا يكسره؟", "a": "الضوء"},
+    {"q": "له أوراق كثيرة ولكنه ليس شجرة؟", "a": "الكتاب"},
+    {"q": "يسير بلا أقدام ويدخل الأذن؟", "a": "الصوت"},
+    {"q": "ما هو الشيء الذي له أربع أرجل في الصباح، ورجلان في الظهر، وثلاث في المساء؟", "a": "الإنسان"},
+    {"q": "أخت خالك وليست خالتك؟", "a": "أمك"},
+    {"q": "ما هو الشيء الذي يزداد كلما أخذت منه؟", "a": "الحفرة"},
+    {"q": "أسود ولكنه ليس أسود، أحمر ولكنه ليس أحمر، ما هو؟", "a": "البحر الأحمر"},
+    {"q": "يمشي بلا أرجل ويبكي بلا أعين؟", "a": "السحاب"},
+    {"q": "ما هو البيت الذي بلا أبواب ولا نوافذ؟", "a": "بيت الشعر"},
+    {"q": "شيء موجود في القرن مرة وفي الدقيقة مرتين ولا يوجد في الساعة؟", "a": "حرف القاف"},
+    {"q": "ما هو الشيء الذي كلما كبر صغر؟", "a": "الشمعة"},
+    {"q": "له قلب ولا يخفق؟", "a": "قلب الموز"},
+    {"q": "ما هو الشيء الذي تذبحه وتبكي عليه؟", "a": "البصل"},
+    {"q": "أنا ابن الماء، وإن تركوني فيه أموت؟", "a": "الثلج"},
+    {"q": "يكون في أعلى الجبل ومع ذلك في أعماق الوادي؟", "a": "حرف الباء"},
+    {"q": "ما هو الشيء الذي له عيون ولا يرى؟", "a": "الإبرة"},
+    {"q": "في الشتاء خمسة وفي الصيف ثلاثة؟", "a": "النقاط"},
+    {"q": "ما هو الشيء الذي تملكه ويستخدمه الناس أكثر منك؟", "a": "اسمك"},
+    {"q": "له أسنان ولا يعض؟", "a": "المشط"},
+    {"q": "يجري ولا يمشي، ويصب ولا يشرب؟", "a": "النهر"}
+]
 
+RIDDLES = load_bank('riddles', _RIDDLES, question_compiler('q', 'a', words=True))
+
+
+@register_game('لغز')
 class RiddleGame(BaseGame):
     """لعبة الألغاز والأحاجي"""
+
+    __slots__ = ('order',)
     
-    def __init__(self, line_bot_api):
-        super().__init__(line_bot_api, questions_count=10)
+    def __init__(self, line_bot_api, seed=None, clock=None):
+        super().__init__(line_bot_api, questions_count=10, seed=seed, clock=clock)
         
-        # مجموعة ألغاز
-        self.riddles = [
-            {"q": "ما هو الشيء الذي يخترق الزجاج ولا يكسره؟", "a": "الضوء"},
-            {"q": "له أوراق كثيرة ولكنه ليس شجرة؟", "a": "الكتاب"},
-            {"q": "يسير بلا أقدام ويدخل الأذن؟", "a": "الصوت"},
-            {"q": "ما هو الشيء الذي له أربع أرجل في الصباح، ورجلان في الظهر، وثلاث في المساء؟", "a": "الإنسان"},
-            {"q": "أخت خالك وليست خالتك؟", "a": "أمك"},
-            {"q": "ما هو الشيء الذي يزداد كلما أخذت منه؟", "a": "الحفرة"},
-            {"q": "أسود ولكنه ليس أسود، أحمر ولكنه ليس أحمر، ما هو؟", "a": "البحر الأحمر"},
-            {"q": "يمشي بلا أرجل ويبكي بلا أعين؟", "a": "السحاب"},
-            {"q": "ما هو البيت الذي بلا أبواب ولا نوافذ؟", "a": "بيت الشعر"},
-            {"q": "شيء موجود في القرن مرة وفي الدقيقة مرتين ولا يوجد في الساعة؟", "a": "حرف القاف"},
-            {"q": "ما هو الشيء الذي كلما كبر صغر؟", "a": "الشمعة"},
-            {"q": "له قلب ولا يخفق؟", "a": "قلب الموز"},
-            {"q": "ما هو الشيء الذي تذبحه وتبكي عليه؟", "a": "البصل"},
-            {"q": "أنا ابن الماء، وإن تركوني فيه أموت؟", "a": "الثلج"},
-            {"q": "يكون في أعلى الجبل ومع ذلك في أعماق الوادي؟", "a": "حرف الباء"},
-            {"q": "ما هو الشيء الذي له عيون ولا يرى؟", "a": "الإبرة"},
-            {"q": "في الشتاء خمسة وفي الصيف ثلاثة؟", "a": "النقاط"},
-            {"q": "ما هو الشيء الذي تملكه ويستخدمه الناس أكثر منك؟", "a": "اسمك"},
-            {"q": "له أسنان ولا يعض؟", "a": "المشط"},
-            {"q": "يجري ولا يمشي، ويصب ولا يشرب؟", "a": "النهر"}
-        ]
-        
-        random.shuffle(self.riddles)
+        self.order = shuffled_order(len(RIDDLES), self.seed)
     
     def start_game(self):
         """بدء اللعبة"""
@@ -45,11 +52,12 @@ class RiddleGame(BaseGame):
     
     def get_question(self):
         """الحصول على اللغز الحالي"""
-        riddle_data = self.riddles[self.current_question % len(self.riddles)]
-        self.current_answer = riddle_data["a"]
+        riddle = RIDDLES[self.order[self.current_question % len(self.order)]]
+        self.current_entry = riddle
+        self.current_answer = riddle.answer
         
         message = f"🤔 لغز ({self.current_question + 1}/{self.questions_count})\n\n"
-        message += f"❓ {riddle_data['q']}\n\n"
+        message += f"❓ {riddle.prompt}\n\n"
         message += "💡 اكتب الإجابة أو:\n"
         message += "• لمح - للحصول على تلميح\n"
         message += "• جاوب - لعرض الإجابة"
@@ -89,10 +97,7 @@ class RiddleGame(BaseGame):
             }
         
         # فحص الإجابة
-        normalized_answer = self.normalize_text(user_answer)
-        normalized_correct = self.normalize_text(self.current_answer)
-        
-        if normalized_answer == normalized_correct or normalized_answer in normalized_correct:
+        if self.is_accepted(user_answer):
             points = self.add_score(user_id, display_name, 10)
             
             # الانتقال للسؤال التالي
@@ -3,40 +3,47 @@
 """
 from linebot.models import TextSendMessage
 from .base_game import BaseGame
-import random
+from .registry import register_game
+from .corpus import load_bank
+from .question_bank import question_compiler, shuffled_order
 
+# كلمات مع تلميحات
+_WORDS = [
+    {"word": "مدرسة", "hint": "مكان للتعليم"},
+    {"word": "كتاب", "hint": "نقرأ فيه"},
+    {"word": "حاسوب", "hint": "جهاز إلكتروني"},
+    {"word": "هاتف", "hint": "نستخدمه للاتصال"},
+    {"word": "مطبخ", "hint": "نطبخ فيه"},
+    {"word": "سيارة", "hint": "وسيلة مواصلات"},
+    {"word": "طائرة", "hint": "تطير في السماء"},
+    {"word": "حديقة", "hint": "مكان فيه أشجار وزهور"},
+    {"word": "مستشفى", "hint": "نذهب إليه عند المرض"},
+    {"word": "مكتبة", "hint": "مكان للكتب"},
+    {"word": "قلم", "hint": "نكتب به"},
+    {"word": "دفتر", "hint": "نكتب عليه"},
+    {"word": "معلم", "hint": "يعلم الطلاب"},
+    {"word": "طالب", "hint": "يدرس في المدرسة"},
+    {"word": "طبيب", "hint": "يعالج المرضى"},
+    {"word": "شرطي", "hint": "يحمي الأمن"},
+    {"word": "مهندس", "hint": "يصمم المباني"},
+    {"word": "محامي", "hint": "يدافع عن الحقوق"},
+    {"word": "صحفي", "hint": "يكتب الأخبار"},
+    {"word": "رياضي", "hint": "يمارس الرياضة"}
+]
 
+WORDS = load_bank('scramble_words', _WORDS, question_compiler('word', 'word', hint='hint'))
+
+
+@register_game('ترتيب', 'ترتيب الحروف')
 class ScrambleWordGame(BaseGame):
     """لعبة ترتيب الحروف"""
+
+    __slots__ = ('order', 'current_hint')
     
-    def __init__(self, line_bot_api):
-        super().__init__(line_bot_api, questions_count=10)
+    def __init__(self, line_bot_api, seed=None, clock=None):
+        super().__init__(line_bot_api, questions_count=10, seed=seed, clock=clock)
         
-        # كلمات مع تلميحات
-        self.words = [
-            {"word": "مدرسة", "hint": "مكان للتعليم"},
-            {"word": "كتاب", "hint": "نقرأ فيه"},
-            {"word": "حاسوب", "hint": "جهاز إلكتروني"},
-            {"word": "هاتف", "hint": "نستخدمه للاتصال"},
-            {"word": "مطبخ", "hint": "نطبخ فيه"},
-            {"word": "سيارة", "hint": "وسيلة مواصلات"},
-            {"word": "طائرة", "hint": "تطير في السماء"},
-            {"word": "حديقة", "hint": "مكان فيه أشجار وزهور"},
-            {"word": "مستشفى", "hint": "نذهب إليه عند المرض"},
-            {"word": "مكتبة", "hint": "مكان للكتب"},
-            {"word": "قلم", "hint": "نكتب به"},
-            {"word": "دفتر", "hint": "نكتب عليه"},
-            {"word": "معلم", "hint": "يعلم الطلاب"},
-            {"word": "طالب", "hint": "يدرس في المدرسة"},
-            {"word": "طبيب", "hint": "يعالج المرضى"},
-            {"word": "شرطي", "hint": "يحمي الأمن"},
-            {"word": "مهندس", "hint": "يصمم المباني"},
-            {"word": "محامي", "hint": "يدافع عن الحقوق"},
-            {"word": "صحفي", "hint": "يكتب الأخبار"},
-            {"word": "رياضي", "hint": "يمارس الرياضة"}
-        ]
-        
-        random.shuffle(self.words)
+        self.order = shuffled_order(len(WORDS), self.seed)
         self.current_hint = ""  # لحفظ التلميح الحالي
     
     def scramble_word(self, word):
@@ -45,9 +52,10 @@ class ScrambleWordGame(BaseGame):
         scrambled = letters.copy()
         
         # التأكد من أن الكلمة مخلوطة فعلاً
+        rng = self.round_rng()
         max_attempts = 10
         while scrambled == letters and max_attempts > 0:
-            random.shuffle(scrambled)
+            rng.shuffle(scrambled)
             max_attempts -= 1
         
         return ''.join(scrambled)
@@ -59,12 +67,12 @@ class ScrambleWordGame(BaseGame):
     
     def get_question(self):
         """الحصول على الكلمة المخلوطة"""
-        word_data = self.words[self.current_question % len(self.words)]
-        word = word_data["word"]
-        hint = word_data["hint"]
+        entry = WORDS[self.order[self.current_question % len(self.order)]]
+        word = entry.answer
         
+        self.current_entry = entry
         self.current_answer = word
-        self.current_hint = hint  # حفظ التلميح
+        self.current_hint = entry.hint  # حفظ التلميح
         scrambled = self.scramble_word(word)
         
         message = f"رتب الحروف ({self.current_question + 1}/{self.questions_count})\n\n"
@@ -108,10 +116,7 @@ class ScrambleWordGame(BaseGame):
             }
         
         # فحص الإجابة
-        normalized_answer = self.normalize_text(user_answer)
-        normalized_correct = self.normalize_text(self.current_answer)
-        
-        if normalized_answer == normalized_correct:
+        if self.is_accepted(user_answer):
             points = self.add_score(user_id, display_name, 10)
             
             # الانتقال للسؤال التالي
@@ -3,166 +3,181 @@
 """
 from linebot.models import TextSendMessage
 from .base_game import BaseGame
-import random
+from .registry import register_game
+from .corpus import load_bank
+from .question_bank import question_compiler, shuffled_order
 
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# ❗ قائمة الأغاني الجديدة فقط
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+_SONGS = [
+    {
+        "artist": "أم كلثوم",
+        "title": "أيام الماضي",
+        "lyrics": "رجعت لي أيام الماضي معاك",
+        "nationality": "مصرية"
+    },
+    {
+        "artist": "عبد الحليم حافظ",
+        "title": "الخوف بعينيها",
+        "lyrics": "جلست والخوف بعينيها تتأمل فنجاني",
+        "nationality": "مصري"
+    },
+    {
+        "artist": "عمرو دياب",
+        "title": "تملي معاك",
+        "lyrics": "تملي معاك ولو حتى بعيد عني",
+        "nationality": "مصري"
+    },
+    {
+        "artist": "نانسي عجرم",
+        "title": "يا بنات",
+        "lyrics": "يا بنات يا بنات",
+        "nationality": "لبنانية"
+    },
+    {
+        "artist": "كاظم الساهر",
+        "title": "قولي أحبك",
+        "lyrics": "قولي أحبك كي تزيد وسامتي",
+        "nationality": "عراقي"
+    },
+    {
+        "artist": "فيروز",
+        "title": "أنا لحبيبي",
+        "lyrics": "أنا لحبيبي وحبيبي إلي",
+        "nationality": "لبنانية"
+    },
+    {
+        "artist": "تامر حسني",
+        "title": "كل الحياة",
+        "lyrics": "حبيبي يا كل الحياة اوعدني تبقى معايا",
+        "nationality": "مصري"
+    },
+    {
+        "artist": "وائل كفوري",
+        "title": "قلبي بيسألني",
+        "lyrics": "قلبي بيسألني عنك دخلك طمني وينك",
+        "nationality": "لبناني"
+    },
+    {
+        "artist": "عايض",
+        "title": "كيف أبين لك",
+        "lyrics": "كيف أبيّن لك شعوري دون ما أحكي\nخابرك لمّاح لكن مالمحته\nلاتغرّك كثرة مزوحي وضحكي\nوالله إن قلبي لغيرك ما فتحته",
+        "nationality": "سعودي"
+    },
+    {
+        "artist": "عايض",
+        "title": "اسخر لك غلا",
+        "lyrics": "اسخر لك غلا وتشوفني مقصر\nمعاك الحق ..\nوش الي يملي عيونك\nأنا ما عيش من دونك\nأحد ربي يجيبه لك حبيب\nويقدر يخونك",
+        "nationality": "سعودي"
+    },
+    {
+        "artist": "عبدالمجيد عبدالله",
+        "title": "رحت عني",
+        "lyrics": "رحت عني ما قويت جيت لك لاتردني",
+        "nationality": "سعودي"
+    },
+    {
+        "artist": "عبادي الجوهر",
+        "title": "خذني من ليلي",
+        "lyrics": "خذني من ليلي لليلك",
+        "nationality": "سعودي"
+    },
+    {
+        "artist": "راشد الماجد",
+        "title": "مخنوق",
+        "lyrics": "تدري كثر ماني من البعد مخنوق",
+        "nationality": "سعودي"
+    },
+    {
+        "artist": "عباس ابراهيم",
+        "title": "انسى هالعالم",
+        "lyrics": "انسى هالعالم ولو هم يزعلون",
+        "nationality": "سعودي"
+    },
+    {
+        "artist": "حسين الجسمي",
+        "title": "أنا عندي قلب واحد",
+        "lyrics": "أنا عندي قلب واحد",
+        "nationality": "إماراتي"
+    },
+    {
+        "artist": "محمد عبده",
+        "title": "منوتي ليتك معي",
+        "lyrics": "منوتي ليتك معي",
+        "nationality": "سعودي"
+    },
+    {
+        "artist": "نوال الكويتية",
+        "title": "خلنا مني",
+        "lyrics": "خلنا مني طمني عليك",
+        "nationality": "كويتية"
+    },
+    {
+        "artist": "عبدالمجيد عبدالله",
+        "title": "أحبك ليه",
+        "lyrics": "أحبك ليه أنا مدري",
+        "nationality": "سعودي"
+    },
+    {
+        "artist": "ماجد المهندس",
+        "title": "أمر الله أقوى",
+        "lyrics": "أمر الله أقوى أحبك والعقل واعي",
+        "nationality": "عراقي"
+    },
+    {
+        "artist": "راشد الماجد",
+        "title": "الحب يتعب",
+        "lyrics": "الحب يتعب من يدله والله في حبه بلاني",
+        "nationality": "سعودي"
+    },
+    {
+        "artist": "وليد الشامي",
+        "title": "شغل عقلي",
+        "lyrics": "محد غيرك شغل عقلي شغل بالي",
+        "nationality": "عراقي"
+    },
+    {
+        "artist": "أصاله نصري",
+        "title": "مر الحقيقة",
+        "lyrics": "نكتشف مر الحقيقة بعد ما يفوت الأوان",
+        "nationality": "سورية"
+    },
+    {
+        "artist": "أميمة طالب",
+        "title": "اخباري تمام",
+        "lyrics": "يا هي توجع كذبة اخباري تمام",
+        "nationality": "سعودية"
+    },
+    {
+        "artist": "عبدالمجيد عبدالله",
+        "title": "لقيتك عشان تضيع",
+        "lyrics": "احس اني لقيتك بس عشان تضيع مني",
+        "nationality": "سعودي"
+    },
+]
 
+
+def _nationality_hint(song):
+    gender = "مغني" if song["nationality"] not in ["لبنانية", "سورية", "كويتية", "سعودية"] else "مغنية"
+    return f"💡 تلميح: {gender} {song['nationality']}"
+
+
+# التلميح مجهز مسبقاً و extra هو اسم الأغنية
+SONGS = load_bank('songs', [dict(song, hint=_nationality_hint(song)) for song in _SONGS],
+                  question_compiler('lyrics', 'artist', hint='hint', words=True, extra='title'))
+
+
+@register_game('أغنية')
 class SongGame(BaseGame):
     """لعبة تخمين المغني"""
+
+    __slots__ = ('order',)
     
-    def __init__(self, line_bot_api):
-        super().__init__(line_bot_api, questions_count=10)
+    def __init__(self, line_bot_api, seed=None, clock=None):
+        super().__init__(line_bot_api, questions_count=10, seed=seed, clock=clock)
         
-        # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-        # ❗ قائمة الأغاني الجديدة فقط
-        # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-        self.songs = [
-            {
-                "artist": "أم كلثوم",
-                "title": "أيام الماضي",
-                "lyrics": "رجعت لي أيام الماضي معاك",
-                "nationality": "مصرية"
-            },
-            {
-                "artist": "عبد الحليم حافظ",
-                "title": "الخوف بعينيها",
-                "lyrics": "جلست والخوف بعينيها تتأمل فنجاني",
-                "nationality": "مصري"
-            },
-            {
-                "artist": "عمرو دياب",
-                "title": "تملي معاك",
-                "lyrics": "تملي معاك ولو حتى بعيد عني",
-                "nationality": "مصري"
-            },
-            {
-                "artist": "نانسي عجرم",
-                "title": "يا بنات",
-                "lyrics": "يا بنات يا بنات",
-                "nationality": "لبنانية"
-            },
-            {
-                "artist": "كاظم الساهر",
-                "title": "قولي أحبك",
-                "lyrics": "قولي أحبك كي تزيد وسامتي",
-                "nationality": "عراقي"
-            },
-            {
-                "artist": "فيروز",
-                "title": "أنا لحبيبي",
-                "lyrics": "أنا لحبيبي وحبيبي إلي",
-                "nationality": "لبنانية"
-            },
-            {
-                "artist": "تامر حسني",
-                "title": "كل الحياة",
-                "lyrics": "حبيبي يا كل الحياة اوعدني تبقى معايا",
-                "nationality": "مصري"
-            },
-            {
-                "artist": "وائل كفوري",
-                "title": "قلبي بيسألني",
-                "lyrics": "قلبي بيسألني عنك دخلك طمني وينك",
-                "nationality": "لبناني"
-            },
-            {
-                "artist": "عايض",
-                "title": "كيف أبين لك",
-                "lyrics": "كيف أبيّن لك شعوري دون ما أحكي\nخابرك لمّاح لكن مالمحته\nلاتغرّك كثرة مزوحي وضحكي\nوالله إن قلبي لغيرك ما فتحته",
-                "nationality": "سعودي"
-            },
-            {
-                "artist": "عايض",
-                "title": "اسخر لك غلا",
-                "lyrics": "اسخر لك غلا وتشوفني مقصر\nمعاك الحق ..\nوش الي يملي عيونك\nأنا ما عيش من دونك\nأحد ربي يجيبه لك حبيب\nويقدر يخونك",
-                "nationality": "سعودي"
-            },
-            {
-                "artist": "عبدالمجيد عبدالله",
-                "title": "رحت عني",
-                "lyrics": "رحت عني ما قويت جيت لك لاتردني",
-                "nationality": "سعودي"
-            },
-            {
-                "artist": "عبادي الجوهر",
-                "title": "خذني من ليلي",
-                "lyrics": "خذني من ليلي لليلك",
-                "nationality": "سعودي"
-            },
-            {
-                "artist": "راشد الماجد",
-                "title": "مخنوق",
-                "lyrics": "تدري كثر ماني من البعد مخنوق",
-                "nationality": "سعودي"
-            },
-            {
-                "artist": "عباس ابراهيم",
-                "title": "انسى هالعالم",
-                "lyrics": "انسى هالعالم ولو هم يزعلون",
-                "nationality": "سعودي"
-            },
-            {
-                "artist": "حسين الجسمي",
-                "title": "أنا عندي قلب واحد",
-                "lyrics": "أنا عندي قلب واحد",
-                "nationality": "إماراتي"
-            },
-            {
-                "artist": "محمد عبده",
-                "title": "منوتي ليتك معي",
-                "lyrics": "منوتي ليتك معي",
-                "nationality": "سعودي"
-            },
-            {
-                "artist": "نوال الكويتية",
-                "title": "خلنا مني",
-                "lyrics": "خلنا مني طمني عليك",
-                "nationality": "كويتية"
-            },
-            {
-                "artist": "عبدالمجيد عبدالله",
-                "title": "أحبك ليه",
-                "lyrics": "أحبك ليه أنا مدري",
-                "nationality": "سعودي"
-            },
-            {
-                "artist": "ماجد المهندس",
-                "title": "أمر الله أقوى",
-                "lyrics": "أمر الله أقوى أحبك والعقل واعي",
-                "nationality": "عراقي"
-            },
-            {
-                "artist": "راشد الماجد",
-                "title": "الحب يتعب",
-                "lyrics": "الحب يتعب من يدله والله في حبه بلاني",
-                "nationality": "سعودي"
-            },
-            {
-                "artist": "وليد الشامي",
-                "title": "شغل عقلي",
-                "lyrics": "محد غيرك شغل عقلي شغل بالي",
-                "nationality": "عراقي"
-            },
-            {
-                "artist": "أصاله نصري",
-                "title": "مر الحقيقة",
-                "lyrics": "نكتشف مر الحقيقة بعد ما يفوت الأوان",
-                "nationality": "سورية"
-            },
-            {
-                "artist": "أميمة طالب",
-                "title": "اخباري تمام",
-                "lyrics": "يا هي توجع كذبة اخباري تمام",
-                "nationality": "سعودية"
-            },
-            {
-                "artist": "عبدالمجيد عبدالله",
-                "title": "لقيتك عشان تضيع",
-                "lyrics": "احس اني لقيتك بس عشان تضيع مني",
-                "nationality": "سعودي"
-            },
-        ]
-        
-        random.shuffle(self.songs)
+        self.order = shuffled_order(len(SONGS), self.seed)
     
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     # نفس دوال اللعبة بدون تغيير
@@ -173,11 +188,12 @@ class SongGame(BaseGame):
         return self.get_question()
     
     def get_question(self):
-        song = self.songs[self.current_question % len(self.songs)]
-        self.current_answer = song["artist"]
+        song = SONGS[self.order[self.current_question % len(self.order)]]
+        self.current_entry = song
+        self.current_answer = song.answer
         
         message = f"من كلمات الأغنية:\n\n"
-        message += f"« {song['lyrics']} »\n\n"
+        message += f"« {song.prompt} »\n\n"
         message += f"━━━━━━━━━━━━━━━\n"
         message += f"خمن اسم المغني ({self.current_question + 1}/{self.questions_count})\n\n"
         message += "اكتب اسم المغني أو:\n"
@@ -187,9 +203,7 @@ class SongGame(BaseGame):
         return TextSendMessage(text=message)
     
     def get_hint(self):
-        song = self.songs[self.current_question % len(self.songs)]
-        gender = "مغني" if song["nationality"] not in ["لبنانية", "سورية", "كويتية", "سعودية"] else "مغنية"
-        return f"💡 تلميح: {gender} {song['nationality']}"
+        return self.current_entry.hint
     
     def check_answer(self, user_answer, user_id, display_name):
         if not self.game_active:
@@ -207,8 +221,8 @@ class SongGame(BaseGame):
             }
         
         if user_answer == 'جاوب':
-            song = self.songs[self.current_question % len(self.songs)]
-            reveal = f"المغني: {song['artist']}\nالأغنية: {song['title']}"
+            song = self.current_entry
+            reveal = f"المغني: {song.answer}\nالأغنية: {song.extra}"
             next_q = self.next_question()
             
             if isinstance(next_q, dict) and next_q.get('game_over'):
@@ -222,11 +236,11 @@ class SongGame(BaseGame):
             }
         
         normalized_answer = self.normalize_text(user_answer)
-        normalized_correct = self.normalize_text(self.current_answer)
+        song = self.current_entry
         
-        if normalized_correct in normalized_answer or normalized_answer in normalized_correct:
+        # اسم المغني كاملاً داخل الرسالة مقبول أيضاً ("هي فيروز")
+        if normalized_answer in song.accepted or song.key in normalized_answer:
             points = self.add_score(user_id, display_name, 10)
-            song = self.songs[self.current_question % len(self.songs)]
             next_q = self.next_question()
             
             if isinstance(next_q, dict) and next_q.get('game_over'):
@@ -235,8 +249,8 @@ class SongGame(BaseGame):
             
             message = (
                 f"إجابة صحيحة يا {display_name}\n\n"
-                f"المغني: {song['artist']}\n"
-                f"الأغنية: {song['title']}\n"
+                f"المغني: {song.answer}\n"
+                f"الأغنية: {song.extra}\n"
                 f"+{points} نقطة\n\n"
             )
             if hasattr(next_q, 'text'):
@@ -244,8 +258,8 @@ class SongGame(BaseGame):
             
             return {
                 'message': message,
-                'response": TextSendMessage(text=message),
-                'points": points
+                'response': TextSendMessage(text=message),
+                'points': points
             }
         
         return None
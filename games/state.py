@@ -0,0 +1,294 @@
+"""
+حالة اللعبة المضغوطة ولقطاتها (snapshot)
+النقاط في مصفوفة أعداد مع جدول لاعبين بأرقام صغيرة، ولقطة اللعبة تُرمّز
+إلى كتلة ثنائية صغيرة (JSON موسوم + zlib) بدلاً من pickle للكائن كاملاً،
+فيمكن إخراج اللعبة من الذاكرة وإعادتها عند الرسالة التالية. سجل المخزن كاملاً
+(النوع، المشاركون، الأوقات + اللقطة) بنفس الترميز عبر dump_record. الصيغة لا تتغير
+مع إصدار Python، وبايت الإصدار في الرأس للترحيل عند تغيير شكل الحقول
+"""
+import base64
+import json
+import sys
+import zlib
+from array import array
+from datetime import datetime
+
+from .question_bank import Question, LetterSet
+
+MAGIC = b'GS'
+RECORD_MAGIC = b'GR'
+VERSION = 5
+
+# اسم الفئة -> فئة اللعبة (تُسجل تلقائياً من BaseGame.__init_subclass__)
+_classes = {}
+
+
+def register_class(game_class):
+    _classes[game_class.__name__] = game_class
+    return game_class
+
+
+class Scoreboard:
+    """نقاط اللاعبين بمفتاح user_id: كل لاعب يأخذ رقماً صغيراً ثابتاً والنقاط في array،
+    وأسماء العرض في جدول موازٍ يتحدث مع كل نقطة (لاعبان بنفس الاسم لا يندمجان)
+
+    أعلى top_k لاعبين مرتبون ويُحدَّثون مع كل إضافة، فالنتائج والترتيب المباشر
+    O(k) بدون فرز كل اللاعبين. version يزيد مع كل إضافة (لذاكرة الترتيب المبني).
+    واجهة قاموس للقراءة: scores[user_id]، items()، len
+    """
+
+    __slots__ = ('players', 'names', '_index', 'points', 'top_k', '_top', 'version')
+
+    def __init__(self, players=(), names=(), points=(), top_k=5, top=None, version=0):
+        self.players = [sys.intern(player) for player in players]
+        self.names = [sys.intern(name) for name in names]
+        self._index = {player: i for i, player in enumerate(self.players)}
+        self.points = points if isinstance(points, array) else array('i', points)
+        self.top_k = top_k
+        if top is None:
+            top = sorted(range(len(self.players)), key=self._rank)[:top_k]
+        self._top = list(top)
+        self.version = version
+
+    def _rank(self, i):
+        """ترتيب اللاعب: النقاط تنازلياً ثم الأسبق تسجيلاً (نفس نتيجة الفرز الكامل)"""
+        return -self.points[i], i
+
+    def slot(self, player, name=None):
+        """رقم اللاعب (يُضاف إذا كان جديداً) مع تحديث اسمه إذا تغير"""
+        i = self._index.get(player)
+        if i is None:
+            i = len(self.players)
+            player = sys.intern(player)
+            self.players.append(player)
+            self.names.append(sys.intern(name or player))
+            self._index[player] = i
+            self.points.append(0)
+        elif name and name != self.names[i]:
+            self.names[i] = sys.intern(name)
+        return i
+
+    def add(self, player, points, name=None):
+        """إضافة نقاط وإرجاع المجموع الجديد - تحديث أعلى k فقط"""
+        i = self.slot(player, name)
+        self.points[i] += points
+        self.version += 1
+        top = self._top
+        if points < 0:
+            # النقاط تزيد فقط في الألعاب، والخصم يعيد الترتيب كاملاً
+            self._top = sorted(range(len(self.players)), key=self._rank)[:self.top_k]
+        elif i in top:
+            top.sort(key=self._rank)
+        elif len(top) < self.top_k or self._rank(i) < self._rank(top[-1]):
+            top.append(i)
+            top.sort(key=self._rank)
+            del top[self.top_k:]
+        return self.points[i]
+
+    def top(self, k=None, names=None):
+        """أعلى k لاعبين [(user_id, الاسم، النقاط)]
+
+        names(user_id) اختياري يعيد أحدث اسم معروف (مثل profile_cache.peek) أو None
+        """
+        k = self.top_k if k is None else k
+        slots = self._top[:k] if k <= self.top_k else sorted(range(len(self.players)), key=self._rank)[:k]
+        result = []
+        for i in slots:
+            player = self.players[i]
+            name = names(player) if names else None
+            if name and name != self.names[i]:
+                self.names[i] = sys.intern(name)
+            result.append((player, self.names[i], self.points[i]))
+        return result
+
+    def name(self, player):
+        i = self._index.get(player)
+        return None if i is None else self.names[i]
+
+    def __getitem__(self, player):
+        i = self._index.get(player)
+        return 0 if i is None else self.points[i]
+
+    def get(self, player, default=None):
+        i = self._index.get(player)
+        return default if i is None else self.points[i]
+
+    def __contains__(self, player):
+        return player in self._index
+
+    def __len__(self):
+        return len(self.players)
+
+    def __iter__(self):
+        return iter(self.players)
+
+    def items(self):
+        return list(zip(self.players, self.points))
+
+    def __eq__(self, other):
+        if not isinstance(other, Scoreboard):
+            return NotImplemented
+        return (self.players == other.players and self.names == other.names
+                and self.points == other.points)
+
+    def snapshot(self):
+        return (tuple(self.players), tuple(self.names), self.points.tobytes(), self.top_k,
+                tuple(self._top), self.version)
+
+    @classmethod
+    def from_snapshot(cls, data):
+        players, names, points, top_k, top, version = data
+        return cls(players, names, _array('i', points), top_k, top, version)
+
+
+# أنواع الحقول غير البسيطة: النوع -> (وسم، ترميز، فك)
+_CODECS = {
+    array: ('a', lambda v: (v.typecode, v.tobytes()), lambda d: _array(*d)),
+    Question: ('q', tuple, lambda d: Question(*d)),
+    LetterSet: ('l', tuple, lambda d: LetterSet(*d)),
+    Scoreboard: ('s', Scoreboard.snapshot, Scoreboard.from_snapshot),
+}
+_DECODERS = {tag: decode for tag, _encode, decode in _CODECS.values()}
+
+
+def _array(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    return values
+
+
+def _to_json(value):
+    """قيمة بسيطة -> JSON بدون فقد النوع: القوائم والنصوص والأعداد كما هي،
+    وtuple/set/dict/bytes/datetime كائنات موسومة {"t"|"s"|"d"|"b"|"dt": ...}
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        return [_to_json(item) for item in value]
+    if isinstance(value, tuple):
+        return {'t': [_to_json(item) for item in value]}
+    if isinstance(value, (set, frozenset)):
+        items = [_to_json(item) for item in value]
+        try:
+            items.sort()  # نفس الحالة -> نفس البايتات
+        except TypeError:
+            items.sort(key=repr)
+        return {'s': items}
+    if isinstance(value, dict):
+        return {'d': [[_to_json(key), _to_json(item)] for key, item in value.items()]}
+    if isinstance(value, (bytes, bytearray)):
+        return {'b': base64.b64encode(value).decode('ascii')}
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    raise TypeError(f"نوع غير مدعوم في اللقطة: {type(value).__name__}")
+
+
+def _from_json(value):
+    if isinstance(value, list):
+        return [_from_json(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    (tag, data), = value.items()
+    if tag == 't':
+        return tuple(_from_json(item) for item in data)
+    if tag == 's':
+        return {_from_json(item) for item in data}
+    if tag == 'd':
+        return {_from_json(key): _from_json(item) for key, item in data}
+    if tag == 'b':
+        return base64.b64decode(data)
+    if tag == 'dt':
+        return datetime.fromisoformat(data)
+    raise ValueError(f"وسم غير معروف في اللقطة: {tag}")
+
+
+def _encode_fields(class_name, fields):
+    """{حقل: قيمة} -> كائن JSON للقطة (بدون ضغط)"""
+    plain, tags = {}, {}
+    for name, value in fields.items():
+        codec = _CODECS.get(type(value))
+        if codec is not None:
+            tag, encode, _decode = codec
+            tags[name] = tag
+            value = encode(value)
+        plain[name] = value
+    try:
+        return {'class': class_name, 'fields': {name: _to_json(value) for name, value in plain.items()},
+                'tags': tags}
+    except TypeError as e:
+        raise TypeError(f"حالة {class_name} تحوي قيمة غير قابلة للترميز: {e}")
+
+
+def _decode_fields(payload):
+    """كائن JSON للقطة -> (اسم الفئة، {حقل: قيمة})"""
+    class_name, tags = payload['class'], payload['tags']
+    fields = {name: _from_json(value) for name, value in payload['fields'].items()}
+    for name, tag in tags.items():
+        fields[name] = _DECODERS[tag](fields[name])
+    return class_name, fields
+
+
+def _pack(magic, payload):
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return magic + bytes((VERSION,)) + zlib.compress(data)
+
+
+def _unpack(magic, blob, what):
+    if blob[:2] != magic or blob[2] != VERSION:
+        raise ValueError(f"{what} بصيغة غير مدعومة: {bytes(blob[:3])!r}")
+    return json.loads(zlib.decompress(blob[3:]).decode('utf-8'))
+
+
+def encode_snapshot(class_name, fields):
+    """لقطة {حقل: قيمة} -> bytes
+
+    القيم البسيطة (أعداد، نصوص، tuple/list/set/dict منها) تُكتب كما هي،
+    وأنواع _CODECS تُحوَّل مع وسم باسم الحقل
+    """
+    return _pack(MAGIC, _encode_fields(class_name, fields))
+
+
+def decode_snapshot(blob):
+    """bytes -> (اسم الفئة، {حقل: قيمة})"""
+    return _decode_fields(_unpack(MAGIC, blob, "لقطة لعبة"))
+
+
+def dump_game(game):
+    """لعبة -> كتلة ثنائية للتخزين"""
+    return encode_snapshot(type(game).__name__, game.snapshot())
+
+
+def load_game(blob, line_bot_api=None, clock=None):
+    """كتلة ثنائية -> لعبة جديدة مربوطة بواجهة LINE والساعة (time.time افتراضياً)"""
+    return _restore_game(*decode_snapshot(blob), line_bot_api, clock)
+
+
+def _restore_game(class_name, fields, line_bot_api, clock):
+    game_class = _classes.get(class_name)
+    if game_class is None:
+        raise ValueError(f"نوع لعبة غير معروف في اللقطة: {class_name}")
+    game = game_class.__new__(game_class)
+    game.restore(fields, line_bot_api, clock)
+    return game
+
+
+def dump_record(record):
+    """سجل لعبة {type, game, participants, ...} -> bytes
+
+    كل السجل في JSON موسوم واحد واللعبة لقطة داخله. المفاتيح والمجموعات
+    مرتبة، فنفس الحالة تعطي نفس البايتات (المخزن يتخطى الكتابة بدون تغيير)
+    """
+    game = record.get('game')
+    return _pack(RECORD_MAGIC, {
+        'record': [[key, _to_json(record[key])] for key in sorted(record) if key != 'game'],
+        'game': None if game is None else _encode_fields(type(game).__name__, game.snapshot()),
+    })
+
+
+def load_record(blob, line_bot_api=None, clock=None):
+    """bytes -> سجل اللعبة مع إعادة بناء اللعبة مربوطة بواجهة LINE والساعة"""
+    payload = _unpack(RECORD_MAGIC, blob, "سجل لعبة")
+    record = {key: _from_json(value) for key, value in payload['record']}
+    if payload['game'] is not None:
+        record['game'] = _restore_game(*_decode_fields(payload['game']), line_bot_api, clock)
+    return record
@@ -3,29 +3,35 @@
 """
 from linebot.models import TextSendMessage
 from .base_game import BaseGame
-import random
+from .registry import register_game
+from .question_bank import compile_bank
 
+# قائمة الألوان
+_COLORS = {
+    "أحمر": "🔴",
+    "أزرق": "🔵",
+    "أخضر": "🟢",
+    "أصفر": "🟡",
+    "برتقالي": "🟠",
+    "أرجواني": "🟣",
+    "بني": "🟤",
+    "أسود": "⚫",
+    "أبيض": "⚪"
+}
 
+# prompt الدائرة و answer اسم اللون
+COLORS = compile_bank([{"name": name, "circle": circle} for name, circle in _COLORS.items()],
+                      'circle', 'name')
+
+
+@register_game('كلمة ولون', 'لون', uses_ai=True)
 class WordColorGame(BaseGame):
     """لعبة الكلمة واللون"""
+
+    __slots__ = ()
     
-    def __init__(self, line_bot_api, use_ai=False, get_api_key=None, switch_key=None):
-        super().__init__(line_bot_api, questions_count=10)
-        
-        # قائمة الألوان
-        self.colors = {
-            "أحمر": "🔴",
-            "أزرق": "🔵",
-            "أخضر": "🟢",
-            "أصفر": "🟡",
-            "برتقالي": "🟠",
-            "أرجواني": "🟣",
-            "بني": "🟤",
-            "أسود": "⚫",
-            "أبيض": "⚪"
-        }
-        
-        self.color_names = list(self.colors.keys())
+    def __init__(self, line_bot_api, use_ai=False, get_api_key=None, switch_key=None, seed=None, clock=None):
+        super().__init__(line_bot_api, questions_count=10, seed=seed, clock=clock)
     
     def start_game(self):
         """بدء اللعبة"""
@@ -35,20 +41,22 @@ class WordColorGame(BaseGame):
     def get_question(self):
         """الحصول على السؤال الحالي"""
         # اختيار كلمة ولون مختلف
-        word_color = random.choice(self.color_names)
-        display_color = random.choice(self.color_names)
+        rng = self.round_rng()
+        word_color = rng.choice(COLORS)
+        display_color = rng.choice(COLORS)
         
         # في بعض الأحيان يكونان متطابقين
-        if random.random() < 0.3:
+        if rng.random() < 0.3:
             display_color = word_color
         
-        self.current_answer = display_color
+        self.current_entry = display_color
+        self.current_answer = display_color.answer
         
-        color_emoji = self.colors[display_color]
+        color_emoji = display_color.prompt
         
         message = f"🎨 كلمة ولون ({self.current_question + 1}/{self.questions_count})\n\n"
         message += f"❓ ما لون الدائرة؟\n\n"
-        message += f"الكلمة: {word_color}\n"
+        message += f"الكلمة: {word_color.answer}\n"
         message += f"الدائرة: {color_emoji}\n\n"
         message += "💡 اكتب لون الدائرة وليس الكلمة!"
         
@@ -79,10 +87,7 @@ class WordColorGame(BaseGame):
             }
         
         # فحص الإجابة
-        normalized_answer = self.normalize_text(user_answer)
-        normalized_correct = self.normalize_text(self.current_answer)
-        
-        if normalized_answer == normalized_correct:
+        if self.is_accepted(user_answer):
             points = self.add_score(user_id, display_name, 10)
             
             # الانتقال للسؤال التالي
@@ -0,0 +1,926 @@
+"""
+اختبارات وحدات الأدوات المساعدة (utils)
+"""
+import sys
+import os
+import tempfile
+import threading
+import json
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.profile_cache import ProfileCache
+from utils.game_store import MemoryGameStore, SQLiteGameStore, TieredGameStore
+from utils.locks import LockManager
+from utils.dispatcher import EventDispatcher
+from utils.db_pool import ConnectionPool, ScoreBuffer
+from utils.storage import Storage, SCHEMA_VERSION, LEADERBOARD_SQL, RANK_SQL
+from utils.leaderboard_index import LeaderboardIndex
+from utils.leaderboard_cache import LeaderboardCache
+from utils.flex_templates import FlexTemplate, FrozenQuickReply, prebuilt_flex, slot, RAW
+from flex_styles import FlexStyles
+from utils.commands import CommandRouter
+from utils.rate_limiter import SlidingWindowLimiter, SQLiteSlidingWindowLimiter
+from utils.expiry import ExpiryScheduler
+from utils.ai_client import GeminiClient, CircuitBreaker
+from utils.ai_cache import AICache, cache_key
+from utils.arabic import normalize, normalize_compact
+from utils.gemini_helper import GeminiHelper
+from utils.question_pool import QuestionPool
+from utils.answer_matcher import AnswerMatcher, bounded_distance, normalize_answer
+from games.registry import GAMES, game_specs
+from games import IQGame
+
+
+class FakeClock:
+    """ساعة يدوية للتحكم في انتهاء الصلاحية"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_profile_cache_hit_and_ttl():
+    calls = []
+    clock = FakeClock()
+    cache = ProfileCache(lambda uid: calls.append(uid) or f"اسم-{uid}", ttl=10, clock=clock)
+
+    assert cache.get("u1") == "اسم-u1"
+    assert cache.get("u1") == "اسم-u1"
+    assert calls == ["u1"]
+
+    clock.now = 11
+    cache.get("u1")
+    assert calls == ["u1", "u1"]
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+def test_profile_cache_negative_and_lru():
+    clock = FakeClock()
+    persisted = {}
+
+    def failing(uid):
+        raise RuntimeError("network")
+
+    cache = ProfileCache(failing, load=lambda uid: "محفوظ" if uid == "u2" else None,
+                         persist=persisted.__setitem__, negative_ttl=5, clock=clock)
+    assert cache.get("u1") == "مستخدم"
+    assert cache.get("u2") == "محفوظ"
+    assert cache.get("u1") == "مستخدم"
+    assert cache.stats()['negative_hits'] == 1
+    assert cache.stats()['fetch_errors'] == 2
+
+    lru = ProfileCache(lambda uid: uid, persist=persisted.__setitem__, max_size=2)
+    for uid in ("a", "b", "c"):
+        lru.get(uid)
+    assert lru.peek("a") is None
+    assert lru.peek("c") == "c"
+    assert persisted["c"] == "c"
+
+
+def test_sqlite_game_store_shared_between_instances():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "games.db")
+        api = object()
+        first = SQLiteGameStore(path, line_bot_api=api)
+        second = SQLiteGameStore(path, line_bot_api=api)
+
+        game = IQGame(api)
+        game.start_game()
+        first["g1"] = {'game': game, 'type': 'ذكاء', 'created_at': datetime.now(), 'participants': {"u1"}}
+        first.players.add("u1")
+
+        assert "g1" in second and len(second) == 1
+        record = second["g1"]
+        assert record['game'].line_bot_api is api
+        assert record['game'].current_answer == game.current_answer
+        assert "u1" in second.players
+
+        record['game'].check_answer(game.current_answer, "u1", "لاعب")
+        second["g1"] = record
+        assert first["g1"]['game'].current_question == 1
+
+        assert first.delete("g1")['type'] == 'ذكاء'
+        assert second.get("g1") is None and second.delete("g1") is None
+
+
+def test_sqlite_game_store_update_retries_on_concurrent_write():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "games.db")
+        first = SQLiteGameStore(path)
+        second = SQLiteGameStore(path)
+        game = IQGame(None)
+        game.start_game()
+        first["g1"] = {'game': game, 'type': 'ذكاء', 'participants': set()}
+        calls = []
+
+        def score(user_id):
+            def apply(record):
+                calls.append(user_id)
+                if len(calls) == 1:
+                    # عامل آخر يكتب بين القراءة والحفظ
+                    second.update("g1", score("u2"))
+                record['game'].add_score(user_id, user_id, 10)
+                return user_id, False
+            return apply
+
+        assert first.update("g1", score("u1")) == "u1"
+        assert calls == ["u1", "u2", "u1"] and first.conflicts == 1
+        scores = second["g1"]['game'].scores
+        assert scores["u1"] == 10 and scores["u2"] == 10
+
+        # حالة تغيرت بدون رد تُحفظ، وعدم التغيير لا يكتب شيئاً
+        first.update("g1", lambda record: (record['game'].answered_users.add("u3"), False))
+        assert "u3" in second["g1"]['game'].answered_users
+        assert first.update("g1", lambda record: ("same", False)) == "same"
+        assert first.update("g1", lambda record: (None, True)) is None and "g1" not in second
+        assert first.update("g1", lambda record: ("x", False)) is None
+
+
+def test_memory_game_store_keeps_identity():
+    store = MemoryGameStore()
+    record = {'game': object(), 'type': 'لغز'}
+    store["g"] = record
+    assert store["g"] is record
+    assert [gid for gid, _ in store.items()] == ["g"]
+    del store["g"]
+    assert "g" not in store
+
+
+def test_lock_manager_orders_stripes_and_is_reentrant():
+    locks = LockManager(stripes=8)
+    with locks.locked("b", "a", "a"):
+        with locks.locked("a"):
+            pass
+    assert locks.stats()['acquisitions'] == 3
+    assert locks.lock_for("a") is locks.lock_for("a")
+
+
+def test_dispatcher_keeps_order_per_key_and_rejects_when_full():
+    seen = []
+    dispatcher = EventDispatcher(workers=3, queue_size=300)
+    dispatcher.start()
+    for i in range(50):
+        for key in ("g1", "g2"):
+            assert dispatcher.submit(key, lambda k, n: seen.append((k, n)), key, i)
+    dispatcher.join()
+    assert [n for k, n in seen if k == "g1"] == list(range(50))
+    assert [n for k, n in seen if k == "g2"] == list(range(50))
+    dispatcher.shutdown()
+
+    # معالج بطيء في مجموعة لا يوقف مجموعة أخرى
+    release, done = threading.Event(), threading.Event()
+    slow = EventDispatcher(workers=2, queue_size=10)
+    slow.start()
+    slow.submit("g1", release.wait, 5)
+    slow.submit("g1", seen.append, "g1-next")
+    slow.submit("g2", done.set)
+    assert done.wait(2) and "g1-next" not in seen
+    release.set()
+    slow.shutdown()
+    assert seen[-1] == "g1-next"
+
+    blocked = EventDispatcher(workers=1, queue_size=1, put_timeout=0.01)
+    assert blocked.submit("g", print)
+    assert not blocked.submit("g", print)
+    assert blocked.stats()['rejected'] == 1 and blocked.stats()['queue_depth'] == 1
+
+
+def test_score_buffer_coalesces_into_one_upsert():
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "scores.db"))
+        pool.execute('''CREATE TABLE users (user_id TEXT PRIMARY KEY, display_name TEXT,
+                                     total_points INTEGER DEFAULT 0, games_played INTEGER DEFAULT 0,
+                                     wins INTEGER DEFAULT 0, last_played TEXT)''')
+        pool.execute('''CREATE TABLE game_history (user_id TEXT, game_type TEXT,
+                                     points INTEGER, won INTEGER)''')
+        buffer = ScoreBuffer(pool)
+        for _ in range(3):
+            buffer.add("u1", "لاعب", 10, game_type="أسرع")
+        buffer.add("u1", "لاعب جديد", 50, won=True)
+        assert buffer.flush() == 1
+        buffer.add("u1", "لاعب جديد", 5)
+        buffer.flush()
+
+        row = pool.query_one("SELECT * FROM users")
+        assert (row['display_name'], row['total_points'], row['games_played'], row['wins']) == ("لاعب جديد", 85, 5, 1)
+        assert pool.query_one("SELECT COUNT(*) FROM game_history")[0] == 3
+        assert buffer.stats()['flushes'] == 2 and buffer.flush() == 0
+        pool.close_all()
+
+
+def test_connection_pool_is_bounded_across_threads():
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "pool.db"), size=2, timeout=2.0)
+        pool.execute("CREATE TABLE t (n INTEGER)")
+        with pool.connection() as outer:
+            with pool.transaction() as inner:
+                assert inner is outer  # استعارة متداخلة في نفس الخيط
+                inner.execute("INSERT INTO t VALUES (1)")
+
+        def work(n):
+            for _ in range(20):
+                pool.execute("INSERT INTO t VALUES (?)", (n,))
+                pool.query_one("SELECT COUNT(*) FROM t")
+
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = pool.stats()
+        assert pool.query_one("SELECT COUNT(*) FROM t")[0] == 201
+        assert stats['open'] <= 2 and stats['opened'] <= 2 and stats['idle'] == stats['open']
+        pool.close_all()
+
+
+def test_storage_migrates_and_imports_legacy_once():
+    import sqlite3
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, "users.db")
+        conn = sqlite3.connect(legacy)
+        conn.execute("CREATE TABLE users (user_id TEXT PRIMARY KEY, name TEXT, score INTEGER, "
+                     "games_played INTEGER, wins INTEGER, last_activity TEXT)")
+        conn.execute("CREATE TABLE games_history (user_id TEXT, game_type TEXT, points_earned INTEGER, "
+                     "is_win BOOLEAN, played_at TEXT)")
+        conn.execute("INSERT INTO users VALUES ('u1', 'قديم', 30, 3, 1, NULL)")
+        conn.execute("INSERT INTO games_history VALUES ('u1', 'ذكاء', 30, 1, '2024-01-01')")
+        conn.commit()
+        conn.close()
+
+        storage = Storage(os.path.join(tmp, "scores.db"))
+        assert storage.version == SCHEMA_VERSION
+        storage.add_score("u1", "جديد", 10, won=True, game_type="أسرع")
+        storage.add_score("u2", "ثاني", 100)
+        assert storage.import_legacy(legacy) == 1
+        assert storage.import_legacy(legacy) == 0
+
+        stats = storage.get_user_stats("u1")
+        assert (stats['display_name'], stats['total_points'], stats['games_played']) == ("جديد", 40, 4)
+        assert storage.get_rank("u1") == 2
+        assert [row['user_id'] for row in storage.get_leaderboard(5)] == ["u2", "u1"]
+
+        plan = " ".join(row[3] for row in storage.pool.query(
+            "EXPLAIN QUERY PLAN " + LEADERBOARD_SQL, (5,)))
+        assert "COVERING INDEX idx_users_leaderboard" in plan
+        plan = " ".join(row[3] for row in storage.pool.query(
+            "EXPLAIN QUERY PLAN " + RANK_SQL, ("u1",)))
+        assert "COVERING INDEX idx_users_leaderboard" in plan
+        assert Storage(storage.db_path).version == SCHEMA_VERSION
+        storage.pool.close_all()
+
+
+def test_leaderboard_index_matches_sql_ranking():
+    import random
+    import sqlite3
+    rng = random.Random(7)
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE users (user_id TEXT PRIMARY KEY, display_name TEXT, total_points INTEGER, "
+                 "games_played INTEGER, wins INTEGER)")
+    index = LeaderboardIndex()
+    for i in range(300):
+        uid, points = f"u{i % 120}", rng.choice([0, 5, 10, 50, 3000])
+        index.add_score(uid, uid, points)
+        conn.execute("INSERT INTO users VALUES (?, ?, ?, 1, 0) ON CONFLICT(user_id) DO UPDATE SET "
+                     "total_points = total_points + excluded.total_points, games_played = games_played + 1",
+                     (uid, uid, points))
+    assert index.verify(conn, sample=120) == []
+    for uid in ("u0", "u7", "u119"):
+        expected = conn.execute(RANK_SQL, (uid,)).fetchone()[0]
+        assert index.rank(uid) == expected
+
+    top = index.top(10)
+    assert [row['total_points'] for row in top] == sorted((row['total_points'] for row in top), reverse=True)
+    around = index.around("u7", radius=2)
+    assert "u7" in [row['user_id'] for row in around] and len(around) <= 5
+    assert index.threshold(10) == top[-1]['total_points']
+
+    index.add_score("new", "جديد", 10 ** 6)
+    assert index.rank("new") == 1 and index.stats()['tree_size'] > 10 ** 6
+
+    # النقاط السالبة تحت الصفر كما في SQL (لا تُدمج مع مجموعة الصفر)
+    for uid, points in (("neg1", -30), ("neg2", -5000)):
+        index.add_score(uid, uid, points)
+        conn.execute("INSERT INTO users VALUES (?, ?, ?, 1, 0) ON CONFLICT(user_id) DO UPDATE SET "
+                     "total_points = total_points + excluded.total_points", (uid, uid, points))
+    conn.execute("INSERT INTO users VALUES ('new', 'جديد', 1000000, 1, 0)")
+    for uid in ("neg1", "neg2", "u7"):
+        assert index.rank(uid) == conn.execute(RANK_SQL, (uid,)).fetchone()[0]
+    assert [row['user_id'] for row in index.top(len(index))[-2:]] == ["neg1", "neg2"]
+    assert [row['user_id'] for row in index.around("neg2", radius=1)] == ["neg1", "neg2"]
+    assert index.verify(conn, sample=200) == [] and index.stats()['offset'] > 0
+
+
+def test_leaderboard_cache_reloads_other_workers_points_from_sql():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scores.db")
+        here, other = Storage(path), Storage(path)
+        here.add_score("u1", "محلي", 10)
+        now = [0.0]
+        cache = LeaderboardCache(here.query_leaderboard, lambda rows: len(rows), limit=5, ttl=30,
+                                 clock=lambda: now[0])
+        assert [row['user_id'] for row in cache.get()[0]] == ["u1"]
+
+        other.add_score("u2", "عامل آخر", 50)
+        assert [row['user_id'] for row in here.get_leaderboard(5)] == ["u1"]  # فهرس هذه العملية
+        now[0] += 31
+        assert [row['user_id'] for row in cache.get()[0]] == ["u2", "u1"]
+        here.pool.close_all()
+        other.pool.close_all()
+
+
+def test_leaderboard_cache_invalidates_only_inside_top_n():
+    import threading
+    index = LeaderboardIndex()
+    for i in range(5):
+        index.add_score(f"u{i}", f"u{i}", (i + 1) * 10)
+    loads = []
+
+    def load(limit):
+        loads.append(limit)
+        return index.top(limit)
+
+    cache = LeaderboardCache(load, lambda rows: {"rows": len(rows)}, limit=3)
+    threads = [threading.Thread(target=cache.get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+
+    index.add_score("u0", "u0", 5)
+    cache.notify("u0", index.points("u0"))
+    cache.get()
+    assert len(loads) == 1 and cache.stats()['ignored_updates'] == 1
+
+    index.add_score("u1", "u1", 100)
+    cache.notify("u1", index.points("u1"))
+    rows, rendered = cache.get()
+    assert len(loads) == 2 and rows[0]['user_id'] == "u1" and rendered == {"rows": 3}
+    assert cache.stats()['hit_ratio'] > 0.5
+
+
+def test_flex_template_fills_typed_slots():
+    template = FlexTemplate({"text": slot("name"), "label": "نقاط " + slot("points"),
+                             "flex": slot("size"), "contents": slot("rows")},
+                            size=int, rows=RAW)
+    data = template.render(name='a "b"', points=5, size="3", rows='[{"x":1}]')
+    assert data == {"text": 'a "b"', "label": "نقاط 5", "flex": 3, "contents": [{"x": 1}]}
+    assert template.slot_names == {"name", "points", "size", "rows"}
+
+    leaders = [{'display_name': f"لاعب {i}", 'total_points': 10 - i} for i in range(5)]
+    rows = [FlexStyles.leaderboard_row_layout(i, r['display_name'], r['total_points'], i <= 3,
+                                              "none" if i == 1 else "xs")
+            for i, r in enumerate(leaders, 1)]
+    assert FlexStyles.leaderboard(leaders) == FlexStyles.leaderboard_layout(rows)
+
+    quick_reply = FrozenQuickReply(items=[])
+    message = prebuilt_flex("alt", {"type": "bubble"}, quick_reply)
+    assert message.as_json_dict() == {'type': 'flex', 'altText': 'alt',
+                                      'contents': {'type': 'bubble'}, 'quickReply': {'items': []}}
+
+
+def test_command_router_is_frozen_and_covers_games():
+    router = CommandRouter()
+
+    @router.command('مساعدة', 'Help')
+    def help_command():
+        return 'help'
+
+    for spec in game_specs():
+        router.add(spec.aliases, spec)
+    routes = router.freeze()
+
+    assert router.resolve('  help ') is help_command
+    assert router.resolve('ترتيب   الحروف').game_type == 'ترتيب'
+    assert router.resolve('لون') is GAMES['كلمة ولون'] and GAMES['لون'].uses_ai
+    assert router.resolve('الثلج') is None
+    assert len(routes) == len(GAMES) + 2
+    try:
+        router.add(['جديد'], help_command)
+        assert False, "يجب رفض الإضافة بعد التجميد"
+    except RuntimeError:
+        pass
+
+
+def test_sliding_window_limiter_blocks_boundary_bursts_and_evicts():
+    clock = FakeClock()
+    limiter = SlidingWindowLimiter(limit=3, window=60, max_keys=2, clock=clock)
+    clock.now = 59
+    assert all(limiter.allow("u1") for _ in range(3))
+    clock.now = 61  # نافذة ثابتة كانت ستسمح بثلاث رسائل جديدة هنا
+    assert not limiter.allow("u1")
+    clock.now = 119.5
+    assert all(limiter.allow("u1") for _ in range(3)) and not limiter.allow("u1")
+
+    limiter.allow("u2")
+    limiter.allow("u3")
+    assert len(limiter) == 2 and limiter.stats()['evictions'] == 1
+    clock.now = 500
+    limiter.allow("u4")
+    assert len(limiter) == 1
+
+    disabled = SlidingWindowLimiter(limit=0, window=60, clock=clock)
+    assert all(disabled.allow("g1") for _ in range(5)) and len(disabled) == 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "rate.db")
+        first = SQLiteSlidingWindowLimiter(path, 2, 60, clock=clock)
+        second = SQLiteSlidingWindowLimiter(path, 2, 60, clock=clock)
+        groups = SQLiteSlidingWindowLimiter(path, 1, 60, scope='group', clock=clock)
+        assert first.allow("u1") and second.allow("u1")
+        assert not first.allow("u1") and groups.allow("u1")
+        assert SQLiteSlidingWindowLimiter(path, 0, 60, clock=clock).allow("u1")
+
+
+def test_expiry_scheduler_uses_last_activity():
+    clock = FakeClock()
+    expired = []
+    busy_elsewhere = {"g3"}
+
+    def on_expire(key):
+        if key in busy_elsewhere:
+            busy_elsewhere.discard(key)
+            return clock.now + 600
+        expired.append(key)
+        return None
+
+    scheduler = ExpiryScheduler(600, on_expire, clock=clock)
+    for key in ("g1", "g2", "g3", "g4"):
+        scheduler.touch(key)
+    clock.now = 500
+    scheduler.touch("g1")
+    scheduler.cancel("g4")
+    clock.now = 601
+    assert scheduler.run_due() == 1 and expired == ["g2"]
+    assert "g1" in scheduler and "g3" in scheduler and len(scheduler._heap) == 2
+    clock.now = 1201
+    assert scheduler.run_due() == 2 and expired == ["g2", "g1", "g3"]
+    assert scheduler.stats()['rescheduled'] == 1 and len(scheduler) == 0
+
+    done = threading.Event()
+    live = ExpiryScheduler(0.05, lambda key: done.set())
+    live.start()
+    live.touch("g")
+    assert done.wait(2)
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    """خادم Gemini وهمي: 'slow' يتأخر و 'fail' يرد بخطأ"""
+    hits = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = body['contents'][0]['parts'][0]['text']
+        FakeGeminiHandler.hits.append((self.headers['x-goog-api-key'], prompt))
+        if 'slow' in prompt:
+            time.sleep(0.3)
+        if 'fail' in prompt:
+            self.send_response(500)
+            self.end_headers()
+            return
+        data = json.dumps({'candidates': [{'content': {'parts': [{'text': f"رد: {prompt}"}]}}]})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(data.encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+def test_gemini_client_against_fake_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGeminiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1beta"
+    try:
+        client = GeminiClient(['k1', 'k2'], base_url=base_url, timeout=2, workers=4,
+                              breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+        futures = [client.submit('slow same') for _ in range(3)]
+        assert {f.result() for f in futures} == {"رد: slow same"}
+        assert client.stats()['coalesced'] == 2
+
+        assert client.generate('a') == "رد: a" and client.generate('b') == "رد: b"
+        assert {key for key, _ in FakeGeminiHandler.hits} == {'k1', 'k2'}
+
+        assert client.generate('slow deadline', deadline=0.05) is None
+        assert client.generate('fail 1') is None and client.generate('fail 2') is None
+        hits = len(FakeGeminiHandler.hits)
+        assert client.generate('c') is None and len(FakeGeminiHandler.hits) == hits
+        assert client.breaker.state == 'open'
+
+        helper = GeminiHelper(client=client)
+        assert helper.generate_scrambled_word() in [
+            {"scrambled": s, "correct": c} for s, c in
+            [("ملق", "قلم"), ("باتك", "كتاب"), ("رحب", "بحر"), ("سمش", "شمس"), ("رمق", "قمر")]]
+        client.shutdown()
+    finally:
+        server.shutdown()
+
+
+def test_question_pool_refills_persists_and_counts_underruns():
+    counter = iter(range(1000))
+    broken = {"on": False}
+
+    def produce():
+        if broken["on"]:
+            raise RuntimeError("api down")
+        return {"question": f"q{next(counter)}", "answer": "a"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "pool.json")
+        pool = QuestionPool({"iq": produce}, capacity=4, low_water=1, path=path)
+        assert pool.get("iq") is None and pool.stats()['underruns'] == {"iq": 1}
+        assert pool.refill() == 4 and pool.depth("iq") == 4
+        assert pool.get("iq") == {"question": "q0", "answer": "a"}
+        assert pool.refill() == 0  # فوق حد الانخفاض
+        assert pool.save()
+
+        broken["on"] = True
+        restored = QuestionPool({"iq": produce}, capacity=4, low_water=3, path=path)
+        assert restored.depth("iq") == 3 and restored.get("iq")["question"] == "q1"
+        assert restored.refill() == 0 and restored.stats()['failures'] == {"iq": 1}
+        assert restored.refill() == 0 and restored.stats()['failures'] == {"iq": 1}  # تأخير قبل المحاولة
+
+        # نوع لم يُطلب لا يُملأ، وملف المخزون يكتبه عامل واحد
+        broken["on"] = False
+        idle = QuestionPool({"iq": produce, "truth": produce}, capacity=2, low_water=1, path=path)
+        assert idle.refill() == 0 and idle.stats()['produced'] == {"iq": 0, "truth": 0}
+        idle.get("truth")
+        assert idle.refill() == 2 and idle.depth("truth") == 2
+        if os.name == 'posix':
+            pool.get("iq")
+            assert not idle.save() and not idle.stats()['owner']
+            assert pool.save() and pool.stats()['owner']
+            assert [name for name in os.listdir(tmp) if name.endswith('.tmp')] == []
+
+
+def test_answer_matcher_decides_locally_and_memoizes_llm():
+    assert normalize_answer("  الإبْرَة!! ") == "ابره"
+    assert bounded_distance("kitten", "sitting", 5) == 3
+    assert bounded_distance("abcd", "abdc", 1) == 1
+    assert bounded_distance("aaaa", "bbbbbbbb", 2) == 3
+
+    asked = []
+
+    def llm(user, correct):
+        asked.append((user, correct))
+        return True
+
+    matcher = AnswerMatcher(llm=llm)
+    assert matcher.match("الساعه", "الساعة") and matcher.match("الجوال", "الهاتف")
+    assert matcher.match("هو القلم", "القلم") and matcher.match("الكمبيوتر", "الكمبيوتير")
+    assert not matcher.match("1", "10") and not matcher.match("سيارة", "الهاتف")
+    assert asked == []
+
+    assert matcher.match("المشظ", "المشط") and matcher.match("المشظ", "المشط")
+    assert asked == [("مشظ", "مشط")]
+    assert matcher.stats()['llm_cache_hits'] == 1
+
+
+def test_ai_cache_tiers_ttl_and_eviction():
+    now = [1000.0]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ai_cache.db")
+        cache = AICache(max_entries=2, max_bytes=1000, db_path=path, clock=lambda: now[0])
+        key = cache_key('m', 'حيوان يبدأ بحرف د')
+        assert key != cache_key('m2', 'حيوان يبدأ بحرف د')
+        cache.put(key, "دب", ttl=60, latency_ms=800)
+        assert cache.get(key) == "دب"
+
+        # الطبقة الثانية تبقى بعد إعادة التشغيل
+        restarted = AICache(db_path=path, clock=lambda: now[0])
+        assert restarted.get(key) == "دب" and restarted.get(key) == "دب"
+        assert restarted.stats()['disk_hits'] == 1 and restarted.stats()['memory_hits'] == 1
+        assert restarted.stats()['latency_saved_ms'] == 1600
+
+        cache.put('b', "x", ttl=60)
+        cache.put('c', "y" * 600, ttl=60)
+        cache.put('d', "z" * 600, ttl=60)  # الحجم يتجاوز 1000 بايت
+        assert cache.stats()['entries'] == 1 and cache.stats()['evictions'] == 3
+
+        now[0] += 61
+        assert cache.get(key) is None and restarted.get(key) is None
+        assert cache.stats()['saved_calls'] == 1
+
+    client = GeminiClient([], model='m', cache=AICache())
+    client.cache.put(cache_key('m', 'prompt'), "محفوظ", ttl=60)
+    assert client.generate('prompt', cache_ttl=60) == "محفوظ"
+    assert client.generate('prompt') is None  # بدون cache_ttl لا تُستخدم الذاكرة
+    assert client.stats()['cache']['saved_calls'] == 1
+    client.shutdown()
+
+
+def test_arabic_normalization_is_shared_by_games():
+    from games.base_game import BaseGame
+    from games.letters_words_game import LettersWordsGame
+
+    assert normalize("  القَلَمُ  ") == "قلم" and normalize("إسكندرية") == "اسكندريه"
+    assert normalize("مستشفى   كبير") == "مستشفي كبير" and normalize("قمــر") == "قمر"
+    assert normalize("آلة") == "اله" and normalize("") == "" and normalize(None) == ""
+    assert normalize_compact("ساعة يد") == "ساعهيد"
+    assert BaseGame(None).normalize_text("الإبرة") == normalize("الإبرة")
+    assert LettersWordsGame(None).normalize_text("سَيّارة") == "سياره"
+
+
+def test_question_banks_are_precompiled():
+    from games.question_bank import compile_bank, compile_categories, answer_key
+    from games.iq_game import QUESTIONS
+    from games.human_animal_plant_game import HumanAnimalPlantGame, ANSWERS
+    from games.letters_words_game import LETTER_SETS
+
+    bank = compile_bank([{"q": "؟", "a": "بيت الشعر"}], 'q', 'a', words=True,
+                        aliases={"بيت الشعر": ["القصيدة"]})
+    assert bank[0].key == "بيت الشعر" and bank[0].accepted == {"بيت الشعر", "بيت", "شعر", "قصيده"}
+    assert isinstance(QUESTIONS, tuple) and all(q.hint for q in QUESTIONS)
+    assert "ساعه" in next(q for q in QUESTIONS if q.answer == "الساعة").accepted
+
+    guess = compile_categories({"المطبخ": {"ق": ["قدر", "قلاية"], "م": []}})
+    assert len(guess) == 1 and guess[0].accepted == {"قدر", "قلايه"} and guess[0].extra == "ق"
+    assert LETTER_SETS[0].keys[0] == "قلم" and "قلم" in LETTER_SETS[0].accepted
+
+    # حروف البنك بالهمزة (أ) تطابق حروف اللعبة بدونها (ا)
+    assert "اردن" in ANSWERS.find(answer_key("بلاد", "أ"))[1]
+    game = HumanAnimalPlantGame(None)
+    game.current_category, game.current_letter = "حيوان", "ا"
+    assert "أسد" in game.known_answers()[0]
+
+
+def test_games_share_banks_and_hold_only_an_order():
+    import pickle
+    from array import array
+    from games.riddle_game import RiddleGame, RIDDLES
+
+    first, second = RiddleGame(None), RiddleGame(None)
+    assert isinstance(first.order, array) and first.order.typecode == 'H'
+    assert sorted(first.order) == list(range(len(RIDDLES)))
+    assert not any(isinstance(value, (list, tuple)) and len(value) == len(RIDDLES)
+                   for value in first.snapshot().values())
+
+    first.start_game()
+    assert first.current_entry is RIDDLES[first.order[0]]
+    restored = pickle.loads(pickle.dumps(first))
+    assert restored.order == first.order and restored.current_entry == first.current_entry
+    assert second.start_game() is not None
+
+
+def test_corpus_file_is_read_lazily_with_fallback():
+    from games import corpus
+    from games.question_bank import question_compiler, answer_records, record_answer_key, compile_answers
+
+    compile_item = question_compiler('q', 'a')
+    records = [{"q": f"سؤال {i}", "a": f"إجابة {i}"} for i in range(5)]
+    with tempfile.TemporaryDirectory() as tmp:
+        # بدون ملف: البنك من القيم الحرفية
+        bank = corpus.load_bank('test_bank', records, compile_item, directory=tmp)
+        assert isinstance(bank, corpus.MemoryBank) and bank[2].key == "اجابه 2"
+
+        corpus.write_corpus(corpus.corpus_path('test_bank', tmp), records + [{"q": "جديد", "a": "إضافة"}])
+        bank = corpus.load_bank('test_bank', records, compile_item, directory=tmp)
+        assert isinstance(bank, corpus.Corpus) and len(bank) == 6
+        # سجلات البنك المدمج لا تبقى بعد فتح الملف
+        assert 'test_bank' not in corpus.sources() and 'test_bank' in corpus.file_banks()
+        assert bank[-1].answer == "إضافة" and bank[1] is bank[1] and bank[1:3][1].prompt == "سؤال 2"
+        bank.close()
+
+        answers = answer_records({"بلاد": {"أ": ["الأردن"], "ا": ["الإمارات"]}})
+        corpus.write_corpus(os.path.join(tmp, "hap.qbc"), answers, map(record_answer_key, answers))
+        hap = corpus.Corpus(os.path.join(tmp, "hap.qbc"), compile_answers)
+        assert hap.find("بلاد|ا")[1] == {"اردن", "امارات"} and hap.find("بلاد|ب") is None
+        hap.close()
+
+        with open(os.path.join(tmp, "broken.qbc"), "wb") as f:
+            f.write(b"NOPE" + bytes(12))
+        try:
+            corpus.Corpus(os.path.join(tmp, "broken.qbc"), compile_item)
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+    corpus._sources.pop('test_bank', None)
+    corpus._file_banks.discard('test_bank')
+
+
+def test_game_snapshot_restores_every_registered_game():
+    from games.registry import game_specs
+    from games.state import Scoreboard, dump_game, load_game
+    from games.riddle_game import RiddleGame
+
+    board = Scoreboard()
+    assert board.add("سارة", 10) == 10 and board.add("علي", 5) == 5 and board.add("سارة", 5) == 15
+    assert board["سارة"] == 15 and board["غائب"] == 0 and len(board) == 2 and board.points.itemsize == 4
+
+    api = object()
+    for spec in game_specs():
+        game = spec.game_class(api)
+        assert not hasattr(game, '__dict__'), spec.game_type
+        game.start_game()
+        game.add_score("u1", "لاعب", 10)
+        blob = dump_game(game)
+        assert blob[:2] == b'GS' and len(blob) < 600, (spec.game_type, len(blob))
+
+        restored = load_game(blob, api)
+        assert type(restored) is type(game) and restored.line_bot_api is api
+        assert restored.snapshot() == game.snapshot(), spec.game_type
+        assert restored.scores["u1"] == 10 and "u1" in restored.answered_users
+
+    try:
+        load_game(b'XX\x01')
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+    # الصيغة JSON موسوم مستقل عن إصدار Python، والأنواع تعود كما هي
+    from games.state import encode_snapshot, decode_snapshot
+    import zlib
+    fields = {'a': (1, "x", None), 'b': {3, 1, 2}, 'c': {1: [b"\x00\xff", 2.5]}, 'd': [True, ()]}
+    blob = encode_snapshot("Test", fields)
+    assert json.loads(zlib.decompress(blob[3:]))['class'] == "Test"
+    assert decode_snapshot(blob) == ("Test", fields) and encode_snapshot("Test", fields) == blob
+
+    # السجل كاملاً بدون pickle: نفس الحالة بترتيب إدخال مختلف -> نفس البايتات
+    from games.state import dump_record, load_record
+    game = RiddleGame(api, seed=7)
+    game.start_game()
+    record = {'type': 'لغز', 'game': game, 'created_at': datetime(2024, 5, 1, 12, 30),
+              'last_activity': 1.5, 'participants': {"u2", "u1", "u3"}}
+    blob = dump_record(record)
+    assert dump_record(dict(reversed(list(record.items())), participants={"u3", "u1", "u2"})) == blob
+    loaded = load_record(blob, api)
+    assert loaded['participants'] == {"u1", "u2", "u3"} and loaded['game'].line_bot_api is api
+    assert loaded['created_at'] == record['created_at']
+    assert loaded['game'].snapshot() == game.snapshot() and dump_record(loaded) == blob
+
+
+def test_tiered_game_store_spills_idle_games_and_rehydrates():
+    from games.riddle_game import RiddleGame
+
+    now = [1000.0]
+    api = object()
+    locks = LockManager(stripes=64)
+    assert locks.stripe("g1") != locks.stripe("g2")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TieredGameStore(os.path.join(tmp, "spill.db"), line_bot_api=api, idle_seconds=60,
+                                max_hot=2, locks=locks, clock=lambda: now[0])
+        for gid in ("g1", "g2"):
+            game = RiddleGame(api)
+            game.start_game()
+            store[gid] = {'game': game, 'type': 'لغز', 'last_activity': now[0]}
+
+        now[0] += 30
+        store["g2"]['last_activity'] = now[0]
+        now[0] += 40
+        assert store.spill_idle() == 1 and store.stats()['hot'] == 1 and store.stats()['cold'] == 1
+        assert "g1" in store and len(store) == 2
+
+        record = store["g1"]
+        assert record['game'].line_bot_api is api and record['game'].current_answer
+        assert store.stats()['rehydrates'] == 1 and store.stats()['cold'] == 0
+
+        # تجاوز الحد: الأقدم استخداماً يخرج، إلا إذا كان قفله محجوزاً لخيط آخر
+        held, release = threading.Event(), threading.Event()
+
+        def hold_g2():
+            with locks.locked("g2"):
+                held.set()
+                release.wait(5)
+        worker = threading.Thread(target=hold_g2)
+        worker.start()
+        held.wait(5)
+        store["g3"] = {'game': RiddleGame(api), 'type': 'لغز', 'last_activity': now[0]}
+        release.set()
+        worker.join()
+        assert list(store._hot) == ["g2", "g3"] and store.stats()['budget_spills'] == 1
+        store["g4"] = {'game': RiddleGame(api), 'type': 'لغز', 'last_activity': now[0]}
+        assert list(store._hot) == ["g3", "g4"] and len(store) == 4
+
+        # peek (انتهاء الوقت) يقرأ اللعبة الخاملة دون إعادتها للذاكرة
+        rehydrates = store.stats()['rehydrates']
+        assert store.peek("g2")['type'] == 'لغز' and store.peek("missing") is None
+        assert list(store._hot) == ["g3", "g4"] and store.stats()['rehydrates'] == rehydrates
+
+        assert store.delete("g1") and store.delete("g2") and "g2" not in store and len(store) == 2
+
+        # سجل تالف في SQLite يُسجل كخطأ ويبقى للفحص بدلاً من حذفه كأنه غير موجود
+        assert store._spill("g3")
+        store._cold._connections.execute("UPDATE games SET state = ? WHERE game_id = 'g3'", (b'broken',))
+        assert store.get("g3") is None and "g3" in store and store.stats()['cold'] == 1
+
+
+def test_scores_keyed_by_user_id_with_incremental_top_k():
+    import random
+    from games.state import Scoreboard
+    from games.riddle_game import RiddleGame
+
+    rng = random.Random(7)
+    board = Scoreboard(top_k=5)
+    for _ in range(500):
+        user = f"u{rng.randrange(40)}"
+        board.add(user, rng.choice((5, 10, 15)), f"اسم {user}")
+        full = sorted(board.items(), key=lambda item: item[1], reverse=True)[:5]
+        assert [(p, s) for p, _n, s in board.top()] == full
+    assert board.top(10) == [(p, board.name(p), s)
+                             for p, s in sorted(board.items(), key=lambda item: item[1], reverse=True)[:10]]
+
+    game = RiddleGame(None)
+    game.start_game()
+    game.add_score("u1", "أحمد", 10)
+    game.add_score("u2", "أحمد", 20)
+    game.add_score("u1", "أحمد", 5)
+    assert game.scores["u1"] == 15 and game.scores["u2"] == 20 and len(game.scores) == 2
+
+    lookups = []
+    try:
+        RiddleGame.name_lookup = staticmethod(lambda user_id: lookups.append(user_id) or {"u2": "أحمد علي"}.get(user_id))
+        result = game.end_game()
+    finally:
+        del RiddleGame.name_lookup
+    assert result['winner'] == "أحمد علي" and result['winner_id'] == "u2" and result['winner_score'] == 20
+    assert "🥈 أحمد: 15 نقطة" in result['message'] and sorted(lookups) == ["u1", "u2"]
+    assert game.scores.name("u2") == "أحمد علي"
+
+
+def test_standings_cached_per_round_and_rate_limited():
+    from utils.standings_cache import StandingsCache
+    from games.riddle_game import RiddleGame
+
+    now = [0.0]
+    cache = StandingsCache(cooldown=10, clock=lambda: now[0])
+    game = RiddleGame(None)
+    game.start_game()
+    game.add_score("u1", "سارة", 10)
+    builds = []
+
+    def render():
+        builds.append(1)
+        return FlexStyles.game_progress("لغز", game.standings(3), game.current_question + 1,
+                                        game.questions_count)
+
+    def token():
+        return ("g", game.current_question, game.scores.version)
+
+    first = cache.get("g1", token(), render)
+    assert "سارة" in json.dumps(first, ensure_ascii=False) and len(builds) == 1
+    now[0] += 5
+    assert cache.get("g1", token(), render) is None  # خلال فترة التهدئة
+    assert cache.is_limited("g1") and not cache.is_limited("g2")
+    now[0] += 10
+    assert not cache.is_limited("g1")
+    assert cache.get("g1", token(), render) is first and len(builds) == 1
+    game.add_score("u2", "علي", 15)
+    now[0] += 10
+    second = cache.get("g1", token(), render)
+    assert second is not first and len(builds) == 2
+    assert game.standings(3) == [("علي", 15), ("سارة", 10)]
+    assert cache.stats()['limited'] == 2 and cache.stats()['hits'] == 1
+
+
+def test_seeded_games_are_reproducible_and_replayable():
+    from games.math_game import MathGame
+    from games.state import dump_game, load_game
+    from games.replay import simulate, replay
+
+    a, b = MathGame(None, seed=42), MathGame(None, seed=42)
+    a.start_game()
+    b.start_game()
+    assert a.current_answer == b.current_answer
+    a.check_answer(str(a.current_answer), "u1", "سارة")
+    b.check_answer(str(b.current_answer), "u1", "سارة")
+    # اللقطة تحفظ seed فقط والمستعادة تكمل بنفس الأسئلة
+    c = load_game(dump_game(a))
+    assert c.seed == 42
+    assert c.current_answer == a.current_answer == b.current_answer
+    a.check_answer(str(a.current_answer), "u2", "علي")
+    c.check_answer(str(c.current_answer), "u2", "علي")
+    assert c.current_question == a.current_question == 2
+    assert c.current_answer == a.current_answer and c.scores == a.scores
+    # الاستعادة في منتصف السؤال تكمل السحبات ولا تعيد ما سُحب قبل الحفظ
+    drawn = a.round_rng().random()
+    d = load_game(dump_game(a))
+    assert d.round_rng().random() == a.round_rng().random() != drawn
+
+    transcript = simulate('لغز', 7, players=5, messages=60, correct_ratio=0.5)
+    first, second = replay('لغز', 7, transcript), replay('لغز', 7, transcript)
+    assert first.digest == second.digest
+    assert any(points for _i, points, _over, _text in first.outcomes)
+    assert replay('لغز', 8, transcript).digest != first.digest
+
+    # الساعة تمر عبر الاستعادة، فحفظ اللعبة قبل كل رسالة لا يغير البصمة حتى في لعبة توقيت
+    from games.replay import ReplayClock
+    clock = ReplayClock(5.0)
+    assert load_game(dump_game(a), clock=clock).clock is clock
+    assert replay('لغز', 7, transcript, roundtrip=True).digest == first.digest
+    typing = simulate('أسرع', 3, players=4, messages=40, correct_ratio=0.6)
+    assert replay('أسرع', 3, typing, roundtrip=True).digest == replay('أسرع', 3, typing).digest
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✅ {name}")
@@ -0,0 +1,166 @@
+"""
+ذاكرة مؤقتة لردود Gemini حسب المحتوى (hash للنموذج والطلب)
+LRU في الذاكرة مع طبقة SQLite اختيارية على القرص، عمر لكل إدخال وحد للحجم
+"""
+import hashlib
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+from .db_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(model, prompt, generation_config=None):
+    """مفتاح ثابت للطلب: sha256(model, prompt, config)"""
+    config = repr(sorted((generation_config or {}).items()))
+    data = '\0'.join((model, prompt, config)).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+class AICache:
+    """ردود محفوظة مع زمن الطلب الأصلي لحساب الوقت الموفر
+
+    الذاكرة: حتى max_entries إدخال و max_bytes من النصوص (الأقدم استخداماً يُحذف).
+    القرص (db_path): يبقى بعد إعادة التشغيل، ويُقلّم إلى max_disk_bytes.
+    """
+
+    def __init__(self, max_entries=2000, max_bytes=2 * 1024 * 1024, db_path=None,
+                 max_disk_bytes=20 * 1024 * 1024, clock=time.time):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (value, expires_at, latency_ms, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._connections = None
+        if db_path:
+            self._connections = ConnectionPool(db_path, cache_size_kb=1024)
+            self._connections.execute(
+                '''CREATE TABLE IF NOT EXISTS ai_cache
+                   (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL,
+                    latency_ms REAL NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)''')
+            self._connections.execute(
+                'CREATE INDEX IF NOT EXISTS idx_ai_cache_last_used ON ai_cache(last_used)')
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.latency_saved_ms = 0.0
+
+    def get(self, key):
+        """الرد المحفوظ أو None"""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    self.latency_saved_ms += entry[2]
+                    return entry[0]
+                self._drop(key)
+
+        if self._connections is not None:
+            row = self._disk_get(key, now)
+            if row is not None:
+                value, expires_at, latency_ms = row
+                with self._lock:
+                    self._remember(key, value, expires_at, latency_ms)
+                    self.disk_hits += 1
+                    self.latency_saved_ms += latency_ms
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value, ttl, latency_ms=0.0):
+        """حفظ رد لمدة ttl ثانية"""
+        if ttl <= 0 or value is None:
+            return
+        expires_at = self._clock() + ttl
+        with self._lock:
+            self._remember(key, value, expires_at, latency_ms)
+            self.stores += 1
+        if self._connections is not None:
+            self._disk_put(key, value, expires_at, latency_ms)
+
+    def _remember(self, key, value, expires_at, latency_ms):
+        if key in self._entries:
+            self._drop(key)
+        size = len(value.encode('utf-8'))
+        self._entries[key] = (value, expires_at, latency_ms, size)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self._bytes > self.max_bytes):
+            old_key = next(iter(self._entries))
+            self._drop(old_key)
+            self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[3]
+
+    def _disk_get(self, key, now):
+        try:
+            with self._connections.connection() as conn:
+                row = conn.execute('SELECT value, expires_at, latency_ms FROM ai_cache WHERE key = ?',
+                                   (key,)).fetchone()
+                if row is None:
+                    return None
+                if row[1] <= now:
+                    conn.execute('DELETE FROM ai_cache WHERE key = ?', (key,))
+                    return None
+                conn.execute('UPDATE ai_cache SET last_used = ? WHERE key = ?', (now, key))
+                return row[0], row[1], row[2]
+        except Exception as e:
+            logger.error(f"خطأ في قراءة ذاكرة AI من القرص: {e}")
+            return None
+
+    def _disk_put(self, key, value, expires_at, latency_ms):
+        size = len(value.encode('utf-8'))
+        try:
+            with self._connections.transaction() as conn:
+                conn.execute('''INSERT OR REPLACE INTO ai_cache
+                                (key, value, expires_at, latency_ms, size, last_used)
+                                VALUES (?, ?, ?, ?, ?, ?)''',
+                             (key, value, expires_at, latency_ms, size, self._clock()))
+                total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM ai_cache').fetchone()[0]
+                if total > self.max_disk_bytes:
+                    self._trim_disk(conn, total)
+        except Exception as e:
+            logger.error(f"خطأ في حفظ ذاكرة AI على القرص: {e}")
+
+    def _trim_disk(self, conn, total):
+        """حذف المنتهي ثم الأقدم استخداماً حتى ينزل الحجم عن الحد"""
+        conn.execute('DELETE FROM ai_cache WHERE expires_at <= ?', (self._clock(),))
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM ai_cache').fetchone()[0]
+        for key, size in conn.execute('SELECT key, size FROM ai_cache ORDER BY last_used').fetchall():
+            if total <= self.max_disk_bytes:
+                break
+            conn.execute('DELETE FROM ai_cache WHERE key = ?', (key,))
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'disk': self._connections is not None,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'saved_calls': hits,
+                'latency_saved_ms': round(self.latency_saved_ms, 1),
+                'hit_ratio': round(hits / lookups, 3) if lookups else 0.0
+            }
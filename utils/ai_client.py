@@ -0,0 +1,323 @@
+"""
+عميل Gemini عبر REST
+مجموعة threads للطلبات، مهلة لكل استدعاء، توزيع الحمل على كل المفاتيح،
+قاطع دائرة عند بطء الـ API، ودمج الطلبات المتطابقة الجارية،
+وذاكرة اختيارية للردود المتكررة
+"""
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import requests
+
+from .ai_cache import AICache, cache_key
+from .rate_limiter import SlidingWindowLimiter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+
+class AIUnavailable(Exception):
+    """لا يوجد مفتاح متاح أو الدائرة مفتوحة - استخدم البديل المحلي"""
+
+
+class CircuitBreaker:
+    """يفتح بعد failure_threshold أخطاء/استدعاءات بطيئة متتالية
+
+    مفتوح: كل الطلبات تُرفض فوراً لمدة reset_timeout ثانية، ثم يُسمح بطلب
+    تجريبي واحد (half-open) يغلق الدائرة إذا نجح أو يعيد فتحها إذا فشل.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, slow_call_seconds=5.0,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_seconds = slow_call_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self.opens = 0
+        self.short_circuited = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        """هل يُسمح بطلب الآن"""
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial:
+                self._trial = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def skip(self):
+        """طلب سُمح له ولم يُرسل (لا مفتاح متاح) - لا يُحسب نجاحاً ولا فشلاً"""
+        with self._lock:
+            self._trial = False
+
+    def record(self, ok, elapsed=0.0):
+        """تسجيل نتيجة طلب - الاستدعاء البطيء يُحسب فشلاً"""
+        ok = ok and elapsed <= self.slow_call_seconds
+        with self._lock:
+            self._trial = False
+            if ok:
+                self._failures = 0
+                self._opened_at = None
+                return
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"فتح دائرة Gemini بعد {self._failures} أخطاء")
+                    self.opens += 1
+                self._opened_at = self._clock()
+
+    def stats(self):
+        with self._lock:
+            return {'state': self._state(), 'failures': self._failures,
+                    'opens': self.opens, 'short_circuited': self.short_circuited}
+
+
+class KeyPool:
+    """توزيع الطلبات على المفاتيح: الأقل انشغالاً أولاً
+
+    لكل مفتاح حد للطلبات المتزامنة وحصة طلبات في الدقيقة، والمفتاح الذي
+    يرد بـ 429 يُستبعد لفترة cooldown.
+    """
+
+    def __init__(self, keys, max_concurrency=2, requests_per_minute=15, cooldown=60,
+                 clock=time.monotonic):
+        self.keys = list(keys)
+        self.max_concurrency = max_concurrency
+        self.cooldown = cooldown
+        self._clock = clock
+        self._quota = SlidingWindowLimiter(requests_per_minute, 60, clock=clock)
+        self._in_flight = [0] * len(self.keys)
+        self._cooling_until = [0.0] * len(self.keys)
+        self._calls = [0] * len(self.keys)
+        self._errors = [0] * len(self.keys)
+        self._lock = threading.Lock()
+        self.exhausted = 0
+
+    def acquire(self):
+        """رقم المفتاح المحجوز أو None إذا لم يتوفر أي مفتاح"""
+        now = self._clock()
+        with self._lock:
+            order = sorted(range(len(self.keys)), key=lambda i: (self._in_flight[i], self._calls[i]))
+            for index in order:
+                if self._in_flight[index] >= self.max_concurrency or self._cooling_until[index] > now:
+                    continue
+                if not self._quota.allow(index):
+                    continue
+                self._in_flight[index] += 1
+                self._calls[index] += 1
+                return index
+            self.exhausted += 1
+            return None
+
+    def release(self, index, ok=True, rate_limited=False):
+        with self._lock:
+            self._in_flight[index] -= 1
+            if not ok:
+                self._errors[index] += 1
+            if rate_limited:
+                self._cooling_until[index] = self._clock() + self.cooldown
+                logger.warning(f"مفتاح Gemini رقم {index + 1} تجاوز الحصة - إيقاف مؤقت")
+
+    def pick(self):
+        """المفتاح الأقل انشغالاً بدون حجز (للتوافق مع الكود القديم)"""
+        if not self.keys:
+            return None
+        with self._lock:
+            index = min(range(len(self.keys)), key=lambda i: (self._in_flight[i], self._calls[i]))
+        return self.keys[index]
+
+    def stats(self):
+        now = self._clock()
+        with self._lock:
+            return {'keys': len(self.keys), 'exhausted': self.exhausted,
+                    'per_key': [{'in_flight': self._in_flight[i], 'calls': self._calls[i],
+                                 'errors': self._errors[i],
+                                 'cooling': self._cooling_until[i] > now}
+                                for i in range(len(self.keys))]}
+
+
+class GeminiClient:
+    """طلبات generateContent في مجموعة threads
+
+    generate() تنتظر حتى deadline ثانية ثم تعيد None (النتيجة المتأخرة تُهمل)،
+    و None أيضاً عند فتح الدائرة أو نفاد المفاتيح - المستدعي يستخدم البديل المحلي.
+    الطلبات المتطابقة الجارية تشترك في نفس الـ Future. مع cache يُحفظ الرد
+    للطلبات التي تمرر cache_ttl (الطلب المتكرر لا يصل إلى الـ API).
+    """
+
+    def __init__(self, api_keys, model='gemini-2.0-flash', base_url=DEFAULT_BASE_URL,
+                 timeout=8.0, workers=4, key_concurrency=2, key_rpm=15,
+                 breaker=None, session=None, cache=None):
+        self.model = model
+        self.cache = cache
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.keys = KeyPool(api_keys, key_concurrency, key_rpm)
+        self.breaker = breaker or CircuitBreaker(slow_call_seconds=timeout * 0.75)
+        self._session = session or requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, workers))
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="gemini")
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.fallbacks = 0
+
+    @property
+    def enabled(self):
+        return bool(self.keys.keys)
+
+    def submit(self, prompt, generation_config=None):
+        """بدء طلب في الخلفية - يعيد Future (مشترك للطلبات المتطابقة)"""
+        key = (prompt, repr(sorted((generation_config or {}).items())))
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            future = self._executor.submit(self._call, prompt, generation_config)
+            self._inflight[key] = future
+            self.requests += 1
+        future.add_done_callback(lambda _: self._forget(key, future))
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def generate(self, prompt, deadline=None, generation_config=None, cache_ttl=0):
+        """نص الرد أو None (مهلة، خطأ، دائرة مفتوحة)
+
+        cache_ttl > 0: الرد يُحفظ لهذه المدة ويُعاد للطلب المطابق بدون استدعاء
+        """
+        key = None
+        if cache_ttl > 0 and self.cache is not None:
+            key = cache_key(self.model, prompt, generation_config)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        if not self.enabled or not self.breaker.allow():
+            with self._lock:
+                self.fallbacks += 1
+            return None
+        started = time.monotonic()
+        future = self.submit(prompt, generation_config)
+        try:
+            text = future.result(timeout=self.timeout if deadline is None else deadline)
+            if key is not None:
+                self.cache.put(key, text, cache_ttl, (time.monotonic() - started) * 1000)
+            return text
+        except FutureTimeout:
+            logger.warning("انتهت مهلة انتظار Gemini")
+            with self._lock:
+                self.timeouts += 1
+        except AIUnavailable:
+            pass
+        except Exception as e:
+            logger.error(f"خطأ في طلب Gemini: {e}")
+            with self._lock:
+                self.failures += 1
+        with self._lock:
+            self.fallbacks += 1
+        return None
+
+    def _call(self, prompt, generation_config=None):
+        index = self.keys.acquire()
+        if index is None:
+            self.breaker.skip()
+            raise AIUnavailable("لا يوجد مفتاح Gemini متاح")
+
+        body = {'contents': [{'parts': [{'text': prompt}]}]}
+        if generation_config:
+            body['generationConfig'] = generation_config
+        started = time.monotonic()
+        ok = rate_limited = False
+        try:
+            response = self._session.post(
+                f"{self.base_url}/models/{self.model}:generateContent",
+                json=body, headers={'x-goog-api-key': self.keys.keys[index]},
+                timeout=self.timeout)
+            rate_limited = response.status_code == 429
+            response.raise_for_status()
+            text = extract_text(response.json())
+            ok = True
+            return text
+        finally:
+            self.keys.release(index, ok, rate_limited)
+            self.breaker.record(ok, time.monotonic() - started)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        with self._lock:
+            stats = {'enabled': self.enabled, 'requests': self.requests,
+                     'coalesced': self.coalesced, 'in_flight': len(self._inflight),
+                     'timeouts': self.timeouts, 'failures': self.failures,
+                     'fallbacks': self.fallbacks}
+        stats['breaker'] = self.breaker.stats()
+        stats['keys'] = self.keys.stats()
+        if self.cache is not None:
+            stats['cache'] = self.cache.stats()
+        return stats
+
+
+def extract_text(data):
+    """نص الرد من JSON الخاص بـ generateContent"""
+    candidates = data.get('candidates') or []
+    if not candidates:
+        raise ValueError(f"رد Gemini بدون نتائج: {data.get('promptFeedback')}")
+    parts = candidates[0].get('content', {}).get('parts', [])
+    return ''.join(part.get('text', '') for part in parts).strip()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_ai_client():
+    """العميل المشترك لكل العملية - يُنشأ عند أول استخدام"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from config import Config
+                breaker = CircuitBreaker(Config.GEMINI_BREAKER_FAILURES,
+                                         Config.GEMINI_BREAKER_RESET_SECONDS,
+                                         Config.GEMINI_SLOW_CALL_SECONDS)
+                cache = None
+                if Config.AI_CACHE_SIZE > 0 and Config.GEMINI_API_KEYS:
+                    cache = AICache(Config.AI_CACHE_SIZE, Config.AI_CACHE_MAX_BYTES,
+                                    Config.AI_CACHE_PATH or None, Config.AI_CACHE_MAX_DISK_BYTES)
+                _client = GeminiClient(Config.GEMINI_API_KEYS, Config.GEMINI_MODEL,
+                                       Config.GEMINI_BASE_URL, Config.GEMINI_TIMEOUT_SECONDS,
+                                       Config.GEMINI_WORKERS, Config.GEMINI_KEY_CONCURRENCY,
+                                       Config.GEMINI_KEY_RPM, breaker, cache=cache)
+    return _client
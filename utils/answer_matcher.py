@@ -0,0 +1,154 @@
+"""
+مطابقة الإجابات محلياً بدون Gemini
+تطبيع عربي + مسافة تحرير محدودة + تشابه الكلمات + جدول مرادفات صغير،
+والنموذج يُسأل فقط في منطقة الشك مع حفظ حكمه
+"""
+import threading
+import logging
+from collections import OrderedDict
+
+from .arabic import normalize_answer
+
+logger = logging.getLogger(__name__)
+
+# كل مجموعة تُوحد إلى أول كلمة فيها (بعد التطبيع)
+SYNONYM_GROUPS = [
+    ('هاتف', 'جوال', 'تلفون', 'تليفون', 'موبايل', 'محمول'),
+    ('سحاب', 'غيم', 'غيوم', 'سحب'),
+    ('حذاء', 'جزمه', 'نعال', 'كندره'),
+    ('ساعه', 'منبه'),
+    ('قط', 'قطه', 'بسه', 'هر'),
+    ('سياره', 'عربيه', 'موتر'),
+    ('كرسي', 'مقعد'),
+    ('مستقبل', 'غد', 'بكره'),
+    ('ضوء', 'نور'),
+    ('حفره', 'حفر', 'جوره'),
+]
+
+
+def _build_synonyms(groups):
+    table = {}
+    for group in groups:
+        canonical = normalize_answer(group[0])
+        for word in group:
+            table[normalize_answer(word)] = canonical
+    return table
+
+
+SYNONYMS = _build_synonyms(SYNONYM_GROUPS)
+
+
+def bounded_distance(a, b, max_distance):
+    """مسافة Damerau (OSA) مع توقف مبكر - تعيد max_distance + 1 إذا تجاوزتها"""
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if len(a) > len(b):
+        a, b = b, a
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        ca = a[i - 1]
+        for j in range(1, len(b) + 1):
+            cost = 0 if ca == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and j > 1 and ca == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return min(previous[len(b)], max_distance + 1)
+
+
+def token_set_similarity(a, b):
+    """نسبة الكلمات المشتركة (Dice) بعد توحيد المرادفات"""
+    tokens_a = {SYNONYMS.get(word, word) for word in a.split()}
+    tokens_b = {SYNONYMS.get(word, word) for word in b.split()}
+    if not tokens_a or not tokens_b:
+        return 0.0
+    return 2 * len(tokens_a & tokens_b) / (len(tokens_a) + len(tokens_b))
+
+
+class AnswerMatcher:
+    """حكم على الإجابة: مطابق، قريب (أخطاء إملائية)، أو في منطقة الشك
+
+    score >= accept_threshold يُقبل و score < llm_threshold يُرفض محلياً.
+    بينهما يُسأل llm(user, correct) -> True/False/None إن وُجد، وحكمه يُحفظ
+    حسب (الإجابة المطبعة، الصحيحة المطبعة).
+    """
+
+    def __init__(self, llm=None, accept_threshold=0.8, llm_threshold=0.6,
+                 typo_ratio=0.25, cache_size=5000):
+        self._llm = llm
+        self.accept_threshold = accept_threshold
+        self.llm_threshold = llm_threshold
+        self.typo_ratio = typo_ratio
+        self.cache_size = cache_size
+        self._verdicts = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_accepts = 0
+        self.local_rejects = 0
+        self.llm_calls = 0
+        self.llm_cache_hits = 0
+
+    def score(self, user, correct):
+        """تشابه بين 0 و 1 لنصين مطبعين"""
+        if user == correct or SYNONYMS.get(user, user) == SYNONYMS.get(correct, correct):
+            return 1.0
+        if user.isdigit() or correct.isdigit():
+            return 0.0  # الأرقام تطابق تام فقط
+        compact_user = user.replace(' ', '')
+        compact_correct = correct.replace(' ', '')
+        longest = max(len(compact_user), len(compact_correct))
+        # الإجابة الصحيحة كاملة داخل إجابة أطول (مثل "هو القلم")
+        if len(compact_correct) >= 3 and compact_correct in compact_user:
+            return 1.0
+        # أخطاء إملائية ضمن الحد المسموح
+        max_distance = max(1, int(longest * self.typo_ratio))
+        distance = bounded_distance(compact_user, compact_correct, max_distance)
+        edit = 1.0 - distance / longest if distance <= max_distance else 0.0
+        return max(edit, token_set_similarity(user, correct))
+
+    def match(self, user_answer, correct_answer):
+        user = normalize_answer(user_answer)
+        correct = normalize_answer(correct_answer)
+        if not user or not correct:
+            return False
+        score = self.score(user, correct)
+        if score >= self.accept_threshold:
+            self.local_accepts += 1
+            return True
+        if score < self.llm_threshold or self._llm is None:
+            self.local_rejects += 1
+            return False
+        return self._ask_llm(user, correct)
+
+    def _ask_llm(self, user, correct):
+        key = (user, correct)
+        with self._lock:
+            verdict = self._verdicts.get(key)
+            if verdict is not None:
+                self._verdicts.move_to_end(key)
+                self.llm_cache_hits += 1
+                return verdict
+            self.llm_calls += 1
+        verdict = self._llm(user, correct)
+        if verdict is None:
+            return False  # النموذج غير متاح - لا نحفظ
+        with self._lock:
+            self._verdicts[key] = verdict
+            while len(self._verdicts) > self.cache_size:
+                self._verdicts.popitem(last=False)
+        return verdict
+
+    def stats(self):
+        with self._lock:
+            return {'local_accepts': self.local_accepts, 'local_rejects': self.local_rejects,
+                    'llm_calls': self.llm_calls, 'llm_cache_hits': self.llm_cache_hits,
+                    'cached_verdicts': len(self._verdicts)}
@@ -0,0 +1,66 @@
+"""
+تطبيع النص العربي للمقارنة - محرك واحد لكل الألعاب
+جدول str.translate واحد للهمزات والتاء المربوطة والألف المقصورة والتشكيل،
+مع ذاكرة LRU للمدخلات المتكررة
+"""
+import re
+from functools import lru_cache
+
+TASHKEEL = ''.join(map(chr, range(0x064B, 0x0660)))  # الفتحة ... حتى العلامات الإضافية
+TATWEEL = '\u0640'
+
+_FOLD = {'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ة': 'ه', 'ى': 'ي'}
+_REMOVE = TASHKEEL + TATWEEL
+
+# جدول الألعاب: توحيد الحروف وحذف التشكيل في مرور واحد
+FOLD_TABLE = str.maketrans({**_FOLD, **dict.fromkeys(_REMOVE)})
+
+# جدول مطابقة الإجابات: نفس الجدول + همزات أخرى وتشكيل قرآني وأرقام عربية/فارسية
+ANSWER_TABLE = str.maketrans({
+    **_FOLD,
+    '\u0671': 'ا', 'ؤ': 'و', 'ئ': 'ي',
+    **dict.fromkeys(_REMOVE + ''.join(map(chr, range(0x0610, 0x061B))) + '\u0670'
+                    + ''.join(map(chr, range(0x06D6, 0x06EE)))),
+    **{chr(0x0660 + d): str(d) for d in range(10)},
+    **{chr(0x06F0 + d): str(d) for d in range(10)},
+})
+
+_PUNCT_RE = re.compile(r'[^\w\s]')
+
+
+@lru_cache(maxsize=4096)
+def normalize(text):
+    """تطبيع للمقارنة: حذف ال التعريف من البداية، توحيد الحروف، حذف التشكيل والمسافات الزائدة"""
+    if not text:
+        return ""
+    text = text.strip().lower()
+    if text.startswith('ال'):
+        text = text[2:]
+    return ' '.join(text.translate(FOLD_TABLE).split())
+
+
+def normalize_compact(text):
+    """مثل normalize بدون أي مسافات (للكلمات التي قد تُكتب مفصولة)"""
+    return normalize(text).replace(' ', '')
+
+
+def _strip_article(word):
+    return word[2:] if word.startswith('ال') and len(word) > 3 else word
+
+
+@lru_cache(maxsize=4096)
+def normalize_answer(text):
+    """تطبيع أقوى للإجابات الحرة: ال التعريف لكل كلمة، الهمزات، الأرقام، علامات الترقيم"""
+    if not text:
+        return ""
+    text = _PUNCT_RE.sub(' ', text.strip().lower().translate(ANSWER_TABLE))
+    return ' '.join(_strip_article(word) for word in text.split())
+
+
+def cache_stats():
+    """إحصائيات ذاكرة التطبيع"""
+    stats = {}
+    for name, func in (('normalize', normalize), ('normalize_answer', normalize_answer)):
+        info = func.cache_info()
+        stats[name] = {'hits': info.hits, 'misses': info.misses, 'size': info.currsize}
+    return stats
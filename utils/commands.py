@@ -0,0 +1,49 @@
+"""
+موجه الأوامر - قاموس ثابت من الأسماء المختصرة إلى الدوال
+يُبنى مرة واحدة، وكل رسالة تحتاج بحثاً واحداً فقط
+"""
+from types import MappingProxyType
+
+
+def normalize_command(text):
+    """توحيد نص الأمر: إزالة المسافات الزائدة وتصغير الحروف اللاتينية"""
+    return ' '.join(text.split()).lower()
+
+
+class CommandRouter:
+    """تسجيل الأوامر ثم تجميدها
+
+    بعد freeze() لا يمكن إضافة أوامر، و resolve() بحث واحد في قاموس
+    للقراءة فقط - الرسائل التي ليست أوامر (الإجابات) تمر مباشرة.
+    """
+
+    def __init__(self):
+        self._handlers = {}
+        self.routes = None
+
+    def add(self, aliases, handler):
+        if self.routes is not None:
+            raise RuntimeError("لا يمكن إضافة أوامر بعد التجميد")
+        for alias in aliases:
+            key = normalize_command(alias)
+            if key in self._handlers:
+                raise ValueError(f"الأمر {alias} مسجل مسبقاً")
+            self._handlers[key] = handler
+
+    def command(self, *aliases):
+        """مزخرف: @router.command('مساعدة', 'help')"""
+        def decorator(func):
+            self.add(aliases, func)
+            return func
+        return decorator
+
+    def freeze(self):
+        self.routes = MappingProxyType(dict(self._handlers))
+        return self.routes
+
+    def resolve(self, text):
+        """الدالة الخاصة بالنص أو None إذا لم يكن أمراً"""
+        return self.routes.get(normalize_command(text))
+
+    def __len__(self):
+        return len(self._handlers)
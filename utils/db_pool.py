@@ -0,0 +1,277 @@
+"""
+طبقة الوصول لقاعدة البيانات SQLite
+مجمع اتصالات ثابت الحجم مع WAL، وتجميع تحديثات النقاط قبل كتابتها
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """مجمع من size اتصالات كحد أقصى تُستعار وتُعاد (LIFO)
+
+    الاتصال يُستعار فقط طوال كتلة with connection()، فعدد الاتصالات المفتوحة
+    لا يزيد عن size مهما كان عدد الـ threads أو greenlets. الاستعارة المتداخلة
+    في نفس الـ thread/greenlet تعيد نفس الاتصال. الاتصالات في وضع autocommit،
+    والمعاملات تُفتح صراحة عبر transaction().
+    """
+
+    def __init__(self, db_path, timeout=5.0, cache_size_kb=8000, cached_statements=256, size=8):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.cache_size_kb = cache_size_kb
+        self.cached_statements = cached_statements
+        self.size = max(1, size)
+        self._idle = queue.LifoQueue()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self.opened = 0
+        self.waits = 0
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None,
+                               check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.timeout * 1000)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kb)}')
+        return conn
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = len(self._connections) < self.size
+            if create:
+                self._connections.append(None)  # حجز مكان قبل الفتح
+        if create:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._lock:
+                    self._connections.remove(None)
+                raise
+            with self._lock:
+                self._connections[self._connections.index(None)] = conn
+                self.opened += 1
+            return conn
+        with self._lock:
+            self.waits += 1
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"لا يوجد اتصال متاح في المجمع ({self.size}) لـ {self.db_path}")
+
+    @contextmanager
+    def connection(self):
+        """استعارة اتصال طوال كتلة with ثم إعادته للمجمع"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+        conn = self._checkout()
+        self._local.conn, self._local.depth = conn, 1
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def query(self, sql, params=()):
+        """كل صفوف استعلام واحد"""
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        """الصف الأول أو None"""
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def execute(self, sql, params=()):
+        """أمر كتابة واحد (autocommit) - يعيد عدد الصفوف المتأثرة"""
+        with self.connection() as conn:
+            return conn.execute(sql, params).rowcount
+
+    @contextmanager
+    def transaction(self):
+        """معاملة كتابة واحدة (BEGIN IMMEDIATE ... COMMIT)"""
+        with self.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def close_all(self):
+        """إغلاق جميع الاتصالات (عند إيقاف التطبيق)"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._idle = queue.LifoQueue()
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._local = threading.local()
+
+    def stats(self):
+        with self._lock:
+            return {'db_path': self.db_path, 'size': self.size, 'opened': self.opened,
+                    'open': len(self._connections), 'idle': self._idle.qsize(),
+                    'waits': self.waits}
+
+
+UPSERT_USER_SQL = '''INSERT INTO users (user_id, display_name, total_points,
+                         games_played, wins, last_played) VALUES (?, ?, ?, ?, ?, ?)
+                     ON CONFLICT(user_id) DO UPDATE SET
+                         total_points = total_points + excluded.total_points,
+                         games_played = games_played + excluded.games_played,
+                         wins = wins + excluded.wins,
+                         last_played = excluded.last_played,
+                         display_name = excluded.display_name'''
+
+INSERT_HISTORY_SQL = '''INSERT INTO game_history (user_id, game_type, points, won)
+                        VALUES (?, ?, ?, ?)'''
+
+
+def write_scores(conn, users, history):
+    """كتابة تحديثات النقاط المجمعة وسجل الألعاب"""
+    if users:
+        conn.executemany(UPSERT_USER_SQL, users)
+    if history:
+        conn.executemany(INSERT_HISTORY_SQL, history)
+
+
+class ScoreBuffer:
+    """تجميع فروقات النقاط في الذاكرة وكتابتها في معاملة واحدة
+
+    كل مستخدم له صف واحد معلق مهما كان عدد إجاباته، ويُكتب كل شيء كل
+    flush_interval ثانية أو عند استدعاء flush() (نهاية اللعبة / قبل القراءة).
+    """
+
+    def __init__(self, pool, flush_interval=0.2, max_pending=500):
+        self.pool = pool
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}  # user_id -> [display_name, points, games, wins, last_played]
+        self._history = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.added = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.errors = 0
+        self.last_flush_ms = 0.0
+
+    def start(self):
+        """تشغيل الكتابة الدورية في الخلفية"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="score-buffer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def add(self, user_id, display_name, points, won=False, game_type=""):
+        """إضافة فرق نقاط لمستخدم"""
+        with self._lock:
+            entry = self._pending.get(user_id)
+            if entry is None:
+                entry = self._pending[user_id] = [display_name, 0, 0, 0, None]
+            entry[0] = display_name
+            entry[1] += points
+            entry[2] += 1
+            entry[3] += 1 if won else 0
+            entry[4] = datetime.now().isoformat()
+            if game_type:
+                self._history.append((user_id, game_type, points, 1 if won else 0))
+            self.added += 1
+            full = len(self._pending) + len(self._history) >= self.max_pending
+        if full:
+            self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """كتابة كل التحديثات المعلقة - يعيد عدد المستخدمين المكتوبين"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending and not self._history:
+                    return 0
+                pending, self._pending = self._pending, {}
+                history, self._history = self._history, []
+
+            users = [(user_id, name, points, games, wins, last_played)
+                     for user_id, (name, points, games, wins, last_played) in pending.items()]
+            started = time.perf_counter()
+            try:
+                with self.pool.transaction() as conn:
+                    write_scores(conn, users, history)
+            except Exception as e:
+                logger.error(f"خطأ في كتابة النقاط المجمعة: {e}")
+                self._restore(pending, history)
+                with self._lock:
+                    self.errors += 1
+                return 0
+
+            with self._lock:
+                self.flushes += 1
+                self.rows_written += len(users)
+                self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+            return len(users)
+
+    def _restore(self, pending, history):
+        """إرجاع التحديثات للطابور بعد فشل الكتابة حتى لا تضيع"""
+        with self._lock:
+            for user_id, (name, points, games, wins, last_played) in pending.items():
+                entry = self._pending.get(user_id)
+                if entry is None:
+                    self._pending[user_id] = [name, points, games, wins, last_played]
+                else:
+                    entry[1] += points
+                    entry[2] += games
+                    entry[3] += wins
+            self._history[:0] = history
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending_users': len(self._pending),
+                'pending_history': len(self._history),
+                'added': self.added,
+                'flushes': self.flushes,
+                'rows_written': self.rows_written,
+                'errors': self.errors,
+                'last_flush_ms': self.last_flush_ms
+            }
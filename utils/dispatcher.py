@@ -0,0 +1,131 @@
+"""
+موزع أحداث غير متزامن بعدد محدود من العمال
+يسمح بالرد على webhook فوراً ومعالجة الأحداث في الخلفية
+"""
+import queue
+import threading
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()  # إشارة إيقاف العامل (المفتاح نفسه قد يكون None)
+
+
+class EventDispatcher:
+    """طابور لكل مفتاح يفرّغه مجمع عمال مشترك
+
+    أحداث المفتاح الواحد (مثل game_id) تُعالج بالترتيب وواحداً تلو الآخر، بينما
+    أي عامل متاح يأخذ المفتاح الجاهز التالي - فمعالج بطيء في مجموعة لا يوقف
+    المجموعات الأخرى. المفتاح يعود لآخر الدور بعد كل حدث (عدالة بين المجموعات).
+    queue_size حد لكل الأحداث المنتظرة معاً.
+    مع gevent تُستبدل الـ threads تلقائياً بـ greenlets عبر monkey patching.
+    """
+
+    def __init__(self, workers=4, queue_size=1000, put_timeout=0.5):
+        self.workers = max(1, workers)
+        self.capacity = max(1, queue_size)
+        self.put_timeout = put_timeout
+        self._pending = {}  # key -> deque[(func, args, enqueued_at)] للمفاتيح المجدولة أو قيد التنفيذ
+        self._ready = queue.Queue()  # مفاتيح لها أحداث ولا يعالجها عامل حالياً
+        self._cond = threading.Condition()
+        self._depth = 0  # أحداث تنتظر عاملاً
+        self._unfinished = 0  # أحداث لم تنته معالجتها بعد
+        self._threads = []
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self._total_wait = 0.0
+
+    def start(self):
+        """تشغيل العمال"""
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"dispatcher-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"تم تشغيل {self.workers} عمال لمعالجة الأحداث")
+
+    def submit(self, key, func, *args):
+        """إضافة مهمة لطابور المفتاح - يعيد False إذا بقي الحد ممتلئاً بعد put_timeout"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._depth < self.capacity, timeout=self.put_timeout):
+                self.rejected += 1
+                logger.warning(f"طابور الأحداث ممتلئ ({self._depth}) - المفتاح: {key}")
+                return False
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = deque()
+                self._ready.put(key)
+            pending.append((func, args, time.monotonic()))
+            self._depth += 1
+            self._unfinished += 1
+            self.submitted += 1
+            if self._depth > self.max_depth:
+                self.max_depth = self._depth
+        return True
+
+    def _run(self):
+        while True:
+            key = self._ready.get()
+            if key is _STOP:
+                break
+            with self._cond:
+                func, args, enqueued_at = self._pending[key].popleft()
+                self._depth -= 1
+                self._cond.notify_all()
+            wait = time.monotonic() - enqueued_at
+            try:
+                func(*args)
+                failed = False
+            except Exception as e:
+                failed = True
+                logger.error(f"خطأ في معالجة حدث: {e}", exc_info=True)
+            with self._cond:
+                # المفتاح لا يُجدول مرة ثانية قبل انتهاء حدثه الحالي - هذا ما يحفظ الترتيب
+                if self._pending[key]:
+                    self._ready.put(key)
+                else:
+                    del self._pending[key]
+                self._unfinished -= 1
+                self.processed += 1
+                self._total_wait += wait
+                if failed:
+                    self.failed += 1
+                self._cond.notify_all()
+
+    def join(self):
+        """انتظار إنهاء جميع المهام الحالية"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._unfinished == 0)
+
+    def shutdown(self):
+        """إيقاف العمال بعد تفريغ الطوابير"""
+        if not self._threads:
+            return
+        self.join()
+        for _ in self._threads:
+            self._ready.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def stats(self):
+        """مؤشرات عمق الطوابير والضغط"""
+        with self._cond:
+            return {
+                'workers': self.workers,
+                'queue_capacity': self.capacity,
+                'queue_depth': self._depth,
+                'active_keys': len(self._pending),
+                'max_depth': self.max_depth,
+                'submitted': self.submitted,
+                'processed': self.processed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'avg_wait_ms': round(self._total_wait / self.processed * 1000, 2) if self.processed else 0.0
+            }
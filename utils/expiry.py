@@ -0,0 +1,113 @@
+"""
+جدولة انتهاء الألعاب (min-heap حسب آخر نشاط)
+كل لعبة تنتهي قرب موعدها بدلاً من مسح كل الألعاب كل 5 دقائق
+"""
+import heapq
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryScheduler:
+    """مواعيد انتهاء في heap مع حذف كسول
+
+    تأجيل الموعد في touch() يحدّث القاموس فقط (O(1))، فيبقى لكل مفتاح إدخال
+    واحد تقريباً في الـ heap: عند خروجه إذا كان الموعد الحقيقي قد تأخر يُعاد
+    إدخاله بالموعد الجديد. on_expire(key) يعيد None بعد الحذف، أو موعداً جديداً إذا تبين
+    أن اللعبة نشطة (مثلاً في عامل آخر يشارك نفس المخزن).
+    """
+
+    def __init__(self, timeout, on_expire, clock=time.time):
+        self.timeout = timeout
+        self._on_expire = on_expire
+        self._clock = clock
+        self._deadlines = {}  # key -> الموعد الحالي
+        self._heap = []  # (deadline, key) - قد يكون أقدم من الموعد الحالي
+        self._cond = threading.Condition()
+        self._thread = None
+        self.expired = 0
+        self.rescheduled = 0
+        self.errors = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="game-expiry", daemon=True)
+            self._thread.start()
+
+    def touch(self, key, at=None):
+        """تسجيل نشاط: ينتهي المفتاح بعد timeout من at (أو الآن)"""
+        deadline = (self._clock() if at is None else at) + self.timeout
+        with self._cond:
+            previous = self._deadlines.get(key)
+            self._deadlines[key] = deadline
+            # موعد أبكر من إدخال الـ heap الحالي يحتاج إدخالاً جديداً
+            if previous is None or deadline < previous:
+                self._push(deadline, key)
+
+    def _push(self, deadline, key):
+        earliest = not self._heap or deadline < self._heap[0][0]
+        heapq.heappush(self._heap, (deadline, key))
+        if earliest:
+            self._cond.notify()
+
+    def cancel(self, key):
+        """إلغاء الجدولة (انتهت اللعبة أو أُوقفت)"""
+        with self._cond:
+            self._deadlines.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self._deadlines
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def due(self):
+        """إخراج المفاتيح التي حان موعدها"""
+        now = self._clock()
+        keys = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                _, key = heapq.heappop(self._heap)
+                deadline = self._deadlines.get(key)
+                if deadline is None:
+                    continue  # أُلغي
+                if deadline > now:
+                    heapq.heappush(self._heap, (deadline, key))
+                    continue
+                del self._deadlines[key]
+                keys.append(key)
+        return keys
+
+    def run_due(self):
+        """تنفيذ on_expire للمفاتيح المستحقة - يعيد عدد المحذوفة"""
+        removed = 0
+        for key in self.due():
+            try:
+                deadline = self._on_expire(key)
+            except Exception as e:
+                logger.error(f"خطأ في إنهاء {key}: {e}")
+                self.errors += 1
+                continue
+            if deadline is None:
+                removed += 1
+            else:
+                self.touch(key, at=deadline - self.timeout)
+                self.rescheduled += 1
+        self.expired += removed
+        return removed
+
+    def _run(self):
+        while True:
+            with self._cond:
+                wait = self._heap[0][0] - self._clock() if self._heap else None
+                if wait is None or wait > 0:
+                    self._cond.wait(wait)
+            self.run_due()
+
+    def stats(self):
+        with self._cond:
+            return {'scheduled': len(self._deadlines), 'heap_size': len(self._heap),
+                    'expired': self.expired, 'rescheduled': self.rescheduled,
+                    'errors': self.errors}
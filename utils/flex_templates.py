@@ -0,0 +1,125 @@
+"""
+قوالب Flex مجهزة مسبقاً
+يُحوّل التصميم إلى JSON مرة واحدة عند الاستيراد، والعرض مجرد ملء للفراغات
+"""
+import json
+import re
+
+from linebot.models import SendMessage, QuickReply
+
+_MARK = '\ue000'  # حرف خاص لا يظهر في النصوص العادية
+# فراغ يشغل القيمة كاملة (مع علامات التنصيص) أو جزءاً من نص
+_SLOT_RE = re.compile('"\ue000(\\w+)\ue000"|\ue000(\\w+)\ue000')
+
+RAW = 'raw'
+
+
+def slot(name):
+    """علامة فراغ توضع مكان القيمة في التصميم"""
+    return f"{_MARK}{name}{_MARK}"
+
+
+def dumps(data):
+    """ترميز JSON مضغوط بدون تحويل العربية إلى \\u"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def _escape(value):
+    return json.dumps(str(value), ensure_ascii=False)[1:-1]
+
+
+def _raw(value):
+    return value if isinstance(value, str) else dumps(value)
+
+
+class FlexTemplate:
+    """تصميم مترجم إلى أجزاء JSON ثابتة بينها فراغات ذات أنواع
+
+    الأنواع: str (افتراضي - نص مع الهروب)، int (رقم)، RAW (JSON جاهز
+    مثل قائمة عناصر). int و RAW في مكان القيمة الكاملة يُكتبان بدون علامات تنصيص.
+    """
+
+    def __init__(self, layout, **types):
+        text = dumps(layout)
+        self._segments = []
+        self._slots = []
+        position = 0
+        pending = ''
+        for match in _SLOT_RE.finditer(text):
+            whole = match.group(1) is not None
+            name = match.group(1) or match.group(2)
+            kind = types.get(name, str)
+            literal = pending + text[position:match.start()]
+            pending = ''
+            if kind is str:
+                convert = _escape
+                if whole:
+                    literal += '"'
+                    pending = '"'
+            elif kind is int:
+                convert = lambda value: str(int(value))
+            elif kind == RAW:
+                if not whole:
+                    raise ValueError(f"الفراغ {name} من نوع raw يجب أن يكون قيمة كاملة")
+                convert = _raw
+            else:
+                raise ValueError(f"نوع غير معروف للفراغ {name}: {kind}")
+            self._segments.append(literal)
+            self._slots.append((name, convert))
+            position = match.end()
+        self._segments.append(pending + text[position:])
+
+        unknown = set(types) - {name for name, _ in self._slots}
+        if unknown:
+            raise ValueError(f"فراغات غير موجودة في التصميم: {sorted(unknown)}")
+        self.slot_names = frozenset(name for name, _ in self._slots)
+
+    def render_json(self, **values):
+        """ملء الفراغات وإرجاع نص JSON"""
+        segments = self._segments
+        out = [segments[0]]
+        for (name, convert), segment in zip(self._slots, segments[1:]):
+            out.append(convert(values[name]))
+            out.append(segment)
+        return ''.join(out)
+
+    def render(self, **values):
+        """ملء الفراغات وإرجاع قاموس"""
+        return json.loads(self.render_json(**values))
+
+    def message(self, alt_text, quick_reply=None, **values):
+        """رسالة Flex جاهزة للإرسال"""
+        return prebuilt_flex(alt_text, self.render(**values), quick_reply)
+
+
+class FrozenQuickReply(QuickReply):
+    """أزرار سريعة ثابتة - تُرمّز مرة واحدة فقط"""
+
+    def __init__(self, items=None, **kwargs):
+        super().__init__(items=items, **kwargs)
+        self._json_dict = super().as_json_dict()
+
+    def as_json_dict(self):
+        return self._json_dict
+
+
+class PrebuiltMessage(SendMessage):
+    """رسالة جاهزة - as_json_dict يعيد القاموس المحفوظ بدون بناء كائنات SDK
+
+    لا تُعدل بعد الإنشاء؛ الأزرار السريعة تُدمج في القاموس عند الإنشاء.
+    """
+
+    def __init__(self, data, quick_reply=None):
+        super().__init__(quick_reply=quick_reply)
+        self.type = data.get('type')
+        if quick_reply is not None:
+            data = dict(data, quickReply=quick_reply.as_json_dict())
+        self._data = data
+
+    def as_json_dict(self):
+        return self._data
+
+
+def prebuilt_flex(alt_text, contents, quick_reply=None):
+    """رسالة Flex جاهزة من قاموس المحتوى"""
+    return PrebuiltMessage({'type': 'flex', 'altText': alt_text, 'contents': contents}, quick_reply)
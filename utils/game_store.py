@@ -0,0 +1,462 @@
+"""
+مخزن حالة الألعاب - واجهة قابلة للتبديل
+memory: نفس السلوك الحالي داخل العملية
+sqlite: ملف مشترك (WAL) بين جميع عمال gunicorn على نفس الخادم
+tiered: الألعاب النشطة في الذاكرة والخاملة في ملف SQLite محلي (عامل واحد)
+"""
+import threading
+import time
+import logging
+from collections import OrderedDict
+from contextlib import nullcontext
+
+from .db_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+class GameStore:
+    """الواجهة الأساسية لمخزن الألعاب
+
+    يتصرف كقاموس game_id -> سجل اللعبة، مع مجموعة اللاعبين المسجلين في
+    الخاصية players. تعديل سجل موجود (مثل إجابة) يتم عبر update() حتى لا تضيع
+    تعديلات عملية أخرى على نفس اللعبة.
+    """
+
+    players = None
+
+    def __getitem__(self, game_id):
+        record = self.get(game_id)
+        if record is None:
+            raise KeyError(game_id)
+        return record
+
+    def __setitem__(self, game_id, record):
+        self.put(game_id, record)
+
+    def __delitem__(self, game_id):
+        if self.delete(game_id) is None:
+            raise KeyError(game_id)
+
+    def __contains__(self, game_id):
+        raise NotImplementedError("يجب تنفيذ __contains__ في الفئة الفرعية")
+
+    def __len__(self):
+        raise NotImplementedError("يجب تنفيذ __len__ في الفئة الفرعية")
+
+    def get(self, game_id, default=None):
+        raise NotImplementedError("يجب تنفيذ get في الفئة الفرعية")
+
+    def peek(self, game_id, default=None):
+        """قراءة سجل بدون أثر على ترتيب الاستخدام (للصيانة مثل انتهاء الوقت)"""
+        return self.get(game_id, default)
+
+    def put(self, game_id, record):
+        raise NotImplementedError("يجب تنفيذ put في الفئة الفرعية")
+
+    def delete(self, game_id):
+        """حذف لعبة وإرجاع سجلها (أو None)"""
+        raise NotImplementedError("يجب تنفيذ delete في الفئة الفرعية")
+
+    def items(self):
+        raise NotImplementedError("يجب تنفيذ items في الفئة الفرعية")
+
+    def update(self, game_id, apply):
+        """قراءة وتعديل وحفظ سجل لعبة كعملية واحدة
+
+        apply(record) يعدّل السجل ويعيد (القيمة، حذف اللعبة؟). يعيد update القيمة،
+        أو None إذا لم تكن اللعبة موجودة. داخل العملية الواحدة يكفي قفل game_locks
+        """
+        record = self.get(game_id)
+        if record is None:
+            return None
+        value, delete = apply(record)
+        if delete:
+            self.delete(game_id)
+        else:
+            self.put(game_id, record)
+        return value
+
+    def spill_idle(self):
+        """إخراج الألعاب الخاملة من الذاكرة - يعيد عددها (لا شيء في المخازن غير المتدرجة)"""
+        return 0
+
+    def stats(self):
+        return {'games': len(self)}
+
+
+class MemoryGameStore(GameStore):
+    """تخزين داخل الذاكرة (عامل واحد)"""
+
+    def __init__(self):
+        self._games = {}
+        self.players = set()
+
+    def __contains__(self, game_id):
+        return game_id in self._games
+
+    def __len__(self):
+        return len(self._games)
+
+    def get(self, game_id, default=None):
+        return self._games.get(game_id, default)
+
+    def put(self, game_id, record):
+        self._games[game_id] = record
+
+    def delete(self, game_id):
+        return self._games.pop(game_id, None)
+
+    def items(self):
+        return list(self._games.items())
+
+
+def serialize_record(record):
+    """ترميز سجل اللعبة كاملاً كـ JSON موسوم مضغوط - اللعبة كلقطة (games.state)"""
+    from games.state import dump_record
+    return dump_record(record)
+
+
+def deserialize_record(blob, line_bot_api=None, clock=None):
+    """فك ترميز سجل اللعبة وإعادة بناء اللعبة من لقطتها مع ربط واجهة LINE والساعة"""
+    from games.state import load_record
+    return load_record(blob, line_bot_api, clock)
+
+
+class SQLitePlayerSet:
+    """مجموعة اللاعبين المسجلين في SQLite (واجهة مشابهة لـ set)"""
+
+    def __init__(self, connections):
+        self._connections = connections
+
+    def __contains__(self, user_id):
+        row = self._connections.query_one('SELECT 1 FROM players WHERE user_id = ?', (user_id,))
+        return row is not None
+
+    def __len__(self):
+        return self._connections.query_one('SELECT COUNT(*) FROM players')[0]
+
+    def __iter__(self):
+        return iter(self.copy())
+
+    def add(self, user_id):
+        self._connections.execute('INSERT OR IGNORE INTO players (user_id, joined_at) VALUES (?, ?)',
+                                  (user_id, time.time()))
+
+    def remove(self, user_id):
+        if self._connections.execute('DELETE FROM players WHERE user_id = ?', (user_id,)) == 0:
+            raise KeyError(user_id)
+
+    def discard(self, user_id):
+        self._connections.execute('DELETE FROM players WHERE user_id = ?', (user_id,))
+
+    def copy(self):
+        rows = self._connections.query('SELECT user_id FROM players')
+        return {row[0] for row in rows}
+
+
+class SQLiteGameStore(GameStore):
+    """تخزين مشترك بين العمليات في ملف SQLite
+
+    كل سجل له رقم إصدار يزيد مع كل كتابة. update() يحفظ فقط إذا لم يتغير الإصدار
+    منذ القراءة (compare-and-swap) ويعيد المحاولة على الحالة الجديدة، فإجابتان
+    على نفس اللعبة من عاملين مختلفين لا تلغي إحداهما الأخرى.
+    """
+
+    def __init__(self, db_path, line_bot_api=None, max_retries=5, game_clock=None):
+        self.line_bot_api = line_bot_api
+        self.game_clock = game_clock  # ساعة الألعاب المستعادة (None = time.time)
+        self.max_retries = max_retries
+        self._connections = ConnectionPool(db_path)
+        self._init_schema()
+        self.players = SQLitePlayerSet(self._connections)
+        self.conflicts = 0
+
+    def _init_schema(self):
+        with self._connections.connection() as conn:
+            self._create_tables(conn)
+
+    def _create_tables(self, conn):
+        conn.execute('''CREATE TABLE IF NOT EXISTS games
+                        (game_id TEXT PRIMARY KEY,
+                         game_type TEXT,
+                         updated_at REAL,
+                         state BLOB NOT NULL,
+                         version INTEGER NOT NULL DEFAULT 0)''')
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(games)')}
+        if 'version' not in columns:
+            conn.execute('ALTER TABLE games ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+        conn.execute('''CREATE TABLE IF NOT EXISTS players
+                        (user_id TEXT PRIMARY KEY,
+                         joined_at REAL)''')
+
+    def __contains__(self, game_id):
+        row = self._connections.query_one('SELECT 1 FROM games WHERE game_id = ?', (game_id,))
+        return row is not None
+
+    def __len__(self):
+        return self._connections.query_one('SELECT COUNT(*) FROM games')[0]
+
+    def get(self, game_id, default=None):
+        try:
+            found = self.read(game_id)
+        except Exception as e:
+            logger.error(f"خطأ في قراءة حالة اللعبة {game_id}: {e}")
+            return default
+        return default if found is None else found[0]
+
+    def read(self, game_id):
+        """(السجل، الإصدار) أو None إذا لم توجد اللعبة - خطأ فك الترميز يصل للمستدعي"""
+        row = self._connections.query_one('SELECT state, version FROM games WHERE game_id = ?', (game_id,))
+        if row is None:
+            return None
+        return deserialize_record(row[0], self.line_bot_api, self.game_clock), row[1]
+
+    def discard(self, game_id, version):
+        """حذف اللعبة فقط إذا لم تُكتب منذ قراءة version - يعيد True عند الحذف"""
+        return self._connections.execute('DELETE FROM games WHERE game_id = ? AND version = ?',
+                                         (game_id, version)) > 0
+
+    def put(self, game_id, record):
+        self._connections.execute(
+            '''INSERT INTO games (game_id, game_type, updated_at, state) VALUES (?, ?, ?, ?)
+               ON CONFLICT(game_id) DO UPDATE SET
+                   game_type = excluded.game_type,
+                   updated_at = excluded.updated_at,
+                   state = excluded.state,
+                   version = games.version + 1''',
+            (game_id, record.get('type'), time.time(), serialize_record(record)))
+
+    def update(self, game_id, apply):
+        """قراءة وتعديل وحفظ بمقارنة الإصدار - يُعاد apply على الحالة الأحدث عند التعارض
+
+        السجل يُحفظ كلما تغيرت حالته (حتى بدون رد)، وبعد max_retries تعارضات
+        تتم المحاولة الأخيرة داخل معاملة BEGIN IMMEDIATE
+        """
+        with self._connections.connection() as conn:
+            for _attempt in range(self.max_retries):
+                row = conn.execute('SELECT state, version FROM games WHERE game_id = ?', (game_id,)).fetchone()
+                if row is None:
+                    return None
+                applied = self._apply(conn, game_id, row, apply)
+                if applied is not None:
+                    return applied[0]
+                self.conflicts += 1
+        with self._connections.transaction() as conn:
+            row = conn.execute('SELECT state, version FROM games WHERE game_id = ?', (game_id,)).fetchone()
+            if row is None:
+                return None
+            return self._apply(conn, game_id, row, apply)[0]
+
+    def _apply(self, conn, game_id, row, apply):
+        """تطبيق apply على نسخة من السجل وحفظها - None إذا تغير الإصدار في الأثناء"""
+        state, version = row
+        record = deserialize_record(state, self.line_bot_api, self.game_clock)
+        value, delete = apply(record)
+        if delete:
+            cur = conn.execute('DELETE FROM games WHERE game_id = ? AND version = ?', (game_id, version))
+            return (value,) if cur.rowcount else None
+        blob = serialize_record(record)
+        if blob == state:
+            return (value,)
+        cur = conn.execute(
+            'UPDATE games SET state = ?, updated_at = ?, version = version + 1 '
+            'WHERE game_id = ? AND version = ?',
+            (blob, time.time(), game_id, version))
+        return (value,) if cur.rowcount else None
+
+    def delete(self, game_id):
+        with self._connections.transaction() as conn:
+            row = conn.execute('SELECT state FROM games WHERE game_id = ?', (game_id,)).fetchone()
+            if row is not None:
+                conn.execute('DELETE FROM games WHERE game_id = ?', (game_id,))
+        if row is None:
+            return None
+        try:
+            return deserialize_record(row[0], self.line_bot_api, self.game_clock)
+        except Exception as e:
+            logger.error(f"خطأ في قراءة حالة اللعبة {game_id}: {e}")
+            return {}
+
+    def items(self):
+        rows = self._connections.query('SELECT game_id, state FROM games')
+        result = []
+        for game_id, blob in rows:
+            try:
+                result.append((game_id, deserialize_record(blob, self.line_bot_api, self.game_clock)))
+            except Exception as e:
+                logger.error(f"خطأ في قراءة حالة اللعبة {game_id}: {e}")
+        return result
+
+    def stats(self):
+        return {'games': len(self), 'conflicts': self.conflicts}
+
+
+class TieredGameStore(GameStore):
+    """ألعاب نشطة في الذاكرة، والخاملة تُكتب كلقطات في SQLite وتُحذف من الذاكرة
+
+    تُعاد اللعبة للذاكرة تلقائياً عند أول get (الرسالة التالية في المجموعة).
+    الإخراج يحدث للألعاب الخاملة أكثر من idle_seconds (spill_idle من خيط الصيانة)،
+    وللأقدم استخداماً عند تجاوز max_hot لعبة في الذاكرة. مع locks (LockManager)
+    لا تُخرج لعبة قفلها محجوز لخيط آخر. clock لأوقات الخمول، و game_clock ساعة
+    الألعاب المعادة من SQLite (None = time.time).
+    """
+
+    def __init__(self, db_path, line_bot_api=None, idle_seconds=300, max_hot=1000,
+                 locks=None, clock=time.time, game_clock=None):
+        self._hot = OrderedDict()  # game_id -> السجل، بترتيب آخر استخدام
+        self._used = {}
+        self._cold = SQLiteGameStore(db_path, line_bot_api=line_bot_api, game_clock=game_clock)
+        self._lock = threading.Lock()
+        self.idle_seconds = idle_seconds
+        self.max_hot = max(1, max_hot)
+        self.locks = locks
+        self.clock = clock
+        self.players = set()
+        self.idle_spills = 0
+        self.budget_spills = 0
+        self.spill_ms = 0.0
+        self.rehydrates = 0
+        self.rehydrate_ms = 0.0
+        self.rehydrate_max_ms = 0.0
+
+    def __contains__(self, game_id):
+        return game_id in self._hot or game_id in self._cold
+
+    def __len__(self):
+        return len(self._hot) + len(self._cold)
+
+    def get(self, game_id, default=None):
+        with self._lock:
+            record = self._hot.get(game_id)
+            if record is not None:
+                self._hot.move_to_end(game_id)
+                self._used[game_id] = self.clock()
+                return record
+        # القراءة من SQLite ثم الإضافة للذاكرة ثم الحذف - اللعبة في أحد المستويين دائماً
+        start = time.perf_counter()
+        try:
+            found = self._cold.read(game_id)
+        except Exception as e:
+            # السجل يبقى في SQLite للفحص بدلاً من اعتباره غير موجود وحذفه
+            logger.error(f"تعذر إعادة اللعبة {game_id} من SQLite: {e}", exc_info=True)
+            return default
+        if found is None:
+            return default
+        record, version = found
+        with self._lock:
+            current = self._hot.setdefault(game_id, record)
+        if current is not record:
+            # خيط آخر أعادها في الأثناء - نسخته هي المعتمدة
+            return current
+        self.put(game_id, record)
+        # إن كُتبت اللعبة في SQLite من جديد (إخراج آخر) تبقى تلك النسخة
+        self._cold.discard(game_id, version)
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.rehydrates += 1
+            self.rehydrate_ms += elapsed
+            self.rehydrate_max_ms = max(self.rehydrate_max_ms, elapsed)
+        return record
+
+    def peek(self, game_id, default=None):
+        """السجل من الذاكرة أو من SQLite بدون إعادته للذاكرة"""
+        with self._lock:
+            record = self._hot.get(game_id)
+        if record is not None:
+            return record
+        return self._cold.get(game_id, default)
+
+    def put(self, game_id, record):
+        with self._lock:
+            self._hot[game_id] = record
+            self._hot.move_to_end(game_id)
+            self._used[game_id] = self.clock()
+            over = len(self._hot) - self.max_hot
+            candidates = list(self._hot)[:-1] if over > 0 else ()
+        for victim in candidates:
+            if over <= 0:
+                break
+            if self._spill(victim):
+                over -= 1
+                with self._lock:
+                    self.budget_spills += 1
+
+    def delete(self, game_id):
+        with self._lock:
+            record = self._hot.pop(game_id, None)
+            self._used.pop(game_id, None)
+        cold = self._cold.delete(game_id)
+        return record if record is not None else cold
+
+    def items(self):
+        with self._lock:
+            hot = list(self._hot.items())
+        return hot + self._cold.items()
+
+    def _spill(self, game_id):
+        """كتابة لعبة في SQLite ثم حذفها من الذاكرة (تبقى ظاهرة في __contains__ طوال الوقت)"""
+        guard = self.locks.try_locked(game_id) if self.locks else nullcontext(True)
+        with guard as acquired:
+            if not acquired:
+                return False
+            with self._lock:
+                record = self._hot.get(game_id)
+            if record is None:
+                return False
+            start = time.perf_counter()
+            try:
+                self._cold.put(game_id, record)
+            except Exception as e:
+                logger.error(f"تعذر إخراج اللعبة {game_id} من الذاكرة: {e}")
+                return False
+            with self._lock:
+                if self._hot.get(game_id) is record:
+                    del self._hot[game_id]
+                    self._used.pop(game_id, None)
+                self.spill_ms += (time.perf_counter() - start) * 1000
+            return True
+
+    def spill_idle(self):
+        """إخراج الألعاب بلا نشاط منذ idle_seconds (حسب last_activity في السجل)"""
+        cutoff = self.clock() - self.idle_seconds
+        with self._lock:
+            idle = [game_id for game_id, record in self._hot.items()
+                    if record.get('last_activity', self._used.get(game_id, 0)) <= cutoff]
+        spilled = sum(1 for game_id in idle if self._spill(game_id))
+        with self._lock:
+            self.idle_spills += spilled
+        if spilled:
+            logger.info(f"إخراج {spilled} لعبة خاملة من الذاكرة")
+        return spilled
+
+    def stats(self):
+        with self._lock:
+            spills = self.idle_spills + self.budget_spills
+            return {
+                'hot': len(self._hot),
+                'cold': len(self._cold),
+                'max_hot': self.max_hot,
+                'idle_spills': self.idle_spills,
+                'budget_spills': self.budget_spills,
+                'spill_avg_ms': round(self.spill_ms / spills, 2) if spills else 0.0,
+                'rehydrates': self.rehydrates,
+                'rehydrate_avg_ms': round(self.rehydrate_ms / self.rehydrates, 2) if self.rehydrates else 0.0,
+                'rehydrate_max_ms': round(self.rehydrate_max_ms, 2)
+            }
+
+
+def create_game_store(backend='memory', db_path='data/games.db', line_bot_api=None,
+                      idle_seconds=300, max_hot=1000, locks=None, game_clock=None):
+    """إنشاء المخزن المناسب حسب الإعدادات"""
+    if backend == 'sqlite':
+        logger.info(f"مخزن الألعاب: SQLite ({db_path})")
+        return SQLiteGameStore(db_path, line_bot_api=line_bot_api, game_clock=game_clock)
+    if backend == 'tiered':
+        logger.info(f"مخزن الألعاب: ذاكرة + إخراج الخاملة إلى {db_path} "
+                    f"(بعد {idle_seconds} ث، حتى {max_hot} لعبة في الذاكرة)")
+        return TieredGameStore(db_path, line_bot_api=line_bot_api, idle_seconds=idle_seconds,
+                               max_hot=max_hot, locks=locks, game_clock=game_clock)
+    if backend != 'memory':
+        logger.warning(f"نوع مخزن غير معروف '{backend}' - استخدام الذاكرة")
+    return MemoryGameStore()
@@ -1,45 +1,110 @@
-import google.generativeai as genai
 import logging
 import json
+import threading
+
+from .ai_client import GeminiClient, AIUnavailable, get_ai_client
+from .question_pool import QuestionPool
+from .answer_matcher import AnswerMatcher
 
 logger = logging.getLogger(__name__)
 
+
+def parse_json(text, *required):
+    """JSON من رد النموذج (مع إزالة ```json) والتحقق من الحقول المطلوبة"""
+    data = json.loads(text.strip().replace('```json', '').replace('```', ''))
+    if not isinstance(data, dict):
+        raise ValueError("الرد ليس كائن JSON")
+    missing = [key for key in required if not data.get(key)]
+    if missing:
+        raise ValueError(f"حقول ناقصة في الرد: {missing}")
+    return data
+
+
+def require_text(text):
+    """نص الرد بعد التأكد أنه ليس فارغاً"""
+    text = text.strip()
+    if not text:
+        raise ValueError("رد فارغ")
+    return text
+
+
 class GeminiHelper:
-    def __init__(self, api_key):
-        """تهيئة Gemini AI"""
-        if api_key:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-            self.enabled = True
+    # الأنواع التي تُولد مسبقاً في المخزون
+    POOL_KINDS = ('iq_question', 'fast_typing_sentence', 'scrambled_word', 'guess_question',
+                  'human_animal_plant_question', 'analysis_question', 'truth_question')
+    
+    def __init__(self, api_key=None, client=None, pool_size=0, pool_low_water=5, pool_path=None,
+                 accept_threshold=0.8, llm_threshold=0.6, cache_ttl=0, verdict_ttl=0):
+        """تهيئة Gemini AI (العميل المشترك افتراضياً)
+
+        pool_size > 0 يفعّل مخزون الأسئلة الجاهزة (يبدأ مع أول طلب سؤال)، وبين
+        llm_threshold و accept_threshold تُحال مقارنة الإجابات إلى Gemini.
+        cache_ttl و verdict_ttl: مدة حفظ ردود الطلبات المتكررة وأحكام المطابقة
+        """
+        if client is None:
+            client = GeminiClient([api_key]) if api_key else get_ai_client()
+        self.client = client
+        self.cache_ttl = cache_ttl
+        self.verdict_ttl = verdict_ttl
+        self.enabled = client.enabled
+        self.pool = None
+        self.matcher = AnswerMatcher(llm=self._llm_same_answer if client.enabled else None,
+                                     accept_threshold=accept_threshold, llm_threshold=llm_threshold)
+        if self.enabled:
             logger.info("تم تفعيل Gemini AI")
+            if pool_size > 0:
+                producers = {kind: getattr(self, f"_generate_{kind}") for kind in self.POOL_KINDS}
+                self.pool = QuestionPool(producers, pool_size, pool_low_water, pool_path)
         else:
-            self.enabled = False
             logger.warning("Gemini API Key غير متوفر - سيتم استخدام Fallback")
     
-    def generate_iq_question(self):
-        """توليد سؤال ذكاء"""
+    def start_pool(self):
+        """تشغيل تعبئة المخزون في الخلفية (مع أول مستهلك - _take)"""
+        if self.pool is not None:
+            self.pool.start()
+    
+    def _generate(self, prompt, cache_ttl=0):
+        """نص الرد - يرفع AIUnavailable عند المهلة أو فتح الدائرة"""
+        text = self.client.generate(prompt, cache_ttl=cache_ttl)
+        if text is None:
+            raise AIUnavailable("Gemini غير متاح حالياً")
+        return text
+    
+    def _take(self, kind, generate, fallback):
+        """سؤال من المخزون، أو طلب مباشر بدون مخزون، أو البديل المحلي"""
         if not self.enabled:
-            return self._fallback_iq_question()
-        
+            return fallback()
+        if self.pool is not None:
+            # المسار السريع لا ينتظر Gemini أبداً - المخزون الفارغ يعني البديل
+            self.pool.start()
+            item = self.pool.get(kind)
+            return item if item is not None else fallback()
         try:
-            prompt = """
-            أنشئ سؤال ذكاء (IQ) باللغة العربية مع إجابة واحدة صحيحة.
-            السؤال يجب أن يكون رياضي أو منطقي.
-            
-            أرجع النتيجة بصيغة JSON:
-            {
-                "question": "نص السؤال",
-                "answer": "الإجابة الصحيحة",
-                "type": "math" أو "logic"
-            }
-            """
-            
-            response = self.model.generate_content(prompt)
-            data = json.loads(response.text.strip().replace('```json', '').replace('```', ''))
-            return data
+            return generate()
         except Exception as e:
-            logger.error(f"خطأ في توليد سؤال IQ: {e}")
-            return self._fallback_iq_question()
+            logger.error(f"خطأ في توليد {kind}: {e}")
+            return fallback()
+    
+    def generate_iq_question(self):
+        """توليد سؤال ذكاء (من المخزون الجاهز)"""
+        return self._take('iq_question', self._generate_iq_question, self._fallback_iq_question)
+    
+    def _generate_iq_question(self):
+        """توليد سؤال ذكاء من Gemini (يرفع استثناء عند الفشل)"""
+        prompt = """
+        أنشئ سؤال ذكاء (IQ) باللغة العربية مع إجابة واحدة صحيحة.
+        السؤال يجب أن يكون رياضي أو منطقي.
+        
+        أرجع النتيجة بصيغة JSON:
+        {
+            "question": "نص السؤال",
+            "answer": "الإجابة الصحيحة",
+            "type": "math" أو "logic"
+        }
+        """
+        
+        response_text = self._generate(prompt)
+        return parse_json(response_text, 'question', 'answer')
     
     def _fallback_iq_question(self):
         """أسئلة ذكاء احتياطية"""
@@ -54,23 +119,20 @@ class GeminiHelper:
         return random.choice(questions)
     
     def generate_fast_typing_sentence(self):
-        """توليد جملة للكتابة السريعة"""
-        if not self.enabled:
-            return self._fallback_typing_sentence()
+        """توليد جملة للكتابة السريعة (من المخزون الجاهز)"""
+        return self._take('fast_typing_sentence', self._generate_fast_typing_sentence, self._fallback_typing_sentence)
+    
+    def _generate_fast_typing_sentence(self):
+        """توليد جملة للكتابة السريعة من Gemini (يرفع استثناء عند الفشل)"""
+        prompt = """
+        أنشئ جملة عربية قصيرة (5-10 كلمات) للكتابة السريعة.
+        الجملة يجب أن تكون واضحة وسهلة الكتابة.
         
-        try:
-            prompt = """
-            أنشئ جملة عربية قصيرة (5-10 كلمات) للكتابة السريعة.
-            الجملة يجب أن تكون واضحة وسهلة الكتابة.
-            
-            أرجع فقط الجملة بدون أي شرح.
-            """
-            
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
-        except Exception as e:
-            logger.error(f"خطأ في توليد جملة الكتابة: {e}")
-            return self._fallback_typing_sentence()
+        أرجع فقط الجملة بدون أي شرح.
+        """
+        
+        response_text = self._generate(prompt)
+        return require_text(response_text)
     
     def _fallback_typing_sentence(self):
         """جمل كتابة احتياطية"""
@@ -85,27 +147,23 @@ class GeminiHelper:
         return random.choice(sentences)
     
     def generate_scrambled_word(self):
-        """توليد كلمة مخلوطة للترتيب"""
-        if not self.enabled:
-            return self._fallback_scrambled_word()
+        """توليد كلمة مخلوطة للترتيب (من المخزون الجاهز)"""
+        return self._take('scrambled_word', self._generate_scrambled_word, self._fallback_scrambled_word)
+    
+    def _generate_scrambled_word(self):
+        """توليد كلمة مخلوطة للترتيب من Gemini (يرفع استثناء عند الفشل)"""
+        prompt = """
+        اختر كلمة عربية (4-7 حروف) واخلط حروفها.
         
-        try:
-            prompt = """
-            اختر كلمة عربية (4-7 حروف) واخلط حروفها.
-            
-            أرجع النتيجة بصيغة JSON:
-            {
-                "scrambled": "الكلمة المخلوطة",
-                "correct": "الكلمة الصحيحة"
-            }
-            """
-            
-            response = self.model.generate_content(prompt)
-            data = json.loads(response.text.strip().replace('```json', '').replace('```', ''))
-            return data
-        except Exception as e:
-            logger.error(f"خطأ في توليد كلمة مخلوطة: {e}")
-            return self._fallback_scrambled_word()
+        أرجع النتيجة بصيغة JSON:
+        {
+            "scrambled": "الكلمة المخلوطة",
+            "correct": "الكلمة الصحيحة"
+        }
+        """
+        
+        response_text = self._generate(prompt)
+        return parse_json(response_text, 'scrambled', 'correct')
     
     def _fallback_scrambled_word(self):
         """كلمات مخلوطة احتياطية"""
@@ -120,28 +178,24 @@ class GeminiHelper:
         return random.choice(words)
     
     def generate_guess_question(self):
-        """توليد سؤال تخمين"""
-        if not self.enabled:
-            return self._fallback_guess_question()
+        """توليد سؤال تخمين (من المخزون الجاهز)"""
+        return self._take('guess_question', self._generate_guess_question, self._fallback_guess_question)
+    
+    def _generate_guess_question(self):
+        """توليد سؤال تخمين من Gemini (يرفع استثناء عند الفشل)"""
+        prompt = """
+        أنشئ سؤال تخمين لشيء عربي مع تلميح.
         
-        try:
-            prompt = """
-            أنشئ سؤال تخمين لشيء عربي مع تلميح.
-            
-            أرجع النتيجة بصيغة JSON:
-            {
-                "hint": "التلميح (مثل: شيء في المطبخ يبدأ بحرف...)",
-                "answer": "الإجابة الصحيحة",
-                "category": "الفئة (مطبخ، غرفة نوم، إلخ)"
-            }
-            """
-            
-            response = self.model.generate_content(prompt)
-            data = json.loads(response.text.strip().replace('```json', '').replace('```', ''))
-            return data
-        except Exception as e:
-            logger.error(f"خطأ في توليد سؤال التخمين: {e}")
-            return self._fallback_guess_question()
+        أرجع النتيجة بصيغة JSON:
+        {
+            "hint": "التلميح (مثل: شيء في المطبخ يبدأ بحرف...)",
+            "answer": "الإجابة الصحيحة",
+            "category": "الفئة (مطبخ، غرفة نوم، إلخ)"
+        }
+        """
+        
+        response_text = self._generate(prompt)
+        return parse_json(response_text, 'hint', 'answer')
     
     def _fallback_guess_question(self):
         """أسئلة تخمين احتياطية"""
@@ -156,34 +210,32 @@ class GeminiHelper:
         return random.choice(questions)
     
     def generate_human_animal_plant_question(self):
-        """توليد سؤال إنسان/حيوان/نبات"""
-        if not self.enabled:
-            return self._fallback_hap_question()
+        """توليد سؤال إنسان/حيوان/نبات (من المخزون الجاهز)"""
+        return self._take('human_animal_plant_question', self._generate_human_animal_plant_question, self._fallback_hap_question)
+    
+    def _generate_human_animal_plant_question(self):
+        """توليد سؤال إنسان/حيوان/نبات من Gemini (يرفع استثناء عند الفشل)"""
+        import random
+        categories = ['إنسان', 'حيوان', 'نبات', 'جماد', 'مدينة']
+        category = random.choice(categories)
+        letters = 'أبتثجحخدذرزسشصضطظعغفقكلمنهوي'
+        letter = random.choice(letters)
         
-        try:
-            import random
-            categories = ['إنسان', 'حيوان', 'نبات', 'جماد', 'مدينة']
-            category = random.choice(categories)
-            letters = 'أبتثجحخدذرزسشصضطظعغفقكلمنهوي'
-            letter = random.choice(letters)
-            
-            prompt = f"""
-            أعطني مثال واحد لـ {category} يبدأ بحرف "{letter}".
-            
-            أرجع فقط الكلمة بدون شرح.
-            """
-            
-            response = self.model.generate_content(prompt)
-            answer = response.text.strip()
-            
-            return {
-                "category": category,
-                "letter": letter,
-                "answer": answer
-            }
-        except Exception as e:
-            logger.error(f"خطأ في توليد سؤال إنسان/حيوان/نبات: {e}")
-            return self._fallback_hap_question()
+        prompt = f"""
+        أعطني مثال واحد لـ {category} يبدأ بحرف "{letter}".
+        
+        أرجع فقط الكلمة بدون شرح.
+        """
+        
+        # نفس الفئة والحرف = نفس الطلب، فالرد المحفوظ يكفي
+        response_text = self._generate(prompt, cache_ttl=self.cache_ttl)
+        answer = require_text(response_text)
+        
+        return {
+            "category": category,
+            "letter": letter,
+            "answer": answer
+        }
     
     def _fallback_hap_question(self):
         """أسئلة إنسان/حيوان/نبات احتياطية"""
@@ -198,62 +250,44 @@ class GeminiHelper:
         return random.choice(questions)
     
     def check_answer_similarity(self, user_answer, correct_answer):
-        """التحقق من تشابه الإجابة"""
-        # تطبيع النصوص
-        user_answer = user_answer.strip().lower()
-        correct_answer = correct_answer.strip().lower()
-        
-        # مطابقة كاملة
-        if user_answer == correct_answer:
-            return True
-        
-        # مطابقة جزئية (للأرقام والكلمات القصيرة)
-        if user_answer in correct_answer or correct_answer in user_answer:
-            return True
+        """التحقق من تشابه الإجابة (محلياً، و Gemini فقط في منطقة الشك)"""
+        return self.matcher.match(user_answer, correct_answer)
+    
+    def _llm_same_answer(self, user_answer, correct_answer):
+        """حكم Gemini على إجابة قريبة - None إذا لم يكن متاحاً"""
+        prompt = f"""
+        هل هاتان الإجابتان متطابقتان أو متشابهتان بشكل كبير؟
         
-        # استخدام Gemini للتحقق من التشابه
-        if self.enabled:
-            try:
-                prompt = f"""
-                هل هاتان الإجابتان متطابقتان أو متشابهتان بشكل كبير؟
-                
-                إجابة المستخدم: {user_answer}
-                الإجابة الصحيحة: {correct_answer}
-                
-                أجب بـ "نعم" أو "لا" فقط.
-                """
-                
-                response = self.model.generate_content(prompt)
-                result = response.text.strip().lower()
-                return 'نعم' in result or 'yes' in result
-            except Exception as e:
-                logger.error(f"خطأ في التحقق من التشابه: {e}")
+        إجابة المستخدم: {user_answer}
+        الإجابة الصحيحة: {correct_answer}
         
-        return False
+        أجب بـ "نعم" أو "لا" فقط.
+        """
+        result = self.client.generate(prompt, cache_ttl=self.verdict_ttl)
+        if result is None:
+            return None
+        result = result.strip().lower()
+        return 'نعم' in result or 'yes' in result
     
     def generate_analysis_question(self):
-        """توليد سؤال تحليل شخصية"""
-        if not self.enabled:
-            return self._fallback_analysis_question()
+        """توليد سؤال تحليل شخصية (من المخزون الجاهز)"""
+        return self._take('analysis_question', self._generate_analysis_question, self._fallback_analysis_question)
+    
+    def _generate_analysis_question(self):
+        """توليد سؤال تحليل شخصية من Gemini (يرفع استثناء عند الفشل)"""
+        prompt = """
+        أنشئ سؤال تحليل شخصية مع 3 خيارات.
         
-        try:
-            prompt = """
-            أنشئ سؤال تحليل شخصية مع 3 خيارات.
-            
-            أرجع النتيجة بصيغة JSON:
-            {
-                "question": "السؤال",
-                "options": ["خيار 1", "خيار 2", "خيار 3"],
-                "analysis": ["تحليل 1", "تحليل 2", "تحليل 3"]
-            }
-            """
-            
-            response = self.model.generate_content(prompt)
-            data = json.loads(response.text.strip().replace('```json', '').replace('```', ''))
-            return data
-        except Exception as e:
-            logger.error(f"خطأ في توليد سؤال التحليل: {e}")
-            return self._fallback_analysis_question()
+        أرجع النتيجة بصيغة JSON:
+        {
+            "question": "السؤال",
+            "options": ["خيار 1", "خيار 2", "خيار 3"],
+            "analysis": ["تحليل 1", "تحليل 2", "تحليل 3"]
+        }
+        """
+        
+        response_text = self._generate(prompt)
+        return parse_json(response_text, 'question', 'options', 'analysis')
     
     def _fallback_analysis_question(self):
         """أسئلة تحليل احتياطية"""
@@ -272,22 +306,19 @@ class GeminiHelper:
         return random.choice(questions)
     
     def generate_truth_question(self):
-        """توليد سؤال صراحة"""
-        if not self.enabled:
-            return self._fallback_truth_question()
+        """توليد سؤال صراحة (من المخزون الجاهز)"""
+        return self._take('truth_question', self._generate_truth_question, self._fallback_truth_question)
+    
+    def _generate_truth_question(self):
+        """توليد سؤال صراحة من Gemini (يرفع استثناء عند الفشل)"""
+        prompt = """
+        أنشئ سؤال صراحة شخصي ممتع وغير محرج.
         
-        try:
-            prompt = """
-            أنشئ سؤال صراحة شخصي ممتع وغير محرج.
-            
-            أرجع فقط السؤال بدون أي شرح.
-            """
-            
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
-        except Exception as e:
-            logger.error(f"خطأ في توليد سؤال الصراحة: {e}")
-            return self._fallback_truth_question()
+        أرجع فقط السؤال بدون أي شرح.
+        """
+        
+        response_text = self._generate(prompt)
+        return require_text(response_text)
     
     def _fallback_truth_question(self):
         """أسئلة صراحة احتياطية"""
@@ -300,3 +331,25 @@ class GeminiHelper:
             "ما أسعد لحظة في حياتك؟"
         ]
         return random.choice(questions)
+
+
+_helper = None
+_helper_lock = threading.Lock()
+
+
+def get_gemini_helper():
+    """المساعد المشترك لكل العملية - المخزون لا يبدأ التعبئة إلا مع أول طلب سؤال"""
+    global _helper
+    if _helper is None:
+        with _helper_lock:
+            if _helper is None:
+                from config import Config
+                helper = GeminiHelper(pool_size=Config.QUESTION_POOL_SIZE,
+                                      pool_low_water=Config.QUESTION_POOL_LOW_WATER,
+                                      pool_path=Config.QUESTION_POOL_PATH,
+                                      accept_threshold=Config.ANSWER_ACCEPT_THRESHOLD,
+                                      llm_threshold=Config.ANSWER_LLM_THRESHOLD,
+                                      cache_ttl=Config.AI_CACHE_TTL_SECONDS,
+                                      verdict_ttl=Config.AI_VERDICT_TTL_SECONDS)
+                _helper = helper
+    return _helper
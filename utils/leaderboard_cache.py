@@ -0,0 +1,111 @@
+"""
+ذاكرة مؤقتة لنتيجة لوحة الصدارة ورسالتها المبنية
+تُلغى فقط عندما يؤثر تحديث النقاط على أفضل N فعلاً
+"""
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderboardCache:
+    """يحفظ (الصفوف، المحتوى المبني) لأفضل N
+
+    load(limit) يعيد الصفوف و render(rows) يبني المحتوى (مثل Flex).
+    عند انتهاء الصلاحية يبني طلب واحد فقط والبقية تنتظر نتيجته.
+    """
+
+    def __init__(self, load, render, limit=10, ttl=30, clock=time.monotonic):
+        self._load = load
+        self._render = render
+        self.limit = limit
+        self.ttl = ttl
+        self._clock = clock
+        self._entry = None  # (rows, rendered, user_ids, threshold, expires_at)
+        self._building = False
+        self._missed = []  # تحديثات وصلت أثناء البناء
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self.ignored_updates = 0
+
+    def _valid(self):
+        entry = self._entry
+        if entry is not None and entry[4] > self._clock():
+            return entry
+        return None
+
+    def get(self):
+        """إرجاع (rows, rendered) من الذاكرة أو بناؤها مرة واحدة"""
+        entry = self._valid()
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            return entry[0], entry[1]
+
+        with self._build_lock:
+            # طلب آخر ربما أكمل البناء أثناء الانتظار
+            entry = self._valid()
+            if entry is not None:
+                with self._lock:
+                    self.coalesced += 1
+                return entry[0], entry[1]
+
+            with self._lock:
+                self.misses += 1
+                self._building = True
+                self._missed = []
+            try:
+                rows = self._load(self.limit)
+                rendered = self._render(rows) if rows else None
+            finally:
+                with self._lock:
+                    self._building = False
+            user_ids = frozenset(row['user_id'] for row in rows)
+            threshold = rows[-1]['total_points'] if len(rows) >= self.limit else None
+            with self._lock:
+                # لا نحفظ نتيجة فاتها تحديث يؤثر عليها وصل أثناء البناء
+                if not any(self._affects(uid, points, user_ids, threshold)
+                           for uid, points in self._missed):
+                    self._entry = (rows, rendered, user_ids, threshold, self._clock() + self.ttl)
+                self._missed = []
+            return rows, rendered
+
+    @staticmethod
+    def _affects(user_id, points, user_ids, threshold):
+        return (user_id is None or user_id in user_ids or threshold is None
+                or points is None or points >= threshold)
+
+    def notify(self, user_id, points=None):
+        """تحديث نقاط أو اسم لاعب - يُلغى المحتوى فقط إذا كان يدخل أفضل N"""
+        with self._lock:
+            entry = self._entry
+            if entry is None:
+                if self._building:
+                    self._missed.append((user_id, points))
+                return
+            _, _, user_ids, threshold, _ = entry
+            if self._affects(user_id, points, user_ids, threshold):
+                self._entry = None
+                self.invalidations += 1
+            else:
+                self.ignored_updates += 1
+
+    def invalidate(self):
+        self.notify(None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.coalesced + self.misses
+            return {
+                'hits': self.hits,
+                'coalesced': self.coalesced,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'ignored_updates': self.ignored_updates,
+                'hit_ratio': round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0
+            }
@@ -0,0 +1,255 @@
+"""
+فهرس الصدارة في الذاكرة (Fenwick tree على قيم النقاط)
+الترتيب وأفضل N والجيران بزمن O(log n) بدلاً من مسح جدول users
+"""
+import threading
+import logging
+from bisect import bisect_left, insort
+
+logger = logging.getLogger(__name__)
+
+
+class FenwickTree:
+    """عدّاد تراكمي لكل قيمة نقاط - يكبر تلقائياً عند تجاوز الحجم"""
+
+    def __init__(self, size=1024):
+        self.size = 1
+        while self.size < size:
+            self.size *= 2
+        self._tree = [0] * (self.size + 1)
+
+    def _grow(self, minimum):
+        counts = [self.count(i) for i in range(self.size)]
+        while self.size <= minimum:
+            self.size *= 2
+        self._tree = [0] * (self.size + 1)
+        for value, count in enumerate(counts):
+            if count:
+                self.add(value, count)
+
+    def add(self, value, delta):
+        if value >= self.size:
+            self._grow(value)
+        i = value + 1
+        while i <= self.size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix(self, value):
+        """عدد العناصر ذات القيمة <= value"""
+        i = min(value, self.size - 1) + 1
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def count(self, value):
+        return self.prefix(value) - (self.prefix(value - 1) if value > 0 else 0)
+
+    def find(self, k):
+        """أصغر قيمة يصل عندها العدد التراكمي إلى k (k يبدأ من 1)"""
+        pos = 0
+        step = self.size
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and self._tree[nxt] < k:
+                pos = nxt
+                k -= self._tree[nxt]
+            step //= 2
+        return pos
+
+
+class LeaderboardIndex:
+    """ترتيب اللاعبين حسب النقاط في الذاكرة
+
+    كل لاعب له صف [display_name, total_points, games_played, wins]، والشجرة
+    تعد اللاعبين لكل قيمة نقاط. الترتيب = عدد من نقاطهم أعلى + 1 (نفس SQL).
+    لاعبو كل قيمة نقاط في قائمة مرتبة (bisect) فلا فرز عند القراءة، والنقاط
+    السالبة تُزاح بـ offset في الشجرة فتبقى تحت الصفر كما في SQL.
+    """
+
+    def __init__(self):
+        self._rows = {}
+        self._buckets = {}  # points -> [user_id] مرتبة
+        self._tree = FenwickTree()
+        self._offset = 0
+        self._lock = threading.RLock()
+        self.rebuilds = 0
+
+    @staticmethod
+    def _points(points):
+        return int(points or 0)
+
+    def _key(self, points):
+        """موقع قيمة النقاط في الشجرة - يوسّع الإزاحة عند أول قيمة سالبة أقل منها"""
+        key = points + self._offset
+        if key < 0:
+            offset = max(1024, self._offset)
+            while points + offset < 0:
+                offset *= 2
+            self._offset = offset
+            self._tree = FenwickTree(max(self._tree.size, offset + 1))
+            for value, members in self._buckets.items():
+                self._tree.add(value + offset, len(members))
+            key = points + offset
+        return key
+
+    def _insert(self, user_id, row):
+        self._rows[user_id] = row
+        points = self._points(row[1])
+        key = self._key(points)
+        insort(self._buckets.setdefault(points, []), user_id)
+        self._tree.add(key, 1)
+
+    def _remove(self, user_id):
+        row = self._rows.pop(user_id)
+        points = self._points(row[1])
+        members = self._buckets[points]
+        del members[bisect_left(members, user_id)]
+        if not members:
+            del self._buckets[points]
+        self._tree.add(points + self._offset, -1)
+        return row
+
+    def load(self, rows):
+        """إعادة البناء من صفوف (user_id, display_name, total_points, games_played, wins)"""
+        with self._lock:
+            self._rows = {}
+            self._buckets = {}
+            self._tree = FenwickTree()
+            self._offset = 0
+            for user_id, name, points, games, wins in rows:
+                self._insert(user_id, [name, points or 0, games or 0, wins or 0])
+            self.rebuilds += 1
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, user_id):
+        return user_id in self._rows
+
+    def add_score(self, user_id, display_name, points, won=False):
+        """نفس أثر UPSERT في قاعدة البيانات"""
+        with self._lock:
+            row = self._remove(user_id) if user_id in self._rows else [display_name, 0, 0, 0]
+            row[0] = display_name
+            row[1] += points
+            row[2] += 1
+            row[3] += 1 if won else 0
+            self._insert(user_id, row)
+
+    def set_score(self, user_id, total_points, won=False):
+        with self._lock:
+            if user_id not in self._rows:
+                return
+            row = self._remove(user_id)
+            row[1] = total_points
+            row[2] += 1
+            row[3] += 1 if won else 0
+            self._insert(user_id, row)
+
+    def ensure_user(self, user_id, display_name):
+        """إضافة مستخدم بصفر نقاط أو تحديث اسمه"""
+        with self._lock:
+            if user_id in self._rows:
+                self._rows[user_id][0] = display_name
+            else:
+                self._insert(user_id, [display_name, 0, 0, 0])
+
+    def set_name(self, user_id, display_name):
+        with self._lock:
+            if user_id in self._rows:
+                self._rows[user_id][0] = display_name
+
+    def points(self, user_id):
+        row = self._rows.get(user_id)
+        return row[1] if row else None
+
+    def _first(self, points):
+        """مركز أول لاعب بهذه النقاط: عدد من نقاطهم أعلى + 1"""
+        return len(self._rows) - self._tree.prefix(points + self._offset) + 1
+
+    def rank(self, user_id):
+        """ترتيب المستخدم (1 = الأول) أو None إذا لم يكن موجوداً"""
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                return None
+            return self._first(self._points(row[1]))
+
+    def _bucket_at(self, position):
+        """قيمة النقاط للاعب في المركز position (يبدأ من 1، تنازلياً)"""
+        return self._tree.find(len(self._rows) - position + 1) - self._offset
+
+    def _slice(self, start, stop):
+        """اللاعبون من المركز start حتى stop (شامل) مرتبين تنازلياً"""
+        result = []
+        start = max(1, start)
+        position = start
+        stop = min(stop, len(self._rows))
+        while position <= stop:
+            points = self._bucket_at(position)
+            first = self._first(points)
+            members = self._buckets[points]
+            # الجزء المطلوب فقط من مجموعة التعادل
+            for user_id in members[position - first:stop - first + 1]:
+                result.append((first, user_id))
+            position = first + len(members)
+        return result
+
+    def _as_dict(self, rank, user_id):
+        name, points, games, wins = self._rows[user_id]
+        return {'rank': rank, 'user_id': user_id, 'display_name': name,
+                'total_points': points, 'games_played': games, 'wins': wins}
+
+    def top(self, limit=10):
+        """أفضل N لاعبين بنفس أعمدة استعلام الصدارة"""
+        with self._lock:
+            return [self._as_dict(rank, uid) for rank, uid in self._slice(1, limit)]
+
+    def around(self, user_id, radius=2):
+        """اللاعبون حول المستخدم (radius قبله وبعده)"""
+        with self._lock:
+            if user_id not in self._rows:
+                return []
+            points = self._points(self._rows[user_id][1])
+            # موقع المستخدم داخل مجموعة التعادل
+            position = self._first(points) + bisect_left(self._buckets[points], user_id)
+            return [self._as_dict(r, uid)
+                    for r, uid in self._slice(position - radius, position + radius)]
+
+    def threshold(self, limit):
+        """أقل نقاط داخل أفضل N (أو None إذا كان العدد أقل من N)"""
+        with self._lock:
+            if len(self._rows) < limit:
+                return None
+            return self._bucket_at(limit)
+
+    def verify(self, conn, sample=50):
+        """مقارنة الفهرس مع SQL - يعيد قائمة الفروقات (فارغة = متطابق)"""
+        problems = []
+        count = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+        if count != len(self._rows):
+            problems.append(f"count {len(self._rows)} != {count}")
+
+        rows = conn.execute('''SELECT user_id, total_points FROM users
+                               ORDER BY total_points DESC LIMIT ?''', (sample,)).fetchall()
+        expected = [self._points(row[1]) for row in rows]
+        actual = [self._points(row['total_points']) for row in self.top(sample)]
+        if expected != actual:
+            problems.append("top points differ")
+
+        for user_id, _ in rows[:10]:
+            sql_rank = conn.execute('''SELECT COUNT(*) + 1 FROM users WHERE total_points >
+                                       (SELECT total_points FROM users WHERE user_id = ?)''',
+                                    (user_id,)).fetchone()[0]
+            if self.rank(user_id) != sql_rank:
+                problems.append(f"rank {user_id}: {self.rank(user_id)} != {sql_rank}")
+        return problems
+
+    def stats(self):
+        with self._lock:
+            return {'users': len(self._rows), 'buckets': len(self._buckets),
+                    'tree_size': self._tree.size, 'offset': self._offset,
+                    'rebuilds': self.rebuilds}
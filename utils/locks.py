@@ -0,0 +1,73 @@
+"""
+أقفال مقسمة حسب اللعبة (Striped Locks)
+بدلاً من قفل عام واحد يسلسل جميع المجموعات
+"""
+import threading
+import zlib
+from contextlib import contextmanager
+
+
+class LockManager:
+    """مصفوفة أقفال ثابتة الحجم - كل game_id يقع في شريحة واحدة
+
+    الحجم ثابت فلا تنمو الذاكرة مع عدد المجموعات، وعند الحاجة لأكثر من قفل
+    تُحجز الشرائح دائماً بترتيب تصاعدي لتجنب الجمود (deadlock).
+    """
+
+    def __init__(self, stripes=64):
+        self._locks = tuple(threading.RLock() for _ in range(stripes))
+        self._stats_lock = threading.Lock()
+        self.acquisitions = 0
+        self.contended = 0
+
+    def stripe(self, key):
+        """رقم الشريحة الخاصة بالمفتاح (ثابت بين العمليات بخلاف hash())"""
+        return zlib.crc32(str(key).encode('utf-8')) % len(self._locks)
+
+    def lock_for(self, key):
+        """القفل الخاص بمفتاح واحد"""
+        return self._locks[self.stripe(key)]
+
+    def _acquire(self, lock):
+        contended = not lock.acquire(blocking=False)
+        if contended:
+            lock.acquire()
+        with self._stats_lock:
+            self.acquisitions += 1
+            if contended:
+                self.contended += 1
+
+    @contextmanager
+    def locked(self, *keys):
+        """حجز أقفال المفاتيح المعطاة بترتيب ثابت"""
+        indexes = sorted({self.stripe(key) for key in keys})
+        acquired = []
+        try:
+            for index in indexes:
+                lock = self._locks[index]
+                self._acquire(lock)
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    @contextmanager
+    def try_locked(self, key):
+        """حجز قفل مفتاح واحد بدون انتظار - يعطي False إذا كانت الشريحة محجوزة لخيط آخر"""
+        lock = self.lock_for(key)
+        acquired = lock.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+
+    def stats(self):
+        """إحصائيات التنافس على الأقفال"""
+        with self._stats_lock:
+            return {
+                'stripes': len(self._locks),
+                'acquisitions': self.acquisitions,
+                'contended': self.contended
+            }
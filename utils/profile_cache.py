@@ -0,0 +1,126 @@
+"""
+ذاكرة مؤقتة لأسماء المستخدمين (LRU + TTL)
+تقلل استدعاءات get_profile المتزامنة لكل رسالة
+"""
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NAME = "مستخدم"
+
+
+class ProfileCache:
+    """محلل أسماء العرض مع ذاكرة مؤقتة محدودة الحجم والعمر
+
+    ترتيب البحث: الذاكرة ← LINE API ← الاسم المخزن في قاعدة البيانات.
+    فشل الجلب يُخزن سلبياً لمدة أقصر حتى لا نكرر الطلب الفاشل مع كل رسالة.
+    """
+
+    def __init__(self, fetch, load=None, persist=None, max_size=5000,
+                 ttl=3600, negative_ttl=60, default_name=DEFAULT_NAME,
+                 clock=time.monotonic):
+        self._fetch = fetch
+        self._load = load
+        self._persist = persist
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.default_name = default_name
+        self._clock = clock
+        self._entries = OrderedDict()  # user_id -> (name, expires_at, negative)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.fetch_errors = 0
+        self.evictions = 0
+
+    def _lookup(self, user_id):
+        """البحث في الذاكرة فقط - يعيد الإدخال أو None"""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry
+
+    def _store(self, user_id, name, negative=False):
+        ttl = self.negative_ttl if negative else self.ttl
+        with self._lock:
+            self._entries[user_id] = (name, self._clock() + ttl, negative)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def peek(self, user_id):
+        """الاسم من الذاكرة فقط بدون أي طلب شبكة (أو None)"""
+        entry = self._lookup(user_id)
+        return entry[0] if entry else None
+
+    def get(self, user_id):
+        """الحصول على اسم العرض مع الجلب عند الحاجة فقط"""
+        entry = self._lookup(user_id)
+        if entry is not None:
+            with self._lock:
+                if entry[2]:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+            return entry[0]
+
+        with self._lock:
+            self.misses += 1
+
+        try:
+            name = self._fetch(user_id)
+        except Exception as e:
+            with self._lock:
+                self.fetch_errors += 1
+            logger.error(f"خطأ في الحصول على الملف الشخصي: {e}")
+            name = self._load_stored(user_id) or self.default_name
+            self._store(user_id, name, negative=True)
+            return name
+
+        self._store(user_id, name)
+        if self._persist:
+            try:
+                self._persist(user_id, name)
+            except Exception as e:
+                logger.error(f"خطأ في حفظ اسم المستخدم: {e}")
+        return name
+
+    def _load_stored(self, user_id):
+        if not self._load:
+            return None
+        try:
+            return self._load(user_id)
+        except Exception as e:
+            logger.error(f"خطأ في قراءة اسم المستخدم المخزن: {e}")
+            return None
+
+    def invalidate(self, user_id):
+        """حذف اسم مستخدم من الذاكرة"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self):
+        """عدادات الإصابة والإخفاق"""
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'fetch_errors': self.fetch_errors,
+                'evictions': self.evictions,
+                'hit_ratio': round((self.hits + self.negative_hits) / lookups, 3) if lookups else 0.0
+            }
@@ -0,0 +1,226 @@
+"""
+مخزون أسئلة مولدة مسبقاً لكل نوع
+منتج في الخلفية يملأ المخزون من Gemini، واللاعب يأخذ سؤالاً جاهزاً بدون انتظار
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import logging
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:  # ويندوز - عملية واحدة عادة
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionPool:
+    """مخزون محدود لكل نوع أسئلة مع إعادة تعبئة عند الانخفاض
+
+    producers: {kind: دالة تعيد سؤالاً جاهزاً أو ترفع استثناء}. get() تأخذ من
+    المخزون في O(1) أو تعيد None (نقص - المستدعي يستخدم البديل المحلي).
+    عند انخفاض المخزون إلى low_water يُوقظ المنتج ليملأه حتى capacity.
+    لا يُملأ إلا نوع طُلب مرة على الأقل، فلا تُستهلك حصة Gemini لأنواع بلا مستخدم.
+    المخزون يُحفظ في path (JSON) حتى لا تبدأ العملية فارغة بعد إعادة التشغيل،
+    ويكتبه عامل واحد فقط (قفل path.lock) بينما تقرأه العمليات الأخرى عند البدء.
+    """
+
+    def __init__(self, producers, capacity=20, low_water=5, path=None,
+                 retry_delay=5.0, max_retry_delay=300.0, clock=time.monotonic):
+        self._producers = dict(producers)
+        self.capacity = capacity
+        self.low_water = low_water
+        self.path = path
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._clock = clock
+        self._buffers = {kind: deque() for kind in self._producers}
+        self._seen = {kind: set() for kind in self._producers}
+        self._backoff = {kind: (0.0, retry_delay) for kind in self._producers}  # (حتى, التأخير التالي)
+        self._active = set()  # الأنواع التي طُلبت
+        self._owner_fd = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._dirty = False
+        self.served = dict.fromkeys(self._producers, 0)
+        self.underruns = dict.fromkeys(self._producers, 0)
+        self.produced = dict.fromkeys(self._producers, 0)
+        self.failures = dict.fromkeys(self._producers, 0)
+        self.duplicates = 0
+        self.load()
+
+    @staticmethod
+    def _key(item):
+        return json.dumps(item, ensure_ascii=False, sort_keys=True)
+
+    def _push(self, kind, item):
+        key = self._key(item)
+        if key in self._seen[kind]:
+            self.duplicates += 1
+            return False
+        self._buffers[kind].append(item)
+        self._seen[kind].add(key)
+        self._dirty = True
+        return True
+
+    def get(self, kind):
+        """سؤال جاهز أو None - أول طلب لنوع يجعله ضمن التعبئة"""
+        with self._lock:
+            self._active.add(kind)
+            buffer = self._buffers[kind]
+            if buffer:
+                item = buffer.popleft()
+                self._seen[kind].discard(self._key(item))
+                self.served[kind] += 1
+                self._dirty = True
+                low = len(buffer) <= self.low_water
+            else:
+                item = None
+                self.underruns[kind] += 1
+                low = True
+        if low:
+            self._wakeup.set()
+        return item
+
+    def depth(self, kind):
+        with self._lock:
+            return len(self._buffers[kind])
+
+    def start(self, interval=30.0):
+        """تشغيل المنتج في الخلفية (يعمل أيضاً كل interval ثانية) - مرة واحدة"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._interval = interval
+            self._thread = threading.Thread(target=self._run, name="question-pool", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+            try:
+                self.refill()
+                self.save()
+            except Exception as e:
+                logger.error(f"خطأ في تعبئة مخزون الأسئلة: {e}")
+
+    def _needs_refill(self, kind, now):
+        with self._lock:
+            low = kind in self._active and len(self._buffers[kind]) <= self.low_water
+        return low and self._backoff[kind][0] <= now
+
+    def refill(self):
+        """ملء الأنواع المطلوبة المنخفضة حتى capacity - يعيد عدد الأسئلة الجديدة"""
+        added = 0
+        for kind, produce in self._producers.items():
+            if not self._needs_refill(kind, self._clock()):
+                continue
+            misses = 0
+            while self.depth(kind) < self.capacity and misses < 3:
+                try:
+                    item = produce()
+                except Exception as e:
+                    # الـ API غير متاح - ننتظر قبل المحاولة مجدداً (تأخير متزايد)
+                    delay = self._backoff[kind][1]
+                    self._backoff[kind] = (self._clock() + delay, min(delay * 2, self.max_retry_delay))
+                    with self._lock:
+                        self.failures[kind] += 1
+                    logger.warning(f"تعذر توليد سؤال {kind}: {e}")
+                    break
+                with self._lock:
+                    pushed = self._push(kind, item)
+                    if pushed:
+                        self.produced[kind] += 1
+                if pushed:
+                    added += 1
+                    self._backoff[kind] = (0.0, self.retry_delay)
+                else:
+                    misses += 1
+        return added
+
+    def load(self):
+        """تحميل المخزون المحفوظ (إن وجد)"""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"خطأ في قراءة مخزون الأسئلة {self.path}: {e}")
+            return 0
+        loaded = 0
+        with self._lock:
+            for kind, items in data.items():
+                if kind not in self._buffers:
+                    continue
+                for item in items[:self.capacity]:
+                    if len(self._buffers[kind]) < self.capacity and self._push(kind, item):
+                        loaded += 1
+            self._dirty = False
+        logger.info(f"تم تحميل {loaded} سؤال من {self.path}")
+        return loaded
+
+    def _owns_file(self):
+        """هل هذه العملية كاتبة ملف المخزون؟ (flock غير حاجز يبقى طوال عمرها)"""
+        if self._owner_fd is not None or fcntl is None:
+            return True
+        fd = os.open(f"{self.path}.lock", os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._owner_fd = fd
+        return True
+
+    def save(self):
+        """حفظ المخزون بشكل ذري (ملف مؤقت خاص ثم استبدال) - من العامل المالك فقط"""
+        if not self.path:
+            return False
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not self._owns_file():
+            return False
+        with self._lock:
+            if not self._dirty:
+                return False
+            data = {kind: list(buffer) for kind, buffer in self._buffers.items()}
+            self._dirty = False
+        fd, tmp_path = tempfile.mkstemp(dir=directory or '.', prefix=os.path.basename(self.path) + '.',
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"خطأ في حفظ مخزون الأسئلة: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            with self._lock:
+                self._dirty = True
+            return False
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'capacity': self.capacity,
+                'low_water': self.low_water,
+                'active': sorted(self._active),
+                'owner': self._owner_fd is not None or fcntl is None,
+                'depth': {kind: len(buffer) for kind, buffer in self._buffers.items()},
+                'served': dict(self.served),
+                'underruns': dict(self.underruns),
+                'produced': dict(self.produced),
+                'failures': dict(self.failures),
+                'duplicates': self.duplicates
+            }
@@ -0,0 +1,160 @@
+"""
+حد معدل الرسائل بنافذة منزلقة (sliding log)
+لا يسمح بأكثر من limit رسالة في أي window ثانية متتالية - بدون ضعف الحد عند حدود النافذة
+memory: داخل العملية، sqlite: مشترك بين عمال gunicorn
+"""
+import threading
+import time
+import logging
+from collections import OrderedDict, deque
+
+from .db_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+class SlidingWindowLimiter:
+    """سجل أوقات آخر limit رسالة لكل مفتاح (مستخدم أو مجموعة)
+
+    كل مفتاح يشغل deque بطول أقصى limit، ويُحذف بعد مرور نافذة كاملة
+    بدون رسائل (لم يعد يحمل أي معلومة). عند تجاوز max_keys يُحذف الأقدم استخداماً.
+    limit <= 0 يعطل الحد (كل الرسائل مقبولة بدون تسجيل).
+    """
+
+    def __init__(self, limit, window, max_keys=50000, clock=time.monotonic):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._clock = clock
+        self._slots = OrderedDict()  # key -> deque(أوقات الرسائل المقبولة)
+        self._lock = threading.Lock()
+        self._next_sweep = clock() + window
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    def allow(self, key):
+        """تسجيل رسالة - يعيد False إذا تجاوز المفتاح الحد"""
+        if self.limit <= 0:
+            with self._lock:
+                self.allowed += 1
+            return True
+        now = self._clock()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            times = self._slots.get(key)
+            if times is None:
+                times = self._slots[key] = deque(maxlen=self.limit)
+                while len(self._slots) > self.max_keys:
+                    self._slots.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._slots.move_to_end(key)
+            # السجل ممتلئ وأقدم رسالة ما زالت داخل النافذة
+            if len(times) == self.limit and times[0] > now - self.window:
+                self.rejected += 1
+                return False
+            times.append(now)
+            self.allowed += 1
+            return True
+
+    def _sweep(self, now):
+        """حذف المفاتيح التي لم ترسل شيئاً خلال نافذة كاملة"""
+        cutoff = now - self.window
+        # المفاتيح مرتبة حسب آخر استخدام، فنتوقف عند أول مفتاح نشط
+        while self._slots:
+            key, times = next(iter(self._slots.items()))
+            if times and times[-1] > cutoff:
+                break
+            del self._slots[key]
+            self.evictions += 1
+        self._next_sweep = now + self.window
+
+    def __len__(self):
+        return len(self._slots)
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'limit': self.limit, 'window': self.window,
+                    'keys': len(self._slots), 'allowed': self.allowed,
+                    'rejected': self.rejected, 'evictions': self.evictions}
+
+
+class SQLiteSlidingWindowLimiter:
+    """نفس الخوارزمية في ملف SQLite مشترك - صف لكل رسالة مقبولة
+
+    الصفوف الأقدم من النافذة تُحذف دورياً، فالحجم محدود بعدد المفاتيح
+    النشطة × limit. scope يفصل الحدود المختلفة في نفس الجدول.
+    limit <= 0 يعطل الحد كما في SlidingWindowLimiter.
+    """
+
+    def __init__(self, db_path, limit, window, scope='user', clock=time.time):
+        self.limit = limit
+        self.window = window
+        self.scope = scope
+        self._clock = clock
+        self._connections = ConnectionPool(db_path, cache_size_kb=1024)
+        self._lock = threading.Lock()
+        self._next_sweep = clock() + window
+        self.allowed = 0
+        self.rejected = 0
+        self.errors = 0
+        with self._connections.connection() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS rate_events
+                            (scope TEXT NOT NULL, key TEXT NOT NULL, at REAL NOT NULL)''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_rate_events ON rate_events(scope, key, at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_rate_events_at ON rate_events(at)')
+
+    def allow(self, key):
+        if self.limit <= 0:
+            with self._lock:
+                self.allowed += 1
+            return True
+        now = self._clock()
+        try:
+            with self._connections.transaction() as conn:
+                count = conn.execute('''SELECT COUNT(*) FROM rate_events
+                                        WHERE scope = ? AND key = ? AND at > ?''',
+                                     (self.scope, key, now - self.window)).fetchone()[0]
+                allowed = count < self.limit
+                if allowed:
+                    conn.execute('INSERT INTO rate_events (scope, key, at) VALUES (?, ?, ?)',
+                                 (self.scope, key, now))
+                if now >= self._next_sweep:
+                    conn.execute('DELETE FROM rate_events WHERE scope = ? AND at <= ?',
+                                 (self.scope, now - self.window))
+                    self._next_sweep = now + self.window
+        except Exception as e:
+            # لا نمنع الرسائل بسبب خطأ في قاعدة البيانات
+            logger.error(f"خطأ في فحص حد المعدل: {e}")
+            with self._lock:
+                self.errors += 1
+            return True
+        with self._lock:
+            if allowed:
+                self.allowed += 1
+            else:
+                self.rejected += 1
+        return allowed
+
+    def __len__(self):
+        return self._connections.query_one(
+            'SELECT COUNT(DISTINCT key) FROM rate_events WHERE scope = ? AND at > ?',
+            (self.scope, self._clock() - self.window))[0]
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'sqlite', 'scope': self.scope, 'limit': self.limit,
+                    'window': self.window, 'allowed': self.allowed,
+                    'rejected': self.rejected, 'errors': self.errors}
+
+
+def create_rate_limiter(backend, limit, window, db_path='data/games.db', scope='user',
+                        max_keys=50000):
+    """إنشاء محدد المعدل حسب الإعدادات (نفس خيارات مخزن الألعاب)"""
+    if backend == 'sqlite':
+        return SQLiteSlidingWindowLimiter(db_path, limit, window, scope=scope)
+    if backend != 'memory':
+        logger.warning(f"نوع مخزن غير معروف '{backend}' لحد المعدل - استخدام الذاكرة")
+    return SlidingWindowLimiter(limit, window, max_keys=max_keys)
@@ -0,0 +1,78 @@
+"""
+ذاكرة مؤقتة لرسالة ترتيب اللعبة الجارية لكل مجموعة مع حد للطلبات
+الرسالة تُبنى مرة واحدة لكل حالة نقاط في الجولة، والطلبات المتكررة خلال
+فترة التهدئة لا يُرد عليها
+"""
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class StandingsCache:
+    """game_id -> (الرمز، الرسالة المبنية، وقت آخر رد)
+
+    token يمثل حالة الترتيب (اللعبة، رقم السؤال، إصدار النقاط) - تغيّره يعني
+    إعادة البناء. get() يعيد None إذا طُلب الترتيب في نفس المجموعة خلال cooldown،
+    و is_limited() نفس الفحص بدون رمز (قبل قراءة اللعبة).
+    """
+
+    def __init__(self, cooldown=10, max_entries=1000, clock=time.monotonic):
+        self.cooldown = cooldown
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+        self.limited = 0
+        self.evictions = 0
+
+    def is_limited(self, game_id):
+        """فحص سريع للتهدئة بمفتاح المجموعة فقط - قبل قفل اللعبة وقراءتها من المخزن"""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(game_id)
+            if entry is not None and now - entry[2] < self.cooldown:
+                self.limited += 1
+                return True
+        return False
+
+    def get(self, game_id, token, render):
+        """الرسالة من الذاكرة أو render() عند تغير الرمز - None عند تجاوز الحد"""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(game_id)
+            if entry is not None:
+                if now - entry[2] < self.cooldown:
+                    self.limited += 1
+                    return None
+                self._entries.move_to_end(game_id)
+                if entry[0] == token:
+                    self.hits += 1
+                    self._entries[game_id] = (token, entry[1], now)
+                    return entry[1]
+
+        message = render()
+        with self._lock:
+            self.builds += 1
+            self._entries[game_id] = (token, message, now)
+            self._entries.move_to_end(game_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return message
+
+    def stats(self):
+        with self._lock:
+            served = self.hits + self.builds
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'builds': self.builds,
+                'limited': self.limited,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / served, 3) if served else 0.0
+            }
@@ -0,0 +1,337 @@
+"""
+محرك التخزين الموحد - قاعدة بيانات واحدة بمخطط له رقم إصدار
+يحل محل الطبقات الثلاث السابقة (app.py و database.py و db_utils.py)
+"""
+import os
+import sqlite3
+import threading
+import atexit
+import logging
+from datetime import datetime
+
+from .db_pool import ConnectionPool, ScoreBuffer, write_scores
+from .leaderboard_index import LeaderboardIndex
+
+logger = logging.getLogger(__name__)
+
+
+# كل ترحيل يُطبق مرة واحدة ويُسجل في PRAGMA user_version
+# الإصدار 1 يطابق جداول app.py القديمة حتى تُعتمد قواعد البيانات الحالية كما هي
+MIGRATIONS = (
+    (1, 'الجداول الأساسية', (
+        '''CREATE TABLE IF NOT EXISTS users
+           (user_id TEXT PRIMARY KEY,
+            display_name TEXT,
+            total_points INTEGER DEFAULT 0,
+            games_played INTEGER DEFAULT 0,
+            wins INTEGER DEFAULT 0,
+            last_played TEXT,
+            registered_at TEXT DEFAULT CURRENT_TIMESTAMP)''',
+        '''CREATE TABLE IF NOT EXISTS game_history
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT,
+            game_type TEXT,
+            points INTEGER,
+            won INTEGER,
+            played_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(user_id))''',
+    )),
+    (2, 'فهارس مغطية للصدارة والترتيب والسجل', (
+        'DROP INDEX IF EXISTS idx_user_points',
+        'DROP INDEX IF EXISTS idx_game_history_user',
+        # الصدارة والترتيب تُقرأ من الفهرس وحده بدون الرجوع للجدول
+        '''CREATE INDEX IF NOT EXISTS idx_users_leaderboard
+           ON users(total_points DESC, display_name, games_played, wins, user_id)''',
+        '''CREATE INDEX IF NOT EXISTS idx_history_user
+           ON game_history(user_id, played_at, game_type, points, won)''',
+        'CREATE INDEX IF NOT EXISTS idx_history_played_at ON game_history(played_at)',
+    )),
+    (3, 'سجل استيراد قواعد البيانات القديمة', (
+        '''CREATE TABLE IF NOT EXISTS legacy_imports
+           (source TEXT PRIMARY KEY,
+            users INTEGER,
+            imported_at TEXT)''',
+    )),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# الاستعلامات ثابتة النص حتى يعيد sqlite3 استخدام الجمل المجهزة لكل اتصال
+SELECT_USER_SQL = 'SELECT * FROM users WHERE user_id = ?'
+SELECT_NAME_SQL = 'SELECT display_name FROM users WHERE user_id = ?'
+UPDATE_NAME_SQL = '''UPDATE users SET display_name = ?
+                     WHERE user_id = ? AND display_name IS NOT ?'''
+UPSERT_NAME_SQL = '''INSERT INTO users (user_id, display_name, last_played) VALUES (?, ?, ?)
+                     ON CONFLICT(user_id) DO UPDATE SET
+                         display_name = excluded.display_name,
+                         last_played = excluded.last_played'''
+LEADERBOARD_SQL = '''SELECT user_id, display_name, total_points, games_played, wins
+                     FROM users
+                     ORDER BY total_points DESC LIMIT ?'''
+RANK_SQL = '''SELECT COUNT(*) + 1 FROM users
+              WHERE total_points > (SELECT total_points FROM users WHERE user_id = ?)'''
+SET_SCORE_SQL = '''UPDATE users SET total_points = ?,
+                       games_played = games_played + 1,
+                       wins = wins + ?,
+                       last_played = ?
+                   WHERE user_id = ?'''
+INDEX_ROWS_SQL = 'SELECT user_id, display_name, total_points, games_played, wins FROM users'
+TOTALS_SQL = '''SELECT COUNT(*), COALESCE(SUM(games_played), 0), COALESCE(SUM(total_points), 0)
+                FROM users'''
+
+
+def migrate(pool):
+    """تطبيق الترحيلات الناقصة - يعيد رقم الإصدار النهائي"""
+    version = pool.query_one('PRAGMA user_version')[0]
+    for target, description, statements in MIGRATIONS:
+        if target <= version:
+            continue
+        with pool.transaction() as tx:
+            # قراءة الإصدار داخل المعاملة لأن عمال gunicorn قد يبدؤون معاً
+            current = tx.execute('PRAGMA user_version').fetchone()[0]
+            if current >= target:
+                version = current
+                continue
+            for statement in statements:
+                tx.execute(statement)
+            tx.execute(f'PRAGMA user_version = {target}')
+        version = target
+        logger.info(f"ترحيل قاعدة البيانات إلى الإصدار {target}: {description}")
+    return version
+
+
+class Storage:
+    """واجهة موحدة لجداول users و game_history"""
+
+    def __init__(self, db_path, flush_interval=0):
+        self.db_path = db_path
+        self.pool = ConnectionPool(db_path)
+        self.version = migrate(self.pool)
+        self.buffer = None
+        if flush_interval > 0:
+            self.buffer = ScoreBuffer(self.pool, flush_interval)
+            self.buffer.start()
+        self.index = LeaderboardIndex()
+        # دوال تُستدعى (user_id, points) بعد أي تغيير في النقاط أو الأسماء
+        self.listeners = []
+        self.reload_index()
+
+    def connection(self):
+        """استعارة اتصال من المجمع: with storage.connection() as conn"""
+        return self.pool.connection()
+
+    def reload_index(self):
+        """إعادة بناء فهرس الصدارة من قاعدة البيانات"""
+        self.flush()
+        self.index.load(self.pool.query(INDEX_ROWS_SQL))
+        self._notify(None)
+
+    def _notify(self, user_id):
+        points = self.index.points(user_id) if user_id is not None else None
+        for listener in self.listeners:
+            try:
+                listener(user_id, points)
+            except Exception as e:
+                logger.error(f"خطأ في مستمع تحديث النقاط: {e}")
+
+    def verify_index(self):
+        """مقارنة فهرس الصدارة مع SQL وإعادة بنائه عند الاختلاف
+
+        ضروري مع عدة عمال gunicorn لأن كل عملية تحدّث فهرسها فقط.
+        """
+        self.flush()
+        with self.connection() as conn:
+            problems = self.index.verify(conn)
+        if problems:
+            logger.warning(f"فهرس الصدارة غير متطابق ({'; '.join(problems[:3])}) - إعادة البناء")
+            self.reload_index()
+        return problems
+
+    def flush(self):
+        """كتابة النقاط المعلقة فوراً"""
+        if self.buffer is not None:
+            self.buffer.flush()
+
+    # الكتابة
+    def add_score(self, user_id, display_name, points, won=False, game_type=""):
+        """إضافة نقاط لمستخدم (مع سجل اللعبة إن وُجد نوعها)"""
+        if self.buffer is not None:
+            self.buffer.add(user_id, display_name, points, won, game_type)
+        else:
+            history = [(user_id, game_type, points, 1 if won else 0)] if game_type else []
+            with self.pool.transaction() as conn:
+                write_scores(conn, [(user_id, display_name, points, 1, 1 if won else 0,
+                                     datetime.now().isoformat())], history)
+        self.index.add_score(user_id, display_name, points, won)
+        self._notify(user_id)
+
+    def log_game(self, user_id, game_type, points, won=False):
+        """تسجيل لعبة بدون تغيير النقاط"""
+        self.pool.execute(
+            'INSERT INTO game_history (user_id, game_type, points, won) VALUES (?, ?, ?, ?)',
+            (user_id, game_type, points, 1 if won else 0))
+
+    def upsert_user(self, user_id, display_name):
+        """تسجيل مستخدم أو تحديث اسمه"""
+        self.pool.execute(UPSERT_NAME_SQL, (user_id, display_name, datetime.now().isoformat()))
+        self.index.ensure_user(user_id, display_name)
+        self._notify(user_id)
+
+    def set_display_name(self, user_id, display_name):
+        """تحديث الاسم المخزن للمستخدمين الموجودين فقط"""
+        self.pool.execute(UPDATE_NAME_SQL, (display_name, user_id, display_name))
+        self.index.set_name(user_id, display_name)
+        self._notify(user_id)
+
+    def set_score(self, user_id, total_points, won=False):
+        """تعيين مجموع النقاط مباشرة (واجهة db_utils القديمة)"""
+        self.flush()
+        self.pool.execute(SET_SCORE_SQL, (total_points, 1 if won else 0,
+                                          datetime.now().isoformat(), user_id))
+        self.index.set_score(user_id, total_points, won)
+        self._notify(user_id)
+
+    def cleanup_history(self, days=90):
+        """حذف سجل الألعاب الأقدم من عدد الأيام المحدد"""
+        return self.pool.execute(
+            "DELETE FROM game_history WHERE played_at < datetime('now', ?)", (f'-{int(days)} days',))
+
+    def backup(self, backup_path):
+        """نسخة احتياطية متسقة (تشمل ما في ملف WAL)"""
+        self.flush()
+        directory = os.path.dirname(backup_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        target = sqlite3.connect(backup_path)
+        try:
+            with self.connection() as conn:
+                conn.backup(target)
+        finally:
+            target.close()
+
+    # القراءة - تكتب النقاط المعلقة أولاً حتى يرى المستخدم نقاطه
+    def get_user(self, user_id):
+        self.flush()
+        return self.pool.query_one(SELECT_USER_SQL, (user_id,))
+
+    def get_display_name(self, user_id):
+        row = self.pool.query_one(SELECT_NAME_SQL, (user_id,))
+        return row[0] if row else None
+
+    def get_leaderboard(self, limit=10):
+        """أفضل N لاعبين من فهرس الذاكرة"""
+        return self.index.top(limit)
+
+    def query_leaderboard(self, limit=10):
+        """أفضل N من SQL مباشرة - يشمل نقاط العمال الآخرين التي لم تصل لفهرس هذه العملية"""
+        self.flush()
+        return [dict(row) for row in self.pool.query(LEADERBOARD_SQL, (limit,))]
+
+    def get_rank(self, user_id):
+        """ترتيب المستخدم (1 = الأول)"""
+        rank = self.index.rank(user_id)
+        if rank is not None:
+            return rank
+        self.flush()
+        return self.pool.query_one(RANK_SQL, (user_id,))[0]
+
+    def get_neighbours(self, user_id, radius=2):
+        """اللاعبون قبل المستخدم وبعده في الترتيب"""
+        return self.index.around(user_id, radius)
+
+    def get_user_stats(self, user_id):
+        """إحصائيات المستخدم مع نسبة الفوز - قاموس أو None"""
+        row = self.get_user(user_id)
+        if row is None:
+            return None
+        stats = dict(row)
+        games = stats['games_played'] or 0
+        stats['win_rate'] = round(stats['wins'] * 100.0 / games, 1) if games else 0
+        return stats
+
+    def total_stats(self):
+        self.flush()
+        users, games, points = self.pool.query_one(TOTALS_SQL)
+        return {'total_users': users, 'total_games': games, 'total_points': points}
+
+    # استيراد قواعد البيانات القديمة
+    def import_legacy(self, path):
+        """دمج قاعدة بيانات قديمة (data/users.db أو users.db) مرة واحدة فقط"""
+        if not os.path.exists(path):
+            return 0
+        source = os.path.abspath(path)
+        if source == os.path.abspath(self.db_path):
+            return 0
+
+        if self.pool.query_one('SELECT 1 FROM legacy_imports WHERE source = ?', (source,)):
+            return 0
+
+        # ATTACH خاص بالاتصال - كل الخطوات على نفس الاتصال المستعار
+        with self.connection() as conn:
+            conn.execute('ATTACH DATABASE ? AS legacy', (source,))
+            try:
+                columns = {row[1] for row in conn.execute('PRAGMA legacy.table_info(users)')}
+                points = 'points' if 'points' in columns else 'score' if 'score' in columns else None
+                if points is None or 'name' not in columns:
+                    logger.warning(f"مخطط غير معروف في {path} - تم التجاهل")
+                    return 0
+                last = 'last_active' if 'last_active' in columns else 'last_activity'
+
+                with self.pool.transaction() as tx:
+                    imported = tx.execute(f'''
+                        INSERT INTO users (user_id, display_name, total_points, games_played, wins, last_played)
+                        SELECT user_id, name, {points}, games_played, wins, {last} FROM legacy.users WHERE 1
+                        ON CONFLICT(user_id) DO UPDATE SET
+                            total_points = total_points + excluded.total_points,
+                            games_played = games_played + excluded.games_played,
+                            wins = wins + excluded.wins,
+                            display_name = COALESCE(display_name, excluded.display_name)''').rowcount
+
+                    history = {row[1] for row in tx.execute('PRAGMA legacy.table_info(games_history)')}
+                    if history:
+                        won = 'is_win' if 'is_win' in history else \
+                            "CASE WHEN result IN ('win', 'won', 'فوز') THEN 1 ELSE 0 END"
+                        tx.execute(f'''
+                            INSERT INTO game_history (user_id, game_type, points, won, played_at)
+                            SELECT user_id, game_type, points_earned, {won}, played_at
+                            FROM legacy.games_history''')
+
+                    tx.execute('INSERT INTO legacy_imports (source, users, imported_at) VALUES (?, ?, ?)',
+                               (source, imported, datetime.now().isoformat()))
+            finally:
+                conn.execute('DETACH DATABASE legacy')
+
+        self.reload_index()
+        logger.info(f"تم استيراد {imported} مستخدم من {path}")
+        return imported
+
+    def stats(self):
+        return {
+            'schema_version': self.version,
+            'pool': self.pool.stats(),
+            'leaderboard_index': self.index.stats(),
+            'score_buffer': self.buffer.stats() if self.buffer else None
+        }
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """المحرك المشترك لكل العملية - يُنشأ عند أول استخدام"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                from config import Config
+                storage = Storage(Config.DB_NAME, Config.SCORE_FLUSH_INTERVAL_MS / 1000.0)
+                for path in Config.LEGACY_DB_PATHS:
+                    try:
+                        storage.import_legacy(path)
+                    except Exception as e:
+                        logger.error(f"خطأ في استيراد {path}: {e}")
+                if storage.buffer is not None:
+                    atexit.register(storage.flush)
+                _storage = storage
+    return _storage